@@ -1,83 +1,165 @@
+import time
+_BOOT_TIME = time.monotonic()
+
 import logging
-import requests
-from bs4 import BeautifulSoup
+import math
 import re
 import json
 import os
+import sys
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import google.generativeai as genai
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
-from openpyxl import load_workbook
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from utils.singleflight import SingleFlight
+from utils.lazy_import import lazy_module, import_timings
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.gemini_dispatcher import GeminiDispatcher
+from utils.amortization import MAX_PERIODS, SAVINGS_ESCALATION, iter_csv, iter_ndjson, schedule_json
+from utils.savings_simulation import simulate_savings
+from utils.irradiance import (DEFAULT_AZIMUTH, DEFAULT_IRRADIANCE_PATH, DEFAULT_TILT, IrradianceGrid,
+                              effective_sun_hours)
+from utils.spatial_index import DEFAULT_CENTROIDS_PATH, LocationIndex, ZipCentroids
+from utils.admission import DEGRADED, AdmissionController, OverloadedError, parse_limits, queued_seconds
+from utils.prewarm import CacheWarmer, WarmTask, store_requests
+from utils.log_store import LogStore, parse_time
+from utils.log_policy import LogPolicy, parse_rates
+from utils.shared_cache import TieredCache, cache_backend
+from utils.snapshot import DEFAULT_SNAPSHOT_PATH, DataSnapshot
+from utils.deadline import (DeadlineExceeded, budget_spent, end_deadline, parse_deadlines, remaining_budget,
+                            requested_seconds, stage_timeout, start_deadline)
+try:
+    from flask_limiter import Limiter
+except ImportError:  # optional: per-client rate limits are skipped without it
+    Limiter = None
+
+# Heavy dependencies are imported on first use (or by the warm-up thread)
+# so a cold start can bind the port before paying for them
+requests = lazy_module('requests')
+bs4 = lazy_module('bs4')
+genai = lazy_module('google.generativeai')
+openpyxl = lazy_module('openpyxl')
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+# request.remote_addr is the client as seen by the last TRUSTED_PROXY_HOPS
+# proxies in front of us (Render adds one); hops the client wrote itself
+# into X-Forwarded-For are ignored. Set 0 when nothing sits in front.
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 1))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create logs directory if it doesn't exist (in root directory)
-LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
+# Concurrent lookups for the same ZIP/county/applicant share one upstream call;
+# a waiter gives up when its own request's deadline runs out
+single_flight = SingleFlight(wait_timeout=remaining_budget)
+
+# Create logs directory if it doesn't exist (in root directory unless LOGS_DIR is set)
+LOGS_DIR = os.getenv('LOGS_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs'))
 if not os.path.exists(LOGS_DIR):
     os.makedirs(LOGS_DIR)
 
-def log_api_request(endpoint: str, zip_code: str, response_data: dict, extra_data: dict = None):
-    """Log API requests and responses to separate files"""
-    timestamp = datetime.now().isoformat()
-
-    # Create log entry
-    log_entry = {
-        'timestamp': timestamp,
-        'endpoint': endpoint,
-        'zip_code': zip_code,
-        'response_data': response_data,
-        'extra_data': extra_data or {}
-    }
-
-    # Log to main API log file
-    api_log_file = os.path.join(LOGS_DIR, 'api_requests.jsonl')
-    with open(api_log_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(log_entry) + '\n')
-
-    # Log to endpoint-specific file
-    endpoint_name = endpoint.replace('/', '_').replace('-', '_')
-    endpoint_log_file = os.path.join(LOGS_DIR, f'{endpoint_name}_data.jsonl')
-    with open(endpoint_log_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(log_entry) + '\n')
-
-    # Log extra data to separate file if present
-    if extra_data:
-        extra_log_file = os.path.join(LOGS_DIR, f'{endpoint_name}_extra_data.jsonl')
-        extra_entry = {
-            'timestamp': timestamp,
-            'zip_code': zip_code,
-            'extra_data': extra_data
-        }
-        with open(extra_log_file, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(extra_entry) + '\n')
-
-def log_data_source_details(zip_code: str, source: str, raw_data: dict, processed_data: dict):
-    """Log detailed information about data sources and processing"""
-    timestamp = datetime.now().isoformat()
-
-    log_entry = {
-        'timestamp': timestamp,
-        'zip_code': zip_code,
-        'data_source': source,
-        'raw_data': raw_data,
-        'processed_data': processed_data
+# Log entries go to an indexed SQLite store (written in batches by a
+# background thread) that serves /logs queries. Entries older than
+# LOG_DETAIL_DAYS are rolled up into daily counts, which are kept for
+# LOG_RETENTION_DAYS. The JSONL files in LOGS_DIR are the fallback when the
+# store is off; LOG_JSONL_ENABLED=true keeps writing them alongside it.
+LOG_STORE_ENABLED = os.getenv('LOG_STORE_ENABLED', 'true').lower() == 'true'
+LOG_JSONL_ENABLED = os.getenv('LOG_JSONL_ENABLED', 'false').lower() == 'true'
+LOG_STORE_PATH = os.getenv('LOG_STORE_PATH', os.path.join(LOGS_DIR, 'logs.db'))
+LOG_DETAIL_DAYS = float(os.getenv('LOG_DETAIL_DAYS', 30))
+LOG_RETENTION_DAYS = float(os.getenv('LOG_RETENTION_DAYS', 365))
+log_store = LogStore(LOG_STORE_PATH, detail_days=LOG_DETAIL_DAYS,
+                     retention_days=LOG_RETENTION_DAYS) if LOG_STORE_ENABLED else None
+
+# Lookup results are cached per process (L1) in front of a cache shared by
+# every worker (L2), so a result fetched by one worker - or before a restart -
+# is reused by the rest. SHARED_CACHE_URL is sqlite:///<path> (one file per
+# host, the default), redis://host:port/db for an external service shared
+# across hosts, memory:// (this process only) or none.
+SHARED_CACHE_URL = os.getenv('SHARED_CACHE_URL', 'sqlite:///' + os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'shared_cache.db'))
+SHARED_CACHE_MAX_MB = float(os.getenv('SHARED_CACHE_MAX_MB', 256))
+SHARED_CACHE_L1_ENTRIES = int(os.getenv('SHARED_CACHE_L1_ENTRIES', 10000))
+shared_cache = cache_backend(SHARED_CACHE_URL, max_bytes=int(SHARED_CACHE_MAX_MB * 1024 * 1024))
+
+# OFFLINE_MODE=true serves every upstream lookup (locations, electricity rates,
+# Census, Vantage Scores) from the bundle at DATA_SNAPSHOT_PATH, built by
+# scripts/build_snapshot.py, and never calls Gemini: the server makes no
+# network calls, and a ZIP the bundle doesn't cover is an error.
+OFFLINE_MODE = os.getenv('OFFLINE_MODE', 'false').lower() == 'true'
+DATA_SNAPSHOT_PATH = os.getenv('DATA_SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH)
+snapshot = DataSnapshot(DATA_SNAPSHOT_PATH) if OFFLINE_MODE else None
+
+# What gets logged for successful requests: LOG_SAMPLE_RATE (and per-endpoint
+# LOG_SAMPLE_RATES, e.g. 'electricity-data=0.1,zip-profile=0.1') of them, cut
+# to the fields below and to LOG_MAX_RECORD_BYTES. Errors and degraded
+# responses are always logged in full.
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 1.0))
+LOG_SAMPLE_RATES = parse_rates(os.getenv('LOG_SAMPLE_RATES', ''))
+LOG_MAX_RECORD_BYTES = int(os.getenv('LOG_MAX_RECORD_BYTES', 4096))
+LOG_MAX_STRING = int(os.getenv('LOG_MAX_STRING', 300))
+CLIENT_FIELDS = ('request_ip', 'user_agent')
+LOG_FIELDS = {
+    'electricity-data': {
+        'response_data': ('zip_code', 'city', 'state', 'data_source', 'average_monthly_bill',
+                          'utility_rate_per_kwh', 'degraded'),
+        'extra_data': ('data_source_used', 'raw_scraped_data', *CLIENT_FIELDS)
+    },
+    'demographic-data': {
+        'response_data': ('zip_code', 'city', 'state', 'data_source', 'total_population',
+                          'median_household_income', 'race_percentages'),
+        'extra_data': ('race_diversity_score', *CLIENT_FIELDS)
+    },
+    'check-qualification': {
+        'response_data': ('status', 'system_size_kw', 'total_cost', 'net_cost_after_incentives',
+                          'lifetime_savings', 'loan_terms', 'location', 'degraded'),
+        'extra_data': ('input_data', 'ai_powered', *CLIENT_FIELDS)
+    },
+    'gemini': {
+        'ai_result': ('status', 'system_size_kw', 'total_cost', 'net_cost_after_incentives',
+                      'lifetime_savings', 'loan_terms')
+    },
+    'zip-profile': {
+        'response_data': ('zip_code', 'city', 'state', 'elapsed_ms', 'degraded')
     }
-
-    # Log to data sources file
-    sources_log_file = os.path.join(LOGS_DIR, 'data_sources.jsonl')
-    with open(sources_log_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(log_entry) + '\n')
+}
+log_policy = LogPolicy(LOG_SAMPLE_RATES, LOG_SAMPLE_RATE, LOG_FIELDS,
+                       max_record_bytes=LOG_MAX_RECORD_BYTES, max_string=LOG_MAX_STRING)
+
+def write_log(log_type: str, entry: dict):
+    """Hand an entry to the log store, and append it to <log_type>.jsonl if there is none (or LOG_JSONL_ENABLED)"""
+    if log_store:
+        log_store.write(log_type, entry)
+    if LOG_JSONL_ENABLED or not log_store:
+        with open(os.path.join(LOGS_DIR, f'{log_type}.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+def log_api_request(endpoint: str, zip_code: str, response_data: dict, extra_data: dict = None) -> bool:
+    """Log one request as a single api_requests record
+
+    The per-endpoint, extra data and data source views are derived from it
+    (see /logs). Returns False if the request was sampled out.
+    """
+    log_entry = log_policy.record(endpoint, zip_code, response_data, extra_data, datetime.now().isoformat())
+    if log_entry is None:
+        return False
+
+    write_log('api_requests', log_entry)
+    return True
 
 def log_error(endpoint: str, zip_code: str, error: str, error_details: dict = None):
-    """Log errors to separate error file"""
+    """Log an error as a single errors record"""
     timestamp = datetime.now().isoformat()
 
     error_entry = {
@@ -88,9 +170,7 @@ def log_error(endpoint: str, zip_code: str, error: str, error_details: dict = No
         'error_details': error_details or {}
     }
 
-    error_log_file = os.path.join(LOGS_DIR, 'errors.jsonl')
-    with open(error_log_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(error_entry) + '\n')
+    write_log('errors', error_entry)
 
 # API Keys and URLs from Environment Variables
 EIA_API_KEY = os.getenv('EIA_API_KEY')
@@ -100,6 +180,40 @@ FCC_LOOKUP_URL = os.getenv('FCC_LOOKUP_URL')
 CENSUS_API_KEY = os.getenv('CENSUS_API_KEY')
 CENSUS_API_URL = os.getenv('CENSUS_API_URL')
 
+# Scraped sources; overridable so load tests can point them at local stubs
+FINDENERGY_URL = os.getenv('FINDENERGY_URL', 'https://findenergy.com/{state}/{county}-electricity/')
+ELECTRICITYRATES_URL = os.getenv('ELECTRICITYRATES_URL', 'https://www.electricityrates.com/electricity-rates/{state}/')
+SAVEONENERGY_URL = os.getenv('SAVEONENERGY_URL', 'https://www.saveonenergy.com/electricity-rates/{state}/')
+SCRAPER_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+
+# Circuit breakers: after CIRCUIT_FAILURE_THRESHOLD failed or slow calls within
+# CIRCUIT_WINDOW_SECONDS a provider is skipped for CIRCUIT_RESET_SECONDS, then
+# probed with a single trial request
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_WINDOW_SECONDS = float(os.getenv('CIRCUIT_WINDOW_SECONDS', 60))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', 5))
+CIRCUIT_RESET_SECONDS = float(os.getenv('CIRCUIT_RESET_SECONDS', 30))
+GEMINI_SLOW_CALL_SECONDS = float(os.getenv('GEMINI_SLOW_CALL_SECONDS', 20))
+
+def provider_failure(error: BaseException) -> bool:
+    """Whether an error from a provider call counts against its breaker
+
+    A 4xx means the provider is up and turned down this request (e.g. a
+    county findenergy doesn't know), so only 5xx responses, timeouts and
+    connection errors count.
+    """
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'status', None)  # requests / aiohttp
+    return not isinstance(status, int) or status >= 500
+
+breakers = {
+    name: CircuitBreaker(name, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_WINDOW_SECONDS,
+                         GEMINI_SLOW_CALL_SECONDS if name == 'gemini' else CIRCUIT_SLOW_CALL_SECONDS,
+                         CIRCUIT_RESET_SECONDS, provider_failure,
+                         is_abandoned=lambda error: isinstance(error, DeadlineExceeded))
+    for name in ('findenergy.com', 'eia', 'electricityrates.com', 'saveonenergy.com', 'gemini')
+}
+
 # Vantage Score - now using local Excel file instead of API
 
 # Validate required environment variables
@@ -116,8 +230,10 @@ missing_vars = [var for var, value in required_env_vars.items() if not value]
 if missing_vars:
     logger.warning(f"Missing environment variables: {', '.join(missing_vars)}. Please check your .env file.")
 
-# Global variable to cache Excel data
+# Global variable to cache Excel data; the parsed dict is also shared with the
+# other workers (keyed by the file's mtime) so only one of them parses it
 _vantage_data_cache = None
+_vantage_shared = TieredCache('vantage', shared_cache, ttl=24 * 3600, max_entries=1)
 
 def load_vantage_data_from_excel():
     """Load Vantage Score data from local Excel file using openpyxl"""
@@ -126,6 +242,10 @@ def load_vantage_data_from_excel():
     if _vantage_data_cache is not None:
         return _vantage_data_cache
 
+    if snapshot is not None and snapshot.vantage() is not None:
+        _vantage_data_cache = snapshot.vantage()
+        return _vantage_data_cache
+
     try:
         # Path to Excel file (in root directory)
         excel_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'new data.xlsx')
@@ -134,9 +254,16 @@ def load_vantage_data_from_excel():
             logger.error(f"Excel file not found at: {excel_path}")
             return None
 
+        shared_key = (excel_path, os.path.getmtime(excel_path))
+        shared = _vantage_shared.get(shared_key)
+        if shared is not None:
+            _vantage_data_cache = shared
+            logger.info(f"Loaded {len(shared)} Vantage Score records from the shared cache")
+            return shared
+
         # Read Excel file using openpyxl
         logger.info(f"Loading Vantage Score data from: {excel_path}")
-        workbook = load_workbook(excel_path, read_only=True)
+        workbook = openpyxl.load_workbook(excel_path, read_only=True)
         worksheet = workbook.active
 
         # Get header row to find column indices
@@ -201,6 +328,7 @@ def load_vantage_data_from_excel():
 
         workbook.close()
         _vantage_data_cache = vantage_dict
+        _vantage_shared.set(shared_key, vantage_dict)
         logger.info(f"Loaded {len(vantage_dict)} Vantage Score records from Excel file")
         return vantage_dict
 
@@ -208,79 +336,359 @@ def load_vantage_data_from_excel():
         logger.error(f"Error loading Excel file: {e}")
         return None
 
-# Gemini AI Configuration
+# Gemini AI Configuration (the SDK is configured on first use)
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if GEMINI_API_KEY:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        logger.info("Gemini AI configured successfully")
-    except Exception as e:
-        logger.warning("Gemini AI configuration failed: %s", e)
-else:
+# Optional REST endpoint override (e.g. the local stubs used for load tests)
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')
+if not GEMINI_API_KEY:
     logger.warning("GEMINI_API_KEY not found in environment variables. Please set it in .env file.")
+_gemini_configured = False
+_gemini_lock = threading.Lock()
+
+def get_genai():
+    """Import and configure the Gemini SDK on first use"""
+    global _gemini_configured
+    if not _gemini_configured:
+        with _gemini_lock:
+            if not _gemini_configured:
+                if GEMINI_API_KEY:
+                    try:
+                        if GEMINI_API_ENDPOINT:
+                            genai.configure(api_key=GEMINI_API_KEY, transport='rest',
+                                            client_options={'api_endpoint': GEMINI_API_ENDPOINT})
+                        else:
+                            genai.configure(api_key=GEMINI_API_KEY)
+                        logger.info("Gemini AI configured successfully")
+                    except Exception as e:
+                        logger.warning("Gemini AI configuration failed: %s", e)
+                _gemini_configured = True
+    return genai
+
+GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+# Send compact applicant JSON with schema-constrained output (see GEMINI_SYSTEM_INSTRUCTION)
+GEMINI_STRUCTURED_OUTPUT = os.getenv('GEMINI_STRUCTURED_OUTPUT', 'false').lower() == 'true'
+_gemini_model = None
+
+def get_gemini_model():
+    """Long-lived Gemini model client shared by every request"""
+    global _gemini_model
+    if _gemini_model is None:
+        configured = get_genai()
+        with _gemini_lock:
+            if _gemini_model is None:
+                _gemini_model = configured.GenerativeModel(
+                    GEMINI_MODEL_NAME,
+                    system_instruction=GEMINI_SYSTEM_INSTRUCTION if GEMINI_STRUCTURED_OUTPUT else None
+                )
+    return _gemini_model
+
+def generate_gemini_text(prompt: str, batched: bool = False):
+    """One blocking Gemini call through the provider's circuit breaker; returns (text, token counts)"""
+    response = breakers['gemini'].call(get_gemini_model().generate_content, prompt,
+                                       generation_config=gemini_generation_config(batched),
+                                       request_options={'timeout': GEMINI_TIMEOUT_SECONDS})
+    return response.text, gemini_usage(response)
+
+# At most GEMINI_MAX_CONCURRENCY calls in flight per worker; requests queued
+# longer than GEMINI_MAX_QUEUE_SECONDS use the fallback calculation. With
+# GEMINI_BATCH_SIZE > 1 queued applicants are packed into one call. Batching
+# needs GEMINI_STRUCTURED_OUTPUT, where the rules are sent once as the system
+# instruction and each applicant is only its own fields; a batch of full text
+# prompts would repeat the rules per applicant and save nothing.
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', 4))
+GEMINI_MAX_QUEUE_SECONDS = float(os.getenv('GEMINI_MAX_QUEUE_SECONDS', 10))
+GEMINI_BATCH_SIZE = int(os.getenv('GEMINI_BATCH_SIZE', 1))
+if GEMINI_BATCH_SIZE > 1 and not GEMINI_STRUCTURED_OUTPUT:
+    logger.warning("GEMINI_BATCH_SIZE needs GEMINI_STRUCTURED_OUTPUT=true; sending applicants one at a time")
+    GEMINI_BATCH_SIZE = 1
+GEMINI_BATCH_WAIT_SECONDS = float(os.getenv('GEMINI_BATCH_WAIT_MS', 50)) / 1000
+# Upper bound on one model call; callers stop waiting sooner when their request's deadline is closer
+GEMINI_TIMEOUT_SECONDS = float(os.getenv('GEMINI_TIMEOUT_SECONDS', 30))
+
+# Shared HTTP session so upstream connections are pooled across requests
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """Return the process-wide requests session, creating it on first use"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=20, pool_maxsize=50)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _http_session = session
+    return _http_session
+
+# ZIP -> county/state never changes, so resolved locations are kept for a month
+LOCATION_CACHE_SECONDS = float(os.getenv('LOCATION_CACHE_SECONDS', 30 * 24 * 3600))
+_zip_location_cache = TieredCache('location', shared_cache, ttl=LOCATION_CACHE_SECONDS,
+                                  max_entries=SHARED_CACHE_L1_ENTRIES, decode=tuple)
 
 def zip_to_location(zip_code: str):
     """Get location info from ZIP"""
-    resp = requests.get(ZIPPOPOTAM_URL.format(zip=zip_code), timeout=10)
+    if snapshot is not None:
+        return offline_lookup(snapshot.location(zip_code), zip_code)
+    location = _zip_location_cache.get(zip_code)
+    prewarmer.record('location', zip_code, location is not None)
+    if location is None:
+        location = single_flight.do(('zip_to_location', zip_code), _lookup_zip_location, zip_code)
+        _zip_location_cache.set(zip_code, location)
+    return location
+
+def location_is_cached(zip_code: str) -> bool:
+    """Whether zip_to_location can answer without a network call"""
+    return snapshot is not None or zip_code in _zip_location_cache
+
+def offline_lookup(value, zip_code: str):
+    """A value from the data snapshot; a ZIP it doesn't cover can't be looked up offline"""
+    if value is None:
+        raise LookupError(f'ZIP {zip_code} is not in the offline data snapshot')
+    return value
+
+def _lookup_zip_location(zip_code: str):
+    """Resolve a ZIP to county/state/city via Zippopotam and the FCC API"""
+    resp = get_http_session().get(ZIPPOPOTAM_URL.format(zip=zip_code),
+                                  timeout=stage_timeout(10, 'zippopotam'))
     resp.raise_for_status()
-    data = resp.json()
-    
-    place = data['places'][0]
-    lat, lng = float(place['latitude']), float(place['longitude'])
-    state_code = place['state abbreviation']
-    city = place['place name']
-    
+    lat, lng, state_code, city = parse_zippopotam_response(resp.json())
+
     # Get county
-    params = {'latitude': lat, 'longitude': lng, 'format': 'json'}
-    resp = requests.get(FCC_LOOKUP_URL, params=params, timeout=10)
+    resp = get_http_session().get(FCC_LOOKUP_URL, params=fcc_lookup_params(lat, lng),
+                                  timeout=stage_timeout(10, 'fcc'))
     resp.raise_for_status()
-    fcc_data = resp.json()
-    
-    county = fcc_data['County']['name'].replace(' County', '').lower().replace(' ', '-')
+    county = parse_fcc_county(resp.json())
     state_slug = state_code.lower()
-    
+
     logger.info("Location: %s, %s -> %s county", city, state_code, county)
     return county, state_slug, city, state_code
 
+# Coordinates never change for a ZIP either
+_zip_coordinates_cache = TieredCache('coordinates', shared_cache, ttl=LOCATION_CACHE_SECONDS,
+                                     max_entries=SHARED_CACHE_L1_ENTRIES, decode=tuple)
+
+def zip_coordinates(zip_code: str):
+    """(lat, lng) for a ZIP via Zippopotam"""
+    if snapshot is not None:
+        return offline_lookup(snapshot.coordinates(zip_code), zip_code)
+    coordinates = _zip_coordinates_cache.get(zip_code)
+    if coordinates is None:
+        coordinates = single_flight.do(('zip_coordinates', zip_code), _lookup_zip_coordinates, zip_code)
+        _zip_coordinates_cache.set(zip_code, coordinates)
+    return coordinates
+
+def _lookup_zip_coordinates(zip_code: str):
+    resp = get_http_session().get(ZIPPOPOTAM_URL.format(zip=zip_code),
+                                  timeout=stage_timeout(10, 'zippopotam'))
+    resp.raise_for_status()
+    lat, lng, _, _ = parse_zippopotam_response(resp.json())
+    return lat, lng
+
+# Request builders and response parsers below are shared by the sync Flask
+# views and the asyncio path in async_app.py; only the transport differs.
+
+def parse_zippopotam_response(data: dict):
+    """Extract (lat, lng, state_code, city) from a Zippopotam response"""
+    place = data['places'][0]
+    lat, lng = float(place['latitude']), float(place['longitude'])
+    return lat, lng, place['state abbreviation'], place['place name']
+
+def fcc_lookup_params(lat: float, lng: float) -> dict:
+    return {'latitude': lat, 'longitude': lng, 'format': 'json'}
+
+def parse_fcc_county(fcc_data: dict) -> str:
+    """County slug (e.g. 'new-york') from an FCC block lookup"""
+    return fcc_data['County']['name'].replace(' County', '').lower().replace(' ', '-')
+
+def parse_findenergy_page(html: str, url: str):
+    """Extract bill/usage/rate from a findenergy.com county page"""
+    text = bs4.BeautifulSoup(html, 'html.parser').get_text()
+
+    # Quick extraction
+    bill_match = re.search(r'average.*?bill.*?\$([0-9,]+\.?[0-9]*)', text, re.IGNORECASE)
+    usage_match = re.search(r'([0-9,]+)\s*kWh.*?per month', text, re.IGNORECASE)
+    rate_match = re.search(r'([0-9]+\.?[0-9]*)\s*cents?\s*per\s*kWh', text, re.IGNORECASE)
+
+    data = {}
+    if bill_match:
+        data['average_monthly_bill'] = float(bill_match.group(1).replace(',', ''))
+    if usage_match:
+        data['average_monthly_usage_kwh'] = float(usage_match.group(1).replace(',', ''))
+    if rate_match:
+        data['utility_rate_per_kwh'] = float(rate_match.group(1)) / 100
+
+    if not data:
+        return None, None
+
+    # Raw scraped data for analysis
+    raw_data = {
+        'url': url,
+        'bill_match': bill_match.group(0) if bill_match else None,
+        'usage_match': usage_match.group(0) if usage_match else None,
+        'rate_match': rate_match.group(0) if rate_match else None,
+        'response_length': len(html)
+    }
+    return data, raw_data
+
+def eia_params(state_code: str) -> dict:
+    return {
+        'api_key': EIA_API_KEY,
+        'frequency': 'monthly',
+        'data[0]': 'sales',
+        'data[1]': 'revenue',
+        'data[2]': 'customers',
+        'facets[stateid][]': state_code,
+        'facets[sectorid][]': 'RES',
+        'sort[0][column]': 'period',
+        'sort[0][direction]': 'desc',
+        'offset': 0,
+        'length': 1
+    }
+
+def parse_eia_response(payload: dict):
+    """Turn the latest EIA residential retail-sales row into averages"""
+    data = payload['response']['data'][0]
+
+    total_kwh = float(data['sales']) * 1000000  # Million kWh to kWh
+    total_revenue = float(data['revenue']) * 1000000  # Million $ to $
+    total_customers = float(data['customers'])
+
+    result = {
+        'average_monthly_usage_kwh': round(total_kwh / total_customers),
+        'utility_rate_per_kwh': round(total_revenue / total_kwh, 4),
+        'average_monthly_bill': round(total_revenue / total_customers, 2),
+        'period': data['period']
+    }
+    return result, f"EIA (period: {data['period']})"
+
+def parse_electricityrates_page(html: str):
+    """Extract rate (and usage if present) from an electricityrates.com state page"""
+    text = bs4.BeautifulSoup(html, 'html.parser').get_text()
+
+    # Look for rate data
+    rate_match = re.search(r'([0-9]+\.?[0-9]*)\s*cents?\s*per\s*kWh', text, re.IGNORECASE)
+    usage_match = re.search(r'average.*?([0-9,]+)\s*kWh', text, re.IGNORECASE)
+
+    if not rate_match:
+        return None
+    rate = float(rate_match.group(1)) / 100
+    usage = 900  # Default usage
+    if usage_match:
+        usage = float(usage_match.group(1).replace(',', ''))
+
+    return {
+        'utility_rate_per_kwh': rate,
+        'average_monthly_usage_kwh': usage,
+        'average_monthly_bill': round(rate * usage, 2)
+    }
+
+def parse_saveonenergy_page(html: str):
+    """Extract rate from a saveonenergy.com state page"""
+    text = bs4.BeautifulSoup(html, 'html.parser').get_text()
+
+    rate_match = re.search(r'([0-9]+\.?[0-9]*)\s*cents?\s*per\s*kWh', text, re.IGNORECASE)
+    if not rate_match:
+        return None
+    rate = float(rate_match.group(1)) / 100
+    usage = 900  # Default
+
+    return {
+        'utility_rate_per_kwh': rate,
+        'average_monthly_usage_kwh': usage,
+        'average_monthly_bill': round(rate * usage, 2)
+    }
+
+# (source name, URL template, page parser) tried in order by try_alternative_sources
+ALTERNATIVE_SOURCES = [
+    ('electricityrates.com', ELECTRICITYRATES_URL, parse_electricityrates_page),
+    ('saveonenergy.com', SAVEONENERGY_URL, parse_saveonenergy_page)
+]
+
+CENSUS_VARIABLES = [
+    "NAME",
+    "B02001_001E",  # Total population
+    "B02001_002E",  # White alone
+    "B02001_003E",  # Black alone
+    "B02001_004E",  # American Indian/Alaska Native alone
+    "B02001_005E",  # Asian alone
+    "B02001_006E",  # Native Hawaiian/Pacific Islander alone
+    "B02001_007E",  # Some other race alone
+    "B02001_008E",  # Two or more races
+    "B19013_001E",  # Median household income
+]
+
+def census_url(zip_code: str) -> str:
+    return f"{CENSUS_API_URL}?get={','.join(CENSUS_VARIABLES)}&for=zip%20code%20tabulation%20area:{zip_code}&key={CENSUS_API_KEY}"
+
+def parse_census_response(data: list) -> dict:
+    """Population, income and race breakdown from a Census ACS response"""
+    headers = data[0]
+    values = data[1]
+    result = dict(zip(headers, values))
+
+    # Calculate percentages
+    total_pop = int(result["B02001_001E"])
+    demographics = {
+        'total_population': total_pop,
+        'median_household_income': int(result["B19013_001E"]),
+        'race_breakdown': {
+            'white': int(result["B02001_002E"]),
+            'black': int(result["B02001_003E"]),
+            'asian': int(result["B02001_005E"]),
+            'native_american': int(result["B02001_004E"]),
+            'pacific_islander': int(result["B02001_006E"]),
+            'other': int(result["B02001_007E"]),
+            'mixed': int(result["B02001_008E"])
+        }
+    }
+
+    if total_pop > 0:
+        demographics['race_percentages'] = {
+            race: round((count / total_pop) * 100, 1)
+            for race, count in demographics['race_breakdown'].items()
+        }
+
+    return demographics
+
+def fetch_from_provider(provider: str, url: str, timeout: float, **kwargs):
+    """GET through the provider's circuit breaker; HTTP errors count as failures
+
+    timeout is the provider's own budget, capped at what is left of the
+    request's deadline. A timeout that only expired because of that cap
+    raises DeadlineExceeded, which doesn't count against the breaker.
+    Raises CircuitOpenError without touching the network while the breaker is open.
+    """
+    budget = stage_timeout(timeout, provider)
+    def get():
+        try:
+            resp = get_http_session().get(url, timeout=budget, **kwargs)
+        except requests.Timeout as e:
+            if budget < timeout:
+                raise DeadlineExceeded(f'{provider} cut short: request deadline reached') from e
+            raise
+        resp.raise_for_status()
+        return resp
+    return breakers[provider].call(get)
+
 def try_findenergy_simple(county: str, state: str):
     """Simple attempt at findenergy.com"""
     try:
-        url = f"https://findenergy.com/{state}/{county}-electricity/"
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        
+        url = FINDENERGY_URL.format(state=state, county=county)
+
         logger.info("Trying findenergy.com...")
-        resp = requests.get(url, headers=headers, timeout=10)
-        
-        if resp.status_code == 200:
-            text = BeautifulSoup(resp.text, 'html.parser').get_text()
-            
-            # Quick extraction
-            bill_match = re.search(r'average.*?bill.*?\$([0-9,]+\.?[0-9]*)', text, re.IGNORECASE)
-            usage_match = re.search(r'([0-9,]+)\s*kWh.*?per month', text, re.IGNORECASE)
-            rate_match = re.search(r'([0-9]+\.?[0-9]*)\s*cents?\s*per\s*kWh', text, re.IGNORECASE)
-            
-            data = {}
-            if bill_match:
-                data['average_monthly_bill'] = float(bill_match.group(1).replace(',', ''))
-            if usage_match:
-                data['average_monthly_usage_kwh'] = float(usage_match.group(1).replace(',', ''))
-            if rate_match:
-                data['utility_rate_per_kwh'] = float(rate_match.group(1)) / 100
-            
-            if data:
-                logger.info("FindEnergy data: %s", data)
-                # Log raw scraped data for analysis
-                raw_data = {
-                    'url': url,
-                    'bill_match': bill_match.group(0) if bill_match else None,
-                    'usage_match': usage_match.group(0) if usage_match else None,
-                    'rate_match': rate_match.group(0) if rate_match else None,
-                    'response_length': len(resp.text)
-                }
-                return data, "findenergy.com", raw_data
-
-            return None, None, None
-                
+        resp = fetch_from_provider('findenergy.com', url, headers=SCRAPER_HEADERS, timeout=10)
+
+        data, raw_data = parse_findenergy_page(resp.text, url)
+        if data:
+            logger.info("FindEnergy data: %s", data)
+            return data, "findenergy.com", raw_data
+
+    except CircuitOpenError:
+        logger.info("Skipping findenergy.com: circuit open")
+    except DeadlineExceeded:
+        logger.info("Skipping findenergy.com: request deadline reached")
     except Exception as e:
         logger.warning("FindEnergy failed: %s", e)
 
@@ -289,167 +697,123 @@ def try_findenergy_simple(county: str, state: str):
 def get_eia_data(state_code: str):
     """Get real-time data from EIA as fallback"""
     try:
-        params = {
-            'api_key': EIA_API_KEY,
-            'frequency': 'monthly',
-            'data[0]': 'sales',
-            'data[1]': 'revenue', 
-            'data[2]': 'customers',
-            'facets[stateid][]': state_code,
-            'facets[sectorid][]': 'RES',
-            'sort[0][column]': 'period',
-            'sort[0][direction]': 'desc',
-            'offset': 0,
-            'length': 1
-        }
-        
         logger.info("Getting EIA data for %s...", state_code)
-        resp = requests.get(EIA_URL, params=params, timeout=15)
-        resp.raise_for_status()
-        
-        data = resp.json()['response']['data'][0]
-        
-        total_kwh = float(data['sales']) * 1000000  # Million kWh to kWh
-        total_revenue = float(data['revenue']) * 1000000  # Million $ to $
-        total_customers = float(data['customers'])
-        
-        result = {
-            'average_monthly_usage_kwh': round(total_kwh / total_customers),
-            'utility_rate_per_kwh': round(total_revenue / total_kwh, 4),
-            'average_monthly_bill': round(total_revenue / total_customers, 2),
-            'period': data['period']
-        }
-        
+        resp = fetch_from_provider('eia', EIA_URL, params=eia_params(state_code), timeout=15)
+
+        result, source = parse_eia_response(resp.json())
+
         logger.info("EIA data: %s", result)
-        return result, f"EIA (period: {data['period']})"
-        
+        return result, source
+
+    except CircuitOpenError:
+        logger.info("Skipping EIA: circuit open")
+        return None, None
+    except DeadlineExceeded:
+        logger.info("Skipping EIA: request deadline reached")
+        return None, None
     except Exception as e:
         logger.error("EIA failed: %s", e)
         return None, None
 
 def try_alternative_sources(state_code: str):
     """Try other real-time sources"""
-    
-    # Source 1: Try electricityrates.com
-    try:
-        url = f"https://www.electricityrates.com/electricity-rates/{state_code.lower()}/"
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        
-        logger.info("Trying electricityrates.com...")
-        resp = requests.get(url, headers=headers, timeout=10)
-        
-        if resp.status_code == 200:
-            text = BeautifulSoup(resp.text, 'html.parser').get_text()
-            
-            # Look for rate data
-            rate_match = re.search(r'([0-9]+\.?[0-9]*)\s*cents?\s*per\s*kWh', text, re.IGNORECASE)
-            usage_match = re.search(r'average.*?([0-9,]+)\s*kWh', text, re.IGNORECASE)
-            
-            if rate_match:
-                rate = float(rate_match.group(1)) / 100
-                usage = 900  # Default usage
-                if usage_match:
-                    usage = float(usage_match.group(1).replace(',', ''))
-                
-                data = {
-                    'utility_rate_per_kwh': rate,
-                    'average_monthly_usage_kwh': usage,
-                    'average_monthly_bill': round(rate * usage, 2)
-                }
-                
-                logger.info("ElectricityRates data: %s", data)
-                return data, "electricityrates.com"
-                
-    except Exception as e:
-        logger.warning("ElectricityRates failed: %s", e)
-    
-    # Source 2: Try saveonenergy.com
-    try:
-        url = f"https://www.saveonenergy.com/electricity-rates/{state_code.lower()}/"
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        
-        logger.info("Trying saveonenergy.com...")
-        resp = requests.get(url, headers=headers, timeout=10)
-        
-        if resp.status_code == 200:
-            text = BeautifulSoup(resp.text, 'html.parser').get_text()
-            
-            rate_match = re.search(r'([0-9]+\.?[0-9]*)\s*cents?\s*per\s*kWh', text, re.IGNORECASE)
-            if rate_match:
-                rate = float(rate_match.group(1)) / 100
-                usage = 900  # Default
-                
-                data = {
-                    'utility_rate_per_kwh': rate,
-                    'average_monthly_usage_kwh': usage,
-                    'average_monthly_bill': round(rate * usage, 2)
-                }
-                
-                logger.info("SaveOnEnergy data: %s", data)
-                return data, "saveonenergy.com"
-                
-    except Exception as e:
-        logger.warning("SaveOnEnergy failed: %s", e)
-    
+    for name, url_template, parse_page in ALTERNATIVE_SOURCES:
+        try:
+            url = url_template.format(state=state_code.lower())
+
+            logger.info("Trying %s...", name)
+            resp = fetch_from_provider(name, url, headers=SCRAPER_HEADERS, timeout=10)
+
+            data = parse_page(resp.text)
+            if data:
+                logger.info("%s data: %s", name, data)
+                return data, name
+
+        except CircuitOpenError:
+            logger.info("Skipping %s: circuit open", name)
+        except DeadlineExceeded:
+            logger.info("Skipping %s: request deadline reached", name)
+            break
+        except Exception as e:
+            logger.warning("%s failed: %s", name, e)
+
     return None, None
 
+# Last good electricity result per county: served to every request for
+# ELECTRICITY_FRESH_SECONDS, and as-is for up to ELECTRICITY_CACHE_SECONDS
+# when the server is degraded or a request's deadline runs out
+ELECTRICITY_FRESH_SECONDS = float(os.getenv('ELECTRICITY_FRESH_SECONDS', 3600))
+ELECTRICITY_CACHE_SECONDS = float(os.getenv('ELECTRICITY_CACHE_SECONDS', 6 * 3600))
+_electricity_cache = TieredCache('electricity', shared_cache, ttl=ELECTRICITY_CACHE_SECONDS,
+                                 max_entries=SHARED_CACHE_L1_ENTRIES, decode=tuple)
+
+def get_electricity_data(county: str, state: str, state_code: str):
+    """A fresh cached result, or run the electricity provider chain"""
+    if snapshot is not None:
+        return snapshot.electricity(county, state, state_code)
+    entry = _electricity_cache.entry((state, county), max_age=ELECTRICITY_FRESH_SECONDS)
+    prewarmer.record('electricity', (state, county), entry is not None)
+    if entry is not None:
+        return entry[1]
+    return refresh_electricity_data(county, state, state_code)
+
+def refresh_electricity_data(county: str, state: str, state_code: str):
+    """Run the electricity provider chain (findenergy -> EIA -> alternatives) and cache a result"""
+    result = single_flight.do(('electricity', state, county), _fetch_electricity_data, county, state, state_code)
+    if result[0]:
+        _electricity_cache.set((state, county), result)
+    return result
+
+def cached_electricity_data(county: str, state: str):
+    """A recent electricity result without calling any provider, or (None, None, None)"""
+    if snapshot is not None:
+        return snapshot.electricity(county, state, None)
+    return _electricity_cache.get((state, county), default=(None, None, None))
+
+def _fetch_electricity_data(county: str, state: str, state_code: str):
+    """Try each electricity source in order and return (data, source, raw_data)"""
+    # Try findenergy.com first
+    data, source, raw_data = try_findenergy_simple(county, state)
+
+    # Fallback to EIA
+    if not data:
+        data, source = get_eia_data(state_code)
+        raw_data = None
+
+    # Fallback to alternative sources
+    if not data:
+        data, source = try_alternative_sources(state_code)
+        raw_data = None
+
+    return data, source, raw_data
+
+# ACS estimates change once a year, so Census results are kept for a day
+CENSUS_CACHE_SECONDS = float(os.getenv('CENSUS_CACHE_SECONDS', 24 * 3600))
+_census_cache = TieredCache('census', shared_cache, ttl=CENSUS_CACHE_SECONDS, max_entries=SHARED_CACHE_L1_ENTRIES)
+
 def get_census_demographics(zip_code: str):
+    """Cached race and income data, or fetch it from the Census API"""
+    if snapshot is not None:
+        return snapshot.census(zip_code)
+    entry = _census_cache.entry(zip_code)
+    prewarmer.record('census', zip_code, entry is not None)
+    if entry is not None:
+        return entry[1]
+    return fetch_census_demographics(zip_code)
+
+def fetch_census_demographics(zip_code: str):
     """Get race and income data from Census API"""
     try:
-        variables = [
-            "NAME",
-            "B02001_001E",  # Total population
-            "B02001_002E",  # White alone
-            "B02001_003E",  # Black alone
-            "B02001_004E",  # American Indian/Alaska Native alone
-            "B02001_005E",  # Asian alone
-            "B02001_006E",  # Native Hawaiian/Pacific Islander alone
-            "B02001_007E",  # Some other race alone
-            "B02001_008E",  # Two or more races
-            "B19013_001E",  # Median household income
-        ]
-        
-        url = f"{CENSUS_API_URL}?get={','.join(variables)}&for=zip%20code%20tabulation%20area:{zip_code}&key={CENSUS_API_KEY}"
-        
         logger.info("Fetching Census data for ZIP %s", zip_code)
-        resp = requests.get(url, timeout=10)
+        resp = get_http_session().get(census_url(zip_code), timeout=stage_timeout(10, 'census'))
         resp.raise_for_status()
-        
-        data = resp.json()
-        headers = data[0]
-        values = data[1]
-        result = dict(zip(headers, values))
-        
-        # Calculate percentages
-        total_pop = int(result["B02001_001E"])
-        demographics = {
-            'total_population': total_pop,
-            'median_household_income': int(result["B19013_001E"]),
-            'race_breakdown': {
-                'white': int(result["B02001_002E"]),
-                'black': int(result["B02001_003E"]),
-                'asian': int(result["B02001_005E"]),
-                'native_american': int(result["B02001_004E"]),
-                'pacific_islander': int(result["B02001_006E"]),
-                'other': int(result["B02001_007E"]),
-                'mixed': int(result["B02001_008E"])
-            }
-        }
-        
-        if total_pop > 0:
-            demographics['race_percentages'] = {
-                'white': round((demographics['race_breakdown']['white'] / total_pop) * 100, 1),
-                'black': round((demographics['race_breakdown']['black'] / total_pop) * 100, 1),
-                'asian': round((demographics['race_breakdown']['asian'] / total_pop) * 100, 1),
-                'native_american': round((demographics['race_breakdown']['native_american'] / total_pop) * 100, 1),
-                'pacific_islander': round((demographics['race_breakdown']['pacific_islander'] / total_pop) * 100, 1),
-                'other': round((demographics['race_breakdown']['other'] / total_pop) * 100, 1),
-                'mixed': round((demographics['race_breakdown']['mixed'] / total_pop) * 100, 1)
-            }
-        
+
+        demographics = parse_census_response(resp.json())
+        _census_cache.set(zip_code, demographics)
+
         logger.info("Successfully fetched Census data")
         return demographics
-        
+
     except Exception as e:
         logger.warning("Failed to get Census data: %s", e)
         return None
@@ -464,6 +828,10 @@ def electricity_data():
         return jsonify({'error': error_msg}), 400
 
     try:
+        degraded = is_degraded()
+        if degraded and not location_is_cached(zip_code):
+            return overloaded_response(1)
+
         # Get location info
         county, state, city, state_code = zip_to_location(zip_code)
         location_data = {
@@ -473,18 +841,21 @@ def electricity_data():
             'state_code': state_code
         }
 
-        # Try findenergy.com first
-        data, source, raw_data = try_findenergy_simple(county, state)
-
-        # Fallback to EIA
-        if not data:
-            data, source = get_eia_data(state_code)
-            raw_data = None
-
-        # Fallback to alternative sources
-        if not data:
-            data, source = try_alternative_sources(state_code)
-            raw_data = None
+        if degraded:
+            # Overloaded: serve only what is already cached, never call the providers
+            data, source, raw_data = cached_electricity_data(county, state)
+            if not data:
+                return overloaded_response(1)
+        else:
+            try:
+                data, source, raw_data = get_electricity_data(county, state, state_code)
+            except TimeoutError as e:
+                logger.warning("Electricity lookup for %s timed out: %s", zip_code, e)
+                data, source, raw_data = None, None, None
+            if not data and budget_spent():
+                # Out of time before any provider answered: a recent result beats an error
+                data, source, raw_data = cached_electricity_data(county, state)
+                degraded = bool(data)
 
         if data:
             response_data = {
@@ -494,6 +865,8 @@ def electricity_data():
                 'data_source': source,
                 **data
             }
+            if degraded:
+                response_data['degraded'] = True
 
             # Log the successful request with extra location data
             extra_data = {
@@ -505,7 +878,6 @@ def electricity_data():
             }
 
             log_api_request('electricity-data', zip_code, response_data, extra_data)
-            log_data_source_details(zip_code, source, {'processed': data, 'raw': raw_data}, response_data)
 
             return jsonify(response_data)
         else:
@@ -513,6 +885,11 @@ def electricity_data():
             log_error('electricity-data', zip_code, error_msg, {'location_data': location_data})
             return jsonify({'error': error_msg}), 404
 
+    except TimeoutError as e:
+        error_msg = 'Request deadline exceeded'
+        log_error('electricity-data', zip_code, error_msg, {'exception': str(e)})
+        return jsonify({'error': error_msg}), 504
+
     except Exception as e:
         error_msg = str(e)
         logger.error("Error: %s", e)
@@ -553,7 +930,6 @@ def demographic_data():
             }
 
             log_api_request('demographic-data', zip_code, response_data, extra_data)
-            log_data_source_details(zip_code, 'U.S. Census Bureau', demographics, response_data)
 
             return jsonify(response_data)
         else:
@@ -580,8 +956,85 @@ def calculate_diversity_score(race_percentages: dict) -> float:
 
     return round(1.0 - total, 3)
 
+# Nearest-neighbour estimates for ZIPs missing from the reference data.
+# ZIP centroids come from a Census ZCTA gazetteer file (ZIP_CENTROIDS_PATH);
+# ZIPs not in it are geocoded through Zippopotam.
+ZIP_CENTROIDS_PATH = os.getenv('ZIP_CENTROIDS_PATH', DEFAULT_CENTROIDS_PATH)
+NEAREST_NEIGHBOURS = int(os.getenv('NEAREST_NEIGHBOURS', 5))
+_location_indexes = {}
+_location_index_lock = threading.Lock()
+
+def get_zip_centroids():
+    """ZIP centroid table, or None if the gazetteer file isn't present"""
+    if 'centroids' not in _location_indexes:
+        with _location_index_lock:
+            if 'centroids' not in _location_indexes:
+                _location_indexes['centroids'] = ZipCentroids.load(ZIP_CENTROIDS_PATH)
+    return _location_indexes['centroids']
+
+def get_vantage_index():
+    """KD-tree over every Vantage Score ZIP with known coordinates"""
+    if 'vantage' not in _location_indexes:
+        centroids = get_zip_centroids()
+        vantage_data = load_vantage_data_from_excel() or {}
+        with _location_index_lock:
+            if 'vantage' not in _location_indexes:
+                records = []
+                for zip_code, record in vantage_data.items():
+                    coordinates = centroids.coordinates(zip_code) if centroids else None
+                    if coordinates is None and snapshot is not None:
+                        coordinates = snapshot.coordinates(zip_code)
+                    if coordinates:
+                        records.append({'zip_code': zip_code, 'latitude': coordinates[0],
+                                        'longitude': coordinates[1], 'state': record.get('state'),
+                                        'vantage_score': record['vantage_score']})
+                _location_indexes['vantage'] = LocationIndex(records, ['vantage_score'])
+                logger.info("Built Vantage Score location index over %d ZIPs", len(records))
+    return _location_indexes['vantage']
+
+def locate_zip(zip_code: str):
+    """(lat, lng) from the centroid table, falling back to Zippopotam; None if unknown"""
+    centroids = get_zip_centroids()
+    coordinates = centroids.coordinates(zip_code) if centroids else None
+    if coordinates is None:
+        try:
+            coordinates = zip_coordinates(zip_code)
+        except Exception as e:
+            logger.warning(f"Could not geocode ZIP {zip_code}: {e}")
+    return coordinates
+
+def estimate_vantage_score(zip_code: str):
+    """Distance-weighted Vantage Score from the nearest ZIPs that have one"""
+    index = get_vantage_index()
+    if not len(index):
+        return None
+    coordinates = locate_zip(zip_code)
+    if coordinates is None:
+        return None
+    estimate = index.estimate(coordinates[0], coordinates[1], NEAREST_NEIGHBOURS)
+    if estimate is None or estimate['vantage_score'] is None:
+        return None
+    return {
+        'zip_code': zip_code,
+        'vantage_score': round(estimate['vantage_score'], 1),
+        'source': 'Nearest-neighbour estimate',
+        'city': 'Unknown',
+        'state': estimate['state'] or 'Unknown',
+        'estimated': True,
+        'neighbours': estimate['neighbours']
+    }
+
+def vantage_is_warm(zip_code: str) -> bool:
+    """Whether a Vantage Score lookup for the ZIP can answer without a network call"""
+    vantage_data = load_vantage_data_from_excel()
+    if vantage_data and zip_code in vantage_data:
+        return True
+    centroids = get_zip_centroids()
+    return zip_code in _zip_coordinates_cache or bool(centroids and centroids.coordinates(zip_code))
+
 def get_vantage_score(zip_code: str):
     """Get average Vantage Score for ZIP code from local Excel file"""
+    prewarmer.record('vantage', zip_code, vantage_is_warm(zip_code))
     try:
         # Load data from local Excel file
         vantage_data = load_vantage_data_from_excel()
@@ -599,55 +1052,53 @@ def get_vantage_score(zip_code: str):
                 'vantage_score': record['vantage_score'],
                 'source': 'Local Excel File',
                 'city': record.get('city', 'Unknown'),
-                'state': record.get('state', 'Unknown')
+                'state': record.get('state', 'Unknown'),
+                'estimated': False
             }
         else:
-            logger.warning(f"No Vantage Score found for ZIP {zip_code} in local data")
-            return None
+            estimate = estimate_vantage_score(zip_code)
+            if estimate:
+                logger.info(f"Vantage Score estimated for ZIP {zip_code} from {len(estimate['neighbours'])} neighbours")
+            else:
+                logger.warning(f"No Vantage Score found for ZIP {zip_code} in local data")
+            return estimate
 
     except Exception as e:
         logger.error(f"Vantage Score local lookup error: {e}")
         return None
 
-def calculate_solar_qualification_with_gemini(zip_code: str, monthly_bill: float, credit_band: str, roof_size: float):
-    """Use Gemini AI to calculate solar loan qualification"""
-    try:
-        # Get electricity and demographic data
-        county, state, city, state_code = zip_to_location(zip_code)
+def build_gemini_request(zip_code: str, city: str, state_code: str, county: str, electricity_data: dict,
+                         monthly_bill: float, credit_band: str, roof_size: float):
+    """Build the logged context and the Gemini prompt for one applicant"""
+    # Skip demographic data to keep analysis simple
+    demographics = None
 
-        # Get electricity data
-        electricity_data, source, _ = try_findenergy_simple(county, state)
-        if not electricity_data:
-            electricity_data, source = get_eia_data(state_code)
-        if not electricity_data:
-            electricity_data, source = try_alternative_sources(state_code)
-
-        # Skip demographic data to keep analysis simple
-        demographics = None
-
-        # Prepare data for Gemini
-        context_data = {
-            'location': {
-                'zip_code': zip_code,
-                'city': city,
-                'state': state_code,
-                'county': county
-            },
-            'electricity': electricity_data or {
-                'average_monthly_bill': monthly_bill,
-                'utility_rate_per_kwh': 0.15,  # Default rate
-                'average_monthly_usage_kwh': monthly_bill / 0.15
-            },
-            'demographics': demographics,
-            'user_input': {
-                'monthly_bill': monthly_bill,
-                'credit_band': credit_band,
-                'roof_size': roof_size
-            }
+    # Prepare data for Gemini
+    context_data = {
+        'location': {
+            'zip_code': zip_code,
+            'city': city,
+            'state': state_code,
+            'county': county
+        },
+        'electricity': electricity_data or {
+            'average_monthly_bill': monthly_bill,
+            'utility_rate_per_kwh': 0.15,  # Default rate
+            'average_monthly_usage_kwh': monthly_bill / 0.15
+        },
+        'demographics': demographics,
+        'user_input': {
+            'monthly_bill': monthly_bill,
+            'credit_band': credit_band,
+            'roof_size': roof_size
         }
+    }
 
-        # Create Gemini prompt
-        prompt = f"""
+    if GEMINI_STRUCTURED_OUTPUT:
+        return context_data, build_structured_prompt(context_data)
+
+    # Create Gemini prompt
+    prompt = f"""
 You are an expert solar loan qualification analyst. Based on the following data, calculate and determine solar loan qualification.
 
 LOCATION DATA:
@@ -727,44 +1178,200 @@ Respond in this exact JSON format:
 }}
 """
 
-        # Call Gemini API
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt)
+    return context_data, prompt
+
+# Structured-output mode: the static rules live in the model's system
+# instruction and each request sends only the applicant's fields as JSON; the
+# answer is constrained to QUALIFICATION_SCHEMA so it always parses
+GEMINI_SYSTEM_INSTRUCTION = """You are an expert solar loan qualification analyst.
 
-        # Parse JSON response
-        result_text = response.text.strip()
-        if result_text.startswith('```json'):
-            result_text = result_text[7:-3]
-        elif result_text.startswith('```'):
-            result_text = result_text[3:-3]
+Each request is a JSON applicant object, or a JSON array of applicant objects
+that each carry an "index". Answer with one result object per applicant; for an
+array, answer with an array of results carrying the same "index" values.
 
-        result = json.loads(result_text)
+Applicant fields: zip_code, city, state, county, monthly_bill (the applicant's
+exact bill in USD), local_average_bill, utility_rate_per_kwh,
+estimated_usage_kwh (monthly, from the exact bill), credit_band, roof_size_sqft
+and max_system_kw (roof capacity limit).
+
+Base qualification solely on the applicant's credit band, bill and roof size;
+do not consider area demographics or income.
+
+SOLAR INDUSTRY STANDARDS:
+- Solar panels: ~400W each, ~25 sq ft per panel (including spacing)
+- System cost: ~$2.75/watt installed
+- Federal tax credit: 30%
+- Typical sun hours: 4-6 hours/day depending on location
+- System efficiency: ~85% (including inverter losses)
+- Panel degradation: 0.5% per year
+- Roof space requirement: ~250 sq ft per kW (realistic spacing)
+- Loan terms by credit:
+  * Excellent (750+): 3.99% APR, 25 years, 0% down
+  * Good (700-749): 5.99% APR, 20 years, 0% down
+  * Fair (650-699): 8.99% APR, 15 years, 10% down
+  * Poor (<650): 12.99% APR, 10 years, 20% down
+
+CALCULATE: recommended system_size_kw (never above max_system_kw), total_cost,
+net_cost_after_incentives, 25-year lifetime_savings, status and a 2-3 sentence
+explanation, balancing electricity usage against roof capacity and local rates.
+
+QUALIFICATION RULES (status):
+- Excellent/Good Credit: "approved"
+- Fair Credit: "borderline"
+- Poor Credit: "not_qualified"
+"""
+
+QUALIFICATION_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'status': {'type': 'string'},
+        'system_size_kw': {'type': 'number'},
+        'total_cost': {'type': 'number'},
+        'net_cost_after_incentives': {'type': 'number'},
+        'lifetime_savings': {'type': 'number'},
+        'explanation': {'type': 'string'},
+        'loan_terms': {
+            'type': 'object',
+            'properties': {
+                'apr': {'type': 'number'},
+                'term_years': {'type': 'integer'},
+                'down_payment_percent': {'type': 'number'}
+            },
+            'required': ['apr', 'term_years', 'down_payment_percent']
+        },
+        'calculations': {
+            'type': 'object',
+            'properties': {
+                'monthly_kwh_usage': {'type': 'number'},
+                'system_annual_production': {'type': 'number'}
+            },
+            'required': ['monthly_kwh_usage', 'system_annual_production']
+        }
+    },
+    'required': ['status', 'system_size_kw', 'total_cost', 'net_cost_after_incentives',
+                 'lifetime_savings', 'explanation', 'loan_terms', 'calculations']
+}
+
+QUALIFICATION_BATCH_SCHEMA = {
+    'type': 'array',
+    'items': {
+        **QUALIFICATION_SCHEMA,
+        'properties': {'index': {'type': 'integer'}, **QUALIFICATION_SCHEMA['properties']},
+        'required': ['index', *QUALIFICATION_SCHEMA['required']]
+    }
+}
+
+def build_structured_prompt(context_data: dict) -> str:
+    """Compact JSON applicant object for the structured-output mode"""
+    electricity = context_data['electricity']
+    user_input = context_data['user_input']
+    return json.dumps({
+        **context_data['location'],
+        'monthly_bill': user_input['monthly_bill'],
+        'local_average_bill': electricity.get('average_monthly_bill'),
+        'utility_rate_per_kwh': electricity.get('utility_rate_per_kwh', 0.15),
+        'estimated_usage_kwh': round(user_input['monthly_bill'] / 0.15),
+        'credit_band': user_input['credit_band'],
+        'roof_size_sqft': user_input['roof_size'],
+        'max_system_kw': round(user_input['roof_size'] / 250, 1)
+    }, separators=(',', ':'))
+
+def build_structured_batch(prompts: list) -> str:
+    """Pack structured applicant objects into one indexed JSON array"""
+    return json.dumps([{'index': i, **json.loads(p)} for i, p in enumerate(prompts)], separators=(',', ':'))
+
+def gemini_generation_config(batched: bool = False):
+    """Per-call generation config (the response schema in structured mode)"""
+    if not GEMINI_STRUCTURED_OUTPUT:
+        return None
+    return {
+        'response_mime_type': 'application/json',
+        'response_schema': QUALIFICATION_BATCH_SCHEMA if batched else QUALIFICATION_SCHEMA
+    }
+
+def gemini_usage(response) -> dict:
+    """Token counts reported with a Gemini response"""
+    usage = getattr(response, 'usage_metadata', None)
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_token_count', None),
+        'response_tokens': getattr(usage, 'candidates_token_count', None),
+        'total_tokens': getattr(usage, 'total_token_count', None)
+    }
+
+def parse_gemini_response(text: str) -> dict:
+    """Parse Gemini's JSON answer, stripping any markdown code fences"""
+    result_text = text.strip()
+    if result_text.startswith('```json'):
+        result_text = result_text[7:-3]
+    elif result_text.startswith('```'):
+        result_text = result_text[3:-3]
+
+    return json.loads(result_text)
+
+def calculate_solar_qualification_with_gemini(zip_code: str, monthly_bill: float, credit_band: str, roof_size: float):
+    """Use Gemini AI to calculate solar loan qualification"""
+    key = ('gemini', zip_code, monthly_bill, credit_band, roof_size)
+    return single_flight.do(key, _gemini_qualification, zip_code, monthly_bill, credit_band, roof_size)
+
+def _gemini_qualification(zip_code: str, monthly_bill: float, credit_band: str, roof_size: float):
+    """Build the Gemini prompt for one applicant and parse its answer"""
+    try:
+        # Get electricity and demographic data
+        county, state, city, state_code = zip_to_location(zip_code)
+
+        # Get electricity data
+        electricity_data, source, _ = get_electricity_data(county, state, state_code)
+
+        context_data, prompt = build_gemini_request(
+            zip_code, city, state_code, county, electricity_data, monthly_bill, credit_band, roof_size
+        )
+
+        # Call Gemini API (without a key the SDK spends seconds probing for
+        # default credentials before failing)
+        if not GEMINI_API_KEY:
+            raise RuntimeError('GEMINI_API_KEY is not configured')
+        if snapshot is not None:
+            raise RuntimeError('Gemini is not called in offline mode')
+        result, call = gemini_dispatcher.submit(prompt, timeout=remaining_budget())
 
         # Log the Gemini calculation
-        log_gemini_calculation(zip_code, context_data, result)
+        log_gemini_calculation(zip_code, context_data, result, call)
 
         return result
 
     except Exception as e:
         logger.error("Gemini calculation failed: %s", e)
         # Fallback to simple calculation
-        return fallback_calculation(monthly_bill, credit_band, roof_size)
+        result = fallback_calculation(monthly_bill, credit_band, roof_size)
+        if isinstance(e, TimeoutError) or budget_spent():
+            result['degraded'] = True
+        return result
 
-def log_gemini_calculation(zip_code: str, input_data: dict, result: dict):
-    """Log Gemini AI calculations for analysis"""
-    timestamp = datetime.now().isoformat()
+gemini_dispatcher = GeminiDispatcher(generate_gemini_text, parse_gemini_response,
+                                     GEMINI_MAX_CONCURRENCY, GEMINI_MAX_QUEUE_SECONDS,
+                                     GEMINI_BATCH_SIZE, GEMINI_BATCH_WAIT_SECONDS,
+                                     build_structured_batch if GEMINI_STRUCTURED_OUTPUT else None)
+
+def log_gemini_calculation(zip_code: str, input_data: dict, result: dict, call: dict = None):
+    """Log Gemini AI calculations for analysis, with the call's latency and token counts"""
+    keep, rate = log_policy.should_log('gemini')
+    if not keep:
+        return
 
     log_entry = {
-        'timestamp': timestamp,
+        'timestamp': datetime.now().isoformat(),
         'zip_code': zip_code,
-        'ai_model': 'gemini-1.5-flash',
+        'ai_model': GEMINI_MODEL_NAME,
+        'prompt_mode': 'structured' if GEMINI_STRUCTURED_OUTPUT else 'text',
         'input_data': input_data,
-        'ai_result': result
+        'ai_result': log_policy.project('gemini', 'ai_result', result),
+        'call': call or {}
     }
+    if rate < 1.0:
+        log_entry['sample_rate'] = rate
+    log_entry, _ = log_policy.fit(log_entry)
 
-    gemini_log_file = os.path.join(LOGS_DIR, 'gemini_calculations.jsonl')
-    with open(gemini_log_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(log_entry) + '\n')
+    write_log('gemini_calculations', log_entry)
 
 def fallback_calculation(monthly_bill: float, credit_band: str, roof_size: float):
     """Simple fallback calculation if Gemini fails"""
@@ -828,10 +1435,122 @@ def fallback_calculation(monthly_bill: float, credit_band: str, roof_size: float
         }
     }
 
+# Admission control: past the soft threshold an endpoint switches new
+# requests to its degraded path (no Gemini, cached data only); past the hard
+# threshold it sheds them with 503 + Retry-After. Counts are per worker process.
+ADMISSION_SOFT_LIMIT = int(os.getenv('ADMISSION_SOFT_LIMIT', 16))
+ADMISSION_HARD_LIMIT = int(os.getenv('ADMISSION_HARD_LIMIT', 48))
+ADMISSION_SOFT_WAIT_SECONDS = float(os.getenv('ADMISSION_SOFT_WAIT_MS', 1000)) / 1000
+ADMISSION_HARD_WAIT_SECONDS = float(os.getenv('ADMISSION_HARD_WAIT_MS', 5000)) / 1000
+admission = AdmissionController(ADMISSION_SOFT_LIMIT, ADMISSION_HARD_LIMIT, ADMISSION_SOFT_WAIT_SECONDS,
+                                ADMISSION_HARD_WAIT_SECONDS, parse_limits(os.getenv('ADMISSION_LIMITS', '')))
+# Health, metrics and log views are never throttled
+ADMISSION_EXEMPT = {'index', 'healthz', 'readyz', 'metrics', 'logs_summary', 'get_logs', 'static'}
+
+# Request deadlines: each endpoint has a budget (REQUEST_DEADLINE_MS, or an
+# override in REQUEST_DEADLINES='endpoint=ms,...') that a client can shorten
+# with X-Request-Timeout-Ms. The clock starts when the request reached the
+# proxy, and every upstream stage is given only what is left of it.
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_MS', 25000)) / 1000
+REQUEST_DEADLINES = parse_deadlines(os.getenv('REQUEST_DEADLINES', ''))
+
+def request_budget(endpoint: str, header: str = None, queued: float = 0.0) -> float:
+    """Seconds this request may still take"""
+    budget = REQUEST_DEADLINES.get(endpoint, REQUEST_DEADLINE_SECONDS)
+    requested = requested_seconds(header)
+    if requested is not None:
+        budget = min(budget, requested)
+    return max(budget - queued, 0.0)
+
+def proxy_queued_seconds(header: str = None) -> float:
+    """Queue time from X-Request-Start, which only counts when a trusted proxy (which sets it) is in front"""
+    return queued_seconds(header) if TRUSTED_PROXY_HOPS else 0.0
+
+def overloaded_response(retry_after: int):
+    response = jsonify({'error': 'Server is busy, please retry shortly', 'retry_after': retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.before_request
+def admit_request():
+    """Admit, degrade or shed the request before its view runs"""
+    if request.endpoint is None or request.endpoint in ADMISSION_EXEMPT:
+        return None
+    name = request.endpoint.replace('_', '-')
+    queued = proxy_queued_seconds(request.headers.get('X-Request-Start'))
+    try:
+        g.admission_mode = admission.admit(name, queued)
+    except OverloadedError as e:
+        log_error(name, request.args.get('zip', 'unknown'), str(e), {'retry_after': e.retry_after})
+        return overloaded_response(e.retry_after)
+    g.admission = (name, time.monotonic())
+    g.deadline_token = start_deadline(request_budget(name, request.headers.get('X-Request-Timeout-Ms'), queued))
+    return None
+
+@app.teardown_request
+def release_request(error=None):
+    admitted = g.pop('admission', None)
+    if admitted:
+        admission.release(admitted[0], time.monotonic() - admitted[1])
+    token = g.pop('deadline_token', None)
+    if token:
+        end_deadline(token)
+
+def is_degraded() -> bool:
+    return g.get('admission_mode') == DEGRADED
+
+# Per-client rate limits (flask-limiter), keyed by the proxy-verified client
+# address (see TRUSTED_PROXY_HOPS)
+RATE_LIMIT_DEFAULT = os.getenv('RATE_LIMIT_DEFAULT', '120/minute')
+RATE_LIMIT_QUALIFICATION = os.getenv('RATE_LIMIT_QUALIFICATION', '30/minute')
+RATE_LIMIT_STORAGE_URI = os.getenv('RATE_LIMIT_STORAGE_URI', 'memory://')
+
+def client_key() -> str:
+    return request.remote_addr or 'unknown'
+
+limiter = Limiter(client_key, app=app, default_limits=[RATE_LIMIT_DEFAULT], storage_uri=RATE_LIMIT_STORAGE_URI,
+                  headers_enabled=True,
+                  default_limits_exempt_when=lambda: request.endpoint in ADMISSION_EXEMPT) if Limiter else None
+if limiter is None:
+    logger.warning("flask-limiter is not installed; per-client rate limits are disabled")
+
+def rate_limit(limit: str):
+    """limiter.limit(limit), or a no-op without flask-limiter"""
+    return limiter.limit(limit) if limiter else (lambda view: view)
+
+@app.errorhandler(429)
+def rate_limited(e):
+    """JSON body for rate-limited clients (flask-limiter adds Retry-After)"""
+    return jsonify({'error': 'Too many requests', 'limit': str(e.description)}), 429
+
+@app.route('/metrics')
+def metrics():
+    """Runtime counters for the in-process performance layers"""
+    return jsonify({
+        'single_flight': single_flight.stats(),
+        'circuit_breakers': {name: breaker.state() for name, breaker in breakers.items()},
+        'gemini_dispatcher': gemini_dispatcher.stats(),
+        'admission': admission.stats(),
+        'prewarm': prewarmer.stats(),
+        'log_store': log_store.stats() if log_store else None,
+        'log_policy': log_policy.stats(),
+        'snapshot': snapshot.stats() if snapshot else None,
+        'shared_cache': {
+            'backend': shared_cache.stats() if shared_cache else None,
+            **{cache.name: cache.stats() for cache in (_zip_location_cache, _zip_coordinates_cache,
+                                                       _electricity_cache, _census_cache)}
+        },
+        'startup': {**_startup_metrics, 'warm_up': _warmup_state['status'], 'lazy_imports': import_timings}
+    })
+
 @app.route('/logs/summary')
 def logs_summary():
     """Get a summary of all logged data"""
     try:
+        if log_store:
+            return jsonify(log_store.summary())
+
         summary = {
             'total_requests': 0,
             'unique_zip_codes': set(),
@@ -888,20 +1607,51 @@ def logs_summary():
         logger.error("Error reading logs: %s", e)
         return jsonify({'error': str(e)}), 500
 
+# Every view is derived from one stored log: (log type, endpoint filter)
+DATA_SOURCE_ENDPOINTS = ('electricity-data', 'demographic-data')
+LOG_VIEWS = {
+    'api_requests': ('api_requests', None),
+    'electricity_data_data': ('api_requests', 'electricity-data'),
+    'demographic_data_data': ('api_requests', 'demographic-data'),
+    'electricity_data_extra_data': ('api_requests', 'electricity-data'),
+    'demographic_data_extra_data': ('api_requests', 'demographic-data'),
+    'data_sources': ('api_requests', DATA_SOURCE_ENDPOINTS),
+    'errors': ('errors', None),
+    'gemini_calculations': ('gemini_calculations', None)
+}
+MAX_LOG_PAGE = 1000
+
+def log_view_entry(log_type: str, entry: dict) -> dict:
+    """The part of a stored entry that a log view shows"""
+    if log_type.endswith('_extra_data'):
+        return {'timestamp': entry['timestamp'], 'zip_code': entry['zip_code'],
+                'extra_data': entry.get('extra_data', {})}
+    if log_type == 'data_sources':
+        response_data = entry.get('response_data') or {}
+        return {'timestamp': entry['timestamp'], 'zip_code': entry['zip_code'],
+                'data_source': response_data.get('data_source'),
+                'raw_data': (entry.get('extra_data') or {}).get('raw_scraped_data'),
+                'processed_data': response_data}
+    return entry
+
 @app.route('/logs/<log_type>')
 def get_logs(log_type):
-    """Get specific log file contents"""
-    try:
-        valid_log_types = [
-            'api_requests', 'electricity_data_data', 'demographic_data_data',
-            'electricity_data_extra_data', 'demographic_data_extra_data',
-            'data_sources', 'errors'
-        ]
+    """Get log entries, newest first
 
-        if log_type not in valid_log_types:
+    With the log store: ?zip=, ?endpoint=, ?source=, ?status=, ?since= and
+    ?until= (ISO time or e.g. 7d / 24h) filter, ?sort= picks the column
+    (prefix '-' for descending) and ?limit= / ?offset= page the results.
+    """
+    try:
+        if log_type not in LOG_VIEWS:
             return jsonify({'error': 'Invalid log type'}), 400
+        if log_store:
+            return query_log_store(log_type)
 
-        log_file = os.path.join(LOGS_DIR, f'{log_type}.jsonl')
+        stored_type, endpoints = LOG_VIEWS[log_type]
+        if isinstance(endpoints, str):
+            endpoints = (endpoints,)
+        log_file = os.path.join(LOGS_DIR, f'{stored_type}.jsonl')
 
         if not os.path.exists(log_file):
             return jsonify({'logs': [], 'message': 'Log file does not exist yet'})
@@ -910,55 +1660,113 @@ def get_logs(log_type):
         with open(log_file, 'r', encoding='utf-8') as f:
             for line in f:
                 try:
-                    logs.append(json.loads(line.strip()))
+                    entry = json.loads(line.strip())
                 except json.JSONDecodeError:
                     continue
+                if endpoints is None or entry.get('endpoint') in endpoints:
+                    logs.append(entry)
 
         # Return most recent 100 entries
-        return jsonify({'logs': logs[-100:], 'total_entries': len(logs)})
+        return jsonify({'logs': [log_view_entry(log_type, entry) for entry in logs[-100:]],
+                        'total_entries': len(logs)})
 
     except Exception as e:
         logger.error("Error reading log file: %s", e)
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/check-qualification', methods=['POST'])
-def check_qualification():
-    """Solar loan qualification endpoint using Gemini AI"""
+def query_log_store(log_type: str):
+    """One page of indexed log entries for /logs/<log_type>"""
+    stored_type, endpoint = LOG_VIEWS[log_type]
+    args = request.args
     try:
-        data = request.get_json()
-
-        # Validate input
-        required_fields = ['zipCode', 'electricBill', 'creditBand', 'roofSize']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        limit = min(int(args.get('limit', 100)), MAX_LOG_PAGE)
+        offset = int(args.get('offset', 0))
+        since, until = parse_time(args.get('since')), parse_time(args.get('until'))
+        if limit < 1 or offset < 0:
+            raise ValueError('limit must be positive and offset non-negative')
+        # Flush this worker's pending batch so a query sees its own latest writes
+        log_store.flush()
+        logs, total = log_store.query(
+            since=since, until=until, sort=args.get('sort', '-timestamp'), limit=limit, offset=offset,
+            log_type=stored_type, endpoint=args.get('endpoint', endpoint), zip_code=args.get('zip'),
+            data_source=args.get('source'), status=args.get('status')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'logs': [log_view_entry(log_type, entry) for entry in logs],
+        'total_entries': total,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + len(logs) if offset + len(logs) < total else None
+    })
+
+def parse_qualification_input(data: dict):
+    """Validate a qualification payload
+
+    Returns ((zip_code, monthly_bill, credit_band, roof_size), None) or
+    (None, error_message). Non-numeric bill/roof values raise ValueError.
+    """
+    required_fields = ['zipCode', 'electricBill', 'creditBand', 'roofSize']
+    for field in required_fields:
+        if field not in data:
+            return None, f'Missing required field: {field}'
+
+    zip_code = str(data['zipCode']).strip()
+    monthly_bill = float(data['electricBill'])
+    credit_band = str(data['creditBand'])
+    roof_size = float(data['roofSize'])
+
+    # Validate ZIP code
+    if not zip_code.isdigit() or len(zip_code) != 5:
+        return None, 'Invalid ZIP code format'
 
-        zip_code = str(data['zipCode']).strip()
-        monthly_bill = float(data['electricBill'])
-        credit_band = str(data['creditBand'])
-        roof_size = float(data['roofSize'])
+    # Validate ranges
+    if monthly_bill < 50 or monthly_bill > 500:
+        return None, 'Electric bill must be between $50 and $500'
 
-        # Validate ZIP code
-        if not zip_code.isdigit() or len(zip_code) != 5:
-            return jsonify({'error': 'Invalid ZIP code format'}), 400
+    if roof_size <= 0 or roof_size > 50000:
+        return None, 'Invalid roof size'
 
-        # Validate ranges
-        if monthly_bill < 50 or monthly_bill > 500:
-            return jsonify({'error': 'Electric bill must be between $50 and $500'}), 400
+    if credit_band not in ['Excellent', 'Good', 'Fair', 'Poor']:
+        return None, 'Invalid credit band'
 
-        if roof_size <= 0 or roof_size > 50000:
-            return jsonify({'error': 'Invalid roof size'}), 400
+    return (zip_code, monthly_bill, credit_band, roof_size), None
 
-        if credit_band not in ['Excellent', 'Good', 'Fair', 'Poor']:
-            return jsonify({'error': 'Invalid credit band'}), 400
+@app.route('/api/check-qualification', methods=['POST'])
+@rate_limit(RATE_LIMIT_QUALIFICATION)
+def check_qualification():
+    """Solar loan qualification endpoint using Gemini AI"""
+    try:
+        data = request.get_json()
 
-        # Calculate qualification using Gemini AI
-        result = calculate_solar_qualification_with_gemini(
-            zip_code, monthly_bill, credit_band, roof_size
-        )
+        # Validate input
+        fields, error_msg = parse_qualification_input(data)
+        if error_msg:
+            return jsonify({'error': error_msg}), 400
+        zip_code, monthly_bill, credit_band, roof_size = fields
+        degraded = is_degraded()
+
+        if degraded:
+            # Overloaded: answer from the local calculation without Gemini or scrapers
+            result = fallback_calculation(monthly_bill, credit_band, roof_size)
+            result['degraded'] = True
+        else:
+            # Calculate qualification using Gemini AI
+            try:
+                result = calculate_solar_qualification_with_gemini(
+                    zip_code, monthly_bill, credit_band, roof_size
+                )
+            except TimeoutError as e:
+                # Deadline reached while waiting on another request's identical call
+                logger.warning("Qualification for %s fell back: %s", zip_code, e)
+                result = fallback_calculation(monthly_bill, credit_band, roof_size)
+                result['degraded'] = True
 
         # Add location information to the result
         try:
+            if degraded and not location_is_cached(zip_code):
+                raise LookupError('location lookups are skipped while degraded')
             _, _, city, state_code = zip_to_location(zip_code)
             result['location'] = {
                 'city': city,
@@ -976,7 +1784,7 @@ def check_qualification():
         # Log the qualification request
         log_api_request('check-qualification', zip_code, result, {
             'input_data': data,
-            'ai_powered': True,
+            'ai_powered': not result.get('degraded'),
             'request_ip': request.remote_addr,
             'user_agent': request.headers.get('User-Agent', 'Unknown')
         })
@@ -997,6 +1805,263 @@ def check_qualification():
         })
         return jsonify({'error': 'Internal server error'}), 500
 
+# Amortization: JSON responses are capped at AMORTIZATION_MAX_JSON_LOANS
+# loans; bigger exports stream as CSV or NDJSON
+AMORTIZATION_MAX_LOANS = int(os.getenv('AMORTIZATION_MAX_LOANS', 20000))
+AMORTIZATION_MAX_JSON_LOANS = int(os.getenv('AMORTIZATION_MAX_JSON_LOANS', 100))
+AMORTIZATION_FORMATS = ('json', 'csv', 'ndjson')
+# Yearly growth of the savings column, as a fraction (0.2 = 20% a year)
+MAX_SAVINGS_ESCALATION = 0.2
+
+def parse_amortization_request(data: dict):
+    """Validate an amortization payload
+
+    Accepts {"loans": [...]} or a single loan at the top level. Each loan has
+    principal, apr and term_months (or term_years), plus optional id and
+    monthly_savings. Returns (loans, None) or (None, error_message).
+    """
+    raw_loans = data.get('loans')
+    if raw_loans is None:
+        raw_loans = [data]
+    if not isinstance(raw_loans, list) or not raw_loans:
+        return None, 'loans must be a non-empty list'
+    if len(raw_loans) > AMORTIZATION_MAX_LOANS:
+        return None, f'At most {AMORTIZATION_MAX_LOANS} loans per request'
+
+    loans = []
+    for index, raw in enumerate(raw_loans):
+        if not isinstance(raw, dict):
+            return None, f'Loan {index} must be an object'
+        for field in ('principal', 'apr'):
+            if field not in raw:
+                return None, f'Loan {index}: missing required field: {field}'
+        # JSON bodies may carry NaN and Infinity, which every range check below lets through
+        for field in ('principal', 'apr', 'term_months', 'term_years', 'monthly_savings'):
+            if raw.get(field) is not None and not math.isfinite(float(raw[field])):
+                return None, f'Loan {index}: {field} must be a finite number'
+        if 'term_months' in raw:
+            months = int(raw['term_months'])
+        elif 'term_years' in raw:
+            months = int(float(raw['term_years']) * 12)
+        else:
+            return None, f'Loan {index}: missing required field: term_months or term_years'
+        loan = {
+            'id': raw.get('id', index),
+            'principal': float(raw['principal']),
+            'apr': float(raw['apr']),
+            'months': months,
+            'monthly_savings': float(raw.get('monthly_savings') or 0)
+        }
+        if loan['principal'] <= 0 or loan['principal'] > 10_000_000:
+            return None, f'Loan {index}: principal must be between 0 and 10,000,000'
+        if loan['apr'] < 0 or loan['apr'] > 50:
+            return None, f'Loan {index}: apr must be between 0 and 50'
+        if months < 1 or months > MAX_PERIODS:
+            return None, f'Loan {index}: term must be between 1 and {MAX_PERIODS} months'
+        if loan['monthly_savings'] < 0:
+            return None, f'Loan {index}: monthly_savings cannot be negative'
+        loans.append(loan)
+    return loans, None
+
+@app.route('/api/amortization', methods=['POST'])
+def amortization():
+    """Month-by-month loan schedules as JSON, or streamed as CSV/NDJSON"""
+    data = {}
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        loans, error_msg = parse_amortization_request(data)
+        if error_msg:
+            return jsonify({'error': error_msg}), 400
+
+        output_format = str(data.get('format') or request.args.get('format', 'json')).lower()
+        if output_format not in AMORTIZATION_FORMATS:
+            return jsonify({'error': 'format must be json, csv or ndjson'}), 400
+        if output_format == 'json' and len(loans) > AMORTIZATION_MAX_JSON_LOANS:
+            return jsonify({
+                'error': f'More than {AMORTIZATION_MAX_JSON_LOANS} loans; request format csv or ndjson'
+            }), 400
+        escalation = float(data.get('savings_escalation', SAVINGS_ESCALATION))
+        if not 0 <= escalation <= MAX_SAVINGS_ESCALATION:
+            return jsonify({'error': f'savings_escalation must be between 0 and {MAX_SAVINGS_ESCALATION}'}), 400
+
+        log_api_request('amortization', str(data.get('zipCode', '')), {
+            'loans': len(loans), 'format': output_format
+        }, {'request_ip': request.remote_addr})
+
+        if output_format == 'csv':
+            return Response(stream_with_context(iter_csv(loans, savings_escalation=escalation)),
+                            mimetype='text/csv',
+                            headers={'Content-Disposition': 'attachment; filename=amortization.csv'})
+        if output_format == 'ndjson':
+            return Response(stream_with_context(iter_ndjson(loans, savings_escalation=escalation)),
+                            mimetype='application/x-ndjson')
+        return jsonify({'loans': schedule_json(loans, escalation)})
+
+    except (TypeError, ValueError, OverflowError) as e:
+        error_msg = f'Invalid input data: {str(e)}'
+        log_error('amortization', str(data.get('zipCode', 'unknown')), error_msg)
+        return jsonify({'error': error_msg}), 400
+
+    except Exception as e:
+        logger.error("Amortization error: %s", e)
+        log_error('amortization', str(data.get('zipCode', 'unknown')), str(e),
+                  {'exception_type': type(e).__name__})
+        return jsonify({'error': 'Internal server error'}), 500
+
+SIMULATION_MAX_PATHS = int(os.getenv('SIMULATION_MAX_PATHS', 50000))
+# Request field -> system key of the overrides savings_simulation accepts
+SIMULATION_OVERRIDES = (('systemSizeKw', 'system_size_kw'), ('netCost', 'net_cost'),
+                        ('electricityRateCents', 'electricity_rate_cents'), ('sunHours', 'sun_hours'))
+
+def whole_number(value) -> int:
+    """value as an int; fractions, NaN and Infinity are a ValueError rather than truncated or overflowing"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f'{value!r} is not a whole number')
+    return int(number)
+
+@app.route('/api/savings-simulation', methods=['POST'])
+def savings_simulation():
+    """Monte Carlo P10/P50/P90 bands of lifetime savings and payback for an applicant
+
+    Takes the qualification fields plus optional paths, years, seed and
+    overrides for the system (systemSizeKw, netCost) and location
+    (electricityRateCents, sunHours); defaults follow fallback_calculation.
+    """
+    data = {}
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        fields, error_msg = parse_qualification_input(data)
+        if error_msg:
+            return jsonify({'error': error_msg}), 400
+        zip_code, monthly_bill, credit_band, roof_size = fields
+
+        paths = whole_number(data.get('paths', 10000))
+        years = whole_number(data.get('years', 25))
+        seed = whole_number(data['seed']) if data.get('seed') is not None else None
+        if paths < 100 or paths > SIMULATION_MAX_PATHS:
+            return jsonify({'error': f'paths must be between 100 and {SIMULATION_MAX_PATHS}'}), 400
+        if years < 1 or years > 40:
+            return jsonify({'error': 'years must be between 1 and 40'}), 400
+        if seed is not None and seed < 0:
+            return jsonify({'error': 'seed must be a non-negative integer'}), 400
+
+        baseline = fallback_calculation(monthly_bill, credit_band, roof_size)
+        system = {
+            'system_size_kw': float(data.get('systemSizeKw', baseline['system_size_kw'])),
+            'net_cost': float(data.get('netCost', baseline['net_cost_after_incentives'])),
+            'electricity_rate_cents': float(data.get('electricityRateCents', 15.0)),
+            'sun_hours': float(data.get('sunHours', 5.0)),
+            **baseline['loan_terms']
+        }
+        for field, key in SIMULATION_OVERRIDES:
+            if not math.isfinite(system[key]) or system[key] <= 0:
+                return jsonify({'error': f'{field} must be a positive number'}), 400
+
+        started = time.perf_counter()
+        result = simulate_savings(
+            system['system_size_kw'], system['electricity_rate_cents'], system['sun_hours'],
+            system['net_cost'], system['apr'], system['term_years'], system['down_payment_percent'],
+            paths=paths, years=years, seed=seed
+        )
+        response_data = {
+            'zip_code': zip_code,
+            'credit_band': credit_band,
+            'system': system,
+            **result,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+        log_api_request('savings-simulation', zip_code, {
+            key: response_data[key] for key in ('lifetime_savings', 'payback_years', 'paths', 'elapsed_ms')
+        }, {'input_data': data, 'request_ip': request.remote_addr})
+        return jsonify(response_data)
+
+    except (TypeError, ValueError) as e:
+        error_msg = f'Invalid input data: {str(e)}'
+        log_error('savings-simulation', str(data.get('zipCode', 'unknown')), error_msg)
+        return jsonify({'error': error_msg}), 400
+
+    except Exception as e:
+        logger.error("Savings simulation error: %s", e)
+        log_error('savings-simulation', str(data.get('zipCode', 'unknown')), str(e),
+                  {'exception_type': type(e).__name__})
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Gridded irradiance for location-specific production (scripts/build_irradiance_grid.py)
+IRRADIANCE_GRID_PATH = os.getenv('IRRADIANCE_GRID_PATH', DEFAULT_IRRADIANCE_PATH)
+_irradiance_grid = None
+_irradiance_lock = threading.Lock()
+
+def get_irradiance_grid():
+    """Memory-mapped irradiance grid, or None if it hasn't been built"""
+    global _irradiance_grid
+    if _irradiance_grid is None:
+        with _irradiance_lock:
+            if _irradiance_grid is None:
+                _irradiance_grid = IrradianceGrid.load(IRRADIANCE_GRID_PATH) or False
+    return _irradiance_grid or None
+
+@app.route('/api/production-estimate')
+def production_estimate():
+    """Monthly kWh for a system at a ZIP (or lat/lon) from the local irradiance grid"""
+    zip_code = request.args.get('zip', '').strip()
+    try:
+        system_size_kw = float(request.args.get('systemSizeKw', 1.0))
+        tilt = float(request.args.get('tilt', DEFAULT_TILT))
+        azimuth = float(request.args.get('azimuth', DEFAULT_AZIMUTH))
+        if not 0 < system_size_kw <= 1000:
+            raise ValueError('systemSizeKw must be between 0 and 1000')
+        if not 0 <= tilt <= 90 or not 0 <= azimuth < 360:
+            raise ValueError('tilt must be 0-90 and azimuth 0-359 degrees')
+        if 'lat' in request.args and 'lon' in request.args:
+            lat, lng = float(request.args['lat']), float(request.args['lon'])
+        elif zip_code.isdigit() and len(zip_code) == 5:
+            lat, lng = None, None
+        else:
+            raise ValueError('Invalid ZIP code')
+    except ValueError as e:
+        log_error('production-estimate', zip_code or 'unknown', str(e))
+        return jsonify({'error': str(e)}), 400
+
+    irradiance = get_irradiance_grid()
+    if irradiance is None:
+        return jsonify({'error': 'Irradiance data not available'}), 503
+
+    try:
+        if lat is None:
+            lat, lng = zip_coordinates(zip_code)
+        monthly_kwh = irradiance.monthly_production(lat, lng, system_size_kw, tilt, azimuth)
+        if monthly_kwh is None:
+            error_msg = 'No irradiance data for this location'
+            log_error('production-estimate', zip_code or 'unknown', error_msg, {'latitude': lat, 'longitude': lng})
+            return jsonify({'error': error_msg}), 404
+        annual_kwh = sum(monthly_kwh)
+        response_data = {
+            'zip_code': zip_code or None,
+            'latitude': lat,
+            'longitude': lng,
+            'system_size_kw': system_size_kw,
+            'tilt': tilt,
+            'azimuth': azimuth,
+            'monthly_kwh': [round(kwh, 1) for kwh in monthly_kwh],
+            'annual_kwh': round(annual_kwh, 1),
+            'sun_hours_daily': round(effective_sun_hours(monthly_kwh, system_size_kw), 2),
+            'data_source': irradiance.source
+        }
+        log_api_request('production-estimate', zip_code or 'unknown', response_data)
+        return jsonify(response_data)
+
+    except Exception as e:
+        logger.error("Production estimate error: %s", e)
+        log_error('production-estimate', zip_code or 'unknown', str(e), {'exception_type': type(e).__name__})
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/vantage-score')
 def vantage_score():
     """Get Vantage Score for ZIP code"""
@@ -1013,7 +2078,7 @@ def vantage_score():
         if vantage_data:
             # Log the successful request
             extra_data = {
-                'local_excel_used': True,
+                'local_excel_used': not vantage_data.get('estimated'),
                 'data_source': vantage_data.get('source', 'Local Excel File'),
                 'request_ip': request.remote_addr,
                 'user_agent': request.headers.get('User-Agent', 'Unknown')
@@ -1033,8 +2098,296 @@ def vantage_score():
         log_error('vantage-score', zip_code, error_msg, {'exception_type': type(e).__name__})
         return jsonify({'error': 'Internal server error'}), 500
 
+# /api/zip-profile: the ZIP is resolved once in the request thread while the
+# Census and Vantage sections run on a shared pool, so a profile takes about
+# as long as its slowest section rather than the sum of them
+ZIP_PROFILE_WORKERS = int(os.getenv('ZIP_PROFILE_WORKERS', 8))
+_profile_executor = None
+_profile_executor_lock = threading.Lock()
+
+def get_profile_executor():
+    """Process-wide thread pool for profile sections, created on first use (never in the pre-fork master)"""
+    global _profile_executor
+    if _profile_executor is None:
+        with _profile_executor_lock:
+            if _profile_executor is None:
+                _profile_executor = ThreadPoolExecutor(max_workers=ZIP_PROFILE_WORKERS,
+                                                       thread_name_prefix='zip-profile')
+    return _profile_executor
+
+def run_profile_section(fetch, *args):
+    """Run one section and wrap its result as {'status', 'elapsed_ms', 'data' | 'error'}
+
+    fetch returns the section's data, or None when the ZIP has none.
+    """
+    started = time.monotonic()
+    try:
+        data = fetch(*args)
+        section = {'status': 'ok', 'data': data} if data else {'status': 'not_found'}
+    except TimeoutError as e:
+        section = {'status': 'timeout', 'error': str(e)}
+    except Exception as e:
+        logger.warning("ZIP profile section %s failed: %s", getattr(fetch, '__name__', fetch), e)
+        section = {'status': 'error', 'error': str(e)}
+    section['elapsed_ms'] = round((time.monotonic() - started) * 1000, 1)
+    return section
+
+def profile_location(zip_code: str):
+    county, state, city, state_code = zip_to_location(zip_code)
+    return {'county': county, 'state': state, 'city': city, 'state_code': state_code}
+
+def profile_electricity(location: dict, degraded: bool):
+    if degraded:
+        data, source, _ = cached_electricity_data(location['county'], location['state'])
+    else:
+        data, source, _ = get_electricity_data(location['county'], location['state'], location['state_code'])
+        if not data and budget_spent():
+            data, source, _ = cached_electricity_data(location['county'], location['state'])
+    return {'data_source': source, **data} if data else None
+
+def profile_demographics(zip_code: str):
+    demographics = get_census_demographics(zip_code)
+    if not demographics:
+        return None
+    return {
+        'data_source': 'U.S. Census Bureau ACS 5-year estimates (2021)',
+        'race_diversity_score': calculate_diversity_score(demographics.get('race_percentages', {})),
+        **demographics
+    }
+
+def profile_vantage(zip_code: str):
+    return get_vantage_score(zip_code)
+
+@app.route('/api/zip-profile')
+def zip_profile():
+    """Electricity, demographics and Vantage Score for a ZIP in one document"""
+    zip_code = request.args.get('zip', '').strip()
+
+    if not zip_code.isdigit() or len(zip_code) != 5:
+        error_msg = 'Invalid ZIP code'
+        log_error('zip-profile', zip_code, error_msg)
+        return jsonify({'error': error_msg}), 400
+
+    try:
+        started = time.monotonic()
+        degraded = is_degraded()
+        executor = get_profile_executor()
+        # Each section runs in a copy of this context so it sees the request's deadline
+        pending = {'vantage': executor.submit(contextvars.copy_context().run, run_profile_section,
+                                              profile_vantage, zip_code)}
+        if not degraded:
+            pending['demographics'] = executor.submit(contextvars.copy_context().run, run_profile_section,
+                                                      profile_demographics, zip_code)
+
+        if degraded and not location_is_cached(zip_code):
+            sections = {'location': {'status': 'skipped', 'elapsed_ms': 0.0}}
+        else:
+            sections = {'location': run_profile_section(profile_location, zip_code)}
+        if sections['location']['status'] == 'ok':
+            sections['electricity'] = run_profile_section(profile_electricity, sections['location']['data'],
+                                                          degraded)
+        else:
+            sections['electricity'] = {'status': 'skipped', 'elapsed_ms': 0.0}
+        if degraded:
+            sections['demographics'] = {'status': 'skipped', 'elapsed_ms': 0.0}
+
+        for name, future in pending.items():
+            try:
+                sections[name] = future.result(timeout=remaining_budget())
+            except FutureTimeoutError:
+                sections[name] = {'status': 'timeout', 'elapsed_ms': round((time.monotonic() - started) * 1000, 1)}
+
+        location = sections['location'].get('data') or {}
+        vantage = sections['vantage'].get('data') or {}
+        response_data = {
+            'zip_code': zip_code,
+            'city': location.get('city') or vantage.get('city'),
+            'state': location.get('state_code') or vantage.get('state'),
+            'sections': {name: sections[name] for name in ('location', 'electricity', 'demographics', 'vantage')},
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1)
+        }
+        if degraded:
+            response_data['degraded'] = True
+
+        extra_data = {
+            'section_status': {name: section['status'] for name, section in sections.items()},
+            'section_elapsed_ms': {name: section['elapsed_ms'] for name, section in sections.items()},
+            'request_ip': request.remote_addr,
+            'user_agent': request.headers.get('User-Agent', 'Unknown')
+        }
+
+        if not any(section['status'] == 'ok' for section in sections.values()):
+            error_msg = 'No data available for this ZIP code'
+            log_error('zip-profile', zip_code, error_msg, extra_data)
+            return jsonify({'error': error_msg, **response_data}), 404
+
+        log_api_request('zip-profile', zip_code, response_data, extra_data)
+        return jsonify(response_data)
+
+    except Exception as e:
+        error_msg = str(e)
+        logger.error("ZIP profile error: %s", e)
+        log_error('zip-profile', zip_code, error_msg, {'exception_type': type(e).__name__})
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Traffic-driven pre-warming: the PREWARM_TOP_N most requested ZIPs in the
+# request log (weighted towards recent requests) get their geocode,
+# electricity, Census and Vantage entries refreshed in the background before
+# they expire, at most PREWARM_RATE_PER_SECOND upstream calls and only while
+# the worker isn't busy. Traffic is ranked from the log store's per-ZIP daily
+# counts (scaled up by each record's sample rate), or from api_requests.jsonl
+# without the store. One worker per host - whichever holds PREWARM_LOCK_PATH -
+# runs it and the rest read what it warms through the shared cache.
+# PREWARM_TOP_N=0 turns it off.
+PREWARM_TOP_N = int(os.getenv('PREWARM_TOP_N', 500))
+PREWARM_INTERVAL_SECONDS = float(os.getenv('PREWARM_INTERVAL_SECONDS', 300))
+PREWARM_RATE_PER_SECOND = float(os.getenv('PREWARM_RATE_PER_SECOND', 2))
+PREWARM_WINDOW_DAYS = float(os.getenv('PREWARM_WINDOW_DAYS', 7))
+# Entries are refreshed once they are this far through their freshness window
+PREWARM_REFRESH_FRACTION = float(os.getenv('PREWARM_REFRESH_FRACTION', 0.8))
+PREWARM_LOCK_PATH = os.getenv('PREWARM_LOCK_PATH', os.path.join(LOGS_DIR, 'prewarm.lock'))
+
+def _expiring(cache: TieredCache, key, ttl: float) -> bool:
+    return cache.entry(key, max_age=ttl * PREWARM_REFRESH_FRACTION, count=False) is None
+
+def _refresh_location(zip_code: str):
+    _zip_location_cache.set(zip_code, single_flight.do(('zip_to_location', zip_code), _lookup_zip_location,
+                                                       zip_code))
+
+def _electricity_expiring(zip_code: str) -> bool:
+    location = _zip_location_cache.entry(zip_code, count=False)
+    if location is None:
+        return True
+    county, state, _, _ = location[1]
+    prewarmer.track((state, county))
+    return _expiring(_electricity_cache, (state, county), ELECTRICITY_FRESH_SECONDS)
+
+def _refresh_electricity(zip_code: str):
+    county, state, _, state_code = _zip_location_cache.get(zip_code)
+    if not refresh_electricity_data(county, state, state_code)[0]:
+        raise LookupError(f'No electricity data for {county}, {state}')
+
+def _refresh_census(zip_code: str):
+    if fetch_census_demographics(zip_code) is None:
+        raise LookupError(f'No Census data for {zip_code}')
+
+prewarmer = CacheWarmer(
+    os.path.join(LOGS_DIR, 'api_requests.jsonl'),
+    [
+        WarmTask('location', lambda zip_code: zip_code not in _zip_location_cache, _refresh_location),
+        WarmTask('electricity', _electricity_expiring, _refresh_electricity),
+        WarmTask('census', lambda zip_code: _expiring(_census_cache, zip_code, CENSUS_CACHE_SECONDS),
+                 _refresh_census),
+        WarmTask('vantage', lambda zip_code: not vantage_is_warm(zip_code), zip_coordinates)
+    ],
+    top_n=PREWARM_TOP_N, interval_seconds=PREWARM_INTERVAL_SECONDS, rate_per_second=PREWARM_RATE_PER_SECOND,
+    window_days=PREWARM_WINDOW_DAYS, should_pause=admission.busy,
+    traffic=(lambda since: store_requests(log_store, since)) if log_store else None, lock_path=PREWARM_LOCK_PATH
+)
+
+# Background warm-up: preload everything the first request would otherwise pay for
+_warmup_state = {
+    'status': 'pending',
+    'steps': {},
+    'error': None,
+    'completed_in_seconds': None
+}
+_startup_metrics = {
+    'import_seconds': None,
+    'first_response_seconds': None
+}
+
+def warm_up():
+    """Import heavy modules and load reference data ahead of the first request"""
+    _warmup_state['status'] = 'running'
+    started = time.monotonic()
+    steps = [
+        ('http_session', get_http_session),
+        ('bs4', lambda: bs4.BeautifulSoup),
+        ('gemini', lambda: get_gemini_model() if GEMINI_API_KEY else get_genai()),
+        ('vantage_index', load_vantage_data_from_excel),
+        ('location_index', get_vantage_index)
+    ]
+    if snapshot is not None:
+        steps.insert(0, ('snapshot', snapshot.preload))
+    try:
+        for name, step in steps:
+            step_start = time.monotonic()
+            step()
+            _warmup_state['steps'][name] = round(time.monotonic() - step_start, 4)
+        _warmup_state['status'] = 'ready'
+    except Exception as e:
+        logger.error("Warm-up failed: %s", e)
+        _warmup_state['status'] = 'failed'
+        _warmup_state['error'] = str(e)
+    _warmup_state['completed_in_seconds'] = round(time.monotonic() - started, 4)
+    logger.info("Warm-up %s in %.2fs: %s", _warmup_state['status'],
+                _warmup_state['completed_in_seconds'], _warmup_state['steps'])
+
+def preload_shared_data():
+    """Load read-only modules and reference data before workers are forked
+
+    Called in the pre-forking master (see gunicorn.conf.py) so every worker
+    shares these pages copy-on-write instead of loading its own copy. Anything
+    holding sockets or threads (HTTP pools, the Gemini client) is left to the
+    per-worker warm-up.
+    """
+    started = time.monotonic()
+    requests.Session
+    bs4.BeautifulSoup
+    if snapshot is not None:
+        snapshot.preload()
+    load_vantage_data_from_excel()
+    get_irradiance_grid()
+    get_vantage_index()
+    logger.info("Preloaded shared data in %.2fs", time.monotonic() - started)
+
+def start_warm_up():
+    """Run warm_up() in a daemon thread so the server can bind immediately, then start pre-warming"""
+    def run():
+        warm_up()
+        if PREWARM_TOP_N > 0 and snapshot is None:
+            prewarmer.start()
+    thread = threading.Thread(target=run, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+@app.after_request
+def record_first_response(response):
+    """Record time from process start to the first response sent"""
+    if _startup_metrics['first_response_seconds'] is None:
+        _startup_metrics['first_response_seconds'] = round(time.monotonic() - _BOOT_TIME, 4)
+        logger.info("First response %.3fs after cold start", _startup_metrics['first_response_seconds'])
+    return response
+
+@app.route('/')
+def index():
+    """Health check"""
+    return jsonify({'status': 'healthy', 'service': 'Solar Loan Backend'})
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'healthy'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: warm-up has finished loading modules and reference data"""
+    ready = _warmup_state['status'] == 'ready'
+    body = {
+        'status': 'ready' if ready else 'not_ready',
+        'warm_up': _warmup_state,
+        'startup': {**_startup_metrics, 'lazy_imports': import_timings}
+    }
+    return jsonify(body), 200 if ready else 503
+
+_startup_metrics['import_seconds'] = round(time.monotonic() - _BOOT_TIME, 4)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5500))
     host = os.environ.get('HOST', '0.0.0.0')
     debug = os.environ.get('FLASK_ENV') != 'production'
+    # The reloader would run warm-up in the watcher process too
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warm_up()
     app.run(debug=debug, host=host, port=port)
\ No newline at end of file
@@ -0,0 +1,470 @@
+"""
+asyncio-native request path for the I/O-bound endpoints.
+
+Serves /electricity-data, /demographic-data and /api/check-qualification as
+an ASGI app. Request building, response parsing, fallbacks and logging are
+shared with app.py; only the transport differs: upstream calls go through
+one non-blocking aiohttp session and Gemini's async API, so a single worker can
+keep hundreds of requests in flight. Blocking work (HTML parsing, log writes,
+shared cache reads and writes) runs on the default thread pool so it never
+stalls the event loop, and requests go through the same admission control as
+app.py.
+
+Run with:
+    uvicorn async_app:app --host 0.0.0.0 --port 5500
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from functools import partial
+
+import aiohttp
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import app as core
+from utils.singleflight import AsyncSingleFlight
+from utils.circuit_breaker import CircuitOpenError
+from utils.gemini_dispatcher import AsyncGeminiDispatcher
+from utils.admission import DEGRADED, OverloadedError
+from utils.deadline import DeadlineExceeded, budget_spent, deadline_scope, remaining_budget, stage_timeout
+
+logger = logging.getLogger(__name__)
+
+single_flight = AsyncSingleFlight(wait_timeout=remaining_budget)
+_session = None
+# The admission mode of the request being handled (see admitted())
+_admission_mode: contextvars.ContextVar = contextvars.ContextVar('admission_mode', default=None)
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Shared async HTTP session (created on startup, or lazily on first use)"""
+    global _session
+    if _session is None:
+        _session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=500))
+    return _session
+
+
+def _request_kwargs(timeout: float, params: dict = None, **kwargs) -> dict:
+    """aiohttp request options; like requests, query params set to None are dropped
+
+    The timeout is capped at what is left of the request's deadline.
+    """
+    if params is not None:
+        kwargs['params'] = {key: value for key, value in params.items() if value is not None}
+    return {'timeout': aiohttp.ClientTimeout(total=stage_timeout(timeout)), **kwargs}
+
+
+async def _get(url: str, timeout: float, parse_json: bool = True, **kwargs):
+    """GET url, raise on HTTP errors and return the decoded JSON (or text) body"""
+    async with get_session().get(url, **_request_kwargs(timeout, **kwargs)) as resp:
+        resp.raise_for_status()
+        return await resp.json(content_type=None) if parse_json else await resp.text()
+
+
+async def fetch_from_provider(provider: str, url: str, timeout: float, parse_json: bool = True, **kwargs):
+    """GET through the provider's circuit breaker (shared with the sync path)
+
+    As in app.fetch_from_provider, a timeout cut short by the request's
+    deadline raises DeadlineExceeded rather than counting against the breaker.
+    """
+    budget = stage_timeout(timeout, provider)
+
+    async def get():
+        try:
+            return await _get(url, budget, parse_json, **kwargs)
+        except asyncio.TimeoutError as e:
+            if budget < timeout:
+                raise DeadlineExceeded(f'{provider} cut short: request deadline reached') from e
+            raise
+    return await core.breakers[provider].call_async(get)
+
+
+async def zip_to_location(zip_code: str):
+    """Get location info from ZIP (through the caches shared with app.py's workers)"""
+    if core.snapshot is not None:
+        return core.zip_to_location(zip_code)
+    location = await core._zip_location_cache.get_async(zip_code)
+    if location is None:
+        location = await single_flight.do(('zip_to_location', zip_code), _lookup_zip_location, zip_code)
+        await core._zip_location_cache.set_async(zip_code, location)
+    return location
+
+
+async def _lookup_zip_location(zip_code: str):
+    data = await _get(core.ZIPPOPOTAM_URL.format(zip=zip_code), 10)
+    lat, lng, state_code, city = core.parse_zippopotam_response(data)
+
+    fcc_data = await _get(core.FCC_LOOKUP_URL, 10, params=core.fcc_lookup_params(lat, lng))
+    county = core.parse_fcc_county(fcc_data)
+
+    logger.info("Location: %s, %s -> %s county", city, state_code, county)
+    return county, state_code.lower(), city, state_code
+
+
+async def try_findenergy_simple(county: str, state: str):
+    try:
+        url = core.FINDENERGY_URL.format(state=state, county=county)
+        html = await fetch_from_provider('findenergy.com', url, 10, parse_json=False, headers=core.SCRAPER_HEADERS)
+        data, raw_data = await asyncio.to_thread(core.parse_findenergy_page, html, url)
+        if data:
+            return data, "findenergy.com", raw_data
+    except CircuitOpenError:
+        logger.info("Skipping findenergy.com: circuit open")
+    except DeadlineExceeded:
+        logger.info("Skipping findenergy.com: request deadline reached")
+    except Exception as e:
+        logger.warning("FindEnergy failed: %s", e)
+    return None, None, None
+
+
+async def get_eia_data(state_code: str):
+    try:
+        payload = await fetch_from_provider('eia', core.EIA_URL, 15, params=core.eia_params(state_code))
+        return core.parse_eia_response(payload)
+    except CircuitOpenError:
+        logger.info("Skipping EIA: circuit open")
+        return None, None
+    except DeadlineExceeded:
+        logger.info("Skipping EIA: request deadline reached")
+        return None, None
+    except Exception as e:
+        logger.error("EIA failed: %s", e)
+        return None, None
+
+
+async def try_alternative_sources(state_code: str):
+    for name, url_template, parse_page in core.ALTERNATIVE_SOURCES:
+        try:
+            url = url_template.format(state=state_code.lower())
+            html = await fetch_from_provider(name, url, 10, parse_json=False, headers=core.SCRAPER_HEADERS)
+            data = await asyncio.to_thread(parse_page, html)
+            if data:
+                return data, name
+        except CircuitOpenError:
+            logger.info("Skipping %s: circuit open", name)
+        except DeadlineExceeded:
+            logger.info("Skipping %s: request deadline reached", name)
+            break
+        except Exception as e:
+            logger.warning("%s failed: %s", name, e)
+    return None, None
+
+
+async def get_electricity_data(county: str, state: str, state_code: str):
+    """A fresh shared cached result, or run the electricity provider chain (findenergy -> EIA -> alternatives)"""
+    if core.snapshot is not None:
+        return core.snapshot.electricity(county, state, state_code)
+    entry = await core._electricity_cache.entry_async((state, county), max_age=core.ELECTRICITY_FRESH_SECONDS)
+    if entry is not None:
+        return entry[1]
+    result = await single_flight.do(('electricity', state, county), _fetch_electricity_data,
+                                    county, state, state_code)
+    if result[0]:
+        await core._electricity_cache.set_async((state, county), result)
+    return result
+
+
+async def _fetch_electricity_data(county: str, state: str, state_code: str):
+    data, source, raw_data = await try_findenergy_simple(county, state)
+    if not data:
+        data, source = await get_eia_data(state_code)
+        raw_data = None
+    if not data:
+        data, source = await try_alternative_sources(state_code)
+        raw_data = None
+    return data, source, raw_data
+
+
+async def get_census_demographics(zip_code: str):
+    if core.snapshot is not None:
+        return core.snapshot.census(zip_code)
+    cached = await core._census_cache.get_async(zip_code)
+    if cached is not None:
+        return cached
+    try:
+        demographics = core.parse_census_response(await _get(core.census_url(zip_code), 10))
+        await core._census_cache.set_async(zip_code, demographics)
+        return demographics
+    except Exception as e:
+        logger.warning("Failed to get Census data: %s", e)
+        return None
+
+
+async def generate_gemini_text(prompt: str, batched: bool = False):
+    """One Gemini call through the shared model client and circuit breaker"""
+    model = core.get_gemini_model()
+    # The SDK's async client only speaks gRPC, so a REST endpoint override
+    # (the load-test stubs) goes through the blocking client on a thread
+    generate = partial(asyncio.to_thread, model.generate_content) if core.GEMINI_API_ENDPOINT \
+        else model.generate_content_async
+    response = await core.breakers['gemini'].call_async(
+        generate, prompt, generation_config=core.gemini_generation_config(batched),
+        request_options={'timeout': core.GEMINI_TIMEOUT_SECONDS}
+    )
+    return response.text, core.gemini_usage(response)
+
+
+gemini_dispatcher = AsyncGeminiDispatcher(generate_gemini_text, core.parse_gemini_response,
+                                          core.GEMINI_MAX_CONCURRENCY, core.GEMINI_MAX_QUEUE_SECONDS,
+                                          core.GEMINI_BATCH_SIZE, core.GEMINI_BATCH_WAIT_SECONDS,
+                                          core.gemini_dispatcher.build_batch)
+
+
+async def calculate_solar_qualification_with_gemini(zip_code: str, monthly_bill: float,
+                                                    credit_band: str, roof_size: float):
+    """Async twin of app.calculate_solar_qualification_with_gemini"""
+    key = ('gemini', zip_code, monthly_bill, credit_band, roof_size)
+    return await single_flight.do(key, _gemini_qualification, zip_code, monthly_bill, credit_band, roof_size)
+
+
+async def _gemini_qualification(zip_code: str, monthly_bill: float, credit_band: str, roof_size: float):
+    try:
+        county, state, city, state_code = await zip_to_location(zip_code)
+        electricity_data, _, _ = await get_electricity_data(county, state, state_code)
+        context_data, prompt = core.build_gemini_request(
+            zip_code, city, state_code, county, electricity_data, monthly_bill, credit_band, roof_size
+        )
+        if not core.GEMINI_API_KEY:
+            raise RuntimeError('GEMINI_API_KEY is not configured')
+        if core.snapshot is not None:
+            raise RuntimeError('Gemini is not called in offline mode')
+        result, call = await gemini_dispatcher.submit(prompt, timeout=remaining_budget())
+        await asyncio.to_thread(core.log_gemini_calculation, zip_code, context_data, result, call)
+        return result
+    except Exception as e:
+        logger.error("Gemini calculation failed: %s", e)
+        result = core.fallback_calculation(monthly_bill, credit_band, roof_size)
+        if isinstance(e, TimeoutError) or budget_spent():
+            result['degraded'] = True
+        return result
+
+
+def overloaded_response(retry_after: int) -> JSONResponse:
+    return JSONResponse({'error': 'Server is busy, please retry shortly', 'retry_after': retry_after},
+                        status_code=503, headers={'Retry-After': str(retry_after)})
+
+
+def is_degraded() -> bool:
+    return _admission_mode.get() == DEGRADED
+
+
+def admitted(endpoint: str, handler):
+    """Admit, degrade or shed the request (see app.admit_request), then run handler
+    under the endpoint's request deadline (see app.request_budget)"""
+    async def run(request):
+        queued = core.proxy_queued_seconds(request.headers.get('x-request-start'))
+        try:
+            mode = core.admission.admit(endpoint, queued)
+        except OverloadedError as e:
+            await asyncio.to_thread(core.log_error, endpoint, request.query_params.get('zip', 'unknown'), str(e),
+                                    {'retry_after': e.retry_after})
+            return overloaded_response(e.retry_after)
+        started = time.monotonic()
+        token = _admission_mode.set(mode)
+        try:
+            with deadline_scope(core.request_budget(endpoint, request.headers.get('x-request-timeout-ms'), queued)):
+                return await handler(request)
+        finally:
+            _admission_mode.reset(token)
+            core.admission.release(endpoint, time.monotonic() - started)
+    return run
+
+
+def _client_info(request) -> dict:
+    return {
+        'request_ip': request.client.host if request.client else None,
+        'user_agent': request.headers.get('user-agent', 'Unknown')
+    }
+
+
+def _valid_zip(zip_code: str) -> bool:
+    return zip_code.isdigit() and len(zip_code) == 5
+
+
+async def electricity_data(request):
+    zip_code = request.query_params.get('zip', '').strip()
+    if not _valid_zip(zip_code):
+        await asyncio.to_thread(core.log_error, 'electricity-data', zip_code, 'Invalid ZIP code')
+        return JSONResponse({'error': 'Invalid ZIP code'}, status_code=400)
+
+    try:
+        degraded = is_degraded()
+        if degraded and not await asyncio.to_thread(core.location_is_cached, zip_code):
+            return overloaded_response(1)
+
+        county, state, city, state_code = await zip_to_location(zip_code)
+        location_data = {'county': county, 'state': state, 'city': city, 'state_code': state_code}
+
+        if degraded:
+            # Overloaded: serve only what is already cached, never call the providers
+            data, source, raw_data = await asyncio.to_thread(core.cached_electricity_data, county, state)
+            if not data:
+                return overloaded_response(1)
+        else:
+            try:
+                data, source, raw_data = await get_electricity_data(county, state, state_code)
+            except TimeoutError as e:
+                logger.warning("Electricity lookup for %s timed out: %s", zip_code, e)
+                data, source, raw_data = None, None, None
+        if not data:
+            await asyncio.to_thread(core.log_error, 'electricity-data', zip_code, 'No data available',
+                                    {'location_data': location_data})
+            return JSONResponse({'error': 'No data available'}, status_code=404)
+
+        response_data = {'zip_code': zip_code, 'city': city, 'state': state_code, 'data_source': source, **data}
+        if degraded:
+            response_data['degraded'] = True
+        await asyncio.to_thread(core.log_api_request, 'electricity-data', zip_code, response_data, {
+            'location_details': location_data,
+            'data_source_used': source,
+            'raw_scraped_data': raw_data,
+            **_client_info(request)
+        })
+        return JSONResponse(response_data)
+
+    except TimeoutError as e:
+        await asyncio.to_thread(core.log_error, 'electricity-data', zip_code, 'Request deadline exceeded',
+                                {'exception': str(e)})
+        return JSONResponse({'error': 'Request deadline exceeded'}, status_code=504)
+
+    except Exception as e:
+        logger.error("Error: %s", e)
+        await asyncio.to_thread(core.log_error, 'electricity-data', zip_code, str(e),
+                                {'exception_type': type(e).__name__})
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def demographic_data(request):
+    zip_code = request.query_params.get('zip', '').strip()
+    if not _valid_zip(zip_code):
+        await asyncio.to_thread(core.log_error, 'demographic-data', zip_code, 'Invalid ZIP code')
+        return JSONResponse({'error': 'Invalid ZIP code'}, status_code=400)
+
+    try:
+        # Census and geocoding are independent, so fetch them together
+        demographics, location = await asyncio.gather(
+            get_census_demographics(zip_code), zip_to_location(zip_code)
+        )
+        if not demographics:
+            await asyncio.to_thread(core.log_error, 'demographic-data', zip_code, 'No demographic data available')
+            return JSONResponse({'error': 'No demographic data available'}, status_code=404)
+
+        _, _, city, state_code = location
+        response_data = {
+            'zip_code': zip_code,
+            'city': city,
+            'state': state_code,
+            'data_source': 'U.S. Census Bureau ACS 5-year estimates (2021)',
+            **demographics
+        }
+        await asyncio.to_thread(core.log_api_request, 'demographic-data', zip_code, response_data, {
+            'census_api_used': True,
+            'total_population': demographics.get('total_population'),
+            'median_income': demographics.get('median_household_income'),
+            'race_diversity_score': core.calculate_diversity_score(demographics.get('race_percentages', {})),
+            **_client_info(request)
+        })
+        return JSONResponse(response_data)
+
+    except Exception as e:
+        logger.error("Error: %s", e)
+        await asyncio.to_thread(core.log_error, 'demographic-data', zip_code, str(e),
+                                {'exception_type': type(e).__name__})
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def check_qualification(request):
+    data = {}
+    try:
+        data = await request.json()
+        fields, error_msg = core.parse_qualification_input(data)
+        if error_msg:
+            return JSONResponse({'error': error_msg}, status_code=400)
+        zip_code, monthly_bill, credit_band, roof_size = fields
+
+        if is_degraded():
+            # Overloaded: answer from the local calculation without Gemini or scrapers
+            result = core.fallback_calculation(monthly_bill, credit_band, roof_size)
+            result['degraded'] = True
+        else:
+            try:
+                result = await calculate_solar_qualification_with_gemini(zip_code, monthly_bill, credit_band,
+                                                                         roof_size)
+            except TimeoutError as e:
+                # Deadline reached while waiting on another request's identical call
+                logger.warning("Qualification for %s fell back: %s", zip_code, e)
+                result = core.fallback_calculation(monthly_bill, credit_band, roof_size)
+                result['degraded'] = True
+
+        try:
+            _, _, city, state_code = await zip_to_location(zip_code)
+            result['location'] = {'city': city, 'state': state_code, 'zip_code': zip_code}
+        except Exception as e:
+            logger.warning("Could not get location info for %s: %s", zip_code, e)
+            result['location'] = {'city': 'Unknown', 'state': 'Unknown', 'zip_code': zip_code}
+
+        await asyncio.to_thread(core.log_api_request, 'check-qualification', zip_code, result, {
+            'input_data': data,
+            'ai_powered': not result.get('degraded'),
+            **_client_info(request)
+        })
+        return JSONResponse(result)
+
+    except ValueError as e:
+        error_msg = f'Invalid input data: {str(e)}'
+        await asyncio.to_thread(core.log_error, 'check-qualification', data.get('zipCode', 'unknown'), error_msg)
+        return JSONResponse({'error': error_msg}, status_code=400)
+
+    except Exception as e:
+        logger.error("Qualification error: %s", e)
+        await asyncio.to_thread(core.log_error, 'check-qualification', data.get('zipCode', 'unknown'), str(e), {
+            'exception_type': type(e).__name__,
+            'input_data': data
+        })
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+
+async def healthz(request):
+    return JSONResponse({'status': 'healthy'})
+
+
+async def metrics(request):
+    return JSONResponse({
+        'single_flight': single_flight.stats(),
+        'circuit_breakers': {name: breaker.state() for name, breaker in core.breakers.items()},
+        'admission': core.admission.stats(),
+        'gemini_dispatcher': gemini_dispatcher.stats(),
+        'snapshot': core.snapshot.stats() if core.snapshot else None
+    })
+
+
+async def _startup():
+    started = time.monotonic()
+    get_session()
+    # Import bs4/Gemini off the event loop so the first request doesn't pay for them
+    await asyncio.to_thread(core.warm_up)
+    logger.info("Async app ready in %.2fs", time.monotonic() - started)
+
+
+async def _shutdown():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+app = Starlette(
+    routes=[
+        Route('/electricity-data', admitted('electricity-data', electricity_data)),
+        Route('/demographic-data', admitted('demographic-data', demographic_data)),
+        Route('/api/check-qualification', admitted('check-qualification', check_qualification),
+              methods=['POST']),
+        Route('/healthz', healthz),
+        Route('/metrics', metrics)
+    ],
+    on_startup=[_startup],
+    on_shutdown=[_shutdown]
+)
@@ -0,0 +1,51 @@
+# backend/gunicorn.conf.py
+"""
+Production server settings: a pre-forking gunicorn master that loads the app
+and its reference data once, then forks workers that share it copy-on-write.
+
+All settings can be overridden from the environment:
+  WEB_CONCURRENCY           worker processes (default: 2 x CPUs + 1)
+  GUNICORN_THREADS          threads per worker (default: 4)
+  GUNICORN_MAX_REQUESTS     recycle a worker after this many requests (0 = never)
+  GUNICORN_MAX_REQUESTS_JITTER  random spread so workers don't recycle together
+  GUNICORN_TIMEOUT          seconds before a silent worker is killed
+  GUNICORN_GRACEFUL_TIMEOUT seconds workers get to finish requests on reload/stop
+
+Because the app is preloaded in the master, SIGHUP only restarts workers from
+the code the master already imported; it does not pick up a deploy. To load
+new code without dropping connections, send SIGUSR2 to the master (it re-execs
+a new master and workers beside the old ones), then SIGTERM the old master
+once the new workers are serving. Otherwise a deploy needs a full restart.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5500)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Import app.py in the master so its modules and data are shared by workers
+preload_app = True
+
+
+def when_ready(server):
+    """Runs in the master after binding and before the first fork"""
+    import app
+    app.preload_shared_data()
+    # Move everything loaded so far out of the GC's reach so collections in
+    # the workers don't touch (and therefore copy) the shared pages
+    gc.freeze()
+    server.log.info("Shared data loaded; forking %s workers x %s threads", workers, threads)
+
+
+def post_fork(server, worker):
+    """Per-worker warm-up for resources that must not cross a fork"""
+    import app
+    app.start_warm_up()
@@ -0,0 +1,239 @@
+# backend/models/batches.py
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from models.solar_models import QualificationRequest, QualificationResult
+CREDIT_BANDS = ('Excellent', 'Good', 'Fair', 'Poor')
+STATUSES = ('approved', 'borderline', 'not_qualified')
+class TextColumn:
+    """Variable-length strings as one UTF-8 buffer plus int64 offsets (Arrow's large_utf8 layout)"""
+    __slots__ = ('offsets', 'data')
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]):
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8))
+    @classmethod
+    def concat(cls, columns: List['TextColumn']):
+        offsets, base = [np.zeros(1, dtype=np.int64)], 0
+        for column in columns:
+            offsets.append(column.offsets[1:] - column.offsets[0] + base)
+            base += int(column.offsets[-1] - column.offsets[0])
+        data = np.concatenate([c.data[c.offsets[0]:c.offsets[-1]] for c in columns]) if columns \
+            else np.zeros(0, dtype=np.uint8)
+        return cls(np.concatenate(offsets), data)
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+    def take(self, start: int, stop: int) -> 'TextColumn':
+        """Rows start..stop, sharing this column's buffers"""
+        return TextColumn(self.offsets[start:stop + 1], self.data)
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + int(self.offsets[-1] - self.offsets[0])
+# Column kinds: numpy dtype for stored values and Arrow type name for buffers
+KINDS = {
+    'zip': (np.dtype('S5'), 'fixed_size_binary[5]'),
+    'float': (np.dtype(np.float64), 'float64'),
+    'int': (np.dtype(np.int16), 'int16'),
+    'timestamp': (np.dtype('datetime64[us]'), 'timestamp[us]'),
+    'category': (np.dtype(np.uint8), 'dictionary<uint8, utf8>'),
+    'text': (None, 'large_utf8')
+}
+class RecordBatch:
+    """Struct-of-arrays container for many records of one slotted type
+
+    Each field is one NumPy array (or TextColumn), so a million rows cost
+    the size of their values instead of a dict and boxed floats per row.
+    Subclasses list FIELDS as (attribute, dict key, kind) and the
+    dictionary of each 'category' field in CATEGORIES. Rows convert to and
+    from the record type and its to_dict()/from_dict() form, which is also
+    the NDJSON and CSV row shape; to_buffers()/from_buffers() expose the
+    column memory itself, following Arrow's buffer layout.
+    """
+    RECORD: Any = None
+    FIELDS: Tuple[Tuple[str, str, str], ...] = ()
+    CATEGORIES: Dict[str, Tuple[str, ...]] = {}
+    __slots__ = ('columns', 'length')
+    def __init__(self, columns: Dict[str, Any], length: Optional[int] = None):
+        self.columns = columns
+        self.length = len(next(iter(columns.values()))) if length is None else length
+        for name, column in columns.items():
+            if len(column) != self.length:
+                raise ValueError(f'Column {name} has {len(column)} rows, expected {self.length}')
+    def __len__(self) -> int:
+        return self.length
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+    @classmethod
+    def _encode(cls, name: str, kind: str, values: List[Any]):
+        if kind == 'text':
+            return TextColumn.from_strings(values)
+        if kind == 'category':
+            lookup = {value: code for code, value in enumerate(cls.CATEGORIES[name])}
+            try:
+                return np.fromiter((lookup[value] for value in values), dtype=np.uint8, count=len(values))
+            except KeyError as e:
+                raise ValueError(f'Unknown {name}: {e.args[0]}') from None
+        if kind == 'zip':
+            encoded = [str(value).encode('ascii') for value in values]
+            if any(len(value) != 5 for value in encoded):
+                raise ValueError(f'{name} values must be 5 characters')
+            return np.array(encoded, dtype='S5')
+        if kind == 'timestamp':
+            return np.array(values, dtype='datetime64[us]')
+        return np.array(values, dtype=KINDS[kind][0])
+    @classmethod
+    def from_records(cls, records: Iterable[Any], chunk_size: int = 8192):
+        """Build from record objects, holding at most chunk_size of them as Python values at once"""
+        chunks, chunk = [], []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                chunks.append(cls._from_chunk(chunk))
+                chunk = []
+        if chunk or not chunks:
+            chunks.append(cls._from_chunk(chunk))
+        return cls.concat(chunks)
+    @classmethod
+    def _from_chunk(cls, records: List[Any]):
+        return cls({name: cls._encode(name, kind, [getattr(record, name) for record in records])
+                    for name, _, kind in cls.FIELDS}, len(records))
+    @classmethod
+    def from_dicts(cls, rows: Iterable[Dict[str, Any]], chunk_size: int = 8192):
+        return cls.from_records((cls.RECORD.from_dict(row) for row in rows), chunk_size)
+    @classmethod
+    def concat(cls, batches: List['RecordBatch']):
+        if len(batches) == 1:
+            return batches[0]
+        columns = {}
+        for name, _, kind in cls.FIELDS:
+            parts = [batch.columns[name] for batch in batches]
+            columns[name] = TextColumn.concat(parts) if kind == 'text' else np.concatenate(parts)
+        return cls(columns, sum(len(batch) for batch in batches))
+    def slice(self, start: int, stop: int):
+        """Rows start..stop as a view over this batch's arrays"""
+        stop = min(stop, self.length)
+        return type(self)({name: column.take(start, stop) if isinstance(column, TextColumn) else column[start:stop]
+                           for name, column in self.columns.items()}, max(stop - start, 0))
+    def _decoded(self, name: str, kind: str, start: int, stop: int) -> List[Any]:
+        column = self.columns[name]
+        if kind == 'text':
+            return [column[i] for i in range(start, stop)]
+        values = column[start:stop]
+        if kind == 'category':
+            return [self.CATEGORIES[name][code] for code in values.tolist()]
+        if kind == 'zip':
+            return [value.decode('ascii') for value in values.tolist()]
+        return values.tolist()
+    def iter_records(self, chunk_size: int = 8192) -> Iterator[Any]:
+        """Record objects, materialised chunk_size rows at a time"""
+        for start in range(0, self.length, chunk_size):
+            stop = min(start + chunk_size, self.length)
+            values = [self._decoded(name, kind, start, stop) for name, _, kind in self.FIELDS]
+            for row in zip(*values):
+                yield self.RECORD(*row)
+    def __iter__(self) -> Iterator[Any]:
+        return self.iter_records()
+    def __getitem__(self, i: int):
+        if not -self.length <= i < self.length:
+            raise IndexError(i)
+        i %= self.length
+        return next(self.slice(i, i + 1).iter_records())
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        return (record.to_dict() for record in self.iter_records())
+    def iter_ndjson(self, chunk_size: int = 500) -> Iterator[str]:
+        """One JSON line per row, chunk_size lines per yielded string"""
+        rows = self.iter_dicts()
+        for _ in range(0, self.length, chunk_size):
+            yield ''.join(json.dumps(row) + '\n' for _, row in zip(range(chunk_size), rows))
+    @classmethod
+    def from_ndjson(cls, lines: Iterable[str], chunk_size: int = 8192):
+        return cls.from_dicts((json.loads(line) for line in lines if line.strip()), chunk_size)
+    def iter_csv(self, chunk_size: int = 500) -> Iterator[str]:
+        """CSV with a header of the dict keys, chunk_size rows per yielded string"""
+        keys = [key for _, key, _ in self.FIELDS]
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=keys, extrasaction='ignore', lineterminator='\n')
+        writer.writeheader()
+        for i, row in enumerate(self.iter_dicts(), 1):
+            writer.writerow(row)
+            if i % chunk_size == 0:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+        yield out.getvalue()
+    @classmethod
+    def from_csv(cls, lines: Iterable[str], chunk_size: int = 8192):
+        return cls.from_dicts(csv.DictReader(lines), chunk_size)
+    def schema(self) -> List[Dict[str, Any]]:
+        """Arrow type of each field, with the dictionary of category fields"""
+        schema = []
+        for name, _, kind in self.FIELDS:
+            field = {'name': name, 'type': KINDS[kind][1]}
+            if kind == 'category':
+                field['dictionary'] = list(self.CATEGORIES[name])
+            schema.append(field)
+        return schema
+    def to_buffers(self) -> Dict[str, List[memoryview]]:
+        """Each field's memory without copying: [values], or [offsets, data] for text
+
+        Timestamps are int64 microseconds since the epoch and category
+        fields are uint8 indexes into their schema() dictionary, so
+        pyarrow.Array.from_buffers can wrap them directly.
+        """
+        buffers = {}
+        for name, _, kind in self.FIELDS:
+            column = self.columns[name]
+            if kind == 'text':
+                buffers[name] = [memoryview(column.offsets), memoryview(column.data)]
+            else:
+                values = column.view(np.int64) if kind == 'timestamp' else column
+                buffers[name] = [memoryview(np.ascontiguousarray(values))]
+        return buffers
+    @classmethod
+    def from_buffers(cls, length: int, buffers: Dict[str, List[Any]]):
+        """Inverse of to_buffers(); the arrays are views over the given buffers"""
+        columns = {}
+        for name, _, kind in cls.FIELDS:
+            if kind == 'text':
+                offsets, data = buffers[name]
+                columns[name] = TextColumn(np.frombuffer(offsets, dtype=np.int64, count=length + 1),
+                                           np.frombuffer(data, dtype=np.uint8))
+            else:
+                columns[name] = np.frombuffer(buffers[name][0], dtype=KINDS[kind][0], count=length)
+        return cls(columns, length)
+class QualificationRequestBatch(RecordBatch):
+    """Many QualificationRequests as columns"""
+    RECORD = QualificationRequest
+    FIELDS = (
+        ('zip_code', 'zipCode', 'zip'),
+        ('electric_bill', 'electricBill', 'float'),
+        ('credit_band', 'creditBand', 'category'),
+        ('roof_size', 'roofSize', 'float'),
+        ('loan_term', 'loanTerm', 'int')
+    )
+    CATEGORIES = {'credit_band': CREDIT_BANDS}
+    __slots__ = ()
+class QualificationResultBatch(RecordBatch):
+    """Many QualificationResults as columns"""
+    RECORD = QualificationResult
+    FIELDS = (
+        ('status', 'status', 'category'),
+        ('monthly_payment', 'monthlyPayment', 'float'),
+        ('payback_years', 'paybackYears', 'float'),
+        ('system_size_kw', 'systemSizeKW', 'float'),
+        ('total_savings', 'totalSavings', 'float'),
+        ('explanation', 'explanation', 'text'),
+        ('timestamp', 'timestamp', 'timestamp')
+    )
+    CATEGORIES = {'status': STATUSES}
+    __slots__ = ()
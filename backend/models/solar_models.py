@@ -1,8 +1,8 @@
 # backend/models/solar_models.py
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, Dict, Any
 from datetime import datetime
-@dataclass
+@dataclass(slots=True)
 class QualificationRequest:
     """Input data model"""
     zip_code: str
@@ -17,9 +17,17 @@ class QualificationRequest:
             electric_bill=float(data['electricBill']),
             credit_band=data['creditBand'],
             roof_size=float(data['roofSize']),
-            loan_term=data.get('loanTerm', 20)
+            loan_term=int(data.get('loanTerm', 20))
         )
-@dataclass
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'zipCode': self.zip_code,
+            'electricBill': self.electric_bill,
+            'creditBand': self.credit_band,
+            'roofSize': self.roof_size,
+            'loanTerm': self.loan_term
+        }
+@dataclass(slots=True)
 class QualificationResult:
     """Output data model"""
     status: str  # 'approved', 'borderline', 'not_qualified'
@@ -28,7 +36,20 @@ class QualificationResult:
     system_size_kw: float
     total_savings: float
     explanation: str
-    timestamp: datetime = datetime.now()
+    timestamp: datetime = field(default_factory=datetime.now)
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        """From to_dict() output or a QualificationEngine result"""
+        timestamp = data.get('timestamp')
+        return cls(
+            status=data['status'],
+            monthly_payment=float(data['monthlyPayment']),
+            payback_years=float(data['paybackYears']),
+            system_size_kw=float(data['systemSizeKW']),
+            total_savings=float(data['totalSavings']),
+            explanation=data.get('explanation', ''),
+            timestamp=datetime.fromisoformat(timestamp) if timestamp else datetime.now()
+        )
     def to_dict(self) -> Dict[str, Any]:
         return {
             'status': self.status,
@@ -39,7 +60,7 @@ class QualificationResult:
             'explanation': self.explanation,
             'timestamp': self.timestamp.isoformat()
         }
-@dataclass
+@dataclass(slots=True)
 class SolarSystemSpecs:
     """Solar system specifications"""
     size_kw: float
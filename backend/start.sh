@@ -1,5 +1,5 @@
 #!/bin/bash
 # Render start script for backend
 
-echo "Starting Flask backend..."
-python app.py
+echo "Starting backend (gunicorn, pre-forking workers)..."
+exec gunicorn -c gunicorn.conf.py app:app
@@ -0,0 +1,7 @@
+# backend/tests/conftest.py
+import os
+import sys
+# Backend modules import each other as top-level packages (utils.*, database.*)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Tests share lookups through an in-process stand-in, not the on-disk cache
+os.environ.setdefault('SHARED_CACHE_URL', 'memory://')
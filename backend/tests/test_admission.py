@@ -0,0 +1,91 @@
+# backend/tests/test_admission.py
+import pytest
+from backend.app import app
+from backend.utils.admission import DEGRADED, NORMAL, AdmissionController, OverloadedError, queued_seconds
+QUALIFICATION_INPUT = {'zipCode': '10001', 'electricBill': '150', 'creditBand': 'Good', 'roofSize': '1500'}
+class TestAdmission:
+    """Test admission control and load shedding"""
+    def test_in_flight_thresholds(self):
+        """Requests are normal, then degraded past the soft limit, then shed past the hard limit"""
+        controller = AdmissionController(soft_limit=2, hard_limit=3)
+        modes = [controller.admit('check-qualification') for _ in range(3)]
+        assert modes == [NORMAL, NORMAL, DEGRADED]
+        with pytest.raises(OverloadedError) as excinfo:
+            controller.admit('check-qualification')
+        assert excinfo.value.retry_after >= 1
+        controller.release('check-qualification', 0.1)
+        assert controller.admit('check-qualification') == DEGRADED
+        stats = controller.stats()['check-qualification']
+        assert stats['shed'] == 1 and stats['in_flight'] == 3
+    def test_endpoints_are_independent(self):
+        """Per-endpoint overrides and counts don't affect other endpoints"""
+        controller = AdmissionController(soft_limit=1, hard_limit=1, limits={'electricity-data': (5, 10)})
+        controller.admit('check-qualification')
+        assert controller.admit('electricity-data') == NORMAL
+        with pytest.raises(OverloadedError):
+            controller.admit('check-qualification')
+    def test_queue_wait(self):
+        """A long smoothed queue wait degrades and then sheds"""
+        controller = AdmissionController(soft_wait_seconds=0.5, hard_wait_seconds=2.0, smoothing=1.0)
+        assert controller.admit('x', queued_seconds=1.0) == DEGRADED
+        with pytest.raises(OverloadedError):
+            controller.admit('x', queued_seconds=3.0)
+        assert queued_seconds('t=1000000000000', now=1000000002.5) == pytest.approx(2.5)
+        assert queued_seconds('t=1000000000.0', now=1000000001.0) == pytest.approx(1.0)
+        assert queued_seconds(None) == 0.0
+        assert queued_seconds('t=1', now=1000000002.5) == 0.0  # implausibly old
+        assert queued_seconds('t=1000000010', now=1000000002.5) == 0.0  # in the future
+        assert queued_seconds('t=inf') == 0.0 and queued_seconds('t=soon') == 0.0
+    def test_degraded_and_shed_responses(self, monkeypatch):
+        """The endpoint answers from the fallback when degraded and with 503 + Retry-After when shedding"""
+        from backend import app as app_module
+        monkeypatch.setattr(app_module, 'admission', app_module.AdmissionController(soft_limit=0, hard_limit=1))
+        monkeypatch.setattr(app_module, 'calculate_solar_qualification_with_gemini',
+                            lambda *args: pytest.fail('Gemini must not be called while degraded'))
+        with app.test_client() as client:
+            response = client.post('/api/check-qualification', json=QUALIFICATION_INPUT)
+            assert response.status_code == 200
+            assert response.get_json()['degraded'] is True
+            app_module.admission.admit('check-qualification')
+            response = client.post('/api/check-qualification', json=QUALIFICATION_INPUT)
+            assert response.status_code == 503
+            assert int(response.headers['Retry-After']) >= 1
+            assert client.get('/healthz').status_code == 200
+    def test_forged_request_start_recovers(self, monkeypatch):
+        """A bogus X-Request-Start is ignored, and a slow one stops shedding once later requests arrive"""
+        import time
+        from backend import app as app_module
+        monkeypatch.setattr(app_module, 'admission', app_module.AdmissionController(
+            soft_wait_seconds=1.0, hard_wait_seconds=2.0, smoothing=0.5))
+        monkeypatch.setattr(app_module, 'calculate_solar_qualification_with_gemini',
+                            lambda *args: {'status': 'approved'})
+        with app.test_client() as client:
+            response = client.post('/api/check-qualification', json=QUALIFICATION_INPUT,
+                                   headers={'X-Request-Start': 't=1'})
+            assert response.status_code == 200 and not response.get_json().get('degraded')
+            assert app_module.admission.stats()['check-qualification']['queue_wait_ms'] == 0
+            response = client.post('/api/check-qualification', json=QUALIFICATION_INPUT,
+                                   headers={'X-Request-Start': f't={time.time() - 8:.3f}'})
+            assert response.status_code == 503
+            statuses = [client.post('/api/check-qualification', json=QUALIFICATION_INPUT).status_code
+                        for _ in range(4)]
+            assert statuses[-1] == 200 and not client.post('/api/check-qualification',
+                                                           json=QUALIFICATION_INPUT).get_json().get('degraded')
+    def test_request_start_needs_a_trusted_proxy(self, monkeypatch):
+        """Without a proxy in front the header is the client's own claim and is ignored"""
+        import time
+        from backend import app as app_module
+        monkeypatch.setattr(app_module, 'TRUSTED_PROXY_HOPS', 0)
+        assert app_module.proxy_queued_seconds(f't={time.time() - 5:.3f}') == 0.0
+        monkeypatch.setattr(app_module, 'TRUSTED_PROXY_HOPS', 1)
+        assert app_module.proxy_queued_seconds(f't={time.time() - 5:.3f}') == pytest.approx(5, abs=0.5)
+    def test_client_key_ignores_spoofed_hops(self):
+        """Only the hop added by the trusted proxy identifies the client"""
+        from backend import app as app_module
+        with app.test_client() as client:
+            client.get('/', headers={'X-Forwarded-For': '6.6.6.6, 203.0.113.7'},
+                       environ_base={'REMOTE_ADDR': '10.0.0.1'})
+            assert app_module.client_key() == '203.0.113.7'
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
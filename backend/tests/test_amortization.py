@@ -0,0 +1,91 @@
+# backend/tests/test_amortization.py
+import csv
+import io
+import json
+import numpy as np
+import pytest
+from backend.app import app
+from backend.utils.amortization import amortization_schedules
+from backend.utils.solar_calculator import SolarCalculator
+class TestAmortization:
+    """Test vectorised amortization schedules and the /api/amortization endpoint"""
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+    def test_schedules_match_calculator(self):
+        """Payments match calculate_monthly_payment and every loan is paid off"""
+        schedules = amortization_schedules([20000, 15000, 10000], [5.99, 0.0, 12.99], [240, 120, 300])
+        assert round(schedules['monthly_payment'][0], 2) == SolarCalculator.calculate_monthly_payment(20000, 5.99, 20)
+        assert schedules['monthly_payment'][1] == pytest.approx(125.0)
+        np.testing.assert_allclose(schedules['principal'].sum(axis=1), [20000, 15000, 10000])
+        np.testing.assert_allclose(schedules['balance'][:, -1], 0, atol=1e-6)
+        # Shorter loans are zero-padded past their term
+        assert not schedules['payment'][1, 120:].any()
+        np.testing.assert_allclose(schedules['interest'] + schedules['principal'], schedules['payment'])
+    def test_net_savings_escalate_yearly(self):
+        """Savings grow by the escalation rate every 12 months, net of the payment"""
+        schedules = amortization_schedules(12000, 0.0, 24, 150, savings_escalation=0.10)
+        net = schedules['cumulative_net_savings'][0]
+        assert net[11] == pytest.approx(12 * (150 - 500))
+        assert net[23] == pytest.approx(12 * (150 - 500) + 12 * (165 - 500))
+    def test_json_response(self, client):
+        """A single loan at the top level returns its schedule as JSON"""
+        response = client.post('/api/amortization', json={'principal': 10000, 'apr': 5.99, 'term_years': 10,
+                                                          'monthly_savings': 120})
+        assert response.status_code == 200
+        loan = json.loads(response.data)['loans'][0]
+        assert loan['term_months'] == 120
+        assert len(loan['schedule']['balance']) == 120
+        assert loan['schedule']['balance'][-1] == 0
+    def test_streams_csv_and_ndjson(self, client):
+        """Many loans stream one CSV row per loan-month or one NDJSON line per loan"""
+        loans = [{'id': f'L{i}', 'principal': 10000 + i, 'apr': 5.99, 'term_months': 60 + i} for i in range(3)]
+        response = client.post('/api/amortization?format=csv', json={'loans': loans})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert len(rows) == 60 + 61 + 62
+        assert rows[-1]['loan_id'] == 'L2' and float(rows[-1]['balance']) == 0
+        response = client.post('/api/amortization', json={'loans': loans, 'format': 'ndjson'})
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [line['id'] for line in lines] == ['L0', 'L1', 'L2']
+    def test_rejects_bad_input(self, client):
+        """Invalid terms and oversized JSON requests are rejected"""
+        response = client.post('/api/amortization', json={'principal': 10000, 'apr': 5, 'term_months': 400})
+        assert response.status_code == 400
+        response = client.post('/api/amortization', json={'principal': 10000, 'apr': 5})
+        assert response.status_code == 400
+        loans = [{'principal': 1000, 'apr': 5, 'term_months': 12}] * 101
+        response = client.post('/api/amortization', json={'loans': loans})
+        assert response.status_code == 400
+        assert 'csv' in json.loads(response.data)['error']
+    def test_rejects_bad_options_before_logging(self, client, monkeypatch):
+        """An unknown format or out-of-range escalation is a 400 and never logged as a served request"""
+        from backend import app as app_module
+        logged = []
+        monkeypatch.setattr(app_module, 'log_api_request', lambda *args, **kwargs: logged.append(args))
+        loan = {'principal': 10000, 'apr': 5, 'term_months': 12}
+        for options in ({'format': 'xml'}, {'savings_escalation': -0.5}, {'savings_escalation': 'nan'},
+                        {'savings_escalation': 3}):
+            response = client.post('/api/amortization', json={**loan, **options})
+            assert response.status_code == 400
+        assert logged == []
+        assert client.post('/api/amortization', json={**loan, 'savings_escalation': 0.05}).status_code == 200
+        assert len(logged) == 1
+    def test_rejects_non_finite_numbers(self, client):
+        """NaN and Infinity in the JSON body are a 400, not a NaN schedule or an OverflowError"""
+        for loan in ('{"principal": NaN, "apr": 5, "term_months": 12}',
+                     '{"principal": 10000, "apr": NaN, "term_months": 12}',
+                     '{"principal": 10000, "apr": 5, "term_months": 12, "monthly_savings": NaN}',
+                     '{"principal": 10000, "apr": 5, "term_months": Infinity}',
+                     '{"principal": 10000, "apr": 5, "term_years": Infinity}',
+                     '{"principal": 10000, "apr": 5, "term_years": 1e308}'):
+            for output_format in ('json', 'csv', 'ndjson'):
+                response = client.post(f'/api/amortization?format={output_format}', data=loan,
+                                       content_type='application/json')
+                assert response.status_code == 400, loan
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -16,6 +16,18 @@ class TestAPI:
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data['status'] == 'healthy'
+    def test_liveness_and_readiness(self, client):
+        """Test /healthz is always up and /readyz follows warm-up"""
+        from backend import app as app_module
+        assert client.get('/healthz').status_code == 200
+        if app_module._warmup_state['status'] != 'ready':
+            assert client.get('/readyz').status_code == 503
+            app_module.warm_up()
+        response = client.get('/readyz')
+        data = json.loads(response.data)
+        assert data['warm_up']['status'] == 'ready'
+        assert 'vantage_index' in data['warm_up']['steps']
+        assert data['startup']['first_response_seconds'] is not None
     def test_qualification_valid(self, client):
         """Test valid qualification request"""
         payload = {
@@ -47,4 +59,22 @@ class TestAPI:
             data=json.dumps(payload),
             content_type='application/json'
         )
-        assert response.status_code == 400
\ No newline at end of file
+        assert response.status_code == 400
+    def test_structured_gemini_prompt(self, monkeypatch):
+        """Structured mode sends only the applicant's fields and asks for schema-constrained JSON"""
+        from backend import app as app_module
+        monkeypatch.setattr(app_module, 'GEMINI_STRUCTURED_OUTPUT', True)
+        context, prompt = app_module.build_gemini_request('10001', 'New York', 'NY', 'new-york', None, 150.0, 'Good', 1500.0)
+        applicant = json.loads(prompt)
+        assert applicant['credit_band'] == 'Good'
+        assert applicant['max_system_kw'] == 6.0
+        assert context['user_input']['roof_size'] == 1500.0
+        batch = json.loads(app_module.build_structured_batch([prompt, prompt]))
+        assert [item['index'] for item in batch] == [0, 1]
+        config = app_module.gemini_generation_config(batched=True)
+        assert config['response_mime_type'] == 'application/json'
+        assert config['response_schema']['items']['required'][0] == 'index'
+        monkeypatch.setattr(app_module, 'GEMINI_STRUCTURED_OUTPUT', False)
+        _, text_prompt = app_module.build_gemini_request('10001', 'New York', 'NY', 'new-york', None, 150.0, 'Good', 1500.0)
+        assert len(prompt) * 5 < len(text_prompt)
+        assert app_module.gemini_generation_config() is None
@@ -0,0 +1,112 @@
+# backend/tests/test_async_app.py
+import json
+import pytest
+pytest.importorskip('httpx')
+from starlette.testclient import TestClient
+from backend import async_app
+ZIPPOPOTAM_BODY = {'places': [{'latitude': '40.7506', 'longitude': '-73.9972',
+                               'state abbreviation': 'NY', 'place name': 'New York'}]}
+FCC_BODY = {'County': {'name': 'New York County'}}
+CENSUS_BODY = [
+    ['NAME', 'B02001_001E', 'B02001_002E', 'B02001_003E', 'B02001_004E', 'B02001_005E',
+     'B02001_006E', 'B02001_007E', 'B02001_008E', 'B19013_001E', 'zip code tabulation area'],
+    ['ZCTA5 10001', '27000', '14000', '3000', '100', '6000', '20', '2000', '1880', '96000', '10001']
+]
+FINDENERGY_PAGE = ('<html><body><p>The average monthly electricity bill is $152.30.</p>'
+                   '<p>Residents use 710 kWh of electricity per month.</p>'
+                   '<p>Rates average 21.5 cents per kWh.</p></body></html>')
+GEMINI_RESULT = {'status': 'approved', 'system_size_kw': 6.0, 'explanation': 'Stubbed qualification result.'}
+@pytest.fixture
+def upstreams(monkeypatch):
+    """Point every upstream at canned responses and record the URLs requested"""
+    core = async_app.core
+    calls = []
+    monkeypatch.setattr(core, 'snapshot', None)
+    monkeypatch.setattr(core, 'ZIPPOPOTAM_URL', 'https://zippopotam.test/us/{zip}')
+    monkeypatch.setattr(core, 'FCC_LOOKUP_URL', 'https://fcc.test/block/find')
+    monkeypatch.setattr(core, 'CENSUS_API_URL', 'https://census.test/data/acs5')
+    monkeypatch.setattr(core, 'FINDENERGY_URL', 'https://findenergy.test/{state}/{county}-electricity/')
+    monkeypatch.setattr(core, 'log_api_request', lambda *args, **kwargs: None)
+    monkeypatch.setattr(core, 'log_error', lambda *args, **kwargs: None)
+    monkeypatch.setattr(core, 'log_gemini_calculation', lambda *args, **kwargs: None)
+    monkeypatch.setattr(core, 'admission', core.AdmissionController())
+    for cache in (core._zip_location_cache, core._electricity_cache, core._census_cache):
+        monkeypatch.setattr(cache, 'backend', None)
+        cache.clear()
+    async def get(url, timeout, parse_json=True, **kwargs):
+        calls.append(url)
+        if 'zippopotam' in url:
+            return ZIPPOPOTAM_BODY
+        if 'fcc' in url:
+            return FCC_BODY
+        if 'census' in url:
+            return CENSUS_BODY
+        if 'findenergy' in url:
+            return FINDENERGY_PAGE
+        raise AssertionError(f'Unexpected upstream call: {url}')
+    monkeypatch.setattr(async_app, '_get', get)
+    return calls
+@pytest.fixture
+def client(upstreams):
+    with TestClient(async_app.app) as test_client:
+        yield test_client
+class TestAsyncApp:
+    """Test the asyncio request path against stubbed upstreams"""
+    def test_electricity_data(self, client, upstreams):
+        """The ZIP resolves through Zippopotam and FCC, the rate comes from findenergy"""
+        response = client.get('/electricity-data?zip=10001')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['city'] == 'New York'
+        assert data['state'] == 'NY'
+        assert data['data_source'] == 'findenergy.com'
+        assert data['average_monthly_bill'] == 152.3
+        assert 'degraded' not in data
+        assert any('findenergy.test/ny/new-york-electricity' in url for url in upstreams)
+        # A second request is answered from the caches
+        calls = len(upstreams)
+        assert client.get('/electricity-data?zip=10001').status_code == 200
+        assert len(upstreams) == calls
+    def test_demographic_data(self, client, upstreams):
+        response = client.get('/demographic-data?zip=10001')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['city'] == 'New York'
+        assert data['total_population'] == 27000
+        assert data['median_household_income'] == 96000
+    def test_invalid_zip(self, client, upstreams):
+        assert client.get('/electricity-data?zip=abc').status_code == 400
+        assert client.get('/demographic-data?zip=1234').status_code == 400
+        assert upstreams == []
+    def test_check_qualification(self, client, upstreams, monkeypatch):
+        """The Gemini answer comes back with the applicant's location attached"""
+        prompts = []
+        async def generate(prompt, batched):
+            prompts.append(prompt)
+            return json.dumps(GEMINI_RESULT), {}
+        monkeypatch.setattr(async_app.core, 'GEMINI_API_KEY', 'test-key')
+        monkeypatch.setattr(async_app, 'gemini_dispatcher',
+                            async_app.AsyncGeminiDispatcher(generate, async_app.core.parse_gemini_response))
+        response = client.post('/api/check-qualification', json={
+            'zipCode': '10001', 'electricBill': '150', 'creditBand': 'Good', 'roofSize': '1500'
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data['status'] == 'approved'
+        assert data['location'] == {'city': 'New York', 'state': 'NY', 'zip_code': '10001'}
+        assert len(prompts) == 1
+    def test_check_qualification_rejects_bad_input(self, client, upstreams):
+        response = client.post('/api/check-qualification', json={'zipCode': '10001', 'electricBill': 'lots'})
+        assert response.status_code == 400
+        assert upstreams == []
+    def test_degraded_qualification_skips_gemini(self, client, upstreams, monkeypatch):
+        """Past the soft limit the local calculation answers and is marked degraded"""
+        monkeypatch.setattr(async_app.core, 'admission', async_app.core.AdmissionController(soft_limit=0))
+        response = client.post('/api/check-qualification', json={
+            'zipCode': '10001', 'electricBill': '150', 'creditBand': 'Good', 'roofSize': '1500'
+        })
+        assert response.status_code == 200
+        assert response.json()['degraded'] is True
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
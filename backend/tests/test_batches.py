@@ -0,0 +1,55 @@
+# backend/tests/test_batches.py
+import io
+import sys
+import time
+import numpy as np
+import pytest
+# The record classes the batches build (models.solar_models, as the app imports it)
+from backend.models.batches import (CREDIT_BANDS, STATUSES, QualificationRequest, QualificationRequestBatch,
+                                    QualificationResult, QualificationResultBatch)
+REQUESTS = [QualificationRequest(f'{i % 100000:05d}', 50.0 + i % 450, CREDIT_BANDS[i % 4], 500.0 + i, 20)
+            for i in range(1000)]
+RESULTS = [QualificationResult(STATUSES[i % 3], 100.0 + i, 8.5, 7.25, 30000.0, 'Système ' * (i % 3))
+           for i in range(1000)]
+class TestRecordTypes:
+    """Test the slotted records and their columnar batches"""
+    def test_records_are_slotted(self):
+        """No per-instance __dict__, and each result gets its own timestamp"""
+        assert not hasattr(REQUESTS[0], '__dict__')
+        first = QualificationResult('approved', 1.0, 1.0, 1.0, 1.0, '')
+        time.sleep(0.001)
+        second = QualificationResult('approved', 1.0, 1.0, 1.0, 1.0, '')
+        assert second.timestamp > first.timestamp
+        assert QualificationResult.from_dict(first.to_dict()).timestamp == first.timestamp
+    def test_round_trips(self):
+        """Records, NDJSON and CSV all convert back to the same rows"""
+        batch = QualificationRequestBatch.from_records(REQUESTS, chunk_size=300)
+        assert len(batch) == 1000 and batch[-1] == REQUESTS[-1]
+        assert list(QualificationRequestBatch.from_ndjson(''.join(batch.iter_ndjson()).splitlines())) == REQUESTS
+        assert list(QualificationRequestBatch.from_csv(io.StringIO(''.join(batch.iter_csv())))) == REQUESTS
+        results = QualificationResultBatch.from_records(RESULTS)
+        restored = QualificationResultBatch.from_ndjson(''.join(results.iter_ndjson()).splitlines())
+        assert [r.explanation for r in restored] == [r.explanation for r in RESULTS]
+        assert list(results.slice(10, 20)) == RESULTS[10:20]
+    def test_buffers_are_zero_copy(self):
+        """from_buffers(to_buffers()) shares memory with the original columns"""
+        batch = QualificationResultBatch.from_records(RESULTS)
+        restored = QualificationResultBatch.from_buffers(len(batch), batch.to_buffers())
+        assert np.shares_memory(restored.columns['monthly_payment'], batch.columns['monthly_payment'])
+        assert np.shares_memory(restored.columns['explanation'].data, batch.columns['explanation'].data)
+        assert list(restored) == RESULTS
+        assert batch.schema()[0] == {'name': 'status', 'type': 'dictionary<uint8, utf8>', 'dictionary': list(STATUSES)}
+    def test_batch_is_smaller_than_dicts(self):
+        """Columns take a fraction of the memory of the equivalent dicts"""
+        batch = QualificationRequestBatch.from_records(REQUESTS)
+        dicts = [request.to_dict() for request in REQUESTS]
+        dict_bytes = sum(sys.getsizeof(d) + sum(sys.getsizeof(v) for v in d.values()) for d in dicts)
+        assert batch.nbytes * 10 < dict_bytes
+    def test_invalid_values(self):
+        with pytest.raises(ValueError):
+            QualificationRequestBatch.from_records([QualificationRequest('10001', 100.0, 'Great', 500.0)])
+        with pytest.raises(ValueError):
+            QualificationRequestBatch.from_records([QualificationRequest('1001', 100.0, 'Good', 500.0)])
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
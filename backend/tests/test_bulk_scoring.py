@@ -0,0 +1,73 @@
+# backend/tests/test_bulk_scoring.py
+import csv
+import json
+import pytest
+from backend.utils.bulk_scoring import BulkScorer, ReferenceTables, plan_csv_chunks, score_rows
+from backend.utils.qualification_engine import QualificationEngine, determine_statuses
+from backend.utils.solar_calculator import SolarCalculator
+TABLES = ReferenceTables(
+    [{'zip_code': '10001', 'state': 'NY', 'electricity_rate_cents': 21.45, 'sun_hours_daily': 4.2}],
+    {'Good': {'apr': 5.99, 'term': 20, 'down_payment': 0}},
+    [{'state': 'US', 'incentive_type': 'tax_credit', 'percentage': 30.0}]
+)
+def write_leads(path, count):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'zipCode', 'electricBill', 'creditBand', 'roofSize'])
+        for i in range(count):
+            writer.writerow([i, '10001' if i % 3 else '99999', 50 + i % 460, ['Good', 'Fair', 'Excellent'][i % 3],
+                             150 + (i * 37) % 4900])
+class TestBulkScoring:
+    """Test offline lead scoring"""
+    def test_scores_match_calculator(self):
+        """Vectorised scores equal the per-applicant SolarCalculator formulas"""
+        row = {'zipCode': '10001', 'electricBill': '150', 'creditBand': 'Good', 'roofSize': '1500'}
+        scored, = score_rows([row], TABLES)
+        size = SolarCalculator.calculate_system_size(150, 21.45, 4.2)
+        cost = TABLES.rules.evaluate(size, 'NY')
+        payment = SolarCalculator.calculate_monthly_payment(cost['net_cost'], 5.99, 20)
+        assert scored['system_size_kw'] == size and scored['net_cost'] == cost['net_cost']
+        assert scored['monthly_payment'] == pytest.approx(payment, abs=0.01)
+        assert scored['total_savings'] == pytest.approx(SolarCalculator.calculate_lifetime_savings(size, 21.45, 4.2),
+                                                        abs=0.01)
+        assert scored['location_source'] == 'table'
+        invalid, = score_rows([{**row, 'electricBill': '9000'}], TABLES)
+        assert invalid['status'] == 'invalid' and 'between $50 and $500' in invalid['error']
+    def test_statuses_match_engine(self):
+        """The vectorised status rules agree with QualificationEngine._determine_status"""
+        engine = QualificationEngine.__new__(QualificationEngine)
+        cases = [(bill, payment, band, payback) for bill in (0.0, 100.0) for payment in (70.0, 95.0, 125.0, 160.0)
+                 for band in ('Excellent', 'Good', 'Fair', 'Poor', 'Unknown') for payback in (4, 8, 11, 20)]
+        statuses = determine_statuses(*zip(*cases))
+        assert list(statuses) == [engine._determine_status(*case) for case in cases]
+    def test_chunks_end_at_line_breaks(self, tmp_path):
+        path = tmp_path / 'leads.csv'
+        write_leads(path, 100)
+        chunks = list(plan_csv_chunks(str(path), 0, 256))
+        data = path.read_bytes()
+        assert chunks[0][0] == 0 and chunks[-1][1] == len(data)
+        assert all(data[end - 1:end] == b'\n' for _, end in chunks)
+    def test_resume_after_kill(self, tmp_path):
+        """A job stopped midway resumes from its checkpoint and produces the same output"""
+        leads, expected, output = tmp_path / 'leads.csv', tmp_path / 'expected.csv', tmp_path / 'scored.csv'
+        write_leads(leads, 2000)
+        BulkScorer(TABLES, workers=2, chunk_bytes=4096).run(str(leads), str(expected))
+        calls = []
+        def killed(report):
+            calls.append(report)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+        with pytest.raises(KeyboardInterrupt):
+            BulkScorer(TABLES, workers=2, chunk_bytes=4096, progress=killed, progress_seconds=0).run(
+                str(leads), str(output))
+        checkpoint = json.loads((tmp_path / 'scored.csv.checkpoint.json').read_text())
+        assert 0 < checkpoint['rows'] < 2000 and not checkpoint['complete']
+        with open(output, 'ab') as f:
+            f.write(b'10001,half a row')  # written after the last checkpoint
+        summary = BulkScorer(TABLES, workers=2, chunk_bytes=4096).run(str(leads), str(output))
+        assert summary['rows'] == 2000 and summary['complete']
+        assert output.read_bytes() == expected.read_bytes()
+        assert sum(summary['statuses'].values()) == 2000
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,102 @@
+# backend/tests/test_circuit_breaker.py
+import asyncio
+import threading
+import time
+import pytest
+from backend.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+def failing():
+    raise ConnectionError('upstream down')
+class TestCircuitBreaker:
+    """Test per-provider circuit breakers"""
+    def _trip(self, breaker):
+        for _ in range(breaker.failure_threshold):
+            with pytest.raises(ConnectionError):
+                breaker.call(failing)
+    def test_opens_after_threshold_and_rejects(self):
+        """N failures open the breaker and later calls skip the provider"""
+        breaker = CircuitBreaker('findenergy.com', failure_threshold=3, reset_seconds=60)
+        self._trip(breaker)
+        assert breaker.state()['state'] == 'open'
+        calls = []
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: calls.append(1))
+        assert not calls
+        assert breaker.state()['rejected'] == 1
+    def test_half_open_allows_single_trial(self):
+        """After the reset timeout exactly one trial request goes through"""
+        breaker = CircuitBreaker('eia', failure_threshold=2, reset_seconds=0.05)
+        self._trip(breaker)
+        time.sleep(0.06)
+        assert breaker.state()['state'] == 'half_open'
+        release = threading.Event()
+        trial = threading.Thread(target=breaker.call, args=(release.wait,))
+        trial.start()
+        time.sleep(0.02)
+        # A second caller is rejected while the trial is in flight
+        assert not breaker.allow_request()
+        release.set()
+        trial.join()
+        assert breaker.state()['state'] == 'closed'
+    def test_failed_trial_reopens(self):
+        """A failing trial request opens the breaker again"""
+        breaker = CircuitBreaker('gemini', failure_threshold=2, reset_seconds=0.05)
+        self._trip(breaker)
+        time.sleep(0.06)
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+        assert breaker.state()['state'] == 'open'
+        assert breaker.state()['opened'] == 2
+    def test_slow_calls_count_as_failures(self):
+        """Calls slower than the slow-call threshold trip the breaker"""
+        breaker = CircuitBreaker('saveonenergy.com', failure_threshold=2, slow_call_seconds=0.01)
+        for _ in range(2):
+            assert breaker.call(time.sleep, 0.02) is None
+        assert breaker.state()['state'] == 'open'
+        assert breaker.state()['slow_calls'] == 2
+    def test_abandoned_calls_are_not_recorded(self):
+        """Cancelled and abandoned calls count neither as failures nor as slow, and free a half-open trial"""
+        class Abandoned(Exception):
+            pass
+        def abandoned():
+            time.sleep(0.06)
+            raise Abandoned('request deadline reached')
+        breaker = CircuitBreaker('gemini', failure_threshold=1, slow_call_seconds=0.05, reset_seconds=0.01,
+                                 is_abandoned=lambda error: isinstance(error, Abandoned))
+        with pytest.raises(Abandoned):
+            breaker.call(abandoned)
+        async def cancelled():
+            await asyncio.wait_for(breaker.call_async(asyncio.sleep, 1), 0.06)
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(cancelled())
+        state = breaker.state()
+        assert state['state'] == 'closed' and state['failures'] == 0 and state['slow_calls'] == 0
+        self._trip(breaker)
+        time.sleep(0.02)
+        with pytest.raises(Abandoned):
+            breaker.call(abandoned)
+        # The abandoned trial gave its slot back, so the next call is the trial
+        assert breaker.call(lambda: 'ok') == 'ok'
+        assert breaker.state()['state'] == 'closed'
+    def test_client_errors_do_not_count(self):
+        """A 4xx for one request's input leaves the shared breaker closed; 5xx responses still trip it"""
+        import requests
+        from backend.app import provider_failure
+        def http_error(status):
+            response = requests.Response()
+            response.status_code = status
+            def get():
+                raise requests.HTTPError(f'{status} error', response=response)
+            return get
+        breaker = CircuitBreaker('findenergy.com', failure_threshold=2, is_failure=provider_failure)
+        for _ in range(5):
+            with pytest.raises(requests.HTTPError):
+                breaker.call(http_error(404))
+        assert breaker.state()['state'] == 'closed' and breaker.state()['failures'] == 0
+        for _ in range(2):
+            with pytest.raises(requests.HTTPError):
+                breaker.call(http_error(503))
+        assert breaker.state()['state'] == 'open'
+        assert provider_failure(ConnectionError('reset')) and provider_failure(TimeoutError())
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
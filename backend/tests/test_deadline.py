@@ -0,0 +1,104 @@
+# backend/tests/test_deadline.py
+import threading
+import time
+import pytest
+from backend.app import app
+from backend.utils.deadline import DeadlineExceeded, deadline_scope, remaining_budget, stage_timeout
+from backend.utils.gemini_dispatcher import GeminiDispatcher
+from backend.utils.singleflight import SingleFlight
+QUALIFICATION_INPUT = {'zipCode': '10001', 'electricBill': '150', 'creditBand': 'Good', 'roofSize': '1500'}
+class TestDeadline:
+    """Test request deadlines and their propagation into each stage"""
+    def test_stage_timeout(self):
+        """Stages get their own timeout capped at the remaining budget"""
+        assert stage_timeout(10) == 10
+        assert remaining_budget() is None
+        with deadline_scope(2.0):
+            assert 1.9 < stage_timeout(10) <= 2.0
+            assert stage_timeout(0.5) == 0.5
+        with deadline_scope(0.0):
+            with pytest.raises(DeadlineExceeded):
+                stage_timeout(10, 'census')
+        assert remaining_budget() is None
+    def test_request_budget(self):
+        """A client header can shorten the endpoint's budget but not extend it; queue time counts"""
+        from backend import app as app_module
+        assert app_module.request_budget('vantage-score') == app_module.REQUEST_DEADLINE_SECONDS
+        assert app_module.request_budget('vantage-score', '2000') == 2.0
+        assert app_module.request_budget('vantage-score', '99999999') == app_module.REQUEST_DEADLINE_SECONDS
+        assert app_module.request_budget('vantage-score', '2000', queued=0.5) == 1.5
+        assert app_module.request_budget('vantage-score', 'soon') == app_module.REQUEST_DEADLINE_SECONDS
+    def test_single_flight_waiter_timeout(self):
+        """A waiter stops at its own limit while the leader finishes"""
+        flight = SingleFlight(wait_timeout=lambda: 0.05)
+        leader_result = []
+        def slow():
+            time.sleep(0.3)
+            return 'location'
+        leader = threading.Thread(target=lambda: leader_result.append(flight.do(('zip_to_location', '1'), slow)))
+        leader.start()
+        time.sleep(0.05)
+        with pytest.raises(TimeoutError):
+            flight.do(('zip_to_location', '1'), slow)
+        leader.join()
+        assert leader_result == ['location']
+        assert flight.stats()['operations']['zip_to_location']['wait_timeouts'] == 1
+    def test_dispatcher_timeout(self):
+        """submit() gives up at its timeout and the call is counted as abandoned"""
+        def generate(prompt, batched):
+            time.sleep(0.3)
+            return '{}', {}
+        dispatcher = GeminiDispatcher(generate, lambda text: {}, max_concurrency=1)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            dispatcher.submit('prompt', timeout=0.1)
+        assert time.monotonic() - started < 0.25
+        assert dispatcher.stats()['abandoned'] == 1
+    def test_qualification_falls_back_at_deadline(self, monkeypatch):
+        """A slow Gemini call yields the degraded fallback within the client's budget"""
+        from backend import app as app_module
+        def generate(prompt, batched):
+            time.sleep(1.0)
+            return '{}', {}
+        monkeypatch.setattr(app_module, 'GEMINI_API_KEY', 'test-key')
+        monkeypatch.setattr(app_module, 'zip_to_location', lambda zip_code: ('new-york', 'ny', 'New York', 'NY'))
+        monkeypatch.setattr(app_module, 'get_electricity_data', lambda *args: (None, None, None))
+        monkeypatch.setattr(app_module, 'gemini_dispatcher',
+                            app_module.GeminiDispatcher(generate, app_module.parse_gemini_response))
+        with app.test_client() as client:
+            started = time.monotonic()
+            response = client.post('/api/check-qualification', json=QUALIFICATION_INPUT,
+                                   headers={'X-Request-Timeout-Ms': '300'})
+            elapsed = time.monotonic() - started
+        assert response.status_code == 200
+        assert response.get_json()['degraded'] is True
+        assert elapsed < 0.8
+    def test_shortened_timeout_is_not_a_provider_failure(self, monkeypatch):
+        """A timeout cut short by the request's deadline raises DeadlineExceeded and leaves the breaker alone"""
+        import requests
+        from backend import app as app_module
+        class TimingOutSession:
+            def get(self, url, timeout, **kwargs):
+                time.sleep(min(timeout, 0.4))
+                raise requests.Timeout(f'timed out after {timeout}s')
+        # The breaker app builds, with a slow-call threshold below the remaining budget
+        breaker = app_module.breakers['eia']
+        breaker = type(breaker)('eia', failure_threshold=1, slow_call_seconds=0.2, is_failure=breaker.is_failure,
+                                is_abandoned=breaker.is_abandoned)
+        monkeypatch.setitem(app_module.breakers, 'eia', breaker)
+        monkeypatch.setattr(app_module, 'get_http_session', TimingOutSession)
+        # app imports the deadline module as utils.deadline, so its own context is used
+        token = app_module.start_deadline(0.3)
+        try:
+            with pytest.raises(app_module.DeadlineExceeded):
+                app_module.fetch_from_provider('eia', 'http://eia.test', timeout=15)
+        finally:
+            app_module.end_deadline(token)
+        state = breaker.state()
+        assert state['state'] == 'closed' and state['failures'] == 0 and state['slow_calls'] == 0
+        with pytest.raises(requests.Timeout):
+            app_module.fetch_from_provider('eia', 'http://eia.test', timeout=15)
+        assert breaker.state()['state'] == 'open'
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,106 @@
+# backend/tests/test_gemini_dispatcher.py
+import asyncio
+import json
+import re
+import threading
+import time
+import pytest
+from backend.utils.gemini_dispatcher import AsyncGeminiDispatcher, GeminiDispatcher, QueueTimeoutError
+USAGE = {'prompt_tokens': 120, 'response_tokens': 40, 'total_tokens': 160}
+def index_batch(prompts):
+    return '\n'.join(f'=== APPLICANT {index} ===\n{prompt}' for index, prompt in enumerate(prompts))
+def fake_batch_answer(prompt):
+    """Answer a batch prompt the way the model is asked to: an indexed JSON array"""
+    indexes = [int(i) for i in re.findall(r'=== APPLICANT (\d+) ===', prompt)]
+    bills = re.findall(r'bill=(\d+)', prompt)
+    return json.dumps([{'index': i, 'bill': int(bill)} for i, bill in zip(indexes, bills)]), USAGE
+class TestGeminiDispatcher:
+    """Test bounded Gemini concurrency, queue limits and micro-batching"""
+    def _submit_concurrently(self, dispatcher, prompts):
+        results, errors = {}, []
+        def worker(prompt):
+            try:
+                results[prompt], _ = dispatcher.submit(prompt)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=worker, args=(p,)) for p in prompts]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results, errors
+    def test_concurrency_is_bounded(self):
+        """No more than max_concurrency calls run at once"""
+        active, peak = [0], [0]
+        lock = threading.Lock()
+        def generate(prompt, batched):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return json.dumps({'prompt': prompt}), USAGE
+        dispatcher = GeminiDispatcher(generate, json.loads, max_concurrency=2, max_queue_seconds=5)
+        results, errors = self._submit_concurrently(dispatcher, [f'p{i}' for i in range(8)])
+        assert not errors
+        assert peak[0] == 2
+        assert results['p3'] == {'prompt': 'p3'}
+        assert dispatcher.stats()['completed'] == 8
+        assert dispatcher.stats()['prompt_tokens'] == 8 * 120
+    def test_queue_timeout(self):
+        """Requests that can't get a slot in time fail fast"""
+        dispatcher = GeminiDispatcher(lambda p, batched: (time.sleep(0.5), ('{}', {}))[1], json.loads,
+                                      max_concurrency=1, max_queue_seconds=0.1)
+        results, errors = self._submit_concurrently(dispatcher, ['a', 'b', 'c'])
+        assert len(results) == 1
+        assert len(errors) == 2 and all(isinstance(e, QueueTimeoutError) for e in errors)
+        assert dispatcher.stats()['queue_timeouts'] == 2
+    def test_micro_batching_splits_results(self):
+        """Queued prompts are packed into one call and answers routed back by index"""
+        calls = []
+        def generate(prompt, batched):
+            calls.append(prompt)
+            time.sleep(0.05)
+            return fake_batch_answer(prompt) if batched else (json.dumps({'bill': 0}), USAGE)
+        dispatcher = GeminiDispatcher(generate, json.loads, max_concurrency=1, max_queue_seconds=5,
+                                      batch_size=4, batch_wait_seconds=0.05, build_batch=index_batch)
+        prompts = [f'bill={100 + i}' for i in range(4)]
+        results, errors = self._submit_concurrently(dispatcher, prompts)
+        assert not errors
+        assert len(calls) == 1
+        assert all(results[p] == {'bill': int(p.split('=')[1])} for p in prompts)
+        assert dispatcher.stats()['batches'] == 1
+    def test_missing_batch_entry_fails_only_that_request(self):
+        """An applicant dropped from the batch answer gets an error, the rest succeed"""
+        def generate(prompt, batched):
+            return json.dumps([{'index': 0, 'bill': 100}]), {}
+        dispatcher = GeminiDispatcher(generate, json.loads, max_concurrency=1, batch_size=2,
+                                      batch_wait_seconds=0.2, build_batch=index_batch)
+        results, errors = self._submit_concurrently(dispatcher, ['bill=100', 'bill=200'])
+        assert len(results) == 1 and len(errors) == 1
+    def test_async_batching(self):
+        """The asyncio dispatcher batches prompts submitted together"""
+        calls = []
+        async def generate(prompt, batched):
+            calls.append(prompt)
+            await asyncio.sleep(0.01)
+            return fake_batch_answer(prompt)
+        dispatcher = AsyncGeminiDispatcher(generate, json.loads, max_concurrency=2, batch_size=3,
+                                           batch_wait_seconds=0.02, build_batch=index_batch)
+        async def main():
+            return await asyncio.gather(*(dispatcher.submit(f'bill={i}') for i in range(6)))
+        results = asyncio.run(main())
+        assert len(calls) == 2
+        assert [result for result, _ in results] == [{'bill': i} for i in range(6)]
+        assert all(call['batch_size'] == 3 and call['total_tokens'] == 160 for _, call in results)
+        assert not dispatcher._tasks
+    def test_batching_needs_a_batch_builder(self):
+        """Without a build_batch that shares the instructions, prompts are not batched"""
+        with pytest.raises(ValueError):
+            GeminiDispatcher(lambda prompt, batched: ('{}', {}), json.loads, batch_size=4)
+        with pytest.raises(ValueError):
+            AsyncGeminiDispatcher(lambda prompt, batched: ('{}', {}), json.loads, batch_size=4)
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,58 @@
+# backend/tests/test_incentive_rules.py
+from datetime import date
+import numpy as np
+import pytest
+from backend.utils.incentive_rules import STATES, IncentiveRules, IncentiveRulesCache
+from backend.utils.solar_calculator import SolarCalculator
+INCENTIVES = [
+    {'state': 'US', 'incentive_type': 'tax_credit', 'percentage': 30.0},
+    {'state': 'CA', 'incentive_type': 'rebate', 'amount': 500, 'max_amount': 3000, 'expires': '2024-12-31'},
+    {'state': 'NY', 'incentive_type': 'tax_credit', 'percentage': 25.0, 'max_amount': 5000},
+    {'state': 'NY', 'incentive_type': 'rebate', 'amount': 250}
+]
+class TestIncentiveRules:
+    """Test the compiled incentive and cost rules"""
+    def test_default_rules_match_original_table(self):
+        """Built-in rules give the calculator's original numbers"""
+        costs = SolarCalculator.calculate_system_cost(7.5, 'NY')
+        assert costs == {'gross_cost': 20625.0, 'federal_credit': 6187.5, 'state_credit': 2062.5, 'net_cost': 12375.0}
+        assert SolarCalculator.calculate_system_cost(40, 'CA')['state_credit'] == 1000.0
+        assert SolarCalculator.calculate_system_cost(7.5, 'TX')['state_credit'] == 0.0
+        assert SolarCalculator.calculate_system_cost(7.5)['net_cost'] == 14437.5
+    def test_caps_amounts_and_expiry(self):
+        """Percentages are capped, flat amounts add up and expired rules are dropped"""
+        rules = IncentiveRules(INCENTIVES, {'NY': 3.05}, today=date(2025, 1, 1))
+        ny = rules.evaluate(10, 'NY')
+        assert ny['gross_cost'] == 30500.0
+        assert ny['state_credit'] == 5000.0 + 250.0
+        assert rules.evaluate(10, 'CA')['state_credit'] == 0.0
+        assert rules.evaluate(10, 'WY')['gross_cost'] == 27500.0
+        assert not rules.is_expired(date(2025, 6, 1))
+    def test_all_states_compiled(self):
+        """Every state has its own evaluator"""
+        costs = {state: 2.0 + i / 100 for i, state in enumerate(STATES)}
+        rules = IncentiveRules(INCENTIVES, costs)
+        assert len(STATES) == 51
+        for state, cost in costs.items():
+            assert rules.evaluate(1, state)['gross_cost'] == pytest.approx(cost * 1000)
+    def test_vectorised_matches_scalar(self):
+        """evaluate_many agrees with evaluate for mixed states"""
+        rules = IncentiveRules(INCENTIVES, {'NY': 3.05, 'CA': 2.95}, today=date(2024, 6, 1))
+        sizes = np.arange(2, 20, 0.5)
+        states = [('NY', 'CA', 'TX', 'ZZ')[i % 4] for i in range(len(sizes))]
+        many = rules.evaluate_many(sizes, states)
+        for i, (size, state) in enumerate(zip(sizes, states)):
+            single = rules.evaluate(float(size), state)
+            assert {field: float(values[i]) for field, values in many.items()} == single
+    def test_cache_reloads_only_on_change(self):
+        """The cache recompiles when the source data's fingerprint changes"""
+        source = {'incentives': INCENTIVES}
+        cache = IncentiveRulesCache(lambda: IncentiveRules(source['incentives']), reload_seconds=0)
+        first = cache.get()
+        assert cache.get() is first
+        source['incentives'] = INCENTIVES[:1]
+        assert cache.get() is not first
+        assert cache.reloads == 2
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,58 @@
+# backend/tests/test_irradiance.py
+import pytest
+from backend.app import app
+from backend.utils.irradiance import IrradianceGrid, build_irradiance_grid, plane_of_array_ratio
+from backend.utils.solar_calculator import SolarCalculator
+# Monthly mean daily GHI (kWh/m²/day) roughly like New York City
+NYC_GHI = [1.9, 2.7, 3.7, 4.7, 5.5, 5.9, 5.9, 5.2, 4.3, 3.1, 2.0, 1.6]
+def scaled(factor):
+    return [value * factor for value in NYC_GHI]
+class TestIrradianceGrid:
+    """Test the memory-mapped irradiance grid and production model"""
+    @pytest.fixture
+    def grid(self, tmp_path):
+        points = [(40.0, -74.5, scaled(1.0)), (40.0, -74.0, scaled(1.2)),
+                  (40.5, -74.5, scaled(1.0)), (40.5, -74.0, scaled(1.2)),
+                  (41.0, -74.5, scaled(1.1))]  # (41.0, -74.0) has no data
+        path = str(tmp_path / 'irradiance')
+        build_irradiance_grid(points, 0.5, path, source='test')
+        return IrradianceGrid.load(path)
+    def test_cell_centres_and_interpolation(self, grid):
+        """Cell centres return their own data and points between cells interpolate"""
+        assert grid.monthly_ghi(40.0, -74.5) == pytest.approx(NYC_GHI)
+        assert grid.monthly_ghi(40.25, -74.25) == pytest.approx(scaled(1.1))
+    def test_missing_cells_and_coverage(self, grid):
+        """Cells without data are skipped; points outside the grid return None"""
+        assert grid.monthly_ghi(40.9, -74.1) == pytest.approx(scaled((0.04 * 1.0 + 0.16 * 1.2 + 0.16 * 1.1) / 0.36))
+        assert grid.monthly_ghi(41.0, -74.0) is None
+        assert grid.monthly_ghi(45.0, -74.0) is None
+        assert grid.monthly_production(45.0, -74.0, 7.5) is None
+    def test_flat_panel_matches_calculator(self, grid):
+        """A horizontal panel reproduces SolarCalculator's sun-hours arithmetic"""
+        monthly = grid.monthly_production(40.0, -74.5, 7.5, tilt=0)
+        sun_hours = sum(g * d for g, d in zip(NYC_GHI, [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])) / 365
+        assert len(monthly) == 12
+        assert sum(monthly) == pytest.approx(7.5 * 365 * sun_hours * SolarCalculator.SYSTEM_EFFICIENCY, rel=1e-4)
+        assert grid.sun_hours(40.0, -74.5, tilt=0) == pytest.approx(sun_hours, rel=1e-4)
+    def test_orientation(self):
+        """South-facing tilt helps in winter; north-facing loses year round"""
+        south = plane_of_array_ratio(40.75, tuple(NYC_GHI), 20.0, 180.0)
+        north = plane_of_array_ratio(40.75, tuple(NYC_GHI), 20.0, 0.0)
+        assert south[0] > 1.1 and south[5] < 1.0
+        assert all(ratio < 1.0 for ratio in north)
+        assert all(n < s for n, s in zip(north, south))
+    def test_production_endpoint(self, grid, monkeypatch):
+        """The endpoint answers from the grid for coordinates and rejects bad input"""
+        from backend import app as app_module
+        monkeypatch.setattr(app_module, '_irradiance_grid', grid)
+        with app.test_client() as client:
+            response = client.get('/api/production-estimate?lat=40.0&lon=-74.5&systemSizeKw=7.5&tilt=0')
+            assert response.status_code == 200
+            data = response.get_json()
+            assert len(data['monthly_kwh']) == 12
+            assert data['data_source'] == 'test'
+            assert client.get('/api/production-estimate?lat=40&lon=-74.5&tilt=120').status_code == 400
+            assert client.get('/api/production-estimate?lat=60&lon=-74.5').status_code == 404
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
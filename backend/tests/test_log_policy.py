@@ -0,0 +1,56 @@
+# backend/tests/test_log_policy.py
+import json
+import pytest
+from backend.app import app
+from backend.utils.log_policy import LogPolicy, parse_rates, trim_payload
+from backend.utils.shared_cache import MemoryCacheBackend, TieredCache
+TIMESTAMP = '2026-03-01T12:00:00'
+class TestLogPolicy:
+    """Test log sampling, field allowlists and size caps"""
+    def test_parse_rates(self):
+        assert parse_rates('electricity-data=0.1, zip-profile=2') == {'electricity-data': 0.1, 'zip-profile': 1.0}
+        assert parse_rates('') == {}
+    def test_sampling_never_drops_degraded(self):
+        """Sampled-out requests return None; kept ones carry their rate; degraded ones are always kept"""
+        draws = iter([0.5, 0.05])
+        policy = LogPolicy({'electricity-data': 0.1}, rng=lambda: next(draws))
+        assert policy.record('electricity-data', '10001', {'state': 'NY'}, None, TIMESTAMP) is None
+        assert policy.record('electricity-data', '10001', {'state': 'NY'}, None, TIMESTAMP)['sample_rate'] == 0.1
+        entry = policy.record('electricity-data', '10001', {'degraded': True}, None, TIMESTAMP)
+        assert entry is not None and 'sample_rate' not in entry
+        assert policy.record('vantage-score', '10001', {}, None, TIMESTAMP) is not None
+        stats = policy.stats()
+        assert stats['logged'] == 3 and stats['sampled_out'] == 1
+    def test_allowlist_and_size_cap(self):
+        """Only allowed fields are kept and oversized payloads are trimmed under the cap"""
+        policy = LogPolicy(allowlists={'electricity-data': {'extra_data': ('raw_scraped_data',)}},
+                           max_record_bytes=1024)
+        extra = {'raw_scraped_data': {'rows': [{'html': 'x' * 5000}] * 200}, 'location_details': {'a': 1}}
+        entry = policy.record('electricity-data', '10001', {'state': 'NY'}, extra, TIMESTAMP)
+        assert set(entry['extra_data']) == {'raw_scraped_data'}
+        assert entry['trimmed'] is True
+        assert len(json.dumps(entry)) <= 1024 + 20
+        assert trim_payload(list(range(5)), max_items=2) == ([0, 1, '<3 more>'], True)
+    def test_one_record_per_request(self, tmp_path, monkeypatch):
+        """A request writes a single line; the per-endpoint and data source views derive from it"""
+        from backend import app as app_module
+        monkeypatch.setattr(app_module, 'LOGS_DIR', str(tmp_path))
+        monkeypatch.setattr(app_module, 'log_store', None)
+        monkeypatch.setattr(app_module, '_electricity_cache', TieredCache('electricity', MemoryCacheBackend(),
+                                                                          decode=tuple))
+        monkeypatch.setattr(app_module, 'zip_to_location', lambda z: ('new-york', 'ny', 'New York', 'NY'))
+        monkeypatch.setattr(app_module, '_fetch_electricity_data',
+                            lambda *args: ({'average_monthly_bill': 120.0}, 'eia', {'raw': 'x' * 10000}))
+        with app.test_client() as client:
+            assert client.get('/electricity-data?zip=10001').status_code == 200
+            assert [path.name for path in tmp_path.iterdir()] == ['api_requests.jsonl']
+            lines = (tmp_path / 'api_requests.jsonl').read_text().splitlines()
+            assert len(lines) == 1 and len(lines[0]) <= app_module.LOG_MAX_RECORD_BYTES + 20
+            extra = client.get('/logs/electricity_data_extra_data').get_json()['logs']
+            assert extra[0]['extra_data']['data_source_used'] == 'eia'
+            sources = client.get('/logs/data_sources').get_json()['logs']
+            assert sources[0]['data_source'] == 'eia' and sources[0]['raw_data']
+            assert client.get('/logs/demographic_data_data').get_json()['total_entries'] == 0
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
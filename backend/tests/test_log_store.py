@@ -0,0 +1,94 @@
+# backend/tests/test_log_store.py
+from datetime import datetime, timedelta
+import pytest
+from backend.app import app
+from backend.utils.log_store import LogStore, parse_time
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+def api_entry(days_ago, zip_code, endpoint='electricity-data', **response):
+    return {'timestamp': (NOW - timedelta(days=days_ago)).isoformat(), 'endpoint': endpoint,
+            'zip_code': zip_code, 'request_data': {}, 'response_data': response}
+def error_entry(days_ago, zip_code, error='upstream down'):
+    return {'timestamp': (NOW - timedelta(days=days_ago)).isoformat(), 'endpoint': 'electricity-data',
+            'zip_code': zip_code, 'error': error, 'error_details': None}
+class TestLogStore:
+    """Test the indexed log store and the /logs queries it serves"""
+    def test_filters_sort_and_pagination(self, tmp_path):
+        """Filters combine, pages don't overlap and the total counts every match"""
+        store = LogStore(str(tmp_path / 'logs.db'))
+        for day in range(5):
+            store.write('api_requests', api_entry(day, '10001', data_source='eia'))
+        store.write('api_requests', api_entry(0, '90210', data_source='fallback', degraded=True))
+        store.write('api_requests', api_entry(0, '10001', endpoint='demographic-data'))
+        store.flush()
+        page, total = store.query(zip_code='10001', endpoint='electricity-data', limit=2)
+        assert total == 5
+        assert [entry['timestamp'] for entry in page] == [api_entry(0, '')['timestamp'], api_entry(1, '')['timestamp']]
+        next_page, _ = store.query(zip_code='10001', endpoint='electricity-data', limit=2, offset=2)
+        assert next_page[0]['timestamp'] == api_entry(2, '')['timestamp']
+        oldest, _ = store.query(zip_code='10001', sort='timestamp', limit=1)
+        assert oldest[0]['timestamp'] == api_entry(4, '')['timestamp']
+        degraded, total = store.query(status='degraded')
+        assert total == 1 and degraded[0]['zip_code'] == '90210'
+        with pytest.raises(ValueError):
+            store.query(sort='payload')
+    def test_errors_for_zip_last_week(self, tmp_path):
+        """The on-call question: errors for one ZIP in the last seven days"""
+        store = LogStore(str(tmp_path / 'logs.db'))
+        store.write('errors', error_entry(1, '10001'))
+        store.write('errors', error_entry(10, '10001'))
+        store.write('errors', error_entry(1, '60601'))
+        store.write('api_requests', api_entry(1, '10001'))
+        store.flush()
+        logs, total = store.query(log_type='errors', zip_code='10001', since=parse_time('7d', NOW))
+        assert total == 1 and logs[0]['error'] == 'upstream down'
+        assert parse_time('24h', NOW) == NOW - timedelta(hours=24)
+    def test_compaction_keeps_daily_counts(self, tmp_path):
+        """Old entries become per-day counts, and counts past retention are dropped"""
+        store = LogStore(str(tmp_path / 'logs.db'), detail_days=30, retention_days=90)
+        store.write('api_requests', api_entry(1, '10001'))
+        store.write('api_requests', api_entry(40, '10001'))
+        store.write('api_requests', api_entry(40, '90210'))
+        store.write('api_requests', api_entry(200, '10001'))
+        store.flush()
+        assert store.compact(NOW) == {'rolled_up': 3, 'expired_days': 1}
+        _, total = store.query()
+        assert total == 1
+        counts = store.daily_counts(log_type='api_requests')
+        assert [(row['day'], row['count']) for row in counts] == [((NOW - timedelta(days=40)).strftime('%Y-%m-%d'), 2)]
+        traffic = store.zip_traffic(NOW - timedelta(days=60))
+        assert sorted((zip_code, requests) for _, zip_code, _, requests in traffic) == [
+            ('10001', 1.0), ('10001', 1.0), ('90210', 1.0)]
+    def test_logs_endpoint_queries_store(self, tmp_path, monkeypatch):
+        """/logs answers from the store with filters, pagination and validation"""
+        from backend import app as app_module
+        store = app_module.LogStore(str(tmp_path / 'logs.db'))
+        for day in range(3):
+            store.write('errors', error_entry(day, '10001'))
+        store.write('api_requests', api_entry(0, '10001', endpoint='demographic-data'))
+        monkeypatch.setattr(app_module, 'log_store', store)
+        with app.test_client() as client:
+            body = client.get('/logs/errors?zip=10001&limit=2').get_json()
+            assert body['total_entries'] == 3 and len(body['logs']) == 2 and body['next_offset'] == 2
+            body = client.get('/logs/demographic_data_data').get_json()
+            assert body['total_entries'] == 1
+            assert client.get('/logs/errors?since=yesterday').status_code == 400
+            assert client.get('/logs/errors?sort=payload').status_code == 400
+            assert client.get('/logs/unknown').status_code == 400
+    def test_jsonl_is_opt_in_with_the_store(self, tmp_path, monkeypatch):
+        """With the store on, entries are stored once and no JSONL is appended unless LOG_JSONL_ENABLED"""
+        from backend import app as app_module
+        store = app_module.LogStore(str(tmp_path / 'logs.db'))
+        monkeypatch.setattr(app_module, 'log_store', store)
+        monkeypatch.setattr(app_module, 'LOGS_DIR', str(tmp_path))
+        app_module.log_error('electricity-data', '10001', 'upstream down')
+        assert not (tmp_path / 'errors.jsonl').exists()
+        store.flush()
+        assert store.query(log_type='errors')[1] == 1
+        monkeypatch.setattr(app_module, 'LOG_JSONL_ENABLED', True)
+        app_module.log_error('electricity-data', '10001', 'upstream down')
+        assert len((tmp_path / 'errors.jsonl').read_text().splitlines()) == 1
+        store.flush()
+        assert store.query(log_type='errors')[1] == 2
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,107 @@
+# backend/tests/test_prewarm.py
+import json
+from datetime import datetime, timedelta
+import pytest
+from backend.app import app
+from backend.utils.log_store import LogStore
+from backend.utils.prewarm import CacheWarmer, WarmTask, rank_traffic, read_recent_requests, store_requests
+from backend.utils.shared_cache import MemoryCacheBackend, TieredCache
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+def fresh_cache(cache):
+    return TieredCache(cache.name, MemoryCacheBackend(), ttl=cache.ttl, decode=cache.decode)
+def write_log(path, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        for hours_ago, zip_code, response in entries:
+            f.write(json.dumps({'timestamp': (NOW - timedelta(hours=hours_ago)).isoformat(), 'endpoint': 'x',
+                                'zip_code': zip_code, 'response_data': response}) + '\n')
+        f.write('not json\n')
+class TestPrewarm:
+    """Test the traffic-driven cache pre-warmer"""
+    def test_read_recent_requests(self, tmp_path):
+        """Old entries, bad lines and invalid ZIPs are skipped; states come from either response shape"""
+        path = tmp_path / 'api_requests.jsonl'
+        write_log(path, [(1, '10001', {'state': 'NY'}), (2, '90210', {'location': {'state': 'CA'}}),
+                         (3, 'unknown', {}), (24 * 30, '60601', {'state': 'IL'})])
+        entries = list(read_recent_requests(str(path), NOW - timedelta(days=7)))
+        assert [(zip_code, state) for _, zip_code, state, _ in entries] == [('10001', 'NY'), ('90210', 'CA')]
+    def test_rank_prefers_recent_traffic(self):
+        """Two requests this hour outrank three from four days ago"""
+        requests = [(NOW - timedelta(days=4), '60601', 'IL', 1.0)] * 3 + [(NOW, '10001', 'NY', 1.0)] * 2
+        zips, states = rank_traffic(iter(requests), NOW, half_life_hours=24)
+        assert [z for z, _ in zips] == ['10001', '60601']
+        assert [s for s, _ in states] == ['NY', 'IL']
+    def test_ranks_from_log_store_by_sample_rate(self, tmp_path):
+        """A ZIP logged at a 10% sample rate outranks one logged in full with fewer real requests"""
+        store = LogStore(str(tmp_path / 'logs.db'))
+        for _ in range(2):
+            store.write('api_requests', {'timestamp': (NOW - timedelta(hours=1)).isoformat(), 'zip_code': '10001',
+                                         'endpoint': 'electricity-data', 'response_data': {'state': 'NY'},
+                                         'sample_rate': 0.1})
+        for _ in range(5):
+            store.write('api_requests', {'timestamp': (NOW - timedelta(hours=1)).isoformat(), 'zip_code': '90210',
+                                         'endpoint': 'check-qualification',
+                                         'response_data': {'location': {'state': 'CA'}}})
+        store.write('api_requests', {'timestamp': NOW.isoformat(), 'zip_code': 'unknown', 'response_data': {}})
+        store.flush()
+        requests = list(store_requests(store, NOW - timedelta(days=7)))
+        assert sorted((zip_code, state, count) for _, zip_code, state, count in requests) == [
+            ('10001', 'NY', pytest.approx(20.0)), ('90210', 'CA', 5.0)]
+        zips, states = rank_traffic(requests, NOW)
+        assert [z for z, _ in zips] == ['10001', '90210'] and [s for s, _ in states] == ['NY', 'CA']
+    def test_one_process_warms(self, tmp_path):
+        """Only the holder of the lock file runs passes; another takes over once it is gone"""
+        lock_path = str(tmp_path / 'prewarm.lock')
+        first = CacheWarmer(str(tmp_path / 'api_requests.jsonl'), [], lock_path=lock_path)
+        second = CacheWarmer(str(tmp_path / 'api_requests.jsonl'), [], lock_path=lock_path)
+        assert first.is_leader() and not second.is_leader()
+        assert first.stats()['leader'] and not second.stats()['leader']
+        first._lock_file.close()  # the leading worker exits
+        assert second.is_leader()
+    def test_run_once_refreshes_stale_entries(self, tmp_path):
+        """Only stale entries are refreshed, top ZIPs first, and coverage is reported"""
+        path = tmp_path / 'api_requests.jsonl'
+        write_log(path, [(0, '10001', {})] * 3 + [(0, '90210', {})] * 2 + [(0, '60601', {})])
+        cache, refreshed = {'90210': 'warm'}, []
+        def refresh(zip_code):
+            refreshed.append(zip_code)
+            if zip_code == '60601':
+                raise LookupError('upstream down')
+            cache[zip_code] = 'warm'
+        warmer = CacheWarmer(str(path), [WarmTask('geo', lambda z: z not in cache, refresh)], top_n=2,
+                             rate_per_second=1000)
+        summary = warmer.run_once(NOW)
+        assert refreshed == ['10001']
+        assert summary['tasks']['geo'] == {'fresh': 1, 'refreshed': 1, 'failed': 0, 'coverage': 1.0}
+        warmer.record('geo', '10001', True)
+        warmer.record('geo', '60601', False)
+        hit_rates = warmer.stats()['hit_rates']['geo']
+        assert hit_rates['warmed']['hit_rate'] == 1.0 and hit_rates['other']['hit_rate'] == 0.0
+    def test_warmed_zip_is_served_from_cache(self, tmp_path, monkeypatch):
+        """After a pass, requests for a popular ZIP don't touch the providers"""
+        from backend import app as app_module
+        path = tmp_path / 'api_requests.jsonl'
+        write_log(path, [(0, '10001', {'state': 'NY'})])
+        for cache in ('_zip_location_cache', '_electricity_cache', '_census_cache', '_zip_coordinates_cache'):
+            monkeypatch.setattr(app_module, cache, fresh_cache(getattr(app_module, cache)))
+        monkeypatch.setattr(app_module, '_lookup_zip_location', lambda z: ('new-york', 'ny', 'New York', 'NY'))
+        monkeypatch.setattr(app_module, '_lookup_zip_coordinates', lambda z: (40.75, -73.99))
+        monkeypatch.setattr(app_module, '_fetch_electricity_data',
+                            lambda *args: ({'average_monthly_bill': 120.0}, 'eia', None))
+        monkeypatch.setattr(app_module, 'fetch_census_demographics', lambda z: {'total_population': 1})
+        warmer = CacheWarmer(str(path), app_module.prewarmer.tasks, rate_per_second=1000)
+        monkeypatch.setattr(app_module, 'prewarmer', warmer)
+        summary = warmer.run_once(NOW)
+        assert summary['tasks']['location']['refreshed'] == 1
+        assert summary['tasks']['electricity']['refreshed'] == 1
+        monkeypatch.setattr(app_module, '_fetch_electricity_data',
+                            lambda *args: pytest.fail('providers must not be called for a warm ZIP'))
+        with app.test_client() as client:
+            response = client.get('/electricity-data?zip=10001')
+            assert response.status_code == 200
+            assert response.get_json()['average_monthly_bill'] == 120.0
+            prewarm = client.get('/metrics').get_json()['prewarm']
+        assert prewarm['hit_rates']['electricity']['warmed'] == {'hits': 1, 'misses': 0, 'hit_rate': 1.0}
+        assert prewarm['hit_rates']['location']['warmed']['hits'] == 1
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
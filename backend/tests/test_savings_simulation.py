@@ -0,0 +1,82 @@
+# backend/tests/test_savings_simulation.py
+import json
+import time
+import pytest
+from backend.app import app
+from backend.utils.savings_simulation import simulate_savings
+SYSTEM = {'system_size_kw': 7.5, 'electricity_rate_cents': 15.0, 'sun_hours': 5.0,
+          'net_cost': 14437.5, 'apr': 5.99, 'term_years': 20}
+class TestSavingsSimulation:
+    """Test the Monte Carlo savings simulation"""
+    def test_seeded_runs_are_reproducible(self):
+        """The same seed gives the same bands"""
+        assert simulate_savings(**SYSTEM, paths=2000, seed=7) == simulate_savings(**SYSTEM, paths=2000, seed=7)
+    def test_bands_are_ordered(self):
+        """P10 <= P50 <= P90 for savings, payback and every year"""
+        result = simulate_savings(**SYSTEM, paths=5000, seed=1)
+        savings, payback = result['lifetime_savings'], result['payback_years']
+        assert savings['p10'] < savings['p50'] < savings['p90']
+        assert payback['p10'] <= payback['p50'] <= payback['p90']
+        bands = result['cumulative_net_savings_by_year']
+        assert len(bands['p50']) == 25
+        assert all(lo <= hi for lo, hi in zip(bands['p10'], bands['p90']))
+    def test_chunking_under_memory_cap(self):
+        """A small memory cap splits the paths into chunks without changing the result much"""
+        full = simulate_savings(**SYSTEM, paths=4000, seed=3)
+        chunked = simulate_savings(**SYSTEM, paths=4000, seed=3, memory_cap_bytes=200_000)
+        assert chunked['paths'] == 4000
+        assert chunked['lifetime_savings']['p50'] == pytest.approx(full['lifetime_savings']['p50'], rel=0.05)
+    def test_never_paying_back_is_reported(self):
+        """A system that can't pay back within the horizon has no payback percentiles"""
+        result = simulate_savings(**{**SYSTEM, 'net_cost': 1_000_000}, paths=500, seed=1)
+        assert result['probability_payback_within_horizon'] == 0
+        assert result['payback_years']['p50'] is None
+    def test_ten_thousand_paths_run_inline(self):
+        """10k paths x 25 years stays well under 100 ms"""
+        simulate_savings(**SYSTEM, paths=10000, seed=1)
+        started = time.perf_counter()
+        simulate_savings(**SYSTEM, paths=10000, seed=2)
+        assert time.perf_counter() - started < 0.1
+    def test_endpoint(self):
+        """The endpoint derives the system from the qualification fields"""
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            response = client.post('/api/savings-simulation', json={
+                'zipCode': '10001', 'electricBill': 150, 'creditBand': 'Good', 'roofSize': 1500, 'seed': 42
+            })
+            assert response.status_code == 200
+            data = json.loads(response.data)
+            assert data['paths'] == 10000
+            assert data['system']['term_years'] == 20
+            assert data['lifetime_savings']['p10'] < data['lifetime_savings']['p90']
+            response = client.post('/api/savings-simulation', json={
+                'zipCode': '10001', 'electricBill': 150, 'creditBand': 'Good', 'roofSize': 1500, 'paths': 10
+            })
+            assert response.status_code == 400
+    def test_endpoint_rejects_bad_overrides(self):
+        """Zero, negative and non-finite overrides are a 400, not a nonsense simulation"""
+        app.config['TESTING'] = True
+        base = {'zipCode': '10001', 'electricBill': 150, 'creditBand': 'Good', 'roofSize': 1500, 'paths': 100}
+        with app.test_client() as client:
+            for field, value in (('netCost', 0), ('systemSizeKw', -5), ('sunHours', 'nan'),
+                                 ('electricityRateCents', 'inf')):
+                response = client.post('/api/savings-simulation', json={**base, field: value})
+                assert response.status_code == 400
+                assert field in response.get_json()['error']
+            assert client.post('/api/savings-simulation', json={**base, 'netCost': 20000}).status_code == 200
+    def test_endpoint_rejects_bad_counts(self):
+        """paths, years and seed must be whole numbers in range; Infinity is a 400, not an OverflowError"""
+        app.config['TESTING'] = True
+        base = '"zipCode": "10001", "electricBill": 150, "creditBand": "Good", "roofSize": 1500'
+        with app.test_client() as client:
+            for extra in ('"paths": Infinity', '"years": Infinity', '"seed": Infinity', '"seed": -Infinity',
+                          '"paths": NaN', '"years": 2.5', '"seed": -1'):
+                response = client.post('/api/savings-simulation', data=f'{{{base}, {extra}}}',
+                                       content_type='application/json')
+                assert response.status_code == 400, extra
+            response = client.post('/api/savings-simulation', data=f'{{{base}, "paths": 100.0, "seed": 7}}',
+                                   content_type='application/json')
+            assert response.status_code == 200
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,118 @@
+# backend/tests/test_shared_cache.py
+import asyncio
+import fnmatch
+import time
+import pytest
+from backend.app import app
+from backend.utils.shared_cache import (MemoryCacheBackend, RedisCacheBackend, SQLiteCacheBackend, TieredCache,
+                                        cache_backend)
+class FailingBackend:
+    def get(self, key):
+        raise ConnectionError('cache service unreachable')
+    def set(self, key, value, ttl, stored_at=None):
+        raise ConnectionError('cache service unreachable')
+class StubRedis:
+    """The slice of redis-py's client the Redis backend uses, with millisecond expiries"""
+    def __init__(self):
+        self.entries = {}
+    def get(self, key):
+        value, expires_at = self.entries.get(key, (None, 0))
+        return value.encode() if value is not None and expires_at > time.time() else None
+    def set(self, key, value, px):
+        self.entries[key] = (value, time.time() + px / 1000)
+    def delete(self, key):
+        self.entries.pop(key, None)
+    def scan_iter(self, pattern):
+        return [key for key in list(self.entries) if fnmatch.fnmatch(key, pattern)]
+class TestSharedCache:
+    """Test the per-process L1 caches in front of the shared L2 store"""
+    def test_value_is_shared_between_workers(self, tmp_path):
+        """A value stored by one worker is served to another (and to a new one) from L2"""
+        path = str(tmp_path / 'shared.db')
+        first = TieredCache('location', SQLiteCacheBackend(path), decode=tuple)
+        first.set('10001', ('new-york', 'ny', 'New York', 'NY'))
+        second = TieredCache('location', SQLiteCacheBackend(path), decode=tuple)
+        assert second.get('10001') == ('new-york', 'ny', 'New York', 'NY')
+        assert second.get('10001') == ('new-york', 'ny', 'New York', 'NY')
+        assert second.stats() == {'l1_hits': 1, 'l2_hits': 1, 'misses': 0, 'l2_errors': 0, 'l1_entries': 1,
+                                  'hit_rate': 1.0}
+        assert TieredCache('census', SQLiteCacheBackend(path)).get('10001') is None
+    def test_ttl_and_max_age(self):
+        backend = MemoryCacheBackend()
+        cache = TieredCache('electricity', backend, ttl=60)
+        cache.set(('ny', 'new-york'), [1, 2])
+        backend.set('electricity:["ny", "old"]', '[3]', ttl=60, stored_at=time.time() - 30)
+        assert cache.get(('ny', 'new-york'), max_age=10) == [1, 2]
+        assert cache.entry(('ny', 'old'))[0] == pytest.approx(30, abs=1)
+        assert cache.get(('ny', 'old'), max_age=10) is None
+        backend.set('electricity:["ny", "gone"]', '[4]', ttl=60, stored_at=time.time() - 61)
+        assert ('ny', 'gone') not in cache
+    def test_size_bounded_eviction(self, tmp_path):
+        """Expired entries go first, then the oldest until the values fit"""
+        backend = SQLiteCacheBackend(str(tmp_path / 'shared.db'), max_bytes=100, evict_every=1000)
+        now = time.time()
+        backend.set('expired', 'x' * 10, ttl=1, stored_at=now - 10)
+        for i in range(10):
+            backend.set(f'key{i}', 'x' * 20, ttl=60, stored_at=now + i)
+        assert backend.evict() == 6
+        assert backend.stats()['bytes'] == 100
+        assert backend.get('key0') is None and backend.get('key9') is not None
+    def test_l1_is_bounded(self):
+        cache = TieredCache('census', None, max_entries=2)
+        for zip_code in ('10001', '10002', '10001', '10003'):
+            cache.set(zip_code, {'zip': zip_code})
+        assert '10001' in cache and '10003' in cache and '10002' not in cache
+    def test_backend_errors_are_misses(self):
+        cache = TieredCache('location', FailingBackend())
+        cache.set('10001', ['a'])
+        assert cache.get('10001') == ['a']
+        cache.clear()
+        assert cache.get('10001') is None
+        assert cache.stats()['l2_errors'] == 2
+        assert cache_backend('none') is None
+        with pytest.raises(ValueError):
+            cache_backend('ftp://cache')
+    def test_redis_backend(self):
+        """Values round-trip with their store time under the prefix, expire with the TTL and clear by prefix"""
+        client = StubRedis()
+        backend = RedisCacheBackend('redis://:secret@cache:6379/0', client=client)
+        backend.set('location:"10001"', '["new-york"]', ttl=60, stored_at=1000.0)
+        backend.set('census:"10001"', '{}', ttl=0.001)
+        assert backend.get('location:"10001"') == (1000.0, '["new-york"]')
+        assert client.entries['solar:location:"10001"'][1] == pytest.approx(time.time() + 60, abs=1)
+        time.sleep(0.01)
+        assert backend.get('census:"10001"') is None
+        client.set('other:key', 'x', px=60000)
+        backend.clear()
+        assert list(client.entries) == ['other:key']
+        assert backend.stats() == {'backend': 'redis', 'url': 'cache:6379/0'}
+    def test_async_access(self):
+        """Coroutines see the same entries; L2 is read on a worker thread"""
+        backend = MemoryCacheBackend()
+        writer, reader = TieredCache('location', backend, decode=tuple), TieredCache('location', backend, decode=tuple)
+        async def run():
+            await writer.set_async('10001', ('new-york', 'ny', 'New York', 'NY'))
+            return await reader.get_async('10001'), await reader.get_async('10001'), await reader.get_async('10002')
+        assert asyncio.run(run()) == (('new-york', 'ny', 'New York', 'NY'),) * 2 + (None,)
+        assert reader.stats()['l1_hits'] == 1 and reader.stats()['l2_hits'] == 1 and reader.stats()['misses'] == 1
+    def test_new_worker_is_warm(self, monkeypatch):
+        """A worker started after another fetched a county serves it without calling providers"""
+        from backend import app as app_module
+        backend = MemoryCacheBackend()
+        monkeypatch.setattr(app_module, 'log_store', None)
+        monkeypatch.setattr(app_module, 'zip_to_location', lambda z: ('new-york', 'ny', 'New York', 'NY'))
+        monkeypatch.setattr(app_module, '_electricity_cache', TieredCache('electricity', backend, decode=tuple))
+        monkeypatch.setattr(app_module, '_fetch_electricity_data',
+                            lambda *args: ({'average_monthly_bill': 120.0}, 'eia', None))
+        assert app_module.get_electricity_data('new-york', 'ny', 'NY')[1] == 'eia'
+        monkeypatch.setattr(app_module, '_electricity_cache', TieredCache('electricity', backend, decode=tuple))
+        monkeypatch.setattr(app_module, '_fetch_electricity_data',
+                            lambda *args: pytest.fail('providers must not be called for a shared result'))
+        with app.test_client() as client:
+            response = client.get('/electricity-data?zip=10001')
+            assert response.status_code == 200
+            assert response.get_json()['average_monthly_bill'] == 120.0
+            assert client.get('/metrics').get_json()['shared_cache']['electricity']['l2_hits'] == 1
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,100 @@
+# backend/tests/test_singleflight.py
+import asyncio
+import threading
+import time
+import pytest
+from backend.utils.singleflight import AsyncSingleFlight, SingleFlight
+class TestSingleFlight:
+    """Test request coalescing"""
+    def _run_concurrently(self, flight, key, fn, count=8):
+        results, errors = [], []
+        def worker():
+            try:
+                results.append(flight.do(key, fn))
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results, errors
+    def test_concurrent_calls_share_one_execution(self):
+        """Concurrent callers with the same key run the function once"""
+        flight = SingleFlight()
+        executions = []
+        def slow():
+            executions.append(1)
+            time.sleep(0.1)
+            return {'rate': 0.15}
+        results, errors = self._run_concurrently(flight, ('zip_to_location', '10001'), slow)
+        assert not errors
+        assert len(executions) == 1
+        assert all(r == {'rate': 0.15} for r in results)
+        stats = flight.stats()['operations']['zip_to_location']
+        assert stats['calls'] == 8
+        assert stats['executions'] == 1
+        assert stats['coalesced'] == 7
+    def test_every_caller_gets_its_own_copy(self):
+        """The leader annotating its result doesn't change what waiters receive"""
+        flight = SingleFlight()
+        shared = {'status': 'approved'}
+        def slow():
+            time.sleep(0.1)
+            return shared
+        results, errors = self._run_concurrently(flight, ('gemini', '10001'), slow, count=4)
+        assert not errors
+        assert all(result is not shared for result in results)
+        results[0]['location'] = {'zip_code': '10001'}
+        assert all('location' not in result for result in results[1:]) and shared == {'status': 'approved'}
+    def test_errors_propagate_and_are_not_cached(self):
+        """Every waiter sees the error and the next call retries"""
+        flight = SingleFlight()
+        def failing():
+            time.sleep(0.1)
+            raise RuntimeError('upstream down')
+        results, errors = self._run_concurrently(flight, ('electricity', 'ny', 'new-york'), failing)
+        assert not results
+        assert len(errors) == 8
+        assert flight.do(('electricity', 'ny', 'new-york'), lambda: 'ok') == 'ok'
+        assert flight.in_flight() == 0
+    def test_async_calls_share_one_execution(self):
+        """Concurrent coroutines with the same key await a single execution"""
+        flight = AsyncSingleFlight()
+        executions = []
+        async def slow():
+            executions.append(1)
+            await asyncio.sleep(0.05)
+            return ('new-york', 'ny', 'New York', 'NY')
+        async def main():
+            return await asyncio.gather(*(flight.do(('zip_to_location', '10001'), slow) for _ in range(20)))
+        results = asyncio.run(main())
+        assert len(executions) == 1
+        assert all(r == ('new-york', 'ny', 'New York', 'NY') for r in results)
+        assert flight.stats()['operations']['zip_to_location']['coalesced'] == 19
+    def test_cancelled_leader_does_not_cancel_waiters(self):
+        """When the leader's request is cancelled a waiter takes over the call instead of being cancelled too"""
+        flight = AsyncSingleFlight()
+        executions = []
+        async def slow():
+            executions.append(1)
+            await asyncio.sleep(0.05)
+            return ('new-york', 'ny', 'New York', 'NY')
+        async def main():
+            key = ('zip_to_location', '10001')
+            leader = asyncio.ensure_future(flight.do(key, slow))
+            await asyncio.sleep(0)
+            waiters = [asyncio.ensure_future(flight.do(key, slow)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            results = await asyncio.gather(*waiters)
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return results
+        results = asyncio.run(main())
+        assert results == [('new-york', 'ny', 'New York', 'NY')] * 3
+        assert len(executions) == 2
+        assert flight.in_flight() == 0
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
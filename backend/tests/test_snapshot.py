@@ -0,0 +1,70 @@
+# backend/tests/test_snapshot.py
+import pytest
+from backend.app import app
+from backend.utils.snapshot import DataSnapshot, write_snapshot
+ELECTRICITY = {'average_monthly_bill': 152.3, 'utility_rate_cents_per_kwh': 21.45}
+SECTIONS = {
+    'locations': {'10001': ['new-york', 'ny', 'New York', 'NY'], '07030': ['hudson', 'nj', 'Hoboken', 'NJ']},
+    'coordinates': {'10001': [40.75, -73.99]},
+    'electricity': {'ny/new-york': [ELECTRICITY, 'findenergy.com']},
+    'eia': {'NJ': [{'average_monthly_bill': 118.0}, 'EIA']},
+    'census': {'10001': {'total_population': 27000, 'median_household_income': 96000}},
+    'vantage': {'10001': {'vantage_score': 709.0, 'city': 'New York', 'state': 'NY'}}
+}
+class TestDataSnapshot:
+    """Test the offline data bundle and the server's offline mode"""
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / 'snapshot.bin')
+        manifest = write_snapshot(path, SECTIONS, version='2026-10')
+        snapshot = DataSnapshot(path)
+        assert snapshot.version == '2026-10' and manifest['sections']['locations']['entries'] == 2
+        assert snapshot.stats()['loaded'] == []
+        assert snapshot.location('10001') == ('new-york', 'ny', 'New York', 'NY')
+        assert snapshot.coordinates('10001') == (40.75, -73.99) and snapshot.location('99999') is None
+        assert snapshot.electricity('new-york', 'ny', 'NY') == (ELECTRICITY, 'findenergy.com', None)
+        assert snapshot.electricity('hudson', 'nj', 'NJ') == ({'average_monthly_bill': 118.0}, 'EIA', None)
+        assert snapshot.electricity('bergen', 'nj', None) == (None, None, None)
+        assert snapshot.census('10001')['total_population'] == 27000
+        assert snapshot.stats()['loaded'] == ['census', 'coordinates', 'eia', 'electricity', 'locations']
+        assert snapshot.preload().vantage()['10001']['vantage_score'] == 709.0
+    def test_rejects_bad_files(self, tmp_path):
+        with pytest.raises(ValueError):
+            write_snapshot(str(tmp_path / 'x.bin'), {'weather': {}})
+        (tmp_path / 'other.bin').write_bytes(b'not a snapshot at all')
+        with pytest.raises(ValueError):
+            DataSnapshot(str(tmp_path / 'other.bin'))
+        path = tmp_path / 'snapshot.bin'
+        write_snapshot(str(path), SECTIONS)
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+        snapshot = DataSnapshot(str(path))
+        assert snapshot.location('10001')
+        with pytest.raises(ValueError):
+            snapshot.vantage()
+        data[8] = 2  # the format version, after the magic
+        path.write_bytes(bytes(data))
+        with pytest.raises(ValueError, match='format 2'):
+            DataSnapshot(str(path))
+    def test_offline_mode_makes_no_network_calls(self, tmp_path, monkeypatch):
+        """Every lookup is answered from the bundle; a ZIP outside it is an error, not an upstream call"""
+        from backend import app as app_module
+        path = str(tmp_path / 'snapshot.bin')
+        write_snapshot(path, SECTIONS)
+        monkeypatch.setattr(app_module, 'snapshot', DataSnapshot(path))
+        monkeypatch.setattr(app_module, 'log_store', None)
+        monkeypatch.setattr(app_module, 'LOGS_DIR', str(tmp_path))
+        monkeypatch.setattr(app_module, 'get_http_session', lambda: pytest.fail('offline mode must not call out'))
+        monkeypatch.setattr(app_module, 'fetch_from_provider', lambda *args, **kwargs: pytest.fail('no providers'))
+        with app.test_client() as client:
+            electricity = client.get('/electricity-data?zip=10001')
+            assert electricity.status_code == 200
+            assert electricity.get_json()['data_source'] == 'findenergy.com'
+            assert client.get('/electricity-data?zip=07030').get_json()['data_source'] == 'EIA'
+            assert client.get('/demographic-data?zip=10001').get_json()['median_household_income'] == 96000
+            missing = client.get('/electricity-data?zip=99999')
+            assert missing.status_code == 500 and 'not in the offline data snapshot' in missing.get_json()['error']
+            assert client.get('/metrics').get_json()['snapshot']['sections']['census'] == 1
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
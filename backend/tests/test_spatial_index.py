@@ -0,0 +1,63 @@
+# backend/tests/test_spatial_index.py
+import numpy as np
+import pytest
+from backend.app import app
+from backend.utils.spatial_index import KDTree, LocationIndex, ZipCentroids, to_unit_vectors
+RECORDS = [
+    {'zip_code': '10001', 'latitude': 40.7506, 'longitude': -73.9972, 'state': 'NY', 'score': 700.0},
+    {'zip_code': '07030', 'latitude': 40.7440, 'longitude': -74.0324, 'state': 'NJ', 'score': 720.0},
+    {'zip_code': '90210', 'latitude': 34.0901, 'longitude': -118.4065, 'state': 'CA', 'score': 780.0},
+    {'zip_code': '60601', 'latitude': 41.8858, 'longitude': -87.6181, 'state': 'IL', 'score': None}
+]
+class TestSpatialIndex:
+    """Test the KD-tree and nearest-neighbour estimates"""
+    def test_kdtree_matches_brute_force(self):
+        """k nearest from the tree equal a full scan"""
+        rng = np.random.default_rng(0)
+        points = to_unit_vectors(rng.uniform(25, 49, 5000), rng.uniform(-124, -67, 5000))
+        tree = KDTree(points)
+        for lat, lon in zip(rng.uniform(20, 50, 25), rng.uniform(-130, -60, 25)):
+            query = to_unit_vectors(lat, lon)
+            expected = np.argsort(((points - query) ** 2).sum(axis=1))[:7].tolist()
+            assert [i for _, i in tree.query(query, 7)] == expected
+    def test_estimate_weights_by_distance(self):
+        """Closer neighbours count more and neighbours without a value are skipped"""
+        index = LocationIndex(RECORDS, ['score'])
+        estimate = index.estimate(40.7470, -74.0150, k=3)
+        assert 700 < estimate['score'] < 720
+        assert {n['zip_code'] for n in estimate['neighbours']} == {'10001', '07030', '60601'}
+        assert index.estimate(41.8858, -87.6181, k=1)['score'] is None
+    def test_exact_location(self):
+        """A query on a known location returns its own value"""
+        index = LocationIndex(RECORDS, ['score'])
+        estimate = index.estimate(34.0901, -118.4065)
+        assert estimate['score'] == pytest.approx(780.0, abs=0.01)
+        assert estimate['state'] == 'CA'
+        assert estimate['neighbours'][0]['distance_km'] == 0.0
+    def test_zip_centroids_gazetteer(self, tmp_path):
+        """Census gazetteer files (tab separated) load into a sorted lookup"""
+        path = tmp_path / 'zcta.txt'
+        path.write_text('GEOID\tALAND\tINTPTLAT\tINTPTLONG\n10001\t1\t40.750633\t-73.997177\n'
+                        '00601\t1\t18.180555\t-66.749961\n', encoding='utf-8')
+        centroids = ZipCentroids.load(str(path))
+        assert centroids.coordinates('00601') == pytest.approx((18.180555, -66.749961), abs=1e-4)
+        assert centroids.coordinates('99999') is None
+    def test_vantage_score_estimate(self, monkeypatch):
+        """Unknown ZIPs get a flagged estimate instead of a 404"""
+        from backend import app as app_module
+        records = [{**r, 'vantage_score': r['score']} for r in RECORDS]
+        monkeypatch.setattr(app_module, 'load_vantage_data_from_excel', lambda: {'10001': {'vantage_score': 700.0}})
+        monkeypatch.setattr(app_module, '_location_indexes', {
+            'centroids': ZipCentroids(np.array([10002]), np.array([40.7155]), np.array([-73.9860])),
+            'vantage': LocationIndex(records, ['vantage_score'])
+        })
+        with app.test_client() as client:
+            response = client.get('/vantage-score?zip=10002')
+            assert response.status_code == 200
+            data = response.get_json()
+            assert data['estimated'] is True
+            assert 700 <= data['vantage_score'] <= 720
+            assert client.get('/vantage-score?zip=10001').get_json()['estimated'] is False
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,57 @@
+# backend/tests/test_zip_profile.py
+import time
+import pytest
+from backend.app import app
+DELAY = 0.3
+def slow(value):
+    def fetch(*args):
+        time.sleep(DELAY)
+        return value
+    return fetch
+@pytest.fixture
+def sources(monkeypatch):
+    """Every upstream takes DELAY seconds"""
+    from backend import app as app_module
+    monkeypatch.setattr(app_module, 'zip_to_location', slow(('new-york', 'ny', 'New York', 'NY')))
+    monkeypatch.setattr(app_module, 'get_electricity_data',
+                        slow(({'average_monthly_bill': 120.0, 'utility_rate_per_kwh': 0.2}, 'eia', None)))
+    monkeypatch.setattr(app_module, 'get_census_demographics',
+                        slow({'total_population': 1000, 'race_percentages': {'white': 50.0, 'black': 50.0}}))
+    monkeypatch.setattr(app_module, 'get_vantage_score', slow({'zip_code': '10001', 'vantage_score': 700.0}))
+    return app_module
+class TestZipProfile:
+    """Test the aggregated ZIP profile endpoint"""
+    def test_sections_run_concurrently(self, sources):
+        """Census and Vantage overlap the location + electricity chain"""
+        with app.test_client() as client:
+            started = time.monotonic()
+            response = client.get('/api/zip-profile?zip=10001')
+            elapsed = time.monotonic() - started
+        assert response.status_code == 200
+        data = response.get_json()
+        assert {name: s['status'] for name, s in data['sections'].items()} == {
+            'location': 'ok', 'electricity': 'ok', 'demographics': 'ok', 'vantage': 'ok'}
+        assert data['city'] == 'New York' and data['state'] == 'NY'
+        assert data['sections']['electricity']['data']['average_monthly_bill'] == 120.0
+        assert data['sections']['demographics']['data']['race_diversity_score'] == 0.5
+        assert data['sections']['vantage']['elapsed_ms'] >= DELAY * 1000
+        # Four sequential upstream calls would take 4 * DELAY
+        assert elapsed < 3 * DELAY
+    def test_failed_section_is_reported(self, sources, monkeypatch):
+        """One failing upstream doesn't fail the profile"""
+        def census_down(zip_code):
+            raise RuntimeError('census unavailable')
+        monkeypatch.setattr(sources, 'get_census_demographics', census_down)
+        monkeypatch.setattr(sources, 'get_vantage_score', lambda zip_code: None)
+        with app.test_client() as client:
+            data = client.get('/api/zip-profile?zip=10001').get_json()
+        assert data['sections']['demographics'] == {'status': 'error', 'error': 'census unavailable',
+                                                    'elapsed_ms': data['sections']['demographics']['elapsed_ms']}
+        assert data['sections']['vantage']['status'] == 'not_found'
+        assert data['sections']['electricity']['status'] == 'ok'
+    def test_invalid_zip(self):
+        with app.test_client() as client:
+            assert client.get('/api/zip-profile?zip=abc').status_code == 400
+# Run tests
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,147 @@
+# backend/utils/admission.py
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+NORMAL = 'normal'
+DEGRADED = 'degraded'
+# A queue wait longer than this can't be real (the proxy would have timed the
+# request out), so the header is treated as bogus rather than as load
+MAX_QUEUED_SECONDS = 10.0
+
+
+class OverloadedError(Exception):
+    """Raised instead of admitting a request past the hard threshold"""
+
+    def __init__(self, endpoint: str, retry_after: int):
+        super().__init__(f'{endpoint} is overloaded; retry after {retry_after}s')
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """Per-endpoint overrides from 'endpoint=soft:hard,...'"""
+    limits = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        name, _, values = item.partition('=')
+        soft, _, hard = values.partition(':')
+        limits[name.strip()] = (int(soft), int(hard))
+    return limits
+
+
+class _EndpointLoad:
+    def __init__(self, soft_limit: int, hard_limit: int):
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.queue_wait = 0.0  # EWMA of seconds between arrival and admission
+        self.latency = 0.0     # EWMA of seconds in the handler
+        self.counts = {NORMAL: 0, DEGRADED: 0, 'shed': 0}
+
+
+class AdmissionController:
+    """Per-endpoint admission based on in-flight requests and queue wait
+
+    normal    below both soft thresholds
+    degraded  in-flight >= soft_limit, or the smoothed queue wait is past
+              soft_wait_seconds: the caller should take its cheap path
+    shed      in-flight >= hard_limit, or queue wait past hard_wait_seconds:
+              OverloadedError with a Retry-After hint
+    Queue wait is the time a request spent waiting before it reached the
+    app (e.g. from a proxy's X-Request-Start header), smoothed with an EWMA.
+    Every request moves the average, including shed ones and ones that
+    report no wait, so a burst of slow (or bogus) values fades.
+    """
+
+    def __init__(self, soft_limit: int = 16, hard_limit: int = 64, soft_wait_seconds: float = 1.0,
+                 hard_wait_seconds: float = 5.0, limits: Optional[Dict[str, Tuple[int, int]]] = None,
+                 smoothing: float = 0.2):
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.soft_wait_seconds = soft_wait_seconds
+        self.hard_wait_seconds = hard_wait_seconds
+        self.limits = limits or {}
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, _EndpointLoad] = {}
+
+    def _load(self, endpoint: str) -> _EndpointLoad:
+        load = self._endpoints.get(endpoint)
+        if load is None:
+            soft, hard = self.limits.get(endpoint, (self.soft_limit, self.hard_limit))
+            load = self._endpoints[endpoint] = _EndpointLoad(soft, hard)
+        return load
+
+    def _retry_after(self, load: _EndpointLoad) -> int:
+        """Seconds until roughly one in-flight request per slot has finished"""
+        return max(1, math.ceil(load.latency * load.in_flight / max(load.hard_limit, 1)))
+
+    def admit(self, endpoint: str, queued_seconds: float = 0.0) -> str:
+        """Admit one request and return its mode, or raise OverloadedError"""
+        with self._lock:
+            load = self._load(endpoint)
+            load.queue_wait += self.smoothing * (queued_seconds - load.queue_wait)
+            if load.in_flight >= load.hard_limit or load.queue_wait >= self.hard_wait_seconds:
+                load.counts['shed'] += 1
+                raise OverloadedError(endpoint, self._retry_after(load))
+            mode = DEGRADED if (load.in_flight >= load.soft_limit
+                                or load.queue_wait >= self.soft_wait_seconds) else NORMAL
+            load.in_flight += 1
+            load.max_in_flight = max(load.max_in_flight, load.in_flight)
+            load.counts[mode] += 1
+            return mode
+
+    def release(self, endpoint: str, elapsed: float):
+        """Report an admitted request as finished"""
+        with self._lock:
+            load = self._load(endpoint)
+            load.in_flight = max(load.in_flight - 1, 0)
+            load.latency += self.smoothing * (elapsed - load.latency)
+            # Idle endpoints shouldn't stay degraded on a stale queue wait
+            if load.in_flight == 0:
+                load.queue_wait *= 1 - self.smoothing
+
+    def busy(self, fraction: float = 0.5) -> bool:
+        """Whether any endpoint has in-flight requests at `fraction` of its soft limit"""
+        with self._lock:
+            return any(load.in_flight >= max(1, load.soft_limit * fraction) for load in self._endpoints.values())
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                name: {
+                    'in_flight': load.in_flight,
+                    'max_in_flight': load.max_in_flight,
+                    'soft_limit': load.soft_limit,
+                    'hard_limit': load.hard_limit,
+                    'queue_wait_ms': round(load.queue_wait * 1000, 1),
+                    'latency_ms': round(load.latency * 1000, 1),
+                    **load.counts
+                }
+                for name, load in self._endpoints.items()
+            }
+
+
+def queued_seconds(header: Optional[str], now: Optional[float] = None) -> float:
+    """Time since a proxy's X-Request-Start ('t=<epoch>' in s, ms or us)
+
+    0 if the header is absent, malformed, in the future or further back
+    than MAX_QUEUED_SECONDS.
+    """
+    if not header:
+        return 0.0
+    try:
+        value = float(header.strip().removeprefix('t='))
+    except ValueError:
+        return 0.0
+    if not math.isfinite(value):
+        return 0.0
+    # Scale to seconds by magnitude: seconds ~1e9, milliseconds ~1e12, microseconds ~1e15
+    while value > 1e11:
+        value /= 1000
+    queued = (now or time.time()) - value
+    return queued if 0.0 < queued <= MAX_QUEUED_SECONDS else 0.0
@@ -0,0 +1,125 @@
+# backend/utils/amortization.py
+import json
+from typing import Any, Dict, Iterator, List
+import numpy as np
+
+MAX_PERIODS = 300  # 25-year loans, the longest term offered
+SAVINGS_ESCALATION = 0.03  # Same 3% yearly rate increase as calculate_lifetime_savings
+COLUMNS = ['month', 'payment', 'principal', 'interest', 'balance', 'cumulative_net_savings']
+ROW_FORMAT = ',%d' + ',%.2f' * (len(COLUMNS) - 1) + '\n'
+
+
+def monthly_payments(principal: np.ndarray, apr: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """Level monthly payment for each loan (unrounded, so balances reach exactly zero)"""
+    rate = apr / 1200
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = principal * rate / (1 - (1 + rate) ** -months)
+    return np.where(rate == 0, principal / months, payment)
+
+
+def amortization_schedules(principal, apr, months, monthly_savings=None,
+                           savings_escalation: float = SAVINGS_ESCALATION) -> Dict[str, np.ndarray]:
+    """Month-by-month schedules for many loans at once
+
+    All inputs are per-loan arrays (or scalars). Returns 2-D arrays of shape
+    (loans, longest term) for payment, principal, interest and balance, and
+    cumulative solar savings net of the payment; months past a loan's term
+    are zero. monthly_savings is the first-year saving (e.g. the current
+    bill) and grows by savings_escalation every 12 months.
+    """
+    principal = np.atleast_1d(np.asarray(principal, dtype=np.float64))
+    apr = np.broadcast_to(np.asarray(apr, dtype=np.float64), principal.shape)
+    months = np.broadcast_to(np.asarray(months, dtype=np.int64), principal.shape)
+    savings = np.broadcast_to(np.asarray(0.0 if monthly_savings is None else monthly_savings,
+                                         dtype=np.float64), principal.shape)
+    periods = int(months.max()) if months.size else 0
+    if periods > MAX_PERIODS or (months.size and months.min() < 1):
+        raise ValueError(f'Loan terms must be between 1 and {MAX_PERIODS} months')
+
+    rate = (apr / 1200)[:, None]
+    payment = monthly_payments(principal, apr, months)[:, None]
+    k = np.arange(1, periods + 1)[None, :]
+    active = k <= months[:, None]
+
+    # Closed-form balance after k payments: P(1+r)^k - pmt((1+r)^k - 1)/r
+    growth = (1 + rate) ** k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        balance = principal[:, None] * growth - payment * np.where(rate == 0, k, (growth - 1) / rate)
+    balance = np.where(active, np.maximum(balance, 0.0), 0.0)
+    previous = np.concatenate([principal[:, None], balance[:, :-1]], axis=1)
+    interest = np.where(active, previous * rate, 0.0)
+    principal_paid = np.where(active, previous - balance, 0.0)
+    payment_col = np.where(active, payment, 0.0)
+
+    monthly_saving = savings[:, None] * (1 + savings_escalation) ** ((k - 1) // 12)
+    net_savings = np.cumsum(np.where(active, monthly_saving - payment_col, 0.0), axis=1)
+
+    return {
+        'month': np.broadcast_to(k, balance.shape),
+        'payment': payment_col,
+        'principal': principal_paid,
+        'interest': interest,
+        'balance': balance,
+        'cumulative_net_savings': net_savings,
+        'monthly_payment': payment[:, 0],
+        'total_interest': interest.sum(axis=1),
+        'months': months
+    }
+
+
+def _chunks(loans: List[Dict[str, Any]], chunk_size: int, savings_escalation: float):
+    """Schedules computed chunk_size loans at a time so memory stays bounded"""
+    for start in range(0, len(loans), chunk_size):
+        chunk = loans[start:start + chunk_size]
+        yield chunk, amortization_schedules(
+            [loan['principal'] for loan in chunk],
+            [loan['apr'] for loan in chunk],
+            [loan['months'] for loan in chunk],
+            [loan.get('monthly_savings') or 0.0 for loan in chunk],
+            savings_escalation
+        )
+
+
+def schedule_json(loans: List[Dict[str, Any]], savings_escalation: float = SAVINGS_ESCALATION) -> List[Dict[str, Any]]:
+    """Schedules as a list of JSON-ready dicts (for small requests)"""
+    results = []
+    for chunk, schedules in _chunks(loans, len(loans) or 1, savings_escalation):
+        for i, loan in enumerate(chunk):
+            results.append(_loan_record(loan, schedules, i))
+    return results
+
+
+def _loan_record(loan: Dict[str, Any], schedules: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+    term = int(schedules['months'][i])
+    return {
+        'id': loan['id'],
+        'monthly_payment': round(float(schedules['monthly_payment'][i]), 2),
+        'total_interest': round(float(schedules['total_interest'][i]), 2),
+        'term_months': term,
+        'schedule': {
+            column: (schedules[column][i, :term].tolist() if column == 'month'
+                     else np.round(schedules[column][i, :term], 2).tolist())
+            for column in COLUMNS
+        }
+    }
+
+
+def iter_ndjson(loans: List[Dict[str, Any]], chunk_size: int = 500,
+                savings_escalation: float = SAVINGS_ESCALATION) -> Iterator[str]:
+    """One JSON line per loan"""
+    for chunk, schedules in _chunks(loans, chunk_size, savings_escalation):
+        yield ''.join(json.dumps(_loan_record(loan, schedules, i)) + '\n' for i, loan in enumerate(chunk))
+
+
+def iter_csv(loans: List[Dict[str, Any]], chunk_size: int = 500,
+             savings_escalation: float = SAVINGS_ESCALATION) -> Iterator[str]:
+    """One CSV row per loan-month, header first"""
+    yield ','.join(['loan_id'] + COLUMNS) + '\n'
+    for chunk, schedules in _chunks(loans, chunk_size, savings_escalation):
+        table = np.stack([schedules[column] for column in COLUMNS], axis=2)
+        lines = []
+        for i, loan in enumerate(chunk):
+            term = int(schedules['months'][i])
+            row_format = str(loan['id']).replace(',', ' ').replace('%', '%%') + ROW_FORMAT
+            lines.append(''.join(map(row_format.__mod__, map(tuple, table[i, :term].tolist()))))
+        yield ''.join(lines)
@@ -0,0 +1,319 @@
+# backend/utils/bulk_scoring.py
+import csv
+import io
+import json
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from utils.incentive_rules import IncentiveRules, load_incentives, load_install_costs
+from utils.lazy_import import lazy_module
+from utils.qualification_engine import determine_statuses, load_reference_data
+from utils.solar_calculator import SolarCalculator
+from utils.validators import validate_input
+
+pq = lazy_module('pyarrow.parquet')
+
+RESULT_COLUMNS = ['status', 'system_size_kw', 'gross_cost', 'net_cost', 'monthly_payment', 'payback_years',
+                  'total_savings', 'location_source', 'error']
+# Same fallbacks as QualificationEngine.process_qualification
+DEFAULT_LOCATION = (15.0, 4.5, 'US')
+DEFAULT_TERMS = {'apr': 8.99, 'term': 15, 'down_payment': 10}
+CHUNK_BYTES = 4 * 1024 * 1024
+
+
+class ReferenceTables:
+    """ZIP rates and sun hours, loan terms and incentives, resolved in bulk
+
+    Holds only plain data so it can be sent to worker processes; the
+    incentive rules are compiled on first use in each process.
+    """
+
+    def __init__(self, locations: List[Dict[str, Any]], loan_terms: Dict[str, Dict[str, float]],
+                 incentives: List[Dict[str, Any]], costs_per_watt: Optional[Dict[str, float]] = None):
+        self.zip_index = {loc['zip_code']: i for i, loc in enumerate(locations)}
+        self.rates = np.array([loc['electricity_rate_cents'] for loc in locations] + [DEFAULT_LOCATION[0]])
+        self.sun_hours = np.array([loc['sun_hours_daily'] for loc in locations] + [DEFAULT_LOCATION[1]])
+        self.states = np.array([loc['state'] for loc in locations] + [DEFAULT_LOCATION[2]], dtype=object)
+        self.loan_terms = loan_terms
+        self.incentives = incentives
+        self.costs_per_watt = costs_per_watt or {}
+        self._rules = None
+
+    @classmethod
+    def load(cls, db, irradiance=None):
+        locations, loan_terms = load_reference_data(db, irradiance)
+        return cls(locations, loan_terms, load_incentives(db), load_install_costs())
+
+    def __getstate__(self):
+        return {**self.__dict__, '_rules': None}
+
+    @property
+    def rules(self) -> IncentiveRules:
+        if self._rules is None:
+            self._rules = IncentiveRules(self.incentives, self.costs_per_watt)
+        return self._rules
+
+    def resolve(self, zip_codes: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(rates, sun hours, states, found) for each ZIP; unknown ZIPs get the defaults"""
+        default = len(self.rates) - 1
+        index = np.fromiter((self.zip_index.get(z, default) for z in zip_codes), dtype=np.int64,
+                            count=len(zip_codes))
+        return self.rates[index], self.sun_hours[index], self.states[index], index != default
+
+    def terms(self, credit_bands: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(APRs, term years) for each credit band"""
+        terms = [self.loan_terms.get(band, DEFAULT_TERMS) for band in credit_bands]
+        return np.array([t['apr'] for t in terms], dtype=np.float64), np.array([t['term'] for t in terms])
+
+
+def score_rows(rows: List[Dict[str, Any]], tables: ReferenceTables) -> List[Dict[str, Any]]:
+    """Each row with RESULT_COLUMNS added, using the QualificationEngine rules vectorised over the chunk
+
+    Rows failing validate_input get status 'invalid' and the validation message.
+    """
+    scored = [dict(row) for row in rows]
+    valid = []
+    for row in scored:
+        if isinstance(row.get('zipCode'), int):
+            row['zipCode'] = f"{row['zipCode']:05d}"  # numeric columns drop leading zeros
+        check = validate_input(row)
+        if check['valid']:
+            valid.append(row)
+        else:
+            row.update({column: '' for column in RESULT_COLUMNS})
+            row.update({'status': 'invalid', 'error': check['message']})
+    if not valid:
+        return scored
+
+    bills = np.array([float(row['electricBill']) for row in valid])
+    roofs = np.array([float(row['roofSize']) for row in valid])
+    bands = [row['creditBand'] for row in valid]
+    rates, sun_hours, states, found = tables.resolve([str(row['zipCode'])[:5] for row in valid])
+
+    sizes = SolarCalculator.calculate_system_sizes(bills, rates, sun_hours)
+    # Fit the system to the roof at 200 sq ft per kW
+    sizes = np.where(roofs < sizes * 200, roofs / 200, sizes)
+    costs = SolarCalculator.calculate_system_costs(sizes, states, tables.rules)
+    aprs, years = tables.terms(bands)
+    payments = SolarCalculator.calculate_monthly_payments(costs['net_cost'], aprs, years)
+    paybacks = SolarCalculator.calculate_payback_periods(costs['net_cost'], bills, payments)
+    savings = SolarCalculator.calculate_lifetime_savings_many(sizes, rates, sun_hours)
+    statuses = determine_statuses(bills, payments, bands, paybacks)
+
+    columns = zip(statuses, np.round(sizes, 2).tolist(), costs['gross_cost'].tolist(), costs['net_cost'].tolist(),
+                  payments.tolist(), paybacks.tolist(), savings.tolist(), np.where(found, 'table', 'default').tolist())
+    for row, values in zip(valid, columns):
+        row.update(zip(RESULT_COLUMNS, (*values, '')))
+    return scored
+
+
+def csv_header(path: str) -> Tuple[List[str], int]:
+    """Column names of a CSV file and the byte offset of its first data row"""
+    with open(path, 'rb') as f:
+        line = f.readline()
+        return next(csv.reader([line.decode('utf-8-sig')])), f.tell()
+
+
+def plan_csv_chunks(path: str, start: int, chunk_bytes: int = CHUNK_BYTES) -> Iterator[Tuple[int, int]]:
+    """(start, end) byte ranges of about chunk_bytes, each ending at a line break
+
+    Assumes one record per line (no line breaks inside quoted fields).
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+
+def read_csv_chunk(path: str, fieldnames: List[str], start: int, end: int) -> List[Dict[str, str]]:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    return [row for row in csv.DictReader(io.StringIO(text), fieldnames=fieldnames) if any(row.values())]
+
+
+class LeadFile:
+    """A CSV or Parquet lead file split into independently readable chunks
+
+    A chunk position is a byte offset (CSV) or a row group index (Parquet);
+    chunks() starts from any position returned by an earlier chunk, which
+    is what a checkpoint stores.
+    """
+
+    def __init__(self, path: str, chunk_bytes: int = CHUNK_BYTES):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self.parquet = path.endswith('.parquet')
+        if self.parquet:
+            metadata = pq.ParquetFile(path).metadata
+            self.fieldnames = list(metadata.schema.names)
+            self.start, self.end = 0, metadata.num_row_groups
+        else:
+            self.fieldnames, self.start = csv_header(path)
+            self.end = os.path.getsize(path)
+
+    def identity(self) -> Dict[str, Any]:
+        """What a checkpoint records to make sure it resumes the same file"""
+        stat = os.stat(self.path)
+        return {'path': os.path.abspath(self.path), 'size': stat.st_size, 'mtime': stat.st_mtime,
+                'chunk_bytes': self.chunk_bytes}
+
+    def chunks(self, position: Optional[int] = None) -> Iterator[Tuple[Tuple, int]]:
+        """(chunk, position after it) pairs from position onwards"""
+        position = self.start if position is None else position
+        if self.parquet:
+            for index in range(position, self.end):
+                yield (self.path, self.fieldnames, 'parquet', index, index + 1), index + 1
+        else:
+            for start, end in plan_csv_chunks(self.path, position, self.chunk_bytes):
+                yield (self.path, self.fieldnames, 'csv', start, end), end
+
+
+def read_chunk(chunk: Tuple) -> List[Dict[str, Any]]:
+    path, fieldnames, kind, start, end = chunk
+    if kind == 'parquet':
+        return pq.ParquetFile(path).read_row_group(start).to_pylist()
+    return read_csv_chunk(path, fieldnames, start, end)
+
+
+def encode_rows(rows: List[Dict[str, Any]], fieldnames: List[str], output_format: str) -> str:
+    if output_format == 'ndjson':
+        return ''.join(json.dumps(row) + '\n' for row in rows)
+    out = io.StringIO()
+    csv.DictWriter(out, fieldnames=fieldnames, extrasaction='ignore', lineterminator='\n').writerows(rows)
+    return out.getvalue()
+
+
+# Set in each worker process by _init_worker
+_worker_tables: Optional[ReferenceTables] = None
+
+
+def _init_worker(tables: ReferenceTables):
+    global _worker_tables
+    _worker_tables = tables
+
+
+def score_chunk(chunk: Tuple, output_fields: List[str], output_format: str) -> Tuple[str, int, Dict[str, int]]:
+    """Read, validate and score one chunk in a worker; returns (encoded output, rows, status counts)"""
+    rows = score_rows(read_chunk(chunk), _worker_tables)
+    return encode_rows(rows, output_fields, output_format), len(rows), dict(Counter(row['status'] for row in rows))
+
+
+class BulkScorer:
+    """Scores a lead file across a process pool into a CSV or NDJSON file
+
+    Workers read their own chunks from the input, so the parent only plans
+    byte ranges and appends the encoded results in input order. At most
+    2 x workers chunks are in flight, which bounds memory whatever the file
+    size. After each chunk is written the output is flushed and a
+    checkpoint records the input position and output size; a rerun with
+    the same checkpoint truncates any partly written tail and carries on
+    from there.
+    """
+
+    def __init__(self, tables: ReferenceTables, workers: Optional[int] = None, chunk_bytes: int = CHUNK_BYTES,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None, progress_seconds: float = 5.0):
+        self.tables = tables
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_bytes = chunk_bytes
+        self.progress = progress
+        self.progress_seconds = progress_seconds
+
+    def run(self, input_path: str, output_path: str, checkpoint_path: Optional[str] = None,
+            restart: bool = False) -> Dict[str, Any]:
+        leads = LeadFile(input_path, self.chunk_bytes)
+        output_format = 'ndjson' if output_path.endswith(('.ndjson', '.jsonl')) else 'csv'
+        output_fields = leads.fieldnames + [c for c in RESULT_COLUMNS if c not in leads.fieldnames]
+        checkpoint_path = checkpoint_path or f'{output_path}.checkpoint.json'
+        state = None if restart else read_checkpoint(checkpoint_path)
+        if state is not None and state['input'] != leads.identity():
+            raise ValueError(f'{checkpoint_path} belongs to a different input file or chunk size; '
+                             'rerun with restart to start over')
+        if state is not None and state.get('complete'):
+            return {**state, 'resumed': True, 'rows_per_second': None}
+
+        state = state or {'input': leads.identity(), 'output': os.path.abspath(output_path), 'position': None,
+                          'output_bytes': 0, 'rows': 0, 'statuses': {}, 'complete': False}
+        resumed = state['position'] is not None
+        if resumed and (not os.path.exists(output_path) or os.path.getsize(output_path) < state['output_bytes']):
+            raise ValueError(f'{output_path} is shorter than its checkpoint; rerun with restart to start over')
+        with open(output_path, 'r+b' if resumed else 'wb') as out:
+            out.truncate(state['output_bytes'])
+            out.seek(state['output_bytes'])
+            if not resumed and output_format == 'csv':
+                out.write(encode_header(output_fields))
+            self._score(leads, out, state, checkpoint_path, output_fields, output_format)
+        state['complete'] = True
+        write_checkpoint(checkpoint_path, state)
+        return state
+
+    def _score(self, leads: LeadFile, out, state: Dict[str, Any], checkpoint_path: str,
+               output_fields: List[str], output_format: str):
+        started, rows_at_start, reported = time.monotonic(), state['rows'], time.monotonic()
+        statuses = Counter(state['statuses'])
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.tables,)) as pool:
+            pending = deque()
+
+            def write_next():
+                nonlocal reported
+                position, future = pending.popleft()
+                text, rows, counts = future.result()
+                out.write(text.encode('utf-8'))
+                out.flush()
+                statuses.update(counts)
+                state.update(position=position, output_bytes=out.tell(), rows=state['rows'] + rows,
+                             statuses=dict(statuses))
+                write_checkpoint(checkpoint_path, state)
+                if self.progress and time.monotonic() - reported >= self.progress_seconds:
+                    reported = time.monotonic()
+                    self.progress(progress_report(leads, state, started, rows_at_start))
+
+            for chunk, position in leads.chunks(state['position']):
+                pending.append((position, pool.submit(score_chunk, chunk, output_fields, output_format)))
+                if len(pending) >= 2 * self.workers:
+                    write_next()
+            while pending:
+                write_next()
+        if self.progress:
+            self.progress(progress_report(leads, state, started, rows_at_start))
+        state['rows_per_second'] = progress_report(leads, state, started, rows_at_start)['rows_per_second']
+
+
+def encode_header(fieldnames: List[str]) -> bytes:
+    out = io.StringIO()
+    csv.writer(out, lineterminator='\n').writerow(fieldnames)
+    return out.getvalue().encode('utf-8')
+
+
+def progress_report(leads: LeadFile, state: Dict[str, Any], started: float, rows_at_start: int) -> Dict[str, Any]:
+    elapsed = time.monotonic() - started
+    position = state['position'] if state['position'] is not None else leads.start
+    done = (position - leads.start) / max(leads.end - leads.start, 1)
+    return {
+        'rows': state['rows'],
+        'invalid': state['statuses'].get('invalid', 0),
+        'fraction_done': round(done, 4),
+        'elapsed_seconds': round(elapsed, 1),
+        'rows_per_second': round((state['rows'] - rows_at_start) / elapsed) if elapsed > 0 else None
+    }
+
+
+def read_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_checkpoint(path: str, state: Dict[str, Any]):
+    """Replace the checkpoint atomically, so a kill never leaves half of one"""
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(f'{path}.tmp', path)
@@ -0,0 +1,150 @@
+# backend/utils/circuit_breaker.py
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+
+class CircuitBreaker:
+    """Per-provider circuit breaker with a rolling failure window
+
+    closed     calls go through; failures and slow calls are counted over the
+               last `window_seconds`, and reaching `failure_threshold` opens it
+    open       calls are rejected immediately for `reset_seconds`
+    half_open  a single trial call is let through; success closes the
+               breaker, failure (or a slow call) opens it again
+
+    is_failure decides which exceptions count against the provider; the
+    others (e.g. a 4xx for one bad request) are re-raised but recorded as
+    an answer from a healthy provider. A call the caller gave up on -
+    cancelled, or an error is_abandoned() picks out (e.g. the request's
+    deadline) - says nothing about the provider: it isn't recorded at all,
+    not even as a slow call, and a half-open trial slot it held is freed.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, window_seconds: float = 60,
+                 slow_call_seconds: float = 5, reset_seconds: float = 30,
+                 is_failure: Optional[Callable[[BaseException], bool]] = None,
+                 is_abandoned: Optional[Callable[[BaseException], bool]] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+        self.is_failure = is_failure or (lambda error: True)
+        self.is_abandoned = is_abandoned or (lambda error: False)
+        self._lock = threading.Lock()
+        self._failures = deque()
+        self._state = 'closed'
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._counts = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0, 'opened': 0}
+
+    def _open(self, now: float):
+        self._state = 'open'
+        self._opened_at = now
+        self._trial_in_flight = False
+        self._counts['opened'] += 1
+
+    def allow_request(self) -> bool:
+        """Whether a call may go to the provider now"""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == 'open' and now - self._opened_at >= self.reset_seconds:
+                self._state = 'half_open'
+            if self._state == 'closed':
+                allowed = True
+            elif self._state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                allowed = True
+            else:
+                allowed = False
+            self._counts['calls' if allowed else 'rejected'] += 1
+            return allowed
+
+    def record_success(self, elapsed: float = 0.0):
+        """Report a completed call; calls slower than slow_call_seconds count as failures"""
+        if elapsed >= self.slow_call_seconds:
+            with self._lock:
+                self._counts['slow_calls'] += 1
+            self.record_failure(counted=False)
+            return
+        with self._lock:
+            if self._state == 'half_open':
+                self._state = 'closed'
+                self._failures.clear()
+            self._trial_in_flight = False
+
+    def record_failure(self, counted: bool = True):
+        """Report a failed call"""
+        with self._lock:
+            now = time.monotonic()
+            if counted:
+                self._counts['failures'] += 1
+            if self._state == 'half_open':
+                self._open(now)
+                return
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window_seconds:
+                self._failures.popleft()
+            if self._state == 'closed' and len(self._failures) >= self.failure_threshold:
+                self._failures.clear()
+                self._open(now)
+
+    def release(self):
+        """Report a call that was abandoned; only frees the half-open trial slot"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _record_error(self, error: BaseException, elapsed: float):
+        if isinstance(error, asyncio.CancelledError) or self.is_abandoned(error):
+            self.release()
+        elif self.is_failure(error):
+            self.record_failure()
+        else:
+            self.record_success(elapsed)
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call fn through the breaker, raising CircuitOpenError when open"""
+        if not self.allow_request():
+            raise CircuitOpenError(f'{self.name} circuit is open')
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._record_error(e, time.monotonic() - start)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    async def call_async(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) through the breaker"""
+        if not self.allow_request():
+            raise CircuitOpenError(f'{self.name} circuit is open')
+        start = time.monotonic()
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            # Includes cancellation, so a half-open trial is never left dangling
+            self._record_error(e, time.monotonic() - start)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def state(self) -> Dict[str, Any]:
+        """Current state and counters, for monitoring"""
+        with self._lock:
+            state = self._state
+            if state == 'open' and time.monotonic() - self._opened_at >= self.reset_seconds:
+                state = 'half_open'
+            return {
+                'state': state,
+                'recent_failures': len(self._failures),
+                'failure_threshold': self.failure_threshold,
+                **self._counts
+            }
@@ -0,0 +1,97 @@
+# backend/utils/deadline.py
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Stages aren't started with less than this left; the call couldn't finish anyway
+MIN_STAGE_SECONDS = 0.05
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised instead of starting a stage once the request's budget is spent"""
+
+
+class Deadline:
+    """A fixed point in time (monotonic clock) by which a request must answer"""
+
+    def __init__(self, seconds: float, now: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = (time.monotonic() if now is None else now) + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() < MIN_STAGE_SECONDS
+
+
+# Carried through threads started with contextvars.copy_context() and asyncio tasks
+_current: contextvars.ContextVar = contextvars.ContextVar('request_deadline', default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def start_deadline(seconds: float) -> contextvars.Token:
+    """Set the deadline for the current context; pass the token to end_deadline"""
+    return _current.set(Deadline(seconds))
+
+
+def end_deadline(token: contextvars.Token):
+    _current.reset(token)
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    token = start_deadline(seconds)
+    try:
+        yield _current.get()
+    finally:
+        end_deadline(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left for the current request, or None without a deadline"""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def budget_spent() -> bool:
+    deadline = _current.get()
+    return deadline is not None and deadline.expired()
+
+
+def stage_timeout(default: float, stage: str = 'stage') -> float:
+    """A stage's own timeout capped at what is left of the request's budget
+
+    Raises DeadlineExceeded when too little is left to be worth starting.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    remaining = deadline.remaining()
+    if remaining < MIN_STAGE_SECONDS:
+        raise DeadlineExceeded(f'{stage} skipped: request deadline reached')
+    return min(default, remaining)
+
+
+def parse_deadlines(spec: str) -> Dict[str, float]:
+    """Per-endpoint budgets in seconds from 'endpoint=milliseconds,...'"""
+    deadlines = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        name, _, value = item.partition('=')
+        deadlines[name.strip()] = float(value) / 1000
+    return deadlines
+
+
+def requested_seconds(header: Optional[str]) -> Optional[float]:
+    """A client's budget from an X-Request-Timeout-Ms header, or None if absent or invalid"""
+    try:
+        value = float(header) / 1000
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
@@ -0,0 +1,360 @@
+# backend/utils/gemini_dispatcher.py
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class QueueTimeoutError(TimeoutError):
+    """Raised when a request waited longer than max_queue_seconds (or its own timeout) for a slot"""
+
+
+def split_batch_response(parsed: Any, count: int) -> List[Any]:
+    """Map an indexed JSON array back to per-request results
+
+    Entries that are missing or malformed come back as exceptions so only
+    those requests fall back.
+    """
+    results = [ValueError('Applicant missing from batch response')] * count
+    if not isinstance(parsed, list):
+        return [ValueError('Batch response is not a JSON array')] * count
+    for item in parsed:
+        if isinstance(item, dict) and isinstance(item.get('index'), int) and 0 <= item['index'] < count:
+            index = item.pop('index')
+            results[index] = item
+    return results
+
+
+def call_record(started: float, batch_size: int, usage: Dict[str, Any]) -> Dict[str, Any]:
+    """Latency, batch size and token counts of one model call"""
+    return {'latency_ms': round((time.monotonic() - started) * 1000, 1), 'batch_size': batch_size, **(usage or {})}
+
+
+class _Job:
+    __slots__ = ('prompt', 'enqueued_at', 'started', 'cancelled', 'done', 'result', 'error')
+
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.enqueued_at = time.monotonic()
+        self.started = False
+        self.cancelled = False
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _DispatcherStats:
+    """Counters shared by the thread and asyncio dispatchers"""
+
+    def __init__(self, max_concurrency: int, max_queue_seconds: float, batch_size: int, batch_wait_seconds: float,
+                 build_batch: Optional[Callable[[List[str]], str]] = None):
+        if batch_size > 1 and build_batch is None:
+            raise ValueError('batch_size > 1 needs a build_batch function')
+        self.max_concurrency = max_concurrency
+        self.max_queue_seconds = max_queue_seconds
+        self.batch_size = max(1, batch_size)
+        self.batch_wait_seconds = batch_wait_seconds
+        self.build_batch = build_batch
+        self._stats_lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._counts = {'submitted': 0, 'completed': 0, 'errors': 0, 'queue_timeouts': 0, 'abandoned': 0,
+                        'calls': 0, 'batches': 0, 'batched_requests': 0,
+                        'prompt_tokens': 0, 'response_tokens': 0}
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._counts[name] += amount
+
+    def _record_usage(self, call: Dict[str, Any]):
+        with self._stats_lock:
+            self._counts['prompt_tokens'] += call.get('prompt_tokens') or 0
+            self._counts['response_tokens'] += call.get('response_tokens') or 0
+
+    def _record_wait(self, waited: float, count: int = 1):
+        with self._stats_lock:
+            self._queue_wait_total += waited * count
+            self._queue_wait_max = max(self._queue_wait_max, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        """Concurrency, queueing and batching counters, for monitoring"""
+        with self._stats_lock:
+            started = self._counts['calls'] + self._counts['batched_requests']
+            return {
+                'max_concurrency': self.max_concurrency,
+                'max_queue_seconds': self.max_queue_seconds,
+                'batch_size': self.batch_size,
+                'active_calls': self._active,
+                'queued': self._queued,
+                'avg_queue_wait_ms': round(self._queue_wait_total / started * 1000, 1) if started else 0.0,
+                'max_queue_wait_ms': round(self._queue_wait_max * 1000, 1),
+                **self._counts
+            }
+
+
+class GeminiDispatcher(_DispatcherStats):
+    """Bounded-concurrency dispatcher for blocking Gemini calls
+
+    At most `max_concurrency` calls are in flight; other requests wait in a
+    FIFO queue and give up with QueueTimeoutError after `max_queue_seconds`
+    so a burst degrades to the fallback calculation instead of a pile of quota
+    errors. With `batch_size` > 1 a worker collects up to that many queued
+    prompts (waiting at most `batch_wait_seconds` for stragglers) and sends
+    them as one call, packed by `build_batch`.
+
+    `generate(prompt, batched)` returns the model's response text and a dict
+    of token counts, `parse(text)` decodes it and `build_batch(prompts)` packs
+    prompts for a batched call; its answer is an array with each result's
+    index. Batching only pays off when build_batch sends the instructions
+    the prompts share once, not once per prompt. submit() returns the parsed result with a
+    record of the call that produced it; a submit() timeout (the request's
+    remaining budget) bounds the caller's whole wait, after which the call
+    is abandoned to finish in the background. Worker threads start on first
+    use so a pre-forking master never owns them.
+    """
+
+    def __init__(self, generate: Callable[[str, bool], Tuple[str, Dict[str, Any]]], parse: Callable[[str], Any],
+                 max_concurrency: int = 4, max_queue_seconds: float = 10,
+                 batch_size: int = 1, batch_wait_seconds: float = 0.05,
+                 build_batch: Optional[Callable[[List[str]], str]] = None):
+        super().__init__(max_concurrency, max_queue_seconds, batch_size, batch_wait_seconds, build_batch)
+        self.generate = generate
+        self.parse = parse
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._workers = []
+
+    def _ensure_workers(self):
+        if len(self._workers) < self.max_concurrency:
+            for i in range(len(self._workers), self.max_concurrency):
+                worker = threading.Thread(target=self._run, name=f'gemini-dispatch-{i}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, prompt: str, timeout: Optional[float] = None) -> Tuple[Any, Dict[str, Any]]:
+        """Run one prompt through the dispatcher; returns (parsed result, call record)"""
+        job = _Job(prompt)
+        self._count('submitted')
+        queue_seconds = self.max_queue_seconds if timeout is None else min(self.max_queue_seconds, timeout)
+        with self._cond:
+            self._ensure_workers()
+            self._queue.append(job)
+            with self._stats_lock:
+                self._queued += 1
+            self._cond.notify()
+        if not job.done.wait(queue_seconds):
+            with self._cond:
+                if not job.started:
+                    job.cancelled = True
+                    self._queue.remove(job)
+                    with self._stats_lock:
+                        self._queued -= 1
+            if job.cancelled:
+                self._count('queue_timeouts')
+                raise QueueTimeoutError(f'Gemini request queued for over {queue_seconds:g}s')
+            remaining = None if timeout is None else max(job.enqueued_at + timeout - time.monotonic(), 0)
+            if not job.done.wait(remaining):
+                self._count('abandoned')
+                raise TimeoutError(f'Gemini call did not finish within {timeout:g}s')
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _take_batch(self) -> List[_Job]:
+        """Block for the next job, then collect more up to batch_size (caller holds _cond)"""
+        while not self._queue:
+            self._cond.wait()
+        jobs = []
+        deadline = time.monotonic() + self.batch_wait_seconds
+        while len(jobs) < self.batch_size:
+            if not self._queue:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                continue
+            job = self._queue.popleft()
+            # Once taken off the queue the submitter waits for the result
+            job.started = True
+            jobs.append(job)
+            with self._stats_lock:
+                self._queued -= 1
+        now = time.monotonic()
+        for job in jobs:
+            self._record_wait(now - job.enqueued_at)
+        return jobs
+
+    def _run(self):
+        while True:
+            with self._cond:
+                jobs = self._take_batch()
+            with self._stats_lock:
+                self._active += 1
+            try:
+                self._execute(jobs)
+            finally:
+                with self._stats_lock:
+                    self._active -= 1
+                for job in jobs:
+                    job.done.set()
+
+    def _execute(self, jobs: List[_Job]):
+        started = time.monotonic()
+        try:
+            if len(jobs) == 1:
+                self._count('calls')
+                text, usage = self.generate(jobs[0].prompt, False)
+                results = [self.parse(text)]
+            else:
+                self._count('batches')
+                self._count('batched_requests', len(jobs))
+                text, usage = self.generate(self.build_batch([job.prompt for job in jobs]), True)
+                results = split_batch_response(self.parse(text), len(jobs))
+            call = call_record(started, len(jobs), usage)
+            self._record_usage(call)
+        except Exception as e:
+            results = [e] * len(jobs)
+        for job, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                job.error = result
+                self._count('errors')
+            else:
+                job.result = (result, call)
+                self._count('completed')
+
+
+class AsyncGeminiDispatcher(_DispatcherStats):
+    """asyncio twin of GeminiDispatcher for the async request path
+
+    `generate(prompt, batched)` is awaited. Concurrency is bounded with a
+    semaphore; batching collects prompts submitted within `batch_wait_seconds`
+    of each other, up to `batch_size`.
+    """
+
+    def __init__(self, generate: Callable[[str, bool], Awaitable[Tuple[str, Dict[str, Any]]]],
+                 parse: Callable[[str], Any], max_concurrency: int = 4, max_queue_seconds: float = 10,
+                 batch_size: int = 1, batch_wait_seconds: float = 0.05,
+                 build_batch: Optional[Callable[[List[str]], str]] = None):
+        super().__init__(max_concurrency, max_queue_seconds, batch_size, batch_wait_seconds, build_batch)
+        self.generate = generate
+        self.parse = parse
+        self._semaphore = None
+        self._pending = []
+        self._flush_handle = None
+        # The loop only keeps weak references to tasks; hold batches until they finish
+        self._tasks = set()
+
+    async def _acquire(self, enqueued_at: float, count: int = 1):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        with self._stats_lock:
+            self._queued += count
+        try:
+            remaining = self.max_queue_seconds - (time.monotonic() - enqueued_at)
+            await asyncio.wait_for(self._semaphore.acquire(), max(remaining, 0))
+        except asyncio.TimeoutError:
+            self._count('queue_timeouts', count)
+            raise QueueTimeoutError(f'Gemini request queued for over {self.max_queue_seconds}s') from None
+        finally:
+            with self._stats_lock:
+                self._queued -= count
+        self._record_wait(time.monotonic() - enqueued_at, count)
+
+    async def _call(self, prompt: str, batch_size: int = 1):
+        """Call the model (holding an acquired slot) and return (parsed, call record)"""
+        with self._stats_lock:
+            self._active += 1
+        started = time.monotonic()
+        try:
+            text, usage = await self.generate(prompt, batch_size > 1)
+            parsed = self.parse(text)
+            call = call_record(started, batch_size, usage)
+            self._record_usage(call)
+            return parsed, call
+        finally:
+            with self._stats_lock:
+                self._active -= 1
+            self._semaphore.release()
+
+    async def submit(self, prompt: str, timeout: Optional[float] = None) -> Tuple[Any, Dict[str, Any]]:
+        """Run one prompt through the dispatcher; returns (parsed result, call record)
+
+        A timeout bounds the whole wait; the call is cancelled when it runs out.
+        """
+        if timeout is None:
+            return await self._submit(prompt)
+        try:
+            return await asyncio.wait_for(self._submit(prompt), timeout)
+        except QueueTimeoutError:
+            raise
+        except asyncio.TimeoutError:
+            self._count('abandoned')
+            raise TimeoutError(f'Gemini call did not finish within {timeout:g}s') from None
+
+    async def _submit(self, prompt: str) -> Tuple[Any, Dict[str, Any]]:
+        self._count('submitted')
+        if self.batch_size > 1:
+            return await self._submit_batched(prompt)
+        await self._acquire(time.monotonic())
+        self._count('calls')
+        try:
+            result = await self._call(prompt)
+        except Exception:
+            self._count('errors')
+            raise
+        self._count('completed')
+        return result
+
+    async def _submit_batched(self, prompt: str) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((prompt, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_wait_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        prompts = [prompt for prompt, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            await self._acquire(time.monotonic() - self.batch_wait_seconds, len(batch))
+        except QueueTimeoutError as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        try:
+            if len(batch) == 1:
+                self._count('calls')
+                parsed, call = await self._call(prompts[0])
+                results = [parsed]
+            else:
+                self._count('batches')
+                self._count('batched_requests', len(batch))
+                parsed, call = await self._call(self.build_batch(prompts), len(batch))
+                results = split_batch_response(parsed, len(batch))
+        except Exception as e:
+            results = [e] * len(batch)
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                self._count('errors')
+                future.set_exception(result)
+            else:
+                self._count('completed')
+                future.set_result((result, call))
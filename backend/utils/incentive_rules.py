@@ -0,0 +1,213 @@
+# backend/utils/incentive_rules.py
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+
+FEDERAL = 'US'
+STATES = [
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA', 'KS',
+    'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC',
+    'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
+]
+DEFAULT_COST_PER_WATT = 2.75
+DEFAULT_COSTS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'processed', 'install_costs.csv'
+)
+# The calculator's original built-in table: 30% federal credit plus capped state percentages
+DEFAULT_INCENTIVES = [
+    {'state': FEDERAL, 'incentive_type': 'tax_credit', 'percentage': 30.0},
+    {'state': 'CA', 'incentive_type': 'rebate', 'percentage': 5.0, 'max_amount': 1000.0},
+    {'state': 'NY', 'incentive_type': 'tax_credit', 'percentage': 10.0, 'max_amount': 5000.0},
+    {'state': 'IL', 'incentive_type': 'rebate', 'percentage': 7.0, 'max_amount': 3000.0}
+]
+
+
+def _normalise(incentive: Dict[str, Any]) -> Dict[str, Any]:
+    """Incentive row as (state, percentage, flat amount, cap, expiry date) with defaults filled in"""
+    expires = incentive.get('expires')
+    if isinstance(expires, datetime):
+        expires = expires.date()
+    elif isinstance(expires, str):
+        expires = datetime.fromisoformat(expires).date()
+    return {
+        'state': (incentive.get('state') or FEDERAL).upper(),
+        'incentive_type': incentive.get('incentive_type') or 'rebate',
+        'percentage': float(incentive.get('percentage') or 0.0),
+        'amount': float(incentive.get('amount') or 0.0),
+        'max_amount': float(incentive['max_amount']) if incentive.get('max_amount') is not None else None,
+        'expires': expires
+    }
+
+
+def _compile_state(cost_per_watt: float, federal: List[tuple], state: List[tuple]) -> Callable[[float], Dict[str, float]]:
+    """Evaluator for one state with its rules bound as plain floats
+
+    Rules are (rate, flat amount, cap) with the percentage already divided
+    by 100, so a call is a handful of float operations and no lookups.
+    """
+    def evaluate(system_size_kw: float) -> Dict[str, float]:
+        gross_cost = system_size_kw * 1000 * cost_per_watt
+        federal_credit = 0.0
+        for rate, amount, cap in federal:
+            value = gross_cost * rate + amount
+            federal_credit += value if value < cap else cap
+        state_credit = 0.0
+        for rate, amount, cap in state:
+            value = gross_cost * rate + amount
+            state_credit += value if value < cap else cap
+        return {
+            'gross_cost': round(gross_cost, 2),
+            'federal_credit': round(federal_credit, 2),
+            'state_credit': round(state_credit, 2),
+            'net_cost': round(gross_cost - federal_credit - state_credit, 2)
+        }
+    return evaluate
+
+
+class IncentiveRules:
+    """Installed cost and incentives compiled into one evaluator per state
+
+    Each rule is (percentage of gross cost + flat amount), capped at max_amount.
+    Expired rules are dropped at compile time; valid_until is the next expiry,
+    after which the rules must be recompiled. States without a cost per watt
+    use the national default, and unknown state codes get federal incentives only.
+    """
+
+    def __init__(self, incentives: Sequence[Dict[str, Any]], costs_per_watt: Optional[Dict[str, float]] = None,
+                 default_cost_per_watt: float = DEFAULT_COST_PER_WATT, today: Optional[date] = None):
+        today = today or date.today()
+        rules = [_normalise(i) for i in incentives]
+        active = [r for r in rules if r['expires'] is None or r['expires'] >= today]
+        self.incentives = active
+        self.costs_per_watt = {state.upper(): float(cost) for state, cost in (costs_per_watt or {}).items()}
+        self.default_cost_per_watt = default_cost_per_watt
+        self.valid_until = min((r['expires'] for r in active if r['expires'] is not None), default=None)
+        self.fingerprint = hashlib.sha256(json.dumps({
+            'incentives': sorted(([r['state'], r['incentive_type'], r['percentage'], r['amount'], r['max_amount']]
+                                  for r in active), key=json.dumps),
+            'costs_per_watt': self.costs_per_watt,
+            'default_cost_per_watt': default_cost_per_watt
+        }, sort_keys=True).encode('utf-8')).hexdigest()
+
+        def terms(state):
+            return [(r['percentage'] / 100, r['amount'], r['max_amount'] if r['max_amount'] is not None else float('inf'))
+                    for r in active if r['state'] == state]
+
+        federal = terms(FEDERAL)
+        states = sorted((set(STATES) | {r['state'] for r in active} | set(self.costs_per_watt)) - {FEDERAL})
+        self._evaluators = {
+            state: _compile_state(self.costs_per_watt.get(state, default_cost_per_watt), federal, terms(state))
+            for state in states
+        }
+        self._national = _compile_state(default_cost_per_watt, federal, [])
+
+        # Padded per-state arrays for evaluate_many; row 0 is the national fallback
+        self._state_index = {state: i + 1 for i, state in enumerate(states)}
+        per_state = [[]] + [terms(state) for state in states]
+        width = max(1, max(len(t) for t in per_state))
+        self._cost = np.array([default_cost_per_watt] + [self.costs_per_watt.get(s, default_cost_per_watt)
+                                                         for s in states])
+        self._rules = np.zeros((len(per_state), width, 3))
+        self._rules[..., 2] = np.inf
+        for i, state_terms in enumerate(per_state):
+            if state_terms:
+                self._rules[i, :len(state_terms)] = state_terms
+        self._federal = np.array(federal, dtype=np.float64).reshape(-1, 3)
+
+    def is_expired(self, today: Optional[date] = None) -> bool:
+        return self.valid_until is not None and (today or date.today()) > self.valid_until
+
+    def evaluate(self, system_size_kw: float, state: Optional[str] = None) -> Dict[str, float]:
+        """Gross cost, credits and net cost for one system"""
+        return self._evaluators.get(state, self._national)(system_size_kw)
+
+    def evaluate_many(self, system_sizes_kw, states) -> Dict[str, np.ndarray]:
+        """evaluate() over arrays of sizes and state codes (or one state for all)"""
+        sizes = np.atleast_1d(np.asarray(system_sizes_kw, dtype=np.float64))
+        if isinstance(states, str) or states is None:
+            index = np.full(sizes.shape, self._state_index.get(states, 0))
+        else:
+            codes, inverse = np.unique(np.asarray(states).astype(str), return_inverse=True)
+            index = np.array([self._state_index.get(code, 0) for code in codes])[inverse.reshape(-1)]
+        gross = sizes * 1000 * self._cost[index]
+        federal = np.zeros_like(gross)
+        for rate, amount, cap in self._federal:
+            federal += np.minimum(cap, gross * rate + amount)
+        rules = self._rules[index]
+        state = np.minimum(rules[..., 2], gross[:, None] * rules[..., 0] + rules[..., 1]).sum(axis=1)
+        return {
+            'gross_cost': np.round(gross, 2),
+            'federal_credit': np.round(federal, 2),
+            'state_credit': np.round(state, 2),
+            'net_cost': np.round(gross - federal - state, 2)
+        }
+
+
+DEFAULT_RULES = IncentiveRules(DEFAULT_INCENTIVES)
+
+
+def load_install_costs(path: str = DEFAULT_COSTS_PATH) -> Dict[str, float]:
+    """state -> cost_per_watt from install_costs.csv (see collect_solar_data.create_sample_data_files)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['state']: float(row['cost_per_watt']) for row in csv.DictReader(f)
+                if row.get('state') and row.get('cost_per_watt')}
+
+
+def load_incentives(db) -> List[Dict[str, Any]]:
+    """Rows of the solar_incentives table, in the form IncentiveRules takes"""
+    from database.schema import SolarIncentive
+    return [
+        {
+            'state': row.state,
+            'incentive_type': row.incentive_type,
+            'percentage': row.percentage,
+            'amount': row.amount,
+            'max_amount': row.max_amount,
+            'expires': row.expires
+        }
+        for row in db.query(SolarIncentive).all()
+    ]
+
+
+def load_incentive_rules(db, costs_path: str = DEFAULT_COSTS_PATH, today: Optional[date] = None) -> IncentiveRules:
+    """Rules from the solar_incentives table and install cost file"""
+    return IncentiveRules(load_incentives(db), load_install_costs(costs_path), today=today)
+
+
+class IncentiveRulesCache:
+    """Compiled rules, re-read from their source at most every reload_seconds
+
+    The rules are only recompiled when the source data's fingerprint changes
+    or an incentive expires; concurrent callers share one reload.
+    """
+
+    def __init__(self, loader: Callable[[], IncentiveRules], reload_seconds: float = 60.0):
+        self.loader = loader
+        self.reload_seconds = reload_seconds
+        self._rules: Optional[IncentiveRules] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def get(self) -> IncentiveRules:
+        rules = self._rules
+        if rules is not None and time.monotonic() - self._checked_at < self.reload_seconds and not rules.is_expired():
+            return rules
+        with self._lock:
+            if self._rules is None or time.monotonic() - self._checked_at >= self.reload_seconds \
+                    or self._rules.is_expired():
+                fresh = self.loader()
+                if self._rules is None or self._rules.is_expired() or fresh.fingerprint != self._rules.fingerprint:
+                    self._rules = fresh
+                    self.reloads += 1
+                self._checked_at = time.monotonic()
+            return self._rules
@@ -0,0 +1,184 @@
+# backend/utils/irradiance.py
+import json
+import os
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from utils.solar_calculator import SolarCalculator
+
+DEFAULT_IRRADIANCE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'irradiance_grid'
+)
+DEFAULT_TILT = 20.0      # degrees from horizontal, a typical pitched residential roof
+DEFAULT_AZIMUTH = 180.0  # degrees clockwise from north (180 = due south)
+ALBEDO = 0.2
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.float64)
+# Klein's representative day of the year for each month's mean daily irradiance
+MEAN_DAYS = np.array([17, 47, 75, 105, 135, 162, 198, 228, 258, 288, 318, 344], dtype=np.float64)
+STEPS_PER_DAY = 96  # 15-minute steps when integrating over the day
+
+
+def build_irradiance_grid(points: Iterable[Tuple[float, float, Sequence[float]]], step: float,
+                          path: str = DEFAULT_IRRADIANCE_PATH, source: str = '') -> dict:
+    """Write (lat, lon, 12 monthly GHI values) points to a regular grid at path(.npy/.json)
+
+    GHI is the monthly mean daily global horizontal irradiance in kWh/m²/day
+    (i.e. peak sun hours on a flat surface). Points are snapped to the
+    nearest cell of a step-degree lattice; cells without data are NaN.
+    """
+    points = [(float(lat), float(lon), [float(v) for v in monthly]) for lat, lon, monthly in points]
+    if not points:
+        raise ValueError('No irradiance points to build a grid from')
+    if any(len(monthly) != 12 for _, _, monthly in points):
+        raise ValueError('Every point needs 12 monthly GHI values')
+    lats = np.array([p[0] for p in points])
+    lons = np.array([p[1] for p in points])
+    lat_min, lon_min = float(lats.min()), float(lons.min())
+    rows = np.rint((lats - lat_min) / step).astype(np.int64)
+    cols = np.rint((lons - lon_min) / step).astype(np.int64)
+    shape = (int(rows.max()) + 1, int(cols.max()) + 1, 12)
+
+    # Write to a temporary file and swap it in so readers never map a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp.npy'
+    grid = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=shape)
+    grid[:] = np.nan
+    grid[rows, cols] = np.array([p[2] for p in points], dtype=np.float32)
+    grid.flush()
+    del grid
+
+    meta = {'lat_min': lat_min, 'lon_min': lon_min, 'step': step, 'shape': list(shape),
+            'points': len(points), 'source': source}
+    with open(f'{path}.json.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, f'{path}.npy')
+    os.replace(f'{path}.json.tmp', f'{path}.json')
+    return meta
+
+
+def _erbs_diffuse_fraction(kt: np.ndarray) -> np.ndarray:
+    """Diffuse share of global irradiance for a clearness index (Erbs et al.)"""
+    middle = 0.9511 - 0.1604 * kt + 4.388 * kt ** 2 - 16.638 * kt ** 3 + 12.336 * kt ** 4
+    return np.where(kt <= 0.22, 1 - 0.09 * kt, np.where(kt <= 0.8, middle, 0.165))
+
+
+@lru_cache(maxsize=4096)
+def plane_of_array_ratio(latitude: float, monthly_ghi: Tuple[float, ...], tilt: float = DEFAULT_TILT,
+                         azimuth: float = DEFAULT_AZIMUTH, albedo: float = ALBEDO) -> Tuple[float, ...]:
+    """Ratio of tilted-panel to horizontal irradiance for each month
+
+    Integrates a representative day per month in 15-minute steps: global
+    irradiance follows the extraterrestrial profile scaled by the month's
+    clearness index, is split into beam and diffuse with the Erbs
+    correlation and transposed with an isotropic sky and ground reflection.
+    """
+    phi = np.radians(latitude)
+    beta = np.radians(tilt)
+    gamma = np.radians(azimuth)
+    days = MEAN_DAYS[:, None]
+    declination = np.radians(23.45) * np.sin(2 * np.pi * (284 + days) / 365)
+    omega = np.linspace(-np.pi, np.pi, STEPS_PER_DAY, endpoint=False)[None, :] + np.pi / STEPS_PER_DAY
+
+    # Sun direction as (east, north, up) unit vectors
+    sun_east = -np.cos(declination) * np.sin(omega)
+    sun_north = np.cos(phi) * np.sin(declination) - np.sin(phi) * np.cos(declination) * np.cos(omega)
+    sun_up = np.sin(phi) * np.sin(declination) + np.cos(phi) * np.cos(declination) * np.cos(omega)
+    daylight = sun_up > 0
+
+    normal_extraterrestrial = 1367 * (1 + 0.033 * np.cos(2 * np.pi * days / 365))
+    horizontal_extraterrestrial = np.where(daylight, normal_extraterrestrial * sun_up, 0.0)
+    daily_extraterrestrial = horizontal_extraterrestrial.sum(axis=1) * 24 / STEPS_PER_DAY / 1000
+
+    ghi = np.asarray(monthly_ghi, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        clearness = np.clip(np.where(daily_extraterrestrial > 0, ghi / daily_extraterrestrial, 0.0), 0, 1)
+    diffuse_fraction = _erbs_diffuse_fraction(clearness)[:, None]
+
+    cos_incidence = (sun_east * np.sin(beta) * np.sin(gamma) + sun_north * np.sin(beta) * np.cos(gamma)
+                     + sun_up * np.cos(beta))
+    # Beam on the panel per unit of global horizontal: (1 - fd) * G0n * cos(incidence) / sum(G0)
+    beam = (1 - diffuse_fraction) * np.where(daylight, normal_extraterrestrial * np.maximum(cos_incidence, 0), 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beam_ratio = beam.sum(axis=1) / horizontal_extraterrestrial.sum(axis=1)
+    beam_ratio = np.nan_to_num(beam_ratio)
+    sky_ratio = diffuse_fraction[:, 0] * (1 + np.cos(beta)) / 2
+    ground_ratio = albedo * (1 - np.cos(beta)) / 2
+    return tuple((beam_ratio + sky_ratio + ground_ratio).tolist())
+
+
+def monthly_production_kwh(latitude: float, monthly_ghi: Sequence[float], system_size_kw: float,
+                           tilt: float = DEFAULT_TILT, azimuth: float = DEFAULT_AZIMUTH) -> List[float]:
+    """AC energy per calendar month for a system of system_size_kw"""
+    ratio = np.array(plane_of_array_ratio(round(latitude, 2), tuple(float(v) for v in monthly_ghi),
+                                          float(tilt), float(azimuth)))
+    poa = np.asarray(monthly_ghi, dtype=np.float64) * ratio
+    return (system_size_kw * poa * DAYS_IN_MONTH * SolarCalculator.SYSTEM_EFFICIENCY).tolist()
+
+
+def effective_sun_hours(monthly_kwh: Sequence[float], system_size_kw: float) -> float:
+    """Daily sun hours that make SolarCalculator reproduce this annual output"""
+    return sum(monthly_kwh) / (365 * system_size_kw * SolarCalculator.SYSTEM_EFFICIENCY)
+
+
+class IrradianceGrid:
+    """Read-only, memory-mapped monthly GHI on a regular lat/lon lattice
+
+    The lattice is its own spatial index: a coordinate maps to its cell by
+    arithmetic, so a lookup reads the four surrounding cells and nothing else.
+    """
+
+    def __init__(self, grid: np.ndarray, meta: dict):
+        self.grid = grid
+        self.lat_min = meta['lat_min']
+        self.lon_min = meta['lon_min']
+        self.step = meta['step']
+        self.source = meta.get('source', '')
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_IRRADIANCE_PATH) -> Optional['IrradianceGrid']:
+        """Open the grid if it has been built, otherwise return None"""
+        if not (os.path.exists(f'{path}.npy') and os.path.exists(f'{path}.json')):
+            return None
+        with open(f'{path}.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(np.load(f'{path}.npy', mmap_mode='r'), meta)
+
+    def monthly_ghi(self, latitude: float, longitude: float) -> Optional[List[float]]:
+        """Bilinearly interpolated monthly GHI, or None outside the data's coverage
+
+        Cells without data are left out and the remaining weights renormalised,
+        so points on a coastline or the edge of the dataset still resolve.
+        """
+        rows, cols = self.grid.shape[:2]
+        y = (latitude - self.lat_min) / self.step
+        x = (longitude - self.lon_min) / self.step
+        if not (-0.5 <= y <= rows - 0.5 and -0.5 <= x <= cols - 0.5):
+            return None
+        r = min(max(int(np.floor(y)), 0), max(rows - 2, 0))
+        c = min(max(int(np.floor(x)), 0), max(cols - 2, 0))
+        ty = min(max(y - r, 0.0), 1.0) if rows > 1 else 0.0
+        tx = min(max(x - c, 0.0), 1.0) if cols > 1 else 0.0
+        cell = np.asarray(self.grid[r:r + 2, c:c + 2], dtype=np.float64)
+        weights = np.outer([1 - ty, ty][:cell.shape[0]], [1 - tx, tx][:cell.shape[1]])
+        weights = np.where(np.isnan(cell[..., 0]), 0.0, weights)
+        if weights.sum() <= 0:
+            return None
+        values = np.nansum(cell * weights[..., None], axis=(0, 1)) / weights.sum()
+        return values.tolist()
+
+    def monthly_production(self, latitude: float, longitude: float, system_size_kw: float,
+                           tilt: float = DEFAULT_TILT, azimuth: float = DEFAULT_AZIMUTH) -> Optional[List[float]]:
+        """Monthly kWh for a system at these coordinates, or None without coverage"""
+        ghi = self.monthly_ghi(latitude, longitude)
+        if ghi is None:
+            return None
+        return monthly_production_kwh(latitude, ghi, system_size_kw, tilt, azimuth)
+
+    def sun_hours(self, latitude: float, longitude: float, tilt: float = DEFAULT_TILT,
+                  azimuth: float = DEFAULT_AZIMUTH) -> Optional[float]:
+        """Equivalent daily sun hours on the panel plane for SolarCalculator"""
+        production = self.monthly_production(latitude, longitude, 1.0, tilt, azimuth)
+        if production is None:
+            return None
+        return effective_sun_hours(production, 1.0)
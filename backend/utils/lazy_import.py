@@ -0,0 +1,43 @@
+# backend/utils/lazy_import.py
+import importlib
+import threading
+import time
+from types import ModuleType
+from typing import Dict
+
+
+# Seconds spent importing each lazily loaded module, for startup reporting
+import_timings: Dict[str, float] = {}
+_import_lock = threading.Lock()
+
+
+class LazyModule(ModuleType):
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with _import_lock:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    import_timings[self.__name__] = round(time.perf_counter() - start, 4)
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__['_lazy_module'] is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+
+def lazy_module(name: str) -> LazyModule:
+    """Return a proxy for `name` that defers the import until it is used"""
+    return LazyModule(name)
@@ -0,0 +1,151 @@
+# backend/utils/log_policy.py
+import json
+import random
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+TRUNCATED = '...'
+
+
+def parse_rates(spec: str) -> Dict[str, float]:
+    """Per-endpoint sample rates from 'endpoint=rate,...', each clamped to 0..1"""
+    rates = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        name, _, value = item.partition('=')
+        rates[name.strip()] = min(max(float(value), 0.0), 1.0)
+    return rates
+
+
+def trim_payload(value: Any, max_string: int = 300, max_items: int = 20, max_depth: int = 4) -> Tuple[Any, bool]:
+    """A copy of value with long strings, long lists and deep nesting cut short
+
+    Returns (trimmed value, whether anything was cut). Cut lists end with a
+    note of how many items were dropped; cut strings end with '...'.
+    """
+    if isinstance(value, str):
+        if len(value) > max_string:
+            return value[:max_string] + TRUNCATED, True
+        return value, False
+    if isinstance(value, (dict, list, tuple)) and max_depth <= 0:
+        return f'<{type(value).__name__} of {len(value)}>', True
+    if isinstance(value, dict):
+        trimmed, cut = {}, len(value) > max_items
+        for key in list(value)[:max_items]:
+            trimmed[key], item_cut = trim_payload(value[key], max_string, max_items, max_depth - 1)
+            cut = cut or item_cut
+        return trimmed, cut
+    if isinstance(value, (list, tuple)):
+        trimmed, cut = [], len(value) > max_items
+        for item in value[:max_items]:
+            item, item_cut = trim_payload(item, max_string, max_items, max_depth - 1)
+            trimmed.append(item)
+            cut = cut or item_cut
+        if len(value) > max_items:
+            trimmed.append(f'<{len(value) - max_items} more>')
+        return trimmed, cut
+    return value, False
+
+
+class LogPolicy:
+    """Decides how much of each request is written to the logs
+
+    Successful requests are sampled per endpoint (sample_rates, falling back
+    to default_rate); errors and degraded responses are always logged.
+    Kept records are cut down to the endpoint's field allowlist for the
+    response and extra data (endpoints without one keep every field), then
+    trimmed so that no record exceeds max_record_bytes. Sampled records
+    carry their sample_rate so counts can be scaled back up.
+    """
+
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None, default_rate: float = 1.0,
+                 allowlists: Optional[Dict[str, Dict[str, Iterable[str]]]] = None,
+                 max_record_bytes: int = 4096, max_string: int = 300, max_items: int = 20,
+                 rng: Optional[Callable[[], float]] = None):
+        self.sample_rates = dict(sample_rates or {})
+        self.default_rate = default_rate
+        self.allowlists = {endpoint: {section: frozenset(fields) for section, fields in sections.items()}
+                           for endpoint, sections in (allowlists or {}).items()}
+        self.max_record_bytes = max_record_bytes
+        self.max_string = max_string
+        self.max_items = max_items
+        self.rng = rng or random.random
+        self._lock = threading.Lock()
+        self._counts = {'logged': 0, 'sampled_out': 0, 'trimmed': 0, 'bytes': 0}
+
+    def sample_rate(self, endpoint: str) -> float:
+        return self.sample_rates.get(endpoint, self.default_rate)
+
+    def should_log(self, endpoint: str, response_data: Optional[Dict[str, Any]] = None) -> Tuple[bool, float]:
+        """(log this request?, rate it was sampled at); degraded responses are never dropped"""
+        if response_data and response_data.get('degraded'):
+            return True, 1.0
+        rate = self.sample_rate(endpoint)
+        if rate >= 1.0 or self.rng() < rate:
+            return True, rate
+        with self._lock:
+            self._counts['sampled_out'] += 1
+        return False, rate
+
+    def project(self, endpoint: str, section: str, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """data reduced to the endpoint's allowed fields for section"""
+        if not data:
+            return {}
+        allowed = self.allowlists.get(endpoint, {}).get(section)
+        if allowed is None:
+            return dict(data)
+        return {key: value for key, value in data.items() if key in allowed}
+
+    def record(self, endpoint: str, zip_code: str, response_data: Dict[str, Any],
+               extra_data: Optional[Dict[str, Any]], timestamp: str) -> Optional[Dict[str, Any]]:
+        """The canonical log record for one request, or None if it was sampled out"""
+        keep, rate = self.should_log(endpoint, response_data)
+        if not keep:
+            return None
+        entry = {
+            'timestamp': timestamp,
+            'endpoint': endpoint,
+            'zip_code': zip_code,
+            'response_data': self.project(endpoint, 'response_data', response_data),
+            'extra_data': self.project(endpoint, 'extra_data', extra_data)
+        }
+        if rate < 1.0:
+            entry['sample_rate'] = rate
+        entry, size = self.fit(entry)
+        with self._lock:
+            self._counts['logged'] += 1
+            self._counts['bytes'] += size
+        return entry
+
+    def fit(self, entry: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """entry trimmed to max_record_bytes, tightening the caps until it fits; returns it and its size"""
+        max_string, max_items, trimmed = self.max_string, self.max_items, False
+        for section in ('response_data', 'extra_data', 'input_data', 'ai_result'):
+            if section in entry:
+                entry[section], cut = trim_payload(entry[section], max_string, max_items)
+                trimmed = trimmed or cut
+        size = len(json.dumps(entry))
+        while size > self.max_record_bytes and max_string > 20:
+            max_string, max_items = max_string // 4, max(max_items // 4, 1)
+            for section in ('extra_data', 'input_data', 'ai_result', 'response_data'):
+                if section in entry:
+                    entry[section], _ = trim_payload(entry[section], max_string, max_items)
+            trimmed = True
+            size = len(json.dumps(entry))
+        if trimmed:
+            entry['trimmed'] = True
+            with self._lock:
+                self._counts['trimmed'] += 1
+        return entry, size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        seen = counts['logged'] + counts['sampled_out']
+        return {
+            **counts,
+            'sample_rates': {**self.sample_rates, 'default': self.default_rate},
+            'kept_fraction': round(counts['logged'] / seen, 3) if seen else None,
+            'avg_record_bytes': round(counts['bytes'] / counts['logged']) if counts['logged'] else None
+        }
@@ -0,0 +1,327 @@
+# backend/utils/log_store.py
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LOG_TYPES = ('api_requests', 'errors', 'data_sources', 'gemini_calculations')
+SORT_COLUMNS = {'timestamp': 'ts', 'endpoint': 'endpoint', 'zip_code': 'zip_code',
+                'data_source': 'data_source', 'status': 'status'}
+FILTER_COLUMNS = ('log_type', 'endpoint', 'zip_code', 'data_source', 'status')
+INSERT_SQL = ('INSERT INTO entries (ts, endpoint, zip_code, data_source, status, log_type, payload) '
+              'VALUES (?, ?, ?, ?, ?, ?, ?)')
+# Per-ZIP traffic of an api_requests entry: its state (from either response
+# shape) and the requests it stands for (1 / the rate it was sampled at)
+ENTRY_DAY_SQL = "date(ts, 'unixepoch', 'localtime')"
+ENTRY_STATE_SQL = ("COALESCE(json_extract(payload, '$.response_data.state'), "
+                   "json_extract(payload, '$.response_data.location.state'), '')")
+ENTRY_REQUESTS_SQL = "1.0 / COALESCE(NULLIF(json_extract(payload, '$.sample_rate'), 0), 1)"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    log_type TEXT NOT NULL,
+    endpoint TEXT,
+    zip_code TEXT,
+    data_source TEXT,
+    status TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+CREATE INDEX IF NOT EXISTS entries_type_ts ON entries (log_type, ts);
+CREATE INDEX IF NOT EXISTS entries_endpoint_ts ON entries (endpoint, ts);
+CREATE INDEX IF NOT EXISTS entries_zip_ts ON entries (zip_code, ts);
+CREATE INDEX IF NOT EXISTS entries_source_ts ON entries (data_source, ts);
+CREATE INDEX IF NOT EXISTS entries_status_ts ON entries (status, ts);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT NOT NULL,
+    log_type TEXT NOT NULL,
+    endpoint TEXT NOT NULL DEFAULT '',
+    data_source TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, log_type, endpoint, data_source, status)
+);
+CREATE TABLE IF NOT EXISTS zip_daily_counts (
+    day TEXT NOT NULL,
+    zip_code TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT '',
+    requests REAL NOT NULL,
+    PRIMARY KEY (day, zip_code, state)
+);
+"""
+
+
+def entry_columns(log_type: str, entry: Dict[str, Any]) -> Tuple:
+    """Indexed columns (ts, endpoint, zip, data source, status) for one log entry"""
+    response = entry.get('response_data') or {}
+    if log_type == 'errors':
+        source, status = None, 'error'
+    elif log_type == 'data_sources':
+        source, status = entry.get('data_source'), 'ok'
+    elif log_type == 'gemini_calculations':
+        source, status = 'gemini', 'ok'
+    else:
+        source = response.get('data_source') or response.get('source')
+        status = 'degraded' if response.get('degraded') else 'ok'
+    try:
+        ts = datetime.fromisoformat(entry['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        ts = time.time()
+    endpoint = entry.get('endpoint') or ('check-qualification' if log_type == 'gemini_calculations' else None)
+    return ts, endpoint, entry.get('zip_code'), source, status
+
+
+def parse_time(value: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+    """An ISO date/time, or a relative '30m', '24h' or '7d' before now"""
+    if not value:
+        return None
+    units = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+    if value[-1:] in units and value[:-1].replace('.', '', 1).isdigit():
+        return (now or datetime.now()) - timedelta(**{units[value[-1]]: float(value[:-1])})
+    return datetime.fromisoformat(value)
+
+
+class LogStore:
+    """Indexed SQLite store for the request, error, data source and Gemini logs
+
+    write() only appends to an in-memory buffer; a background thread commits
+    it in one transaction every flush_seconds (or once batch_size entries are
+    waiting), so the request path never waits on the disk. Entries are
+    indexed by time, type, endpoint, ZIP, data source and status. Entries
+    older than detail_days are rolled up into per-day counts (and per-day,
+    per-ZIP request counts) by compact() (run by the flush thread every
+    compact_seconds), and counts older than retention_days are dropped.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_seconds: float = 0.5,
+                 detail_days: float = 30, retention_days: float = 365, compact_seconds: float = 3600):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.detail_days = detail_days
+        self.retention_days = retention_days
+        self.compact_seconds = compact_seconds
+        self._buffer: List[Tuple] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._local = threading.local()
+        self._pid = None  # process that owns the flush thread
+        self.written = 0
+        self.dropped = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread and process (connections must not cross a fork)"""
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def write(self, log_type: str, entry: Dict[str, Any]):
+        """Queue one entry for the next batch"""
+        row = (*entry_columns(log_type, entry), log_type, json.dumps(entry))
+        with self._lock:
+            self._ensure_flusher()
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self._wake.set()
+
+    def _ensure_flusher(self):
+        # Started on first write in each process, so a pre-forking master never owns it
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._buffer = []
+            self._thread = threading.Thread(target=self._run, name='log-store-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        compacted_at = time.monotonic()
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() - compacted_at >= self.compact_seconds:
+                    compacted_at = time.monotonic()
+                    self.compact()
+            except sqlite3.Error:
+                pass  # a failed batch is counted as dropped; keep flushing later ones
+
+    def flush(self) -> int:
+        """Commit everything buffered so far; returns the number of entries written"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        try:
+            self._insert(self._conn(), rows)
+        except sqlite3.Error:
+            with self._lock:
+                self.dropped += len(rows)
+            raise
+        with self._lock:
+            self.written += len(rows)
+        return len(rows)
+
+    def query(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+              sort: str = '-timestamp', limit: int = 100, offset: int = 0,
+              **filters: Optional[str]) -> Tuple[List[Dict[str, Any]], int]:
+        """Entries matching every given filter (log_type, endpoint, zip_code, data_source, status)
+
+        A filter value may be a tuple of alternatives. sort is a column name,
+        prefixed with '-' for descending. Returns the requested page and the
+        total number of matches.
+        """
+        clauses, params = [], []
+        for column in FILTER_COLUMNS:
+            value = filters.get(column)
+            if isinstance(value, tuple):
+                clauses.append(f'{column} IN ({", ".join("?" * len(value))})')
+                params.extend(value)
+            elif value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if since is not None:
+            clauses.append('ts >= ?')
+            params.append(since.timestamp())
+        if until is not None:
+            clauses.append('ts < ?')
+            params.append(until.timestamp())
+        column = SORT_COLUMNS.get(sort.lstrip('-'))
+        if column is None:
+            raise ValueError(f'Cannot sort by {sort}; use one of {", ".join(SORT_COLUMNS)}')
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        direction = 'DESC' if sort.startswith('-') else 'ASC'
+        order = f'{column} {direction}, id {direction}'
+        conn = self._conn()
+        total = conn.execute(f'SELECT COUNT(*) FROM entries {where}', params).fetchone()[0]
+        rows = conn.execute(f'SELECT payload FROM entries {where} ORDER BY {order} LIMIT ? OFFSET ?',
+                            params + [limit, offset]).fetchall()
+        return [json.loads(payload) for payload, in rows], total
+
+    def summary(self, recent: int = 10) -> Dict[str, Any]:
+        """Request, ZIP, endpoint, data source and error counts, answered from the indexes"""
+        conn = self._conn()
+        api = ('api_requests',)
+
+        def counts(sql):
+            return {key: count for key, count in conn.execute(sql, api).fetchall() if key is not None}
+
+        recent_rows = conn.execute('SELECT payload FROM entries WHERE log_type = ? ORDER BY ts DESC, id DESC LIMIT ?',
+                                   (*api, recent)).fetchall()
+        return {
+            'total_requests': conn.execute('SELECT COUNT(*) FROM entries WHERE log_type = ?', api).fetchone()[0],
+            'unique_zip_codes': conn.execute('SELECT COUNT(DISTINCT zip_code) FROM entries WHERE log_type = ?',
+                                             api).fetchone()[0],
+            'endpoints_used': counts('SELECT endpoint, COUNT(*) FROM entries WHERE log_type = ? GROUP BY endpoint'),
+            'data_sources_used': counts('SELECT data_source, COUNT(*) FROM entries WHERE log_type = ? '
+                                        'GROUP BY data_source'),
+            'errors_count': conn.execute("SELECT COUNT(*) FROM entries WHERE log_type = 'errors'").fetchone()[0],
+            'recent_requests': [
+                {key: entry[key] for key in ('timestamp', 'endpoint', 'zip_code')}
+                for entry in (json.loads(payload) for payload, in recent_rows)
+            ]
+        }
+
+    def compact(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Roll entries older than detail_days up into daily counts and drop expired days"""
+        now = now or datetime.now()
+        detail_cutoff = (now - timedelta(days=self.detail_days)).timestamp()
+        retention_cutoff = (now - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO daily_counts (day, log_type, endpoint, data_source, status, count) "
+                "SELECT date(ts, 'unixepoch', 'localtime'), log_type, COALESCE(endpoint, ''), "
+                "COALESCE(data_source, ''), COALESCE(status, ''), COUNT(*) FROM entries WHERE ts < ? "
+                "GROUP BY 1, 2, 3, 4, 5 "
+                "ON CONFLICT (day, log_type, endpoint, data_source, status) DO UPDATE SET count = count + excluded.count",
+                (detail_cutoff,))
+            conn.execute(
+                f"INSERT INTO zip_daily_counts (day, zip_code, state, requests) "
+                f"SELECT {ENTRY_DAY_SQL}, zip_code, {ENTRY_STATE_SQL}, SUM({ENTRY_REQUESTS_SQL}) FROM entries "
+                f"WHERE log_type = 'api_requests' AND zip_code IS NOT NULL AND ts < ? GROUP BY 1, 2, 3 "
+                f"ON CONFLICT (day, zip_code, state) DO UPDATE SET requests = requests + excluded.requests",
+                (detail_cutoff,))
+            rolled_up = conn.execute('DELETE FROM entries WHERE ts < ?', (detail_cutoff,)).rowcount
+            expired = conn.execute('DELETE FROM daily_counts WHERE day < ?', (retention_cutoff,)).rowcount
+            conn.execute('DELETE FROM zip_daily_counts WHERE day < ?', (retention_cutoff,))
+        return {'rolled_up': rolled_up, 'expired_days': expired}
+
+    def daily_counts(self, since: Optional[datetime] = None, **filters: Optional[str]) -> List[Dict[str, Any]]:
+        """Per-day counts for compacted history"""
+        clauses, params = [], []
+        for column in ('log_type', 'endpoint', 'data_source', 'status'):
+            if filters.get(column) is not None:
+                clauses.append(f'{column} = ?')
+                params.append(filters[column])
+        if since is not None:
+            clauses.append('day >= ?')
+            params.append(since.strftime('%Y-%m-%d'))
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        rows = self._conn().execute(f'SELECT day, log_type, endpoint, data_source, status, count FROM daily_counts '
+                                    f'{where} ORDER BY day', params).fetchall()
+        keys = ('day', 'log_type', 'endpoint', 'data_source', 'status', 'count')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def zip_traffic(self, since: datetime) -> List[Tuple[str, str, str, float]]:
+        """(day, ZIP, state, requests) per day since `since`, from the rollup and the detail entries
+
+        requests scales each logged entry by 1 / its sample rate, so it
+        estimates the requests served rather than the ones kept.
+        """
+        rows = self._conn().execute(
+            f"SELECT day, zip_code, state, SUM(requests) FROM ("
+            f"SELECT day, zip_code, state, requests FROM zip_daily_counts WHERE day >= ? UNION ALL "
+            f"SELECT {ENTRY_DAY_SQL} AS day, zip_code, {ENTRY_STATE_SQL} AS state, {ENTRY_REQUESTS_SQL} AS requests "
+            f"FROM entries WHERE log_type = 'api_requests' AND zip_code IS NOT NULL AND ts >= ?"
+            f") GROUP BY 1, 2, 3 ORDER BY 1",
+            (since.strftime('%Y-%m-%d'), since.timestamp())).fetchall()
+        return [tuple(row) for row in rows]
+
+    def import_jsonl(self, path: str, log_type: str, batch_size: int = 5000) -> int:
+        """Load an existing JSONL log into the store; returns the number of entries"""
+        conn = self._conn()
+        count, rows = 0, []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                rows.append((*entry_columns(log_type, entry), log_type, json.dumps(entry)))
+                if len(rows) >= batch_size:
+                    count += self._insert(conn, rows)
+                    rows = []
+        return count + self._insert(conn, rows)
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, rows: Iterable[Tuple]) -> int:
+        rows = list(rows)
+        with conn:
+            conn.executemany(INSERT_SQL, rows)
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'path': self.path, 'buffered': len(self._buffer), 'written': self.written,
+                    'dropped': self.dropped}
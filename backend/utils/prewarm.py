@@ -0,0 +1,263 @@
+# backend/utils/prewarm.py
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every process warms
+    fcntl = None
+
+# (timestamp, zip_code, state, requests it stands for)
+Traffic = Tuple[datetime, str, Optional[str], float]
+
+
+def _valid_zip(zip_code: str) -> bool:
+    return zip_code.isdigit() and len(zip_code) == 5
+
+
+def _valid_state(state: Any) -> Optional[str]:
+    return state if isinstance(state, str) and len(state) == 2 else None
+
+
+def read_recent_requests(path: str, since: datetime, max_bytes: int = 64 * 1024 * 1024) -> Iterator[Traffic]:
+    """(timestamp, zip_code, state, requests) of logged requests since `since`
+
+    A sampled record stands for 1 / its sample_rate requests. Only the last
+    max_bytes of the log are read, so the cost stays flat as
+    api_requests.jsonl grows.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(size - max_bytes, 0))
+        if size > max_bytes:
+            f.readline()  # skip the partial line
+        for line in f:
+            try:
+                entry = json.loads(line)
+                timestamp = datetime.fromisoformat(entry['timestamp'])
+            except (ValueError, KeyError, TypeError):
+                continue
+            zip_code = str(entry.get('zip_code') or '')
+            if timestamp < since or not _valid_zip(zip_code):
+                continue
+            response = entry.get('response_data') or {}
+            location = response.get('location') if isinstance(response.get('location'), dict) else {}
+            state = response.get('state') or location.get('state')
+            yield timestamp, zip_code, _valid_state(state), 1.0 / (entry.get('sample_rate') or 1.0)
+
+
+def store_requests(store, since: datetime) -> Iterator[Traffic]:
+    """(mid-day timestamp, zip_code, state, requests) per ZIP and day from a LogStore's zip_traffic()"""
+    for day, zip_code, state, requests in store.zip_traffic(since):
+        if _valid_zip(zip_code or ''):
+            yield datetime.fromisoformat(day) + timedelta(hours=12), zip_code, _valid_state(state), requests
+
+
+def rank_traffic(requests: Iterable[Traffic], now: datetime,
+                 half_life_hours: float = 24.0) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+    """ZIPs and states by recency-weighted request count, highest first
+
+    Each request counts 0.5 ** (age / half_life), so a ZIP asked for often
+    and lately outranks one that was popular last week.
+    """
+    zip_scores, state_scores = defaultdict(float), defaultdict(float)
+    for timestamp, zip_code, state, count in requests:
+        age_hours = max((now - timestamp).total_seconds(), 0.0) / 3600
+        weight = count * 0.5 ** (age_hours / half_life_hours)
+        zip_scores[zip_code] += weight
+        if state:
+            state_scores[state.upper()] += weight
+    def by_score(item):
+        return -item[1], item[0]
+    return sorted(zip_scores.items(), key=by_score), sorted(state_scores.items(), key=by_score)
+
+
+class RateBudget:
+    """Token bucket: at most rate_per_second upstream refreshes, bursting to `burst`"""
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def wait(self, stop: threading.Event) -> bool:
+        """Block until a token is available; False if stop was set meanwhile"""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            if stop.wait((1 - self._tokens) / self.rate_per_second):
+                return False
+
+
+class WarmTask:
+    """One cache to keep warm: is_stale(zip) says whether refresh(zip) needs to run"""
+
+    def __init__(self, name: str, is_stale: Callable[[str], bool], refresh: Callable[[str], Any]):
+        self.name = name
+        self.is_stale = is_stale
+        self.refresh = refresh
+
+
+class CacheWarmer:
+    """Keeps the caches of the most requested ZIPs warm, mined from the request log
+
+    Every interval_seconds the log window is re-ranked and each task is run
+    for the top_n ZIPs whose entry is missing or close to expiry, most
+    popular first. traffic(since) supplies the window (see store_requests);
+    without it the JSONL log at log_path is read. Refreshes are spent from a
+    RateBudget and wait while should_pause() reports the server is busy, so
+    live traffic always wins. With lock_path set, only the process holding
+    an exclusive lock on that file runs passes; the others retry every
+    interval and take over when it exits. Request-path caches report hits
+    and misses with record(), split by whether the key belongs to a warmed ZIP.
+    """
+
+    def __init__(self, log_path: str, tasks: Sequence[WarmTask], top_n: int = 500, top_states: int = 10,
+                 interval_seconds: float = 300, rate_per_second: float = 2.0, window_days: float = 7,
+                 half_life_hours: float = 24.0, should_pause: Optional[Callable[[], bool]] = None,
+                 traffic: Optional[Callable[[datetime], Iterable[Traffic]]] = None, lock_path: Optional[str] = None):
+        self.log_path = log_path
+        self.traffic = traffic or (lambda since: read_recent_requests(self.log_path, since))
+        self.lock_path = lock_path
+        self._lock_file = None
+        self.tasks = list(tasks)
+        self.top_n = top_n
+        self.top_states = top_states
+        self.interval_seconds = interval_seconds
+        self.window_days = window_days
+        self.half_life_hours = half_life_hours
+        self.should_pause = should_pause or (lambda: False)
+        self.budget = RateBudget(rate_per_second)
+        self.targets: List[str] = []
+        self.states: List[str] = []
+        self._warm_keys = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._hits = defaultdict(lambda: {'warmed': [0, 0], 'other': [0, 0]})
+        self.cycles = 0
+        self.last_cycle: Dict[str, Any] = {}
+        self.last_error: Optional[str] = None
+
+    def track(self, key: Any):
+        """Count a task's own cache key (e.g. a county) as belonging to the warm set"""
+        with self._lock:
+            self._warm_keys.add(key)
+
+    def record(self, cache: str, key: Any, hit: bool):
+        """Count a request-path lookup in `cache`"""
+        with self._lock:
+            counts = self._hits[cache]['warmed' if key in self._warm_keys else 'other']
+            counts[0 if hit else 1] += 1
+
+    def select(self, now: Optional[datetime] = None):
+        """Re-rank the log window and return the target ZIPs"""
+        now = now or datetime.now()
+        zips, states = rank_traffic(self.traffic(now - timedelta(days=self.window_days)), now, self.half_life_hours)
+        targets = [zip_code for zip_code, _ in zips[:self.top_n]]
+        with self._lock:
+            self.targets = targets
+            self.states = [state for state, _ in states[:self.top_states]]
+            self._warm_keys = set(targets)
+        return targets
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """One pass over the targets; returns (and keeps) the pass's counts"""
+        started = time.monotonic()
+        counts = {task.name: {'fresh': 0, 'refreshed': 0, 'failed': 0} for task in self.tasks}
+        targets = self.select(now)
+        for zip_code in targets:
+            if self._stop.is_set():
+                break
+            for task in self.tasks:
+                try:
+                    if not task.is_stale(zip_code):
+                        counts[task.name]['fresh'] += 1
+                        continue
+                    # Live traffic first: hold off while the server is busy
+                    while self.should_pause() and not self._stop.wait(1.0):
+                        pass
+                    if not self.budget.wait(self._stop):
+                        break
+                    task.refresh(zip_code)
+                    counts[task.name]['refreshed'] += 1
+                except Exception:
+                    counts[task.name]['failed'] += 1
+        for task in self.tasks:
+            task_counts = counts[task.name]
+            task_counts['coverage'] = round((task_counts['fresh'] + task_counts['refreshed']) / len(targets), 3) \
+                if targets else 0.0
+        summary = {
+            'finished_at': datetime.now().isoformat(),
+            'seconds': round(time.monotonic() - started, 2),
+            'targets': len(targets),
+            'tasks': counts
+        }
+        with self._lock:
+            self.cycles += 1
+            self.last_cycle = summary
+        return summary
+
+    def is_leader(self) -> bool:
+        """Whether this process runs the passes (takes the lock_path lock if it is free)"""
+        if self.lock_path is None or fcntl is None or self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.is_leader():
+                    self.run_once()
+            except Exception as e:
+                self.last_error = f'{type(e).__name__}: {e}'
+            self._stop.wait(self.interval_seconds)
+
+    def start(self) -> threading.Thread:
+        """Run passes in a daemon thread, the first one immediately"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hit_rates = {}
+            for cache, groups in self._hits.items():
+                hit_rates[cache] = {
+                    group: {'hits': hits, 'misses': misses,
+                            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None}
+                    for group, (hits, misses) in groups.items()
+                }
+            return {
+                'top_n': self.top_n,
+                'leader': self.lock_path is None or fcntl is None or self._lock_file is not None,
+                'targets': len(self.targets),
+                'top_states': list(self.states),
+                'cycles': self.cycles,
+                'last_cycle': self.last_cycle,
+                'last_error': self.last_error,
+                'hit_rates': hit_rates
+            }
@@ -1,12 +1,99 @@
 # backend/utils/qualification_engine.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import numpy as np
 from database.schema import SessionLocal, ZipCodeData, LoanRate
 from utils.solar_calculator import SolarCalculator
+from utils.irradiance import IrradianceGrid
+from utils.spatial_index import LocationIndex, ZipCentroids
+from utils.incentive_rules import IncentiveRules, IncentiveRulesCache, load_incentive_rules
+def location_sun_hours(row, irradiance: Optional[IrradianceGrid] = None) -> Optional[float]:
+    """Sun hours from the irradiance grid at the ZIP's coordinates, else the stored value"""
+    if irradiance is not None and row.latitude is not None and row.longitude is not None:
+        sun_hours = irradiance.sun_hours(row.latitude, row.longitude)
+        if sun_hours is not None:
+            return round(sun_hours, 4)
+    return row.sun_hours_daily
+def load_reference_data(db, irradiance: Optional[IrradianceGrid] = None) -> tuple:
+    """Every ZIP with a rate and sun hours, and the loan terms per credit band"""
+    locations = []
+    for row in db.query(ZipCodeData).all():
+        sun_hours = location_sun_hours(row, irradiance)
+        if row.electricity_rate_cents and sun_hours:
+            locations.append({
+                'zip_code': row.zip_code,
+                'state': row.state,
+                'electricity_rate_cents': row.electricity_rate_cents,
+                'sun_hours_daily': sun_hours
+            })
+    loan_terms = {
+        row.credit_band: {
+            'apr': row.apr_rate,
+            'term': row.max_term_years,
+            'down_payment': row.down_payment_required
+        }
+        for row in db.query(LoanRate).all()
+    }
+    return locations, loan_terms
+def build_location_index(db, irradiance: Optional[IrradianceGrid] = None) -> LocationIndex:
+    """KD-tree over every ZIP record with coordinates, for estimating unknown ZIPs"""
+    return LocationIndex([
+        {
+            'zip_code': row.zip_code,
+            'latitude': row.latitude,
+            'longitude': row.longitude,
+            'state': row.state,
+            'electricity_rate_cents': row.electricity_rate_cents,
+            'sun_hours_daily': location_sun_hours(row, irradiance)
+        }
+        for row in db.query(ZipCodeData).all()
+    ], ['electricity_rate_cents', 'sun_hours_daily'])
+def _load_incentive_rules() -> IncentiveRules:
+    db = SessionLocal()
+    try:
+        return load_incentive_rules(db)
+    finally:
+        db.close()
+# Installed cost and incentives from solar_incentives and the install cost
+# file, recompiled only when that data changes
+incentive_rules = IncentiveRulesCache(_load_incentive_rules)
+# Per credit band, the first (max payment/bill ratio, max payback years) that
+# an applicant meets sets the status; unknown bands are treated as Poor
+STATUS_RULES = {
+    'Excellent': ((1.2, 10, 'approved'), (1.5, 15, 'borderline')),
+    'Good': ((1.0, 8, 'approved'), (1.3, 12, 'borderline')),
+    'Fair': ((0.9, 7, 'approved'), (1.1, 10, 'borderline')),
+    'Poor': ((0.8, 5, 'borderline'),)
+}
+def determine_statuses(monthly_bills, monthly_payments, credit_bands, payback_years) -> np.ndarray:
+    """QualificationEngine._determine_status vectorised over arrays"""
+    bills = np.asarray(monthly_bills, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.where(bills > 0, np.asarray(monthly_payments, dtype=np.float64) / bills, np.inf)
+    payback_years = np.asarray(payback_years, dtype=np.float64)
+    credit_bands = np.asarray(credit_bands, dtype=str)
+    statuses = np.full(len(bills), 'not_qualified', dtype=object)
+    decided = np.zeros(len(bills), dtype=bool)
+    for band, rules in STATUS_RULES.items():
+        in_band = credit_bands == band if band != 'Poor' else ~np.isin(credit_bands, list(STATUS_RULES)[:-1])
+        for max_ratio, max_payback, status in rules:
+            hit = in_band & ~decided & (ratios <= max_ratio) & (payback_years <= max_payback)
+            statuses[hit] = status
+            decided |= hit
+    return statuses
 class QualificationEngine:
     """Main engine for loan qualification decisions"""
-    def __init__(self):
+    def __init__(self, irradiance: Optional[IrradianceGrid] = None,
+                 neighbours: Optional[LocationIndex] = None, centroids: Optional[ZipCentroids] = None,
+                 rules: Optional[IncentiveRules] = None):
         self.db = SessionLocal()
         self.calculator = SolarCalculator()
+        # Location-specific sun hours from the gridded irradiance dataset
+        self.irradiance = irradiance
+        # Unknown ZIPs are estimated from their nearest known ZIPs; see build_location_index
+        self.neighbours = neighbours
+        self.centroids = centroids
+        # Compiled incentive rules; the shared DB-backed rules unless given
+        self.rules = rules
     def process_qualification(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Process qualification request and return decision"""
         # Extract input data
@@ -16,7 +103,12 @@ class QualificationEngine:
         roof_size = float(data['roofSize'])
         # Get location data
         location = self.db.query(ZipCodeData).filter_by(zip_code=zip_code).first()
+        estimate = None
         if not location:
+            estimate = self._estimate_location(zip_code)
+        if estimate:
+            location = estimate
+        elif not location:
             # Use defaults if ZIP not found
             location = {
                 'electricity_rate_cents': 15.0,
@@ -26,7 +118,7 @@ class QualificationEngine:
         else:
             location = {
                 'electricity_rate_cents': location.electricity_rate_cents,
-                'sun_hours_daily': location.sun_hours_daily,
+                'sun_hours_daily': location_sun_hours(location, self.irradiance),
                 'state': location.state
             }
         # Calculate system size
@@ -40,7 +132,8 @@ class QualificationEngine:
         if roof_size < required_roof_size:
             system_size = roof_size / 200  # Adjust system size to fit roof
         # Calculate costs
-        costs = self.calculator.calculate_system_cost(system_size, location['state'])
+        costs = self.calculator.calculate_system_cost(system_size, location['state'],
+                                                      self.rules or incentive_rules.get())
         # Get loan terms
         loan_info = self.db.query(LoanRate).filter_by(credit_band=credit_band).first()
         if not loan_info:
@@ -77,7 +170,7 @@ class QualificationEngine:
         )
         # Close database session
         self.db.close()
-        return {
+        result = {
             'status': status,
             'monthlyPayment': monthly_payment,
             'paybackYears': payback_years,
@@ -90,7 +183,28 @@ class QualificationEngine:
                 'apr': loan_info.apr_rate,
                 'term': loan_info.max_term_years,
                 'downPayment': loan_info.down_payment_required
-            }
+            },
+            'locationEstimated': estimate is not None
+        }
+        if estimate:
+            result['nearestLocations'] = estimate['neighbours']
+        return result
+    def _estimate_location(self, zip_code: str) -> Optional[Dict[str, Any]]:
+        """Rate, sun hours and state weighted from the nearest known ZIPs, if the ZIP can be placed"""
+        if self.neighbours is None or self.centroids is None or not len(self.neighbours):
+            return None
+        coordinates = self.centroids.coordinates(zip_code)
+        if coordinates is None:
+            return None
+        estimate = self.neighbours.estimate(*coordinates)
+        if not estimate or estimate['electricity_rate_cents'] is None or estimate['sun_hours_daily'] is None:
+            return None
+        sun_hours = self.irradiance.sun_hours(*coordinates) if self.irradiance is not None else None
+        return {
+            'electricity_rate_cents': estimate['electricity_rate_cents'],
+            'sun_hours_daily': sun_hours or estimate['sun_hours_daily'],
+            'state': estimate['state'],
+            'neighbours': estimate['neighbours']
         }
     def _determine_status(self, monthly_bill: float, monthly_payment: float,
                          credit_band: str, payback_years: float) -> str:
@@ -98,29 +212,7 @@ class QualificationEngine:
         # Calculate payment to bill ratio
         payment_ratio = monthly_payment / monthly_bill if monthly_bill > 0 else float('inf')
         # Decision logic
-        if credit_band == 'Excellent':
-            if payment_ratio <= 1.2 and payback_years <= 10:
-                return 'approved'
-            elif payment_ratio <= 1.5 and payback_years <= 15:
-                return 'borderline'
-            else:
-                return 'not_qualified'
-        elif credit_band == 'Good':
-            if payment_ratio <= 1.0 and payback_years <= 8:
-                return 'approved'
-            elif payment_ratio <= 1.3 and payback_years <= 12:
-                return 'borderline'
-            else:
-                return 'not_qualified'
-        elif credit_band == 'Fair':
-            if payment_ratio <= 0.9 and payback_years <= 7:
-                return 'approved'
-            elif payment_ratio <= 1.1 and payback_years <= 10:
-                return 'borderline'
-            else:
-                return 'not_qualified'
-        else:  # Poor credit
-            if payment_ratio <= 0.8 and payback_years <= 5:
-                return 'borderline'
-            else:
-                return 'not_qualified'
\ No newline at end of file
+        for max_ratio, max_payback, status in STATUS_RULES.get(credit_band, STATUS_RULES['Poor']):
+            if payment_ratio <= max_ratio and payback_years <= max_payback:
+                return status
+        return 'not_qualified'
@@ -0,0 +1,94 @@
+# backend/utils/savings_simulation.py
+from typing import Any, Dict, Optional
+import numpy as np
+from utils.amortization import monthly_payments
+from utils.solar_calculator import SolarCalculator
+
+PERCENTILES = (10, 50, 90)
+# Uncertainty assumptions (means match SolarCalculator's fixed values)
+ESCALATION_MEAN = 0.03       # yearly electricity rate increase
+ESCALATION_SD = 0.015        # year-to-year spread of that increase
+DEGRADATION_MEAN = SolarCalculator.PANEL_DEGRADATION
+DEGRADATION_SD = 0.0015      # panel-to-panel spread of yearly degradation
+SUN_HOURS_SD = 0.06          # relative year-to-year weather variation
+APR_SD = 0.5                 # spread of the APR actually locked at signing (percentage points)
+MEMORY_CAP_BYTES = 64 * 1024 * 1024
+_ARRAYS_PER_PATH_YEAR = 8    # float64 temporaries alive at once in _simulate_chunk
+
+
+def _simulate_chunk(rng: np.random.Generator, paths: int, years: int, system_size_kw: float,
+                    electricity_rate_cents: float, sun_hours: float, net_cost: float,
+                    principal: float, apr: float, term_years: int):
+    """Lifetime savings, payback year and cumulative net savings per year for one chunk of paths"""
+    year = np.arange(years)[None, :]
+    escalation = rng.normal(ESCALATION_MEAN, ESCALATION_SD, (paths, years))
+    escalation[:, 0] = 0.0
+    rate = electricity_rate_cents / 100 * np.cumprod(1 + escalation, axis=1)
+    degradation = np.clip(rng.normal(DEGRADATION_MEAN, DEGRADATION_SD, (paths, 1)), 0, None)
+    weather = np.clip(rng.normal(1.0, SUN_HOURS_SD, (paths, years)), 0, None)
+    production_kwh = (system_size_kw * 365 * sun_hours * SolarCalculator.SYSTEM_EFFICIENCY
+                      * weather * (1 - degradation * year))
+    energy_value = production_kwh * rate
+
+    path_apr = np.clip(apr + rng.normal(0, APR_SD, paths), 0, None) if principal > 0 else np.zeros(paths)
+    payment = monthly_payments(np.full(paths, principal), path_apr, np.full(paths, term_years * 12))
+    loan_cost = np.where(year < term_years, payment[:, None] * 12, 0.0)
+
+    cumulative_value = np.cumsum(energy_value, axis=1)
+    cumulative_net = cumulative_value - np.cumsum(loan_cost, axis=1) - (net_cost - principal)
+
+    # Payback: first year the energy value covers the net cost, interpolated within that year
+    covered = cumulative_value >= net_cost
+    reached = covered.any(axis=1)
+    first = np.argmax(covered, axis=1)
+    before = np.where(first > 0, cumulative_value[np.arange(paths), first - 1], 0.0)
+    within = (net_cost - before) / energy_value[np.arange(paths), first]
+    payback = np.where(reached, first + within, np.inf)
+    return cumulative_net[:, -1], payback, cumulative_net
+
+
+def simulate_savings(system_size_kw: float, electricity_rate_cents: float, sun_hours: float,
+                     net_cost: float, apr: float, term_years: int, down_payment_percent: float = 0,
+                     paths: int = 10000, years: int = 25, seed: Optional[int] = None,
+                     memory_cap_bytes: int = MEMORY_CAP_BYTES) -> Dict[str, Any]:
+    """Monte Carlo distribution of lifetime savings and payback for one system
+
+    Draws per-path rate escalation, degradation, weather and locked-in APR,
+    evaluated in chunks of paths sized to stay under memory_cap_bytes.
+    Lifetime savings are energy value minus loan payments and down payment.
+    """
+    rng = np.random.default_rng(seed)
+    principal = net_cost * (1 - down_payment_percent / 100)
+    chunk = max(1, memory_cap_bytes // (years * 8 * _ARRAYS_PER_PATH_YEAR))
+    savings, paybacks, yearly = [], [], []
+    for start in range(0, paths, chunk):
+        size = min(chunk, paths - start)
+        lifetime, payback, cumulative = _simulate_chunk(
+            rng, size, years, system_size_kw, electricity_rate_cents, sun_hours,
+            net_cost, principal, apr, term_years
+        )
+        savings.append(lifetime)
+        paybacks.append(payback)
+        # Per-year bands only need percentiles, so keep those rather than every path
+        yearly.append(np.percentile(cumulative, PERCENTILES, axis=0) * size)
+    savings = np.concatenate(savings)
+    paybacks = np.concatenate(paybacks)
+    # Chunk-weighted average of per-chunk bands (exact when there is one chunk)
+    yearly_bands = np.sum(yearly, axis=0) / paths
+
+    def bands(values):
+        # 'nearest' picks actual path values, so never-paid-back (inf) paths aren't interpolated
+        points = np.percentile(values, PERCENTILES, method='nearest')
+        return {f'p{p}': (round(float(v), 2) if np.isfinite(v) else None) for p, v in zip(PERCENTILES, points)}
+
+    return {
+        'paths': paths,
+        'years': years,
+        'seed': seed,
+        'lifetime_savings': {**bands(savings), 'mean': round(float(savings.mean()), 2)},
+        'payback_years': bands(paybacks),
+        'probability_payback_within_horizon': round(float(np.isfinite(paybacks).mean()), 4),
+        'cumulative_net_savings_by_year': {
+            f'p{p}': np.round(band, 2).tolist() for p, band in zip(PERCENTILES, yearly_bands)
+        }
+    }
@@ -0,0 +1,308 @@
+# backend/utils/shared_cache.py
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from utils.lazy_import import lazy_module
+
+redis = lazy_module('redis')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries (expires_at);
+CREATE INDEX IF NOT EXISTS idx_entries_stored ON entries (stored_at);
+"""
+
+
+class SQLiteCacheBackend:
+    """Key-value store in one SQLite file, shared by every worker process on the host
+
+    Each set() is a single INSERT OR REPLACE, so readers in other processes
+    see the old value or the new one, never a partial write. Expired
+    entries are skipped on read; every evict_every writes they are deleted
+    and, if the file holds more than max_bytes of values, the oldest
+    entries go until it fits.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, evict_every: int = 200):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evicted = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread and process (connections must not cross a fork)"""
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        """(stored_at, value) if the key is present and unexpired"""
+        return self._conn().execute('SELECT stored_at, value FROM entries WHERE key = ? AND expires_at > ?',
+                                    (key, time.time())).fetchone()
+
+    def set(self, key: str, value: str, ttl: float, stored_at: Optional[float] = None):
+        stored_at = time.time() if stored_at is None else stored_at
+        with self._conn() as conn:
+            conn.execute('INSERT OR REPLACE INTO entries (key, value, stored_at, expires_at, size) '
+                         'VALUES (?, ?, ?, ?, ?)', (key, value, stored_at, stored_at + ttl, len(value)))
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def delete(self, key: str):
+        with self._conn() as conn:
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Drop expired entries, then the oldest ones while over max_bytes"""
+        with self._conn() as conn:
+            removed = conn.execute('DELETE FROM entries WHERE expires_at <= ?', (now or time.time(),)).rowcount
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total > self.max_bytes:
+                # Oldest first, until the bytes removed cover the excess
+                removed += conn.execute(
+                    'DELETE FROM entries WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER '
+                    '(ORDER BY stored_at, key) - size AS before FROM entries) WHERE before < ?)',
+                    (total - self.max_bytes,)).rowcount
+        with self._lock:
+            self.evicted += removed
+        return removed
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute('DELETE FROM entries')
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._conn().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {'backend': 'sqlite', 'path': self.path, 'entries': entries, 'bytes': size,
+                'max_bytes': self.max_bytes, 'evicted': self.evicted}
+
+
+class MemoryCacheBackend:
+    """In-process stand-in for an external cache service, with the same interface"""
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                return None
+            return entry[0], entry[2]
+
+    def set(self, key: str, value: str, ttl: float, stored_at: Optional[float] = None):
+        stored_at = time.time() if stored_at is None else stored_at
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (stored_at, stored_at + ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'backend': 'memory', 'entries': len(self._entries), 'evicted': self.evicted}
+
+
+class RedisCacheBackend:
+    """An external Redis (or compatible) service shared by every worker on every host
+
+    Values are stored as [stored_at, value] with the TTL as the key's
+    expiry; size-bounded eviction is the server's maxmemory policy.
+    client defaults to a redis-py client for url.
+    """
+
+    def __init__(self, url: str, prefix: str = 'solar:', client=None):
+        self.url = url
+        self.prefix = prefix
+        self.client = client or redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        stored_at, value = json.loads(raw)
+        return stored_at, value
+
+    def set(self, key: str, value: str, ttl: float, stored_at: Optional[float] = None):
+        stored_at = time.time() if stored_at is None else stored_at
+        self.client.set(self.prefix + key, json.dumps([stored_at, value]), px=max(int(ttl * 1000), 1))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': 'redis', 'url': self.url.split('@')[-1]}
+
+
+def cache_backend(url: str, max_bytes: int = 256 * 1024 * 1024):
+    """Backend for a SHARED_CACHE_URL: sqlite:///path, redis://..., memory:// or none"""
+    if not url or url == 'none':
+        return None
+    if url.startswith('sqlite:///'):
+        return SQLiteCacheBackend(url[len('sqlite:///'):], max_bytes=max_bytes)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCacheBackend(url)
+    if url.startswith('memory://'):
+        return MemoryCacheBackend()
+    raise ValueError(f'Unsupported shared cache URL: {url}')
+
+
+class TieredCache:
+    """A per-process L1 dict in front of a shared L2 backend
+
+    entry() answers from L1 when it holds a young enough value, otherwise
+    from L2 (promoting the value into L1), so a value fetched by one worker
+    is reused by every other worker and by newly started ones. Ages come
+    from the time the value was first stored, wherever it was read from.
+    Values go to L2 as JSON; decode turns them back into the stored type
+    (e.g. tuple). L2 errors count as misses; the cache never fails a
+    request. Coroutines use entry_async/get_async/set_async, which answer
+    L1 hits inline and run L2 reads and writes on a worker thread.
+    """
+
+    def __init__(self, name: str, backend=None, ttl: float = 3600, max_entries: int = 10000,
+                 decode: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.decode = decode or (lambda value: value)
+        self._l1: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'l2_errors': 0}
+
+    def _key(self, key: Hashable) -> str:
+        return f'{self.name}:{json.dumps(key)}'
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counts[counter] += 1
+
+    def _remember(self, key: Hashable, stored_at: float, value: Any):
+        with self._lock:
+            self._l1.pop(key, None)
+            self._l1[key] = (stored_at, value)
+            while len(self._l1) > self.max_entries:
+                self._l1.popitem(last=False)
+
+    def entry(self, key: Hashable, max_age: Optional[float] = None, count: bool = True,
+              l1_only: bool = False) -> Optional[Tuple[float, Any]]:
+        """(age in seconds, value) if a value no older than max_age (default ttl) is cached
+
+        With l1_only an L1 miss returns None without reading (or counting) L2.
+        """
+        now = time.time()
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        with self._lock:
+            cached = self._l1.get(key)
+            if cached is not None and now - cached[0] <= max_age:
+                self._l1.move_to_end(key)
+                if count:
+                    self._counts['l1_hits'] += 1
+                return now - cached[0], cached[1]
+        if l1_only:
+            return None
+        if self.backend is not None:
+            try:
+                shared = self.backend.get(self._key(key))
+                if shared is not None and now - shared[0] <= max_age:
+                    value = self.decode(json.loads(shared[1]))
+                    self._remember(key, shared[0], value)
+                    if count:
+                        self._count('l2_hits')
+                    return now - shared[0], value
+            except Exception:
+                self._count('l2_errors')
+        if count:
+            self._count('misses')
+        return None
+
+    def get(self, key: Hashable, max_age: Optional[float] = None, default: Any = None) -> Any:
+        cached = self.entry(key, max_age)
+        return default if cached is None else cached[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.entry(key, count=False) is not None
+
+    def set(self, key: Hashable, value: Any):
+        stored_at = time.time()
+        self._remember(key, stored_at, value)
+        if self.backend is not None:
+            self._store(key, value, stored_at)
+
+    def _store(self, key: Hashable, value: Any, stored_at: float):
+        try:
+            self.backend.set(self._key(key), json.dumps(value), self.ttl, stored_at)
+        except Exception:
+            self._count('l2_errors')
+
+    async def entry_async(self, key: Hashable, max_age: Optional[float] = None) -> Optional[Tuple[float, Any]]:
+        cached = self.entry(key, max_age, l1_only=self.backend is not None)
+        if cached is None and self.backend is not None:
+            cached = await asyncio.to_thread(self.entry, key, max_age)
+        return cached
+
+    async def get_async(self, key: Hashable, max_age: Optional[float] = None, default: Any = None) -> Any:
+        cached = await self.entry_async(key, max_age)
+        return default if cached is None else cached[1]
+
+    async def set_async(self, key: Hashable, value: Any):
+        stored_at = time.time()
+        self._remember(key, stored_at, value)
+        if self.backend is not None:
+            await asyncio.to_thread(self._store, key, value, stored_at)
+
+    def clear(self):
+        """Forget this process's L1 copies; the shared entries stay"""
+        with self._lock:
+            self._l1.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            l1_entries = len(self._l1)
+        lookups = counts['l1_hits'] + counts['l2_hits'] + counts['misses']
+        return {
+            **counts,
+            'l1_entries': l1_entries,
+            'hit_rate': round((counts['l1_hits'] + counts['l2_hits']) / lookups, 3) if lookups else None
+        }
@@ -0,0 +1,155 @@
+# backend/utils/singleflight.py
+import asyncio
+import copy
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """A computation in flight, shared by every caller with the same key"""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _LeaderCancelled(Exception):
+    """Set on an async call's future when its leader was cancelled rather than failing"""
+
+
+class _FlightStats:
+    """Per-operation counters shared by the thread and asyncio variants"""
+
+    def __init__(self, wait_timeout: Optional[Callable[[], Optional[float]]] = None):
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Any] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, operation: str, field: str):
+        stats = self._stats.get(operation)
+        if stats is None:
+            stats = self._stats[operation] = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0,
+                                              'wait_timeouts': 0}
+        stats[field] += 1
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-operation call, execution, coalesce and error counts"""
+        with self._lock:
+            operations = {op: dict(counts) for op, counts in self._stats.items()}
+            in_flight = len(self._calls)
+        return {'in_flight': in_flight, 'operations': operations}
+
+
+class SingleFlight(_FlightStats):
+    """Coalesce concurrent calls with the same key into a single execution
+
+    Keys are tuples whose first element names the operation, e.g.
+    ('zip_to_location', '10001'). The first caller for a key runs the
+    function; callers arriving while it is running wait and receive the same
+    result (or exception). Every caller, the leader included, gets its own
+    deep copy, so one annotating its result never races another copying it.
+    Nothing is cached once the call completes.
+    wait_timeout() gives each waiter's own limit (e.g. its request's
+    remaining budget); a waiter past it gets TimeoutError while the leader
+    carries on.
+    """
+
+    def do(self, key: Tuple, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) once for all concurrent callers of key"""
+        operation = str(key[0])
+        with self._lock:
+            self._count(operation, 'calls')
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._count(operation, 'executions')
+            else:
+                self._count(operation, 'coalesced')
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout() if self.wait_timeout else None):
+                with self._lock:
+                    self._count(operation, 'wait_timeouts')
+                raise TimeoutError(f'Timed out waiting for {operation}')
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+            # Copied before waiters are woken, so the shared result is never mutated
+            return copy.deepcopy(call.result)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._count(operation, 'errors')
+            raise
+        finally:
+            # Drop the entry before waking waiters so errors are never reused
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class AsyncSingleFlight(_FlightStats):
+    """asyncio variant of SingleFlight for coroutine functions
+
+    Must be used from a single event loop; the counters are still safe to
+    read from other threads. If the leader is cancelled (its client went
+    away), waiters are not: the first of them to wake runs the call again
+    as the new leader and the rest wait on it.
+    """
+
+    async def do(self, key: Tuple, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) once for all concurrent callers of key"""
+        operation = str(key[0])
+        with self._lock:
+            self._count(operation, 'calls')
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = asyncio.get_running_loop().create_future()
+                self._count(operation, 'executions')
+            else:
+                self._count(operation, 'coalesced')
+
+        if not leader:
+            # shield() so one waiter being cancelled or timing out doesn't cancel the others
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future),
+                                                self.wait_timeout() if self.wait_timeout else None)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self._count(operation, 'wait_timeouts')
+                raise TimeoutError(f'Timed out waiting for {operation}') from None
+            except _LeaderCancelled:
+                return await self.do(key, fn, *args, **kwargs)
+            return copy.deepcopy(result)
+
+        try:
+            result = await fn(*args, **kwargs)
+            future.set_result(result)
+            return copy.deepcopy(result)
+        except asyncio.CancelledError:
+            # Not future.cancel(), which would raise CancelledError in every waiter
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            with self._lock:
+                self._count(operation, 'errors')
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -0,0 +1,161 @@
+# backend/utils/snapshot.py
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'data_snapshot.bin'
+)
+MAGIC = b'SOLARSNP'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sII')  # magic, format version, manifest length
+# Section -> what its entries are keyed by and hold
+SECTIONS = {
+    'locations': 'ZIP -> [county, state slug, city, state code]',
+    'coordinates': 'ZIP -> [lat, lng]',
+    'electricity': 'state slug/county -> [data, source] from the provider chain',
+    'eia': 'state code -> [data, source] from EIA',
+    'census': 'ZIP -> demographics',
+    'vantage': 'ZIP -> Vantage Score record'
+}
+# Values stored as JSON lists that the request path expects as tuples
+TUPLE_SECTIONS = ('locations', 'coordinates')
+
+
+def electricity_key(state: str, county: str) -> str:
+    return f'{state}/{county}'
+
+
+def write_snapshot(path: str, sections: Dict[str, dict], version: Optional[str] = None, source: str = '',
+                   level: int = 9) -> dict:
+    """Write sections (name -> JSON-serialisable dict) to one compressed bundle file
+
+    The file is a fixed header, a JSON manifest (bundle version, build time
+    and each section's offset, sizes, entry count and CRC) and the sections
+    as zlib-compressed JSON. It is written beside path and swapped in, so a
+    running server never maps a partial file.
+    """
+    unknown = sorted(set(sections) - set(SECTIONS))
+    if unknown:
+        raise ValueError(f'Unknown snapshot sections: {", ".join(unknown)}')
+    built_at = datetime.now(timezone.utc)
+    manifest = {
+        'format': FORMAT_VERSION,
+        'version': version or built_at.strftime('%Y%m%d%H%M%S'),
+        'built_at': built_at.isoformat(timespec='seconds'),
+        'source': source,
+        'sections': {}
+    }
+    blobs, offset = [], 0
+    for name, entries in sections.items():
+        raw = json.dumps(entries, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        blob = zlib.compress(raw, level)
+        manifest['sections'][name] = {'offset': offset, 'length': len(blob), 'raw_length': len(raw),
+                                      'entries': len(entries), 'crc32': zlib.crc32(blob)}
+        blobs.append(blob)
+        offset += len(blob)
+    manifest_bytes = json.dumps(manifest).encode('utf-8')
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+class DataSnapshot:
+    """Read-only upstream data from a bundle written by write_snapshot
+
+    The file is memory-mapped once; a section is checked against its CRC and
+    inflated into a dict the first time it is used (or by preload(), before
+    workers fork), after which every lookup is a dict access.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError(f'{path} is not a data snapshot')
+        magic, file_format, manifest_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a data snapshot')
+        if file_format != FORMAT_VERSION:
+            raise ValueError(f'{path} is snapshot format {file_format}; this build reads format {FORMAT_VERSION}')
+        self.manifest = json.loads(self._map[HEADER.size:HEADER.size + manifest_length])
+        self._data_start = HEADER.size + manifest_length
+        self._sections: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        return self.manifest['version']
+
+    def section(self, name: str) -> Dict[str, Any]:
+        """A section's entries (empty if the bundle doesn't have it)"""
+        entries = self._sections.get(name)
+        if entries is not None:
+            return entries
+        with self._lock:
+            if name not in self._sections:
+                self._sections[name] = self._inflate(name)
+            return self._sections[name]
+
+    def _inflate(self, name: str) -> Dict[str, Any]:
+        info = self.manifest['sections'].get(name)
+        if info is None:
+            return {}
+        start = self._data_start + info['offset']
+        blob = self._map[start:start + info['length']]
+        if zlib.crc32(blob) != info['crc32']:
+            raise ValueError(f'Section {name!r} of {self.path} is corrupt')
+        entries = json.loads(zlib.decompress(blob))
+        if name in TUPLE_SECTIONS:
+            entries = {key: tuple(value) for key, value in entries.items()}
+        return entries
+
+    def preload(self) -> 'DataSnapshot':
+        for name in self.manifest['sections']:
+            self.section(name)
+        return self
+
+    def location(self, zip_code: str) -> Optional[Tuple[str, str, str, str]]:
+        """(county, state slug, city, state code) as zip_to_location returns it"""
+        return self.section('locations').get(zip_code)
+
+    def coordinates(self, zip_code: str) -> Optional[Tuple[float, float]]:
+        return self.section('coordinates').get(zip_code)
+
+    def electricity(self, county: str, state: str, state_code: str) -> Tuple[Optional[dict], Optional[str], None]:
+        """(data, source, raw_data) for the county, falling back to the state's EIA figures"""
+        entry = self.section('electricity').get(electricity_key(state, county)) or self.section('eia').get(state_code)
+        return (entry[0], entry[1], None) if entry else (None, None, None)
+
+    def census(self, zip_code: str) -> Optional[dict]:
+        return self.section('census').get(zip_code)
+
+    def vantage(self) -> Optional[Dict[str, dict]]:
+        """The Vantage Score table, or None if the bundle was built without one"""
+        return self.section('vantage') if 'vantage' in self.manifest['sections'] else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = sorted(self._sections)
+        return {
+            'path': self.path,
+            'version': self.version,
+            'built_at': self.manifest['built_at'],
+            'bytes': len(self._map),
+            'sections': {name: info['entries'] for name, info in self.manifest['sections'].items()},
+            'loaded': loaded
+        }
@@ -2,6 +2,7 @@
 import numpy as np
 from typing import Dict, Any
 from datetime import datetime
+from utils.incentive_rules import DEFAULT_RULES, IncentiveRules
 class SolarCalculator:
     """Core calculation engine for solar loan qualification"""
     # Constants
@@ -22,29 +23,22 @@ class SolarCalculator:
         # Round up to nearest 0.5 kW
         return round(system_size_kw * 2) / 2
     @staticmethod
-    def calculate_system_cost(system_size_kw: float, state: str = None) -> Dict[str, float]:
+    def calculate_system_sizes(monthly_bills, electricity_rates, sun_hours) -> np.ndarray:
+        """calculate_system_size vectorised over arrays"""
+        annual_kwh = np.asarray(monthly_bills, dtype=np.float64) / (np.asarray(electricity_rates) / 100) * 12
+        system_size_kw = annual_kwh / (365 * np.asarray(sun_hours) * SolarCalculator.SYSTEM_EFFICIENCY)
+        return np.round(system_size_kw * 2) / 2
+    @staticmethod
+    def calculate_system_cost(system_size_kw: float, state: str = None,
+                              rules: IncentiveRules = None) -> Dict[str, float]:
         """Calculate total system cost with incentives"""
-        # Base cost
-        gross_cost = system_size_kw * 1000 * SolarCalculator.COST_PER_WATT
-        # Federal tax credit (30%)
-        federal_credit = gross_cost * 0.30
-        # State incentives (simplified)
-        state_incentives = {
-            'CA': min(1000, gross_cost * 0.05),
-            'NY': min(5000, gross_cost * 0.10),
-            'TX': 0,  # No state incentive
-            'FL': 0,
-            'IL': min(3000, gross_cost * 0.07)
-        }
-        state_credit = state_incentives.get(state, 0)
-        # Net cost
-        net_cost = gross_cost - federal_credit - state_credit
-        return {
-            'gross_cost': round(gross_cost, 2),
-            'federal_credit': round(federal_credit, 2),
-            'state_credit': round(state_credit, 2),
-            'net_cost': round(net_cost, 2)
-        }
+        # Installed cost and federal/state incentives come from the compiled
+        # rules (built-in defaults unless DB-backed rules are passed in)
+        return (rules or DEFAULT_RULES).evaluate(system_size_kw, state)
+    @staticmethod
+    def calculate_system_costs(system_sizes_kw, states, rules: IncentiveRules = None) -> Dict[str, np.ndarray]:
+        """calculate_system_cost vectorised over many systems"""
+        return (rules or DEFAULT_RULES).evaluate_many(system_sizes_kw, states)
     @staticmethod
     def calculate_monthly_payment(principal: float, apr: float, years: int) -> float:
         """Calculate monthly loan payment"""
@@ -57,6 +51,17 @@ class SolarCalculator:
                  ((1 + monthly_rate)**num_payments - 1)
         return round(payment, 2)
     @staticmethod
+    def calculate_monthly_payments(principals, aprs, years) -> np.ndarray:
+        """calculate_monthly_payment vectorised over arrays"""
+        principals = np.asarray(principals, dtype=np.float64)
+        monthly_rate = np.asarray(aprs, dtype=np.float64) / 100 / 12
+        num_payments = np.asarray(years, dtype=np.float64) * 12
+        growth = (1 + monthly_rate) ** num_payments
+        with np.errstate(divide='ignore', invalid='ignore'):
+            payment = np.where(monthly_rate == 0, principals / num_payments,
+                               principals * (monthly_rate * growth) / (growth - 1))
+        return np.round(payment, 2)
+    @staticmethod
     def calculate_payback_period(system_cost: float, monthly_bill: float,
                                 monthly_payment: float) -> float:
         """Calculate payback period in years"""
@@ -71,6 +76,12 @@ class SolarCalculator:
         payback_years = system_cost / annual_savings
         return round(payback_years, 1)
     @staticmethod
+    def calculate_payback_periods(system_costs, monthly_bills, monthly_payments) -> np.ndarray:
+        """calculate_payback_period vectorised over arrays"""
+        annual_savings = np.asarray(monthly_bills, dtype=np.float64) * 12
+        net_annual_cost = np.asarray(monthly_payments, dtype=np.float64) * 12 - annual_savings
+        return np.where(net_annual_cost <= 0, 0.0, np.round(np.asarray(system_costs) / annual_savings, 1))
+    @staticmethod
     def calculate_lifetime_savings(system_size_kw: float, electricity_rate: float,
                                  sun_hours: float, years: int = 25) -> float:
         """Calculate 25-year savings"""
@@ -84,3 +95,12 @@ class SolarCalculator:
         avg_rate = electricity_rate * ((1.03**years - 1) / (0.03 * years))
         lifetime_savings = total_kwh * (avg_rate / 100)
         return round(lifetime_savings, 2)
+    @staticmethod
+    def calculate_lifetime_savings_many(system_sizes_kw, electricity_rates, sun_hours,
+                                        years: int = 25) -> np.ndarray:
+        """calculate_lifetime_savings vectorised over arrays"""
+        efficiency = sum(SolarCalculator.SYSTEM_EFFICIENCY * (1 - SolarCalculator.PANEL_DEGRADATION * year)
+                         for year in range(years))
+        total_kwh = np.asarray(system_sizes_kw, dtype=np.float64) * 365 * np.asarray(sun_hours) * efficiency
+        avg_rate = np.asarray(electricity_rates, dtype=np.float64) * ((1.03**years - 1) / (0.03 * years))
+        return np.round(total_kwh * (avg_rate / 100), 2)
@@ -0,0 +1,194 @@
+# backend/utils/spatial_index.py
+import csv
+import heapq
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_CENTROIDS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'zip_centroids.txt'
+)
+
+
+def to_unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """Lat/lon in degrees to 3-D unit vectors, so straight-line distance orders like great-circle distance"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    """to_unit_vectors for a single point, without numpy's per-call overhead"""
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)
+
+
+def chord_to_km(chord_sq: float) -> float:
+    """Great-circle distance for a squared chord length between unit vectors"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(chord_sq) / 2, 1.0))
+
+
+class KDTree:
+    """Static KD-tree over 3-D points
+
+    Points are reordered so every node covers a contiguous slice; leaves hold
+    up to leaf_size points and are scanned with one vectorised distance call.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 16):
+        points = np.asarray(points, dtype=np.float64)
+        order = np.arange(len(points), dtype=np.int32)
+        starts, ends, dims, splits, lefts, rights = [], [], [], [], [], []
+
+        def add_node(start, end):
+            starts.append(start)
+            ends.append(end)
+            dims.append(-1)
+            splits.append(0.0)
+            lefts.append(-1)
+            rights.append(-1)
+            return len(starts) - 1
+
+        stack = [add_node(0, len(points))] if len(points) else []
+        while stack:
+            node = stack.pop()
+            start, end = starts[node], ends[node]
+            if end - start <= leaf_size:
+                continue
+            block = points[order[start:end]]
+            dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (end - start) // 2
+            part = np.argpartition(block[:, dim], mid)
+            order[start:end] = order[start:end][part]
+            dims[node] = dim
+            splits[node] = float(points[order[start + mid], dim])
+            lefts[node] = add_node(start, start + mid)
+            rights[node] = add_node(start + mid, end)
+            stack += [lefts[node], rights[node]]
+
+        self.points = points[order]
+        self.order = order
+        # One tuple per node (about n / leaf_size * 2 of them); the query loop
+        # reads these several times faster than it could index numpy arrays
+        self._nodes = list(zip(starts, ends, dims, splits, lefts, rights))
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def query(self, point: Sequence[float], k: int = 1) -> List[Tuple[float, int]]:
+        """(squared distance, original index) of the k nearest points, nearest first"""
+        if not self._nodes or k < 1:
+            return []
+        q = np.asarray(point, dtype=np.float64)
+        qs = q.tolist()
+        best = []  # max-heap of (-dist_sq, index) holding the current k nearest
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if len(best) == k and bound >= -best[0][0]:
+                continue
+            start, end, dim, split, left, right = self._nodes[node]
+            if dim < 0:
+                d2 = ((self.points[start:end] - q) ** 2).sum(axis=1)
+                for dist, i in zip(d2.tolist(), range(start, end)):
+                    if len(best) < k:
+                        heapq.heappush(best, (-dist, i))
+                    elif dist < -best[0][0]:
+                        heapq.heapreplace(best, (-dist, i))
+                continue
+            diff = qs[dim] - split
+            near, far = (left, right) if diff < 0 else (right, left)
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+        return sorted((-neg, int(self.order[i])) for neg, i in best)
+
+
+class LocationIndex:
+    """Nearest known locations and distance-weighted estimates for coordinates without data"""
+
+    def __init__(self, records: List[Dict[str, Any]], fields: Sequence[str]):
+        """records: dicts with zip_code, latitude, longitude and the numeric fields to estimate"""
+        records = [r for r in records if r.get('latitude') is not None and r.get('longitude') is not None]
+        self.fields = list(fields)
+        self.zip_codes = [r['zip_code'] for r in records]
+        self.states = [r.get('state') for r in records]
+        self.values = np.array([[r.get(field, np.nan) for field in self.fields] for r in records],
+                               dtype=np.float64).reshape(len(records), len(self.fields))
+        self.tree = KDTree(to_unit_vectors([r['latitude'] for r in records], [r['longitude'] for r in records])
+                           if records else np.empty((0, 3)))
+
+    def __len__(self) -> int:
+        return len(self.tree)
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5) -> List[Tuple[int, float]]:
+        """(record position, distance in km) of the k nearest locations"""
+        hits = self.tree.query(unit_vector(latitude, longitude), k)
+        return [(i, chord_to_km(d2)) for d2, i in hits]
+
+    def estimate(self, latitude: float, longitude: float, k: int = 5, power: float = 2.0) -> Optional[Dict[str, Any]]:
+        """Inverse-distance-weighted field values from the k nearest locations
+
+        Each field is averaged over the neighbours that have it. A neighbour
+        within 0.1 km is taken as an exact match.
+        """
+        neighbours = self.nearest(latitude, longitude, k)
+        if not neighbours:
+            return None
+        weights = [1e6 if d <= 0.1 else 1 / d ** power for _, d in neighbours]
+        result = {}
+        for f, field in enumerate(self.fields):
+            pairs = [(w, self.values.item(i, f)) for w, (i, _) in zip(weights, neighbours)]
+            pairs = [(w, v) for w, v in pairs if not math.isnan(v)]
+            total = sum(w for w, _ in pairs)
+            result[field] = sum(w * v for w, v in pairs) / total if total else None
+        return {
+            **result,
+            'state': self.states[neighbours[0][0]],
+            'neighbours': [{'zip_code': self.zip_codes[i], 'distance_km': round(d, 1)} for i, d in neighbours]
+        }
+
+
+class ZipCentroids:
+    """ZIP -> (lat, lon) from a Census ZCTA gazetteer or zip,lat,lon CSV, held as sorted arrays"""
+
+    def __init__(self, zip_codes: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray):
+        order = np.argsort(zip_codes)
+        self.zip_codes = zip_codes[order].astype(np.int32)
+        self.latitudes = latitudes[order].astype(np.float32)
+        self.longitudes = longitudes[order].astype(np.float32)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CENTROIDS_PATH) -> Optional['ZipCentroids']:
+        """Read the centroid file if present, otherwise return None"""
+        if not os.path.exists(path):
+            return None
+        with open(path, newline='', encoding='utf-8') as f:
+            sample = f.readline()
+            f.seek(0)
+            reader = csv.DictReader(f, delimiter='\t' if '\t' in sample else ',')
+            columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+            zip_col = columns.get('geoid') or columns.get('zip') or columns.get('zip_code')
+            lat_col = columns.get('intptlat') or columns.get('lat') or columns.get('latitude')
+            lon_col = columns.get('intptlong') or columns.get('lon') or columns.get('longitude')
+            if not (zip_col and lat_col and lon_col):
+                raise ValueError(f'{path} needs ZIP, latitude and longitude columns')
+            rows = [(int(r[zip_col]), float(r[lat_col]), float(r[lon_col])) for r in reader]
+        if not rows:
+            return None
+        zips, lats, lons = (np.array(column) for column in zip(*rows))
+        return cls(zips, lats, lons)
+
+    def __len__(self) -> int:
+        return len(self.zip_codes)
+
+    def coordinates(self, zip_code: str) -> Optional[Tuple[float, float]]:
+        if not zip_code.isdigit():
+            return None
+        value = int(zip_code)
+        i = int(np.searchsorted(self.zip_codes, value))
+        if i < len(self.zip_codes) and self.zip_codes[i] == value:
+            return float(self.latitudes[i]), float(self.longitudes[i])
+        return None
@@ -1,13 +1,23 @@
 #!/usr/bin/env python3
 """
 Simple script to view and analyze the API logs in a readable format.
+
+Without filters it reads the JSONL logs, which the server writes only when
+the log store is off (LOG_STORE_ENABLED=false) or LOG_JSONL_ENABLED=true.
+
+With filters, entries are looked up in the indexed log store instead, e.g.
+    python view_logs.py --type errors --zip 10001 --since 7d
+Use --import to load existing JSONL logs into the store.
 """
 
+import argparse
 import json
 import os
 from datetime import datetime
 from collections import defaultdict
 
+from utils.log_store import LOG_TYPES, LogStore, parse_time
+
 def load_jsonl(filename):
     """Load JSON Lines file"""
     logs = []
@@ -116,19 +126,65 @@ def print_data_sources():
     print("DATA SOURCE ANALYSIS")
     print("=" * 60)
     
-    source_logs = load_jsonl('logs/data_sources.jsonl')
+    # Data source details are part of each request's record
+    api_logs = load_jsonl('logs/api_requests.jsonl')
     
-    for log in source_logs:
+    for log in api_logs:
+        source = log['response_data'].get('data_source')
+        if not source:
+            continue
         timestamp = datetime.fromisoformat(log['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
         print(f"\n[{timestamp}] ZIP: {log['zip_code']}")
-        print(f"  Source: {log['data_source']}")
+        print(f"  Source: {source}")
         
-        if 'raw' in log['raw_data'] and log['raw_data']['raw']:
-            raw = log['raw_data']['raw']
+        raw = log.get('extra_data', {}).get('raw_scraped_data')
+        if raw:
             print(f"  Raw Data: {raw}")
 
-if __name__ == "__main__":
+def import_logs(store):
+    """Backfill the log store from the JSONL files"""
+    for log_type in LOG_TYPES:
+        path = f'logs/{log_type}.jsonl'
+        if os.path.exists(path):
+            print(f"Imported {store.import_jsonl(path, log_type)} {log_type} entries")
+
+def print_query(store, args):
+    """Print store entries matching the command line filters"""
+    logs, total = store.query(
+        since=parse_time(args.since), log_type=args.type, endpoint=args.endpoint,
+        zip_code=args.zip, status=args.status, limit=args.limit
+    )
+    print(f"{total} matching {args.type} entries, showing {len(logs)}")
+    for log in logs:
+        timestamp = datetime.fromisoformat(log['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+        detail = log.get('error') or log.get('data_source') or (log.get('response_data') or {}).get('data_source', '')
+        print(f"[{timestamp}] {str(log.get('endpoint', '')).upper()} - ZIP: {log.get('zip_code')}  {detail}")
+
+def main():
+    parser = argparse.ArgumentParser(description='View the API logs')
+    parser.add_argument('--db', default=os.getenv('LOG_STORE_PATH', 'logs/logs.db'), help='Log store path')
+    parser.add_argument('--import', dest='import_logs', action='store_true',
+                        help='Load the JSONL logs into the log store')
+    parser.add_argument('--type', choices=LOG_TYPES, help='Query the log store for this log type')
+    parser.add_argument('--zip', help='Only entries for this ZIP code')
+    parser.add_argument('--endpoint', help='Only entries for this endpoint')
+    parser.add_argument('--status', choices=['ok', 'degraded', 'error'], help='Only entries with this status')
+    parser.add_argument('--since', help='ISO time or relative age such as 30m, 24h or 7d')
+    parser.add_argument('--limit', type=int, default=50, help='Entries to show')
+    args = parser.parse_args()
+
+    if args.import_logs or args.type:
+        store = LogStore(args.db)
+        if args.import_logs:
+            import_logs(store)
+        if args.type:
+            print_query(store, args)
+        return
+
     print_summary()
     print_recent_requests()
     print_errors()
     print_data_sources()
+
+if __name__ == "__main__":
+    main()
@@ -42,6 +42,28 @@ export interface ZipCodeData {
   period?: string;
 }
 
+export interface ZipProfileSection<T> {
+  status: 'ok' | 'not_found' | 'error' | 'timeout' | 'skipped';
+  elapsed_ms: number;
+  data?: T;
+  error?: string;
+}
+
+export interface ZipProfile {
+  zip_code: string;
+  city: string;
+  state: string;
+  sections: {
+    location: ZipProfileSection<{ county: string; state: string; city: string; state_code: string }>;
+    electricity: ZipProfileSection<Omit<ZipCodeData, 'zip_code' | 'city' | 'state'>>;
+    demographics: ZipProfileSection<Record<string, unknown>>;
+    vantage: ZipProfileSection<VantageScoreData>;
+  };
+  elapsed_ms: number;
+  degraded?: boolean;
+  error?: string;
+}
+
 export interface VantageScoreData {
   zip_code: string;
   vantage_score: number;
@@ -94,46 +116,34 @@ class ApiService {
 
   async getZipCodeData(zipCode: string): Promise<ZipCodeData> {
     try {
-      const response = await fetch(`${this.baseUrl}/electricity-data?zip=${zipCode}`, {
+      // One round trip: the backend resolves the ZIP once and fetches
+      // electricity, demographic and Vantage Score data concurrently
+      const response = await fetch(`${this.baseUrl}/zip-profile?zip=${zipCode}`, {
         method: 'GET',
         headers: {
           'Content-Type': 'application/json',
         },
       });
 
-      if (!response.ok) {
-        const errorData = await response.json().catch(() => ({}));
-        throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
-      }
-
-      const result = await response.json();
+      const profile: ZipProfile = await response.json().catch(() => ({}));
+      const electricity = profile.sections?.electricity;
 
-      // Fetch demographic data in background for logging (don't wait for it)
-      this.fetchDemographicDataBackground(zipCode);
+      if (!response.ok || electricity?.status !== 'ok' || !electricity.data) {
+        throw new Error(profile.error || electricity?.error || 'No electricity data available for this ZIP code');
+      }
 
-      return result;
+      return {
+        zip_code: profile.zip_code,
+        city: profile.city,
+        state: profile.state,
+        ...electricity.data
+      };
     } catch (error) {
       console.error('ZIP Code API Error:', error);
       throw error;
     }
   }
 
-  private async fetchDemographicDataBackground(zipCode: string): Promise<void> {
-    try {
-      // Fetch demographic data in background - this will be logged but not returned to frontend
-      await fetch(`${this.baseUrl}/demographic-data?zip=${zipCode}`, {
-        method: 'GET',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      });
-      console.log(`Background demographic data fetched for ZIP: ${zipCode}`);
-    } catch (error) {
-      console.warn('Background demographic fetch failed:', error);
-      // Don't throw error - this is background operation
-    }
-  }
-
   async getVantageScore(zipCode: string): Promise<VantageScoreData | null> {
     try {
       const response = await fetch(`${this.baseUrl}/vantage-score?zip=${zipCode}`, {
@@ -5,6 +5,19 @@ import { storage } from "./storage";
 export async function registerRoutes(app: Express): Promise<Server> {
   // Proxy routes to Python backend
   const BACKEND_URL = process.env.BACKEND_URL || 'http://localhost:5500';
+  // Latency SLO for proxied calls: the backend is told the budget so it can
+  // answer with a degraded result in time; the abort is only a last resort
+  const BACKEND_TIMEOUT_MS = Number(process.env.BACKEND_TIMEOUT_MS || 20000);
+
+  const backendFetch = (path: string, init: RequestInit = {}) =>
+    fetch(`${BACKEND_URL}${path}`, {
+      ...init,
+      headers: {
+        ...(init.headers as Record<string, string> | undefined),
+        'X-Request-Timeout-Ms': String(BACKEND_TIMEOUT_MS),
+      },
+      signal: AbortSignal.timeout(BACKEND_TIMEOUT_MS + 1000),
+    });
 
   // Health check endpoint
   app.get('/api/health', (req, res) => {
@@ -14,7 +27,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   // Proxy qualification check to Python backend
   app.post('/api/check-qualification', async (req, res) => {
     try {
-      const response = await fetch(`${BACKEND_URL}/api/check-qualification`, {
+      const response = await backendFetch('/api/check-qualification', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -41,7 +54,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   // Proxy stats endpoint to Python backend
   app.get('/api/stats', async (req, res) => {
     try {
-      const response = await fetch(`${BACKEND_URL}/api/stats`);
+      const response = await backendFetch('/api/stats');
       const data = await response.json();
 
       if (!response.ok) {
@@ -62,7 +75,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.get('/api/electricity-data', async (req, res) => {
     try {
       const zipCode = req.query.zip;
-      const response = await fetch(`${BACKEND_URL}/electricity-data?zip=${zipCode}`);
+      const response = await backendFetch(`/electricity-data?zip=${zipCode}`);
       const data = await response.json();
 
       if (!response.ok) {
@@ -83,7 +96,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.get('/api/demographic-data', async (req, res) => {
     try {
       const zipCode = req.query.zip;
-      const response = await fetch(`${BACKEND_URL}/demographic-data?zip=${zipCode}`);
+      const response = await backendFetch(`/demographic-data?zip=${zipCode}`);
       const data = await response.json();
 
       if (!response.ok) {
@@ -104,7 +117,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
   app.get('/api/vantage-score', async (req, res) => {
     try {
       const zipCode = req.query.zip;
-      const response = await fetch(`${BACKEND_URL}/vantage-score?zip=${zipCode}`);
+      const response = await backendFetch(`/vantage-score?zip=${zipCode}`);
       const data = await response.json();
 
       if (!response.ok) {
@@ -121,6 +134,27 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  // Proxy the aggregated ZIP profile (electricity, demographics, vantage score) to your app.py backend
+  app.get('/api/zip-profile', async (req, res) => {
+    try {
+      const zipCode = req.query.zip;
+      const response = await backendFetch(`/api/zip-profile?zip=${zipCode}`);
+      const data = await response.json();
+
+      if (!response.ok) {
+        return res.status(response.status).json(data);
+      }
+
+      res.json(data);
+    } catch (error) {
+      console.error('ZIP profile proxy error:', error);
+      res.status(500).json({
+        error: 'Failed to connect to ZIP profile service',
+        details: error instanceof Error ? error.message : 'Unknown error'
+      });
+    }
+  });
+
   const httpServer = createServer(app);
 
   return httpServer;
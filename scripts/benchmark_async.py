@@ -0,0 +1,161 @@
+# scripts/benchmark_async.py
+"""
+Compare concurrent-request throughput of the sync server (gunicorn, one
+worker) against the asyncio path (uvicorn + async_app, one worker) with every
+upstream replaced by a local stub with fixed latency.
+
+    python scripts/benchmark_async.py --requests 400 --concurrency 100 --latency-ms 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import aiohttp
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from upstream_stubs import stub_env
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(os.path.dirname(SCRIPTS_DIR), 'backend')
+# Measure the request paths themselves: admission never degrades or sheds, and
+# no shared cache or log store carries results over from an earlier run
+BENCHMARK_ENV = {
+    'ADMISSION_SOFT_LIMIT': '100000', 'ADMISSION_HARD_LIMIT': '100000',
+    'ADMISSION_SOFT_WAIT_MS': '600000', 'ADMISSION_HARD_WAIT_MS': '600000',
+    'SHARED_CACHE_URL': 'none', 'LOG_STORE_ENABLED': 'false'
+}
+def run_env(run_dir: str) -> dict:
+    """Server settings that keep a run's logs and shared cache in run_dir
+
+    Nothing is read from or left in the repo's logs/ and cache/, and the
+    prewarmer is off, so every run starts cold and runs are comparable.
+    """
+    return {
+        'LOGS_DIR': os.path.join(run_dir, 'logs'),
+        'SHARED_CACHE_URL': 'sqlite:///' + os.path.join(run_dir, 'shared_cache.db'),
+        'PREWARM_TOP_N': '0'
+    }
+def server_command(mode: str, port: int, sync_threads: int):
+    if mode == 'sync':
+        return ['gunicorn', '-c', 'gunicorn.conf.py', 'app:app'], {
+            'PORT': str(port), 'WEB_CONCURRENCY': '1', 'GUNICORN_THREADS': str(sync_threads)
+        }
+    return [sys.executable, '-m', 'uvicorn', 'async_app:app', '--port', str(port),
+            '--log-level', 'warning'], {}
+def wait_until_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'{base_url}/healthz', timeout=1) as resp:
+                if resp.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Server at {base_url} did not become ready')
+def build_requests(total: int):
+    """Rotate through the three I/O-bound endpoints with distinct ZIPs"""
+    plan = []
+    for i in range(total):
+        zip_code = f'{10000 + i:05d}'
+        kind = i % 3
+        if kind == 0:
+            plan.append(('GET', f'/electricity-data?zip={zip_code}', None))
+        elif kind == 1:
+            plan.append(('GET', f'/demographic-data?zip={zip_code}', None))
+        else:
+            plan.append(('POST', '/api/check-qualification', {
+                'zipCode': zip_code, 'electricBill': 150, 'creditBand': 'Good', 'roofSize': 1500
+            }))
+    return plan
+async def drive(base_url: str, plan, concurrency: int):
+    """Send the planned requests with at most `concurrency` in flight
+
+    Returns latencies, errors (5xx and transport failures), degraded
+    (answers marked degraded, which skip the upstreams) and the elapsed time.
+    """
+    latencies, errors, degraded = [], 0, 0
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as client:
+        async def one(method, path, body):
+            nonlocal errors, degraded
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with client.request(method, base_url + path, json=body) as resp:
+                        payload = await resp.read()
+                        if resp.status >= 500:
+                            errors += 1
+                        elif resp.status == 200 and json.loads(payload).get('degraded'):
+                            degraded += 1
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+        started = time.perf_counter()
+        await asyncio.gather(*(one(*item) for item in plan))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, degraded, elapsed
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+def run_mode(mode: str, port: int, stub_vars: dict, args) -> dict:
+    command, extra_env = server_command(mode, port, args.sync_threads)
+    with tempfile.TemporaryDirectory(prefix=f'benchmark-{mode}-') as run_dir:
+        env = {**os.environ, **stub_vars, **run_env(run_dir), **BENCHMARK_ENV, **extra_env}
+        proc = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            wait_until_ready(base_url)
+            latencies, errors, degraded, elapsed = asyncio.run(
+                drive(base_url, build_requests(args.requests), args.concurrency))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'errors': errors,
+        'degraded': degraded,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 1),
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1)
+        }
+    }
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sync vs async request paths on stubbed upstreams')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=100, help='Latency of every stubbed upstream call')
+    parser.add_argument('--sync-threads', type=int, default=4, help='Threads for the single sync worker')
+    parser.add_argument('--port', type=int, default=5601)
+    args = parser.parse_args()
+    # The stubs run in their own process so they don't share a GIL with the load generator
+    stub_port = args.port + 10
+    stub = subprocess.Popen([sys.executable, os.path.join(SCRIPTS_DIR, 'upstream_stubs.py'),
+                             '--port', str(stub_port), '--latency-ms', str(args.latency_ms)],
+                            stdout=subprocess.DEVNULL)
+    try:
+        stub_vars = stub_env(f'http://127.0.0.1:{stub_port}')
+        results = [run_mode(mode, args.port + i, stub_vars, args) for i, mode in enumerate(('sync', 'async'))]
+    finally:
+        stub.terminate()
+    speedup = results[1]['throughput_rps'] / results[0]['throughput_rps'] if results[0]['throughput_rps'] else None
+    print(json.dumps({
+        'config': vars(args),
+        'results': results,
+        'async_speedup': round(speedup, 2) if speedup else None
+    }, indent=2))
+if __name__ == "__main__":
+    main()
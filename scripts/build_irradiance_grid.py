@@ -0,0 +1,42 @@
+# scripts/build_irradiance_grid.py
+"""
+Convert a gridded monthly irradiance export into data/irradiance_grid.{npy,json},
+the memory-mapped dataset the production model reads.
+
+The input is a CSV with one row per grid cell: lat, lon and twelve monthly
+mean daily GHI values in kWh/m²/day (jan ... dec), e.g. an NSRDB or NASA
+POWER climatology export. Cells are snapped to a --step-degree lattice.
+
+    python scripts/build_irradiance_grid.py nsrdb_monthly.csv --step 0.04
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from utils.irradiance import DEFAULT_IRRADIANCE_PATH, build_irradiance_grid
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+def read_points(path: str):
+    """(lat, lon, monthly GHI) tuples from the CSV"""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fields = {name.lower().strip(): name for name in reader.fieldnames or []}
+        missing = [name for name in ['lat', 'lon'] + MONTHS if name not in fields]
+        if missing:
+            raise ValueError(f'{path} is missing columns: {", ".join(missing)}')
+        for row in reader:
+            yield (float(row[fields['lat']]), float(row[fields['lon']]),
+                   [float(row[fields[month]]) for month in MONTHS])
+def main():
+    parser = argparse.ArgumentParser(description='Build the memory-mapped irradiance grid')
+    parser.add_argument('csv', help='Monthly GHI per cell: lat,lon,jan,...,dec')
+    parser.add_argument('--step', type=float, required=True, help='Grid spacing in degrees')
+    parser.add_argument('--path', default=DEFAULT_IRRADIANCE_PATH, help='Output path without extension')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    meta = build_irradiance_grid(read_points(args.csv), args.step, args.path, source=os.path.basename(args.csv))
+    print(f":white_check_mark: Built irradiance grid {tuple(meta['shape'])} from {meta['points']} cells "
+          f"in {time.perf_counter() - start:.2f}s -> {args.path}.npy")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# scripts/build_snapshot.py
+"""
+Capture everything the request path fetches from upstreams into one versioned,
+compressed bundle (data/data_snapshot.bin) for OFFLINE_MODE: the location and
+coordinates of each ZIP, the electricity rate of each county they fall in
+(findenergy -> EIA -> alternatives), each state's EIA figures, Census
+demographics per ZIP and the Vantage Score table.
+
+    # every ZIP in the Vantage workbook (the default), 16 lookups at a time
+    python scripts/build_snapshot.py --workers 16
+
+    # a list of ZIPs, one per line
+    python scripts/build_snapshot.py --zips zips.txt --version 2026-10
+
+Then start the server with OFFLINE_MODE=true (and DATA_SNAPSHOT_PATH if the
+bundle was written elsewhere); it makes no network calls.
+
+For hermetic load tests, capture the upstream stubs' answers for the ZIPs
+load_test.py sends and run the test against the bundle:
+
+    python scripts/build_snapshot.py --stubs --zip-range 10001-10500 --path load_test.snap
+    python scripts/load_test.py --snapshot load_test.snap
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(SCRIPTS_DIR), 'backend'))
+sys.path.append(SCRIPTS_DIR)
+from utils.snapshot import DEFAULT_SNAPSHOT_PATH, electricity_key, write_snapshot
+def read_zips(args) -> list:
+    zip_codes = set()
+    for path in args.zips or []:
+        with open(path, encoding='utf-8') as f:
+            zip_codes.update(line.strip().zfill(5) for line in f if line.strip())
+    if args.zip_range:
+        first, _, last = args.zip_range.partition('-')
+        zip_codes.update(f'{zip_code:05d}' for zip_code in range(int(first), int(last or first) + 1))
+    return sorted(zip_codes)
+def lookup_all(pool, name: str, fetch, keys) -> dict:
+    """{key: fetch(*key)} for every key that didn't raise or come back empty"""
+    start = time.perf_counter()
+    futures = {key: pool.submit(fetch, *key) for key in keys}
+    results = {}
+    for key, future in futures.items():
+        try:
+            value = future.result()
+        except Exception:
+            continue
+        if value is not None and (not isinstance(value, tuple) or value[0]):
+            results[key] = value
+    print(f"{name}: {len(results):,} of {len(futures):,} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return results
+def collect(app, zip_codes: list, workers: int) -> dict:
+    """Run the app's upstream lookups for every ZIP, then for the counties and states they are in"""
+    keys = [(zip_code,) for zip_code in zip_codes]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        locations = lookup_all(pool, 'locations', app._lookup_zip_location, keys)
+        coordinates = lookup_all(pool, 'coordinates', app._lookup_zip_coordinates, keys)
+        census = lookup_all(pool, 'census', app.fetch_census_demographics, keys)
+        counties = sorted({(county, state, state_code) for county, state, _, state_code in locations.values()})
+        electricity = lookup_all(pool, 'electricity', app._fetch_electricity_data, counties)
+        eia = lookup_all(pool, 'eia', app.get_eia_data, sorted({(state_code,) for _, _, state_code in counties}))
+    return {
+        'locations': {zip_code: list(location) for (zip_code,), location in locations.items()},
+        'coordinates': {zip_code: list(point) for (zip_code,), point in coordinates.items()},
+        'electricity': {electricity_key(state, county): [data, source]
+                        for (county, state, _), (data, source, _) in electricity.items()},
+        'eia': {state_code: [data, source] for (state_code,), (data, source) in eia.items()},
+        'census': {zip_code: demographics for (zip_code,), demographics in census.items()}
+    }
+def main():
+    parser = argparse.ArgumentParser(description='Build the offline data snapshot bundle')
+    parser.add_argument('--path', default=DEFAULT_SNAPSHOT_PATH, help='Bundle to write')
+    parser.add_argument('--zips', action='append', metavar='FILE',
+                        help='ZIPs to capture, one per line (repeatable); default: every ZIP in the Vantage workbook')
+    parser.add_argument('--zip-range', help='Inclusive ZIP range to capture as well, e.g. 10001-10500')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent upstream lookups')
+    parser.add_argument('--version', help='Bundle version label (default: the build time)')
+    parser.add_argument('--stubs', action='store_true', help='Capture the local upstream stubs instead')
+    args = parser.parse_args()
+    source = 'upstream'
+    if args.stubs:
+        from upstream_stubs import start_stub_server, stub_env
+        os.environ.update(stub_env(start_stub_server(latency_ms=0).base_url))
+        source = 'upstream stubs'
+    # app reads its upstream URLs at import, so it is imported once they are set
+    os.environ['OFFLINE_MODE'] = 'false'
+    os.environ.setdefault('SHARED_CACHE_URL', 'none')
+    import app
+
+    start = time.perf_counter()
+    vantage = app.load_vantage_data_from_excel()
+    zip_codes = read_zips(args) if args.zips or args.zip_range else sorted(vantage or {})
+    if not zip_codes:
+        sys.exit("Error: no ZIPs to capture (pass --zips or --zip-range, or add the Vantage workbook)")
+    print(f"Capturing {len(zip_codes):,} ZIPs with {args.workers} workers", file=sys.stderr)
+    sections = collect(app, zip_codes, args.workers)
+    if vantage:
+        sections['vantage'] = vantage
+    manifest = write_snapshot(args.path, sections, args.version, source)
+    counts = ', '.join(f"{name} {info['entries']:,}" for name, info in manifest['sections'].items())
+    print(f":white_check_mark: Snapshot {manifest['version']} ({counts}) -> {args.path} "
+          f"({os.path.getsize(args.path) / 1024 / 1024:.1f} MB) in {time.perf_counter() - start:.1f}s")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# scripts/load_test.py
+"""
+Offline load test: run the backend against local upstream stubs and report
+latency percentiles, throughput and errors per endpoint as JSON.
+
+Every upstream (Zippopotam, FCC, EIA, Census, the scraped sites, Gemini) is
+served by scripts/upstream_stubs.py with its own latency distribution and
+error rate, and the server under test is pointed at it through the *_URL
+environment variables.
+
+    # closed loop: 50 clients for 30 seconds
+    python scripts/load_test.py --concurrency 50 --duration 30 --output run.json
+
+    # open loop at 200 requests/second with a slow, flaky Gemini
+    python scripts/load_test.py --rps 200 --profile gemini=lognormal:900:0.5@0.02
+
+    # fail (exit 1) if p95/p99 or throughput regressed more than 10% against a saved run
+    python scripts/load_test.py --concurrency 50 --baseline run.json --max-regression 0.10
+
+    # hermetic: no upstreams at all, the server answers from a data snapshot
+    # (see build_snapshot.py) in OFFLINE_MODE
+    python scripts/load_test.py --snapshot load_test.snap
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+import aiohttp
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from benchmark_async import BACKEND_DIR, SCRIPTS_DIR, percentile, run_env, server_command, wait_until_ready
+from upstream_stubs import parse_profile_args, stub_env
+ENDPOINTS = ('check-qualification', 'electricity-data', 'demographic-data', 'vantage-score')
+DEFAULT_MIX = 'check-qualification=4,electricity-data=3,demographic-data=2,vantage-score=1'
+CREDIT_BANDS = ('Excellent', 'Good', 'Fair', 'Poor')
+def parse_mix(mix: str, mode: str):
+    """Weighted endpoint list from 'name=weight,...' (the async app has no /vantage-score)"""
+    weights = {}
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f'Unknown endpoint {name!r}; expected one of {", ".join(ENDPOINTS)}')
+        if mode == 'async' and name == 'vantage-score':
+            continue
+        weights[name] = int(weight or 1)
+    return [name for name, weight in weights.items() for _ in range(weight)]
+def build_request(endpoint: str, i: int, zip_count: int):
+    """(method, path, json body) for the i-th request to an endpoint"""
+    zip_code = f'{10001 + i % zip_count:05d}'
+    if endpoint == 'check-qualification':
+        return 'POST', '/api/check-qualification', {
+            'zipCode': zip_code,
+            'electricBill': 80 + (i * 37) % 300,
+            'creditBand': CREDIT_BANDS[i % len(CREDIT_BANDS)],
+            'roofSize': 800 + (i * 113) % 2500
+        }
+    return 'GET', f'/{endpoint}?zip={zip_code}', None
+class Recorder:
+    """Per-endpoint latencies, status codes and errors"""
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+    def record(self, endpoint: str, latency: float, status):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][str(status)] += 1
+        if not isinstance(status, int) or status >= 500:
+            self.errors[endpoint] += 1
+def summarize(latencies, errors: int, elapsed: float, statuses=None) -> dict:
+    if not latencies:
+        return {'requests': 0, 'errors': errors}
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'error_rate': round(errors / len(latencies), 4),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 1),
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(max(latencies) * 1000, 1)
+        }
+    }
+    if statuses is not None:
+        summary['status_counts'] = dict(statuses)
+    return summary
+async def send(client, base_url: str, endpoint: str, i: int, args, recorder: Recorder, started: float):
+    """Send one request and record its latency from `started` (its intended send time)"""
+    method, path, body = build_request(endpoint, i, args.zips)
+    try:
+        async with client.request(method, base_url + path, json=body) as resp:
+            await resp.read()
+            status = resp.status
+    except asyncio.TimeoutError:
+        status = 'timeout'
+    except aiohttp.ClientError as e:
+        status = type(e).__name__
+    recorder.record(endpoint, time.perf_counter() - started, status)
+async def closed_loop(client, base_url: str, plan, args, recorder: Recorder, deadline: float):
+    """`concurrency` clients each sending their next request as soon as the last one returns"""
+    counter = iter(range(args.requests or sys.maxsize))
+    async def client_loop():
+        for i in counter:
+            if time.perf_counter() >= deadline:
+                return
+            await send(client, base_url, plan[i % len(plan)], i, args, recorder, time.perf_counter())
+    await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+async def open_loop(client, base_url: str, plan, args, recorder: Recorder, deadline: float):
+    """Requests start on a fixed schedule at `rps` regardless of how slow responses are
+
+    Latency is measured from each request's scheduled time, so a stalled
+    server shows up in the percentiles instead of silently lowering the load.
+    """
+    start = time.perf_counter()
+    tasks = []
+    i = 0
+    while (not args.requests or i < args.requests):
+        scheduled = start + i / args.rps
+        if scheduled >= deadline:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(send(client, base_url, plan[i % len(plan)], i, args, recorder, scheduled)))
+        i += 1
+    await asyncio.gather(*tasks)
+async def drive(base_url: str, plan, args) -> tuple:
+    recorder = Recorder()
+    connector = aiohttp.TCPConnector(limit=args.max_connections)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as client:
+        if args.warmup:
+            await closed_loop(client, base_url, plan, args, Recorder(), time.perf_counter() + args.warmup)
+        started = time.perf_counter()
+        deadline = started + (args.duration if not args.requests else sys.maxsize)
+        if args.rps:
+            await open_loop(client, base_url, plan, args, recorder, deadline)
+        else:
+            await closed_loop(client, base_url, plan, args, recorder, deadline)
+        elapsed = time.perf_counter() - started
+    return recorder, elapsed
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    """Regressions beyond max_regression (a fraction) in throughput, p95, p99 or error rate"""
+    regressions = []
+    # In open-loop runs throughput is fixed by --rps, so only latency and errors count
+    check_throughput = not report['config'].get('rps') and not baseline.get('config', {}).get('rps')
+    sections = [('overall', report['overall'], baseline.get('overall', {}))]
+    sections += [(name, stats, baseline.get('endpoints', {}).get(name, {}))
+                 for name, stats in report['endpoints'].items()]
+    for name, current, previous in sections:
+        if not current.get('requests') or not previous.get('requests'):
+            continue
+        if check_throughput and current['throughput_rps'] < previous['throughput_rps'] * (1 - max_regression):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+        for pct in ('p95', 'p99'):
+            before, after = previous['latency_ms'][pct], current['latency_ms'][pct]
+            if after > before * (1 + max_regression):
+                regressions.append(f'{name}: {pct} {before} -> {after} ms')
+        if current['error_rate'] > previous['error_rate'] + max_regression / 10:
+            regressions.append(f"{name}: error rate {previous['error_rate']} -> {current['error_rate']}")
+    return regressions
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the backend against local upstream stubs')
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int, default=50,
+                      help='Closed-loop clients (the default mode; also used for warm-up)')
+    load.add_argument('--rps', type=float, help='Open-loop target requests per second')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run (ignored with --requests)')
+    parser.add_argument('--requests', type=int, help='Stop after this many requests instead of --duration')
+    parser.add_argument('--warmup', type=float, default=2, help='Seconds of unrecorded traffic first')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Endpoint weights, name=weight,...')
+    parser.add_argument('--zips', type=int, default=500, help='Distinct ZIP codes to rotate through')
+    parser.add_argument('--mode', choices=('sync', 'async'), default='sync',
+                        help='gunicorn app:app or uvicorn async_app:app')
+    parser.add_argument('--workers', type=int, default=1, help='Sync workers (WEB_CONCURRENCY)')
+    parser.add_argument('--sync-threads', type=int, default=8, help='Threads per sync worker')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Fixed latency for upstreams without a profile')
+    parser.add_argument('--profile', action='append', metavar='NAME=SPEC',
+                        help='Upstream latency spec, e.g. gemini=lognormal:900:0.5@0.02 (see upstream_stubs.py)')
+    parser.add_argument('--snapshot', help='Serve from this data snapshot (OFFLINE_MODE) instead of the stubs')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request client timeout')
+    parser.add_argument('--max-connections', type=int, default=1000)
+    parser.add_argument('--port', type=int, default=5701)
+    parser.add_argument('--output', help='Write the JSON report here as well as stdout')
+    parser.add_argument('--baseline', help='Earlier report to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.10)
+    args = parser.parse_args()
+    plan = parse_mix(args.mix, args.mode)
+    profiles = parse_profile_args(args.profile)
+    stub_port = args.port + 10
+    stub_command = [sys.executable, os.path.join(SCRIPTS_DIR, 'upstream_stubs.py'),
+                    '--port', str(stub_port), '--latency-ms', str(args.latency_ms)]
+    for name, spec in profiles.items():
+        stub_command += ['--profile', f'{name}={spec}']
+    if args.snapshot:
+        stub = None
+        upstream_env = {'OFFLINE_MODE': 'true', 'DATA_SNAPSHOT_PATH': os.path.abspath(args.snapshot)}
+    else:
+        stub = subprocess.Popen(stub_command, stdout=subprocess.DEVNULL)
+        upstream_env = stub_env(f'http://127.0.0.1:{stub_port}')
+    command, extra_env = server_command(args.mode, args.port, args.sync_threads)
+    # A fresh shared cache and log directory per run, so no run is warmed by the last
+    run_dir = tempfile.TemporaryDirectory(prefix='load-test-')
+    env = {**os.environ, **upstream_env, **run_env(run_dir.name), **extra_env, 'WEB_CONCURRENCY': str(args.workers)}
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{args.port}'
+    try:
+        wait_until_ready(base_url)
+        recorder, elapsed = asyncio.run(drive(base_url, plan, args))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        run_dir.cleanup()
+        if stub:
+            stub.terminate()
+    all_latencies = [lat for values in recorder.latencies.values() for lat in values]
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'upstream_profiles': None if args.snapshot else {'default': f'fixed:{args.latency_ms}', **profiles},
+        'overall': summarize(all_latencies, sum(recorder.errors.values()), elapsed),
+        'endpoints': {
+            name: summarize(recorder.latencies[name], recorder.errors[name], elapsed, recorder.statuses[name])
+            for name in ENDPOINTS if name in recorder.latencies
+        }
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression)
+        report['baseline'] = {'commit': baseline.get('commit'), 'regressions': regressions}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    if regressions:
+        sys.exit(1)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# scripts/microbench.py
+"""
+Offline microbenchmarks for the per-request CPU hot paths: SolarCalculator,
+fallback_calculation, QualificationEngine (against a seeded temporary SQLite
+DB), Vantage Score lookups, input validation, the diversity score and JSON
+serialisation of typical responses.
+
+Each benchmark is calibrated so one sample takes about --min-time seconds,
+warmed up, then sampled --samples times. The report gives median ops/sec, the
+spread between samples and tracemalloc allocation figures per call.
+
+    python scripts/microbench.py                      # run everything
+    python scripts/microbench.py --filter calculator  # only matching names
+    python scripts/microbench.py --save               # record a baseline
+    python scripts/microbench.py --compare            # exit 1 on regressions
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.append(BACKEND_DIR)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(BACKEND_DIR), 'benchmarks', 'microbench_baseline.json')
+QUALIFICATION_INPUT = {'zipCode': '10001', 'electricBill': '150', 'creditBand': 'Good', 'roofSize': '1500'}
+RACE_PERCENTAGES = {'white': 51.9, 'black': 11.1, 'native_american': 0.4, 'asian': 22.2,
+                    'pacific_islander': 0.1, 'other': 7.4, 'two_or_more': 7.0}
+ELECTRICITY_RESPONSE = {
+    'zip_code': '10001', 'city': 'New York', 'state': 'NY', 'data_source': 'findenergy.com',
+    'average_monthly_bill': 152.3, 'average_monthly_usage_kwh': 710, 'utility_rate_per_kwh': 0.215,
+    'source_url': 'https://findenergy.com/ny/new-york-county-electricity/'
+}
+DEMOGRAPHIC_RESPONSE = {
+    'zip_code': '10001', 'city': 'New York', 'state': 'NY',
+    'data_source': 'U.S. Census Bureau ACS 5-year estimates (2021)',
+    'total_population': 27000, 'median_household_income': 96000,
+    'race_counts': {'white': 14000, 'black': 3000, 'asian': 6000, 'other': 2000, 'two_or_more': 1880},
+    'race_percentages': RACE_PERCENTAGES
+}
+SYSTEM_SIZES = [2.0 + (i % 27) * 0.5 for i in range(1000)]
+SYSTEM_STATES = [('CA', 'NY', 'TX', 'FL', 'IL', 'WA')[i % 6] for i in range(1000)]
+@contextlib.contextmanager
+def seeded_database():
+    """Point QualificationEngine at a temporary SQLite DB seeded by init_db.populate_initial_data"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from database import init_db as seed
+    from database.schema import Base
+    import utils.qualification_engine as engine_module
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f'sqlite:///{os.path.join(tmp, "bench.db")}')
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        originals = (seed.SessionLocal, engine_module.SessionLocal)
+        seed.SessionLocal = engine_module.SessionLocal = session_factory
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                seed.populate_initial_data()
+            yield tmp
+        finally:
+            seed.SessionLocal, engine_module.SessionLocal = originals
+            engine.dispose()
+def build_benchmarks():
+    """(name, callable) pairs; every callable runs one operation"""
+    import app
+    from models.batches import QualificationResultBatch
+    from models.solar_models import QualificationResult
+    from utils.amortization import amortization_schedules
+    from utils.qualification_engine import QualificationEngine
+    from utils.solar_calculator import SolarCalculator
+    from utils.validators import validate_input
+    qualification_result = QualificationEngine().process_qualification(QUALIFICATION_INPUT)
+    results = [QualificationResult('approved', 103.36, 9.3, 7.5, 38000.0, 'ok')] * 1000
+    result_batch = QualificationResultBatch.from_records(results)
+    benchmarks = [
+        ('calculator.system_size', lambda: SolarCalculator.calculate_system_size(150, 21.45, 4.2)),
+        ('calculator.system_cost', lambda: SolarCalculator.calculate_system_cost(7.5, 'NY')),
+        ('calculator.system_costs_1000', lambda: SolarCalculator.calculate_system_costs(SYSTEM_SIZES, SYSTEM_STATES)),
+        ('calculator.monthly_payment', lambda: SolarCalculator.calculate_monthly_payment(14437.5, 5.99, 20)),
+        ('calculator.payback_period', lambda: SolarCalculator.calculate_payback_period(14437.5, 150, 103.36)),
+        ('calculator.lifetime_savings', lambda: SolarCalculator.calculate_lifetime_savings(7.5, 21.45, 4.2)),
+        ('amortization.schedules_100x300',
+         lambda: amortization_schedules([20000.0] * 100, 5.99, 300, 150.0)),
+        ('app.fallback_calculation', lambda: app.fallback_calculation(150.0, 'Good', 1500.0)),
+        ('engine.process_qualification.db', lambda: QualificationEngine().process_qualification(QUALIFICATION_INPUT)),
+        ('validators.validate_input.valid', lambda: validate_input(QUALIFICATION_INPUT)),
+        ('validators.validate_input.invalid',
+         lambda: validate_input({**QUALIFICATION_INPUT, 'zipCode': 'ABCDE', 'electricBill': '9000'})),
+        ('app.parse_qualification_input', lambda: app.parse_qualification_input(QUALIFICATION_INPUT)),
+        ('app.calculate_diversity_score', lambda: app.calculate_diversity_score(RACE_PERCENTAGES)),
+        ('json.qualification_response', lambda: json.dumps(qualification_result)),
+        ('json.fallback_response', lambda: json.dumps(app.fallback_calculation(150.0, 'Good', 1500.0))),
+        ('json.electricity_response', lambda: json.dumps(ELECTRICITY_RESPONSE)),
+        ('json.demographic_response', lambda: json.dumps(DEMOGRAPHIC_RESPONSE)),
+        ('models.qualification_result.to_dict',
+         lambda: QualificationResult('approved', 103.36, 9.3, 7.5, 38000.0, 'ok').to_dict()),
+        ('models.result_batch.from_records_1000', lambda: QualificationResultBatch.from_records(results)),
+        ('models.result_batch.ndjson_1000', lambda: ''.join(result_batch.iter_ndjson()))
+    ]
+    vantage_data = app.load_vantage_data_from_excel()
+    if vantage_data:
+        known_zip = next(iter(vantage_data))
+        benchmarks += [
+            ('app.get_vantage_score.hit', lambda: app.get_vantage_score(known_zip)),
+            ('app.get_vantage_score.miss', lambda: app.get_vantage_score('00000'))
+        ]
+    else:
+        print('Skipping get_vantage_score: Vantage Score spreadsheet not found', file=sys.stderr)
+    return benchmarks
+def calibrate(fn, min_time: float) -> int:
+    """Loop count for which one sample takes at least min_time seconds"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            return loops
+        loops *= 2
+def allocations(fn, loops: int) -> dict:
+    """Peak traced memory of one call and bytes still held after `loops` calls"""
+    tracemalloc.start()
+    try:
+        fn()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        start, _ = tracemalloc.get_traced_memory()
+        for _ in range(loops):
+            fn()
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'peak_bytes_per_call': max(peak - before, 0), 'retained_bytes_per_call': round((end - start) / loops, 1)}
+def run_benchmark(fn, args) -> dict:
+    loops = calibrate(fn, args.min_time)
+    warm_until = time.perf_counter() + args.warmup
+    while time.perf_counter() < warm_until:
+        fn()
+    rates = []
+    for _ in range(args.samples):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        rates.append(loops / (time.perf_counter() - start))
+    median = statistics.median(rates)
+    return {
+        'ops_per_sec': round(median, 1),
+        'us_per_op': round(1e6 / median, 3),
+        'rel_stdev': round(statistics.stdev(rates) / statistics.mean(rates), 4) if len(rates) > 1 else 0.0,
+        'loops_per_sample': loops,
+        **allocations(fn, min(loops, 1000))
+    }
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """Benchmarks whose median ops/sec fell by more than max_regression and above their noise"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        drop = 1 - current['ops_per_sec'] / previous['ops_per_sec']
+        noise = 2 * max(current['rel_stdev'], previous['rel_stdev'])
+        if drop > max(max_regression, noise):
+            regressions.append(f"{name}: {previous['ops_per_sec']} -> {current['ops_per_sec']} ops/s "
+                               f"(-{drop:.0%})")
+    return regressions
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark the calculation and lookup hot paths')
+    parser.add_argument('--filter', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--samples', type=int, default=15)
+    parser.add_argument('--min-time', type=float, default=0.05, help='Seconds per sample')
+    parser.add_argument('--warmup', type=float, default=0.2, help='Seconds of warm-up per benchmark')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='Write this run as the baseline')
+    parser.add_argument('--compare', action='store_true', help='Exit 1 if a benchmark regressed')
+    parser.add_argument('--max-regression', type=float, default=0.15)
+    args = parser.parse_args()
+    # Log formatting and file I/O would dominate the lookups being measured
+    logging.disable(logging.CRITICAL)
+    results = {}
+    with seeded_database():
+        for name, fn in build_benchmarks():
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = run_benchmark(fn, args)
+            print(f"{name:<42} {results[name]['ops_per_sec']:>14,.0f} ops/s "
+                  f"±{results[name]['rel_stdev']:.1%}  peak {results[name]['peak_bytes_per_call']:>7} B",
+                  file=sys.stderr)
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'config': {'samples': args.samples, 'min_time': args.min_time, 'warmup': args.warmup},
+        'results': results
+    }
+    regressions = []
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            parser.error(f'No baseline at {args.baseline}; run with --save first')
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        report['regressions'] = regressions
+    print(json.dumps(report, indent=2))
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f":white_check_mark: Baseline saved to {args.baseline}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# scripts/score_leads.py
+"""
+Rescore a lead file offline with the qualification rules, across all cores.
+
+The input is a CSV (or Parquet, with pyarrow installed) with the same fields
+as /api/check-qualification: zipCode, electricBill, creditBand, roofSize;
+other columns are passed through. Each row is validated, resolved against
+the local ZIP, loan rate and incentive tables and scored; the output (CSV,
+or NDJSON for a .ndjson/.jsonl path) gets status, system size, costs,
+payment, payback, savings, location_source and error columns.
+
+    python scripts/score_leads.py leads.csv scored.csv --workers 8
+
+Progress is checkpointed after every chunk; rerunning the same command after
+a crash or kill resumes where it stopped. Use --restart to start over.
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from database.schema import SessionLocal
+from utils.bulk_scoring import CHUNK_BYTES, BulkScorer, ReferenceTables
+from utils.irradiance import DEFAULT_IRRADIANCE_PATH, IrradianceGrid
+def print_progress(report: dict):
+    print(f"{report['rows']:,} rows ({report['fraction_done']:.1%}), {report['invalid']:,} invalid, "
+          f"{report['rows_per_second'] or 0:,} rows/s, {report['elapsed_seconds']}s", file=sys.stderr)
+def main():
+    parser = argparse.ArgumentParser(description='Score a lead file with the qualification rules')
+    parser.add_argument('input', help='Lead file (.csv or .parquet)')
+    parser.add_argument('output', help='Scored output (.csv, or .ndjson/.jsonl)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--chunk-mb', type=float, default=CHUNK_BYTES / 1024 / 1024,
+                        help='Input read per task (CSV); Parquet files are split by row group')
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <output>.checkpoint.json)')
+    parser.add_argument('--restart', action='store_true', help='Ignore any checkpoint and start over')
+    parser.add_argument('--progress-seconds', type=float, default=5.0, help='Seconds between progress lines')
+    parser.add_argument('--irradiance', default=DEFAULT_IRRADIANCE_PATH,
+                        help='Irradiance grid for per-location sun hours (see build_irradiance_grid.py)')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        tables = ReferenceTables.load(db, IrradianceGrid.load(args.irradiance))
+    finally:
+        db.close()
+    print(f"Loaded {len(tables.zip_index):,} ZIPs and {len(tables.loan_terms)} credit bands", file=sys.stderr)
+
+    scorer = BulkScorer(tables, args.workers, int(args.chunk_mb * 1024 * 1024), print_progress,
+                        args.progress_seconds)
+    start = time.perf_counter()
+    try:
+        summary = scorer.run(args.input, args.output, args.checkpoint, restart=args.restart)
+    except (ValueError, ModuleNotFoundError) as e:
+        sys.exit(f"Error: {e}")
+    if summary.get('resumed'):
+        print(f":white_check_mark: {args.output} is already complete; use --restart to score again")
+        return
+    statuses = ', '.join(f'{status} {count:,}' for status, count in sorted(summary['statuses'].items()))
+    print(f":white_check_mark: Scored {summary['rows']:,} leads in {time.perf_counter() - start:.1f}s "
+          f"with {args.workers} workers ({statuses}) -> {args.output}")
+if __name__ == "__main__":
+    main()
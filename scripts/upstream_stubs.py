@@ -0,0 +1,235 @@
+# scripts/upstream_stubs.py
+"""
+Local stand-ins for the upstream services the backend calls (Zippopotam, FCC,
+EIA, Census, the scraped rate sites and Gemini), served from one asyncio HTTP
+server. Every upstream has its own latency distribution and error rate.
+
+Use stub_env() to get the *_URL environment variables that point app.py at it:
+
+    server = start_stub_server(port=0, profiles={'default': 'fixed:50', 'gemini': 'lognormal:900:0.4'})
+    env = stub_env(server.base_url)
+
+Latency specs:
+    fixed:MS                  always MS
+    uniform:LOW:HIGH          uniformly between LOW and HIGH ms
+    exponential:MEAN          exponential with mean MEAN ms
+    lognormal:MEDIAN:SIGMA    log-normal with median MEDIAN ms (long right tail)
+Append @RATE to fail that fraction of calls with a 503, e.g. lognormal:900:0.4@0.02.
+
+For load tests run it as its own process (python scripts/upstream_stubs.py) so
+it doesn't compete with the load generator for the GIL.
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from urllib.parse import urlparse
+ZIPPOPOTAM_BODY = {'places': [{'latitude': '40.7506', 'longitude': '-73.9972',
+                               'state abbreviation': 'NY', 'place name': 'New York'}]}
+FCC_BODY = {'County': {'name': 'New York County'}}
+EIA_BODY = {'response': {'data': [{'sales': '4000', 'revenue': '900', 'customers': '7000000',
+                                   'period': '2024-01'}]}}
+CENSUS_BODY = [
+    ['NAME', 'B02001_001E', 'B02001_002E', 'B02001_003E', 'B02001_004E', 'B02001_005E',
+     'B02001_006E', 'B02001_007E', 'B02001_008E', 'B19013_001E', 'zip code tabulation area'],
+    ['ZCTA5 10001', '27000', '14000', '3000', '100', '6000', '20', '2000', '1880', '96000', '10001']
+]
+FINDENERGY_PAGE = ('<html><body><p>The average monthly electricity bill is $152.30.</p>'
+                   '<p>Residents use 710 kWh of electricity per month.</p>'
+                   '<p>Rates average 21.5 cents per kWh.</p></body></html>')
+RATES_PAGE = ('<html><body><p>The average home uses 880 kWh.</p>'
+              '<p>Electricity costs 20.1 cents per kWh.</p></body></html>')
+GEMINI_RESULT = {
+    'status': 'approved',
+    'system_size_kw': 6.0,
+    'total_cost': 16500.0,
+    'net_cost_after_incentives': 11550.0,
+    'lifetime_savings': 38000.0,
+    'explanation': 'Stubbed qualification result.',
+    'loan_terms': {'apr': 5.99, 'term_years': 20, 'down_payment_percent': 0},
+    'calculations': {'monthly_kwh_usage': 1000.0, 'system_annual_production': 9300.0}
+}
+def gemini_body(request_body: bytes) -> str:
+    """generateContent REST response answering every applicant in the prompt"""
+    try:
+        prompt = json.loads(request_body)['contents'][-1]['parts'][0]['text']
+    except (ValueError, KeyError, IndexError, TypeError):
+        prompt = ''
+    # A structured-output batch is a JSON array of applicants, answered in the same order
+    if prompt.lstrip().startswith('['):
+        answer = [{'index': i, **GEMINI_RESULT} for i in range(len(json.loads(prompt)))]
+    else:
+        answer = GEMINI_RESULT
+    text = json.dumps(answer)
+    return json.dumps({
+        'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}, 'finishReason': 1, 'index': 0}],
+        'usageMetadata': {'promptTokenCount': len(prompt) // 4, 'candidatesTokenCount': len(text) // 4,
+                          'totalTokenCount': (len(prompt) + len(text)) // 4}
+    })
+# (upstream name, path pattern, content type, body or body(request_body)) checked in order
+ROUTES = [
+    ('zippopotam', re.compile(r'^/zippopotam/\d{5}$'), 'application/json', json.dumps(ZIPPOPOTAM_BODY)),
+    ('fcc', re.compile(r'^/fcc$'), 'application/json', json.dumps(FCC_BODY)),
+    ('eia', re.compile(r'^/eia$'), 'application/json', json.dumps(EIA_BODY)),
+    ('census', re.compile(r'^/census$'), 'application/json', json.dumps(CENSUS_BODY)),
+    ('findenergy', re.compile(r'^/findenergy/'), 'text/html', FINDENERGY_PAGE),
+    ('electricityrates', re.compile(r'^/electricityrates/'), 'text/html', RATES_PAGE),
+    ('saveonenergy', re.compile(r'^/saveonenergy/'), 'text/html', RATES_PAGE),
+    ('gemini', re.compile(r'^/v1beta/models/[^/:]+:generateContent$'), 'application/json', gemini_body)
+]
+UPSTREAMS = [name for name, _, _, _ in ROUTES]
+class LatencyProfile:
+    """Latency distribution and error rate for one upstream, parsed from a spec string"""
+    def __init__(self, spec: str):
+        self.spec = spec
+        spec, _, error_rate = spec.partition('@')
+        self.error_rate = float(error_rate) if error_rate else 0.0
+        kind, *params = spec.split(':')
+        params = [float(p) for p in params]
+        if kind == 'fixed' and len(params) == 1:
+            self._sample = lambda: params[0]
+        elif kind == 'uniform' and len(params) == 2:
+            self._sample = lambda: random.uniform(params[0], params[1])
+        elif kind == 'exponential' and len(params) == 1:
+            self._sample = lambda: random.expovariate(1 / params[0]) if params[0] else 0.0
+        elif kind == 'lognormal' and len(params) == 2:
+            self._sample = lambda: random.lognormvariate(math.log(params[0]), params[1])
+        else:
+            raise ValueError(f'Invalid latency spec: {self.spec}')
+    def delay_seconds(self) -> float:
+        return max(self._sample(), 0.0) / 1000
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+def parse_profiles(profiles) -> dict:
+    """Map upstream name -> LatencyProfile; 'default' covers upstreams not listed"""
+    parsed = {'default': LatencyProfile('fixed:50')}
+    for name, spec in (profiles or {}).items():
+        if name != 'default' and name not in UPSTREAMS:
+            raise ValueError(f'Unknown upstream {name!r}; expected one of {", ".join(UPSTREAMS)}')
+        parsed[name] = spec if isinstance(spec, LatencyProfile) else LatencyProfile(spec)
+    return parsed
+class StubServer:
+    """Minimal asyncio HTTP/1.1 server serving canned upstream responses
+
+    Latency is simulated with asyncio.sleep, so thousands of concurrent
+    upstream calls cost no threads and the stub never becomes the bottleneck.
+    """
+    def __init__(self, host: str, port: int, profiles: dict):
+        self.host = host
+        self.port = port
+        self.profiles = parse_profiles(profiles)
+        self.counts = {name: {'requests': 0, 'errors': 0} for name in UPSTREAMS}
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+    def route(self, path: str):
+        """Upstream name, content type and body for a request path"""
+        for name, pattern, content_type, body in ROUTES:
+            if pattern.match(path):
+                return name, content_type, body
+        return None, 'application/json', '{"error": "not found"}'
+    async def respond(self, path: str, request_body: bytes):
+        """Status, content type and payload for one request, after its simulated latency"""
+        name, content_type, body = self.route(path)
+        if name is None:
+            return 404, content_type, body.encode('utf-8')
+        profile = self.profiles.get(name, self.profiles['default'])
+        self.counts[name]['requests'] += 1
+        await asyncio.sleep(profile.delay_seconds())
+        if profile.should_fail():
+            self.counts[name]['errors'] += 1
+            return 503, 'application/json', b'{"error": "stubbed upstream failure"}'
+        if callable(body):
+            body = body(request_body)
+        return 200, content_type, body.encode('utf-8')
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                content_length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = header.decode('latin-1').partition(':')
+                    if key.strip().lower() == 'content-length':
+                        content_length = int(value.strip())
+                request_body = await reader.readexactly(content_length) if content_length else b''
+                path = urlparse(request_line.split(b' ')[1].decode('latin-1')).path
+                status, content_type, payload = await self.respond(path, request_body)
+                writer.write(
+                    f'HTTP/1.1 {status} {"OK" if status == 200 else "Error"}\r\n'
+                    f'Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n\r\n'
+                    .encode('latin-1') + payload
+                )
+                await writer.drain()
+        except (ConnectionError, IndexError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=4096))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self.loop.run_forever()
+    def start(self) -> 'StubServer':
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self
+def start_stub_server(port: int = 0, latency_ms: float = 50, host: str = '127.0.0.1',
+                      profiles: dict = None) -> StubServer:
+    """Start the stub server on a background thread and return it
+
+    latency_ms sets a fixed default latency; profiles maps upstream names (or
+    'default') to latency specs and overrides it.
+    """
+    return StubServer(host, port, {'default': f'fixed:{latency_ms}', **(profiles or {})}).start()
+def stub_env(base: str) -> dict:
+    """Environment variables that point app.py at a stub server at base URL"""
+    return {
+        'ZIPPOPOTAM_URL': f'{base}/zippopotam/{{zip}}',
+        'FCC_LOOKUP_URL': f'{base}/fcc',
+        'EIA_URL': f'{base}/eia',
+        'EIA_API_KEY': 'stub',
+        'CENSUS_API_URL': f'{base}/census',
+        'CENSUS_API_KEY': 'stub',
+        'FINDENERGY_URL': f'{base}/findenergy/{{state}}/{{county}}-electricity/',
+        'ELECTRICITYRATES_URL': f'{base}/electricityrates/{{state}}/',
+        'SAVEONENERGY_URL': f'{base}/saveonenergy/{{state}}/',
+        'GEMINI_API_KEY': 'stub',
+        'GEMINI_API_ENDPOINT': base
+    }
+def parse_profile_args(values) -> dict:
+    """Turn repeated NAME=SPEC command-line values into a profiles dict"""
+    profiles = {}
+    for value in values or []:
+        name, sep, spec = value.partition('=')
+        if not sep:
+            raise ValueError(f'Expected NAME=SPEC, got {value!r}')
+        profiles[name.strip()] = spec.strip()
+    return profiles
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Run the upstream stub server')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=50, help='Fixed default latency')
+    parser.add_argument('--profile', action='append', metavar='NAME=SPEC',
+                        help=f'Latency spec for one upstream or "default" ({", ".join(UPSTREAMS)})')
+    args = parser.parse_args()
+    stub = start_stub_server(args.port, args.latency_ms, profiles=parse_profile_args(args.profile))
+    for key, value in stub_env(stub.base_url).items():
+        print(f'{key}={value}', flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass